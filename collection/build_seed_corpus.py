@@ -0,0 +1,476 @@
+"""
+Builds the seed corpus (seed_<runtime>_<issue>.wasm, as in rtbench) from the issue
+directories written by process_issues.py.
+
+Every issue directory is scanned in parallel for modules: .wasm files, WAT code blocks
+and files (recognized by their content, whatever the extension: process_issues.py saves
+```wasm blocks as .wasm even when they hold WAT), .wast scripts, and the same inside linked
+.tar, .tar.gz and .zip archives. The module commands of .wast scripts (and of WAT followed
+by assertions) are split out; modules in assertions are left alone. Candidates that hold
+no module are counted as dropped. WAT is assembled to binary, every module is validated
+(the validator used is recorded in the manifest), and modules are deduplicated by a
+canonical hash (the module with its custom sections removed, so the same module with or
+without a name section counts once). The first occurrence
+(by runtime, issue and path) becomes the seed; the manifest lists where else it appeared.
+
+Results are cached per artifact, keyed by path, size and mtime, so rebuilding after an
+incremental sync only assembles and validates files of new or changed issues.
+
+Usage:
+    python build_seed_corpus.py <output_dir> <runtime>=<issues_directory> [...]
+e.g.
+    python build_seed_corpus.py rtbench wamr=issues/wamr wasmtime=issues/wasmtime
+"""
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from get_age import TARGET_TO_REPO
+from issue_store import issue_directory
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "reduce"))
+from wasm_module import DecodeError, Module
+
+CACHE_FILENAME = "build_cache.json"
+MANIFEST_FILENAME = "manifest.json"
+SEEDS_DIR = "seeds"
+OBJECTS_DIR = ".objects"
+
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".zip")
+MODULE_SUFFIXES = (".wasm", ".wat", ".wast", ".txt")
+# Bumped when module_candidates changes, so cached artifacts are looked at again
+CACHE_VERSION = 3
+# Artifact status of the candidates module_candidates yields without a module
+DROPPED = {"unrecognized": "not_a_module", "archive": "bad_archive"}
+WASM_MAGIC = b"\0asm"
+
+def find_tools():
+    """
+    Picks the WAT assembler and validator: wasm-tools, else wabt, else the wasmtime Python package.
+    tools["validator"] names the validator, recorded in the manifest; without any of them modules
+    are only checked to decode with reduce/wasm_module.py, which is said loudly.
+    """
+    tools = {}
+    if shutil.which("wasm-tools"):
+        tools["assemble"] = lambda wat, out: ["wasm-tools", "parse", wat, "-o", out]
+        tools["validate"] = lambda wasm: ["wasm-tools", "validate", wasm]
+        tools["validator"] = "wasm-tools"
+    elif shutil.which("wat2wasm"):
+        tools["assemble"] = lambda wat, out: ["wat2wasm", "--enable-all", "--no-check", wat, "-o", out]
+        if shutil.which("wasm-validate"):
+            tools["validate"] = lambda wasm: ["wasm-validate", "--enable-all", wasm]
+            tools["validator"] = "wasm-validate"
+    if "validator" not in tools:
+        if importlib.util.find_spec("wasmtime"):
+            tools["validator"] = "wasmtime"
+        else:
+            tools["validator"] = "wasm_module"
+            print("WARNING: no WebAssembly validator found (wasm-tools, wabt's wasm-validate or the wasmtime "
+                  "Python package); modules are NOT validated, only checked to decode with reduce/wasm_module.py",
+                  file=sys.stderr)
+    return tools
+
+def wat_to_wasm(text, tools):
+    """Assembles WAT source. Returns the binary, or None if it does not assemble."""
+    if "assemble" not in tools:
+        try:
+            import wasmtime
+            return bytes(wasmtime.wat2wasm(text))
+        except ImportError:
+            raise SystemExit("No WAT assembler found: install wasm-tools, wabt or the wasmtime Python package")
+        except Exception:
+            return None
+    with tempfile.TemporaryDirectory() as tmp:
+        wat_path = os.path.join(tmp, "module.wat")
+        wasm_path = os.path.join(tmp, "module.wasm")
+        with open(wat_path, "w") as f:
+            f.write(text)
+        result = subprocess.run(tools["assemble"](wat_path, wasm_path),
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if result.returncode != 0 or not os.path.exists(wasm_path):
+            return None
+        with open(wasm_path, "rb") as f:
+            return f.read()
+
+def is_valid(data, tools):
+    """Whether the module passes the validator of find_tools (see tools["validator"])."""
+    if tools["validator"] == "wasm_module":
+        try:
+            Module(data)
+            return True
+        except (DecodeError, IndexError, ValueError):
+            return False
+    if "validate" not in tools:
+        import wasmtime
+        try:
+            wasmtime.Module.validate(wasmtime.Engine(), data)
+            return True
+        except Exception:
+            return False
+    with tempfile.NamedTemporaryFile(suffix=".wasm") as f:
+        f.write(data)
+        f.flush()
+        return subprocess.run(tools["validate"](f.name), stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL).returncode == 0
+
+def read_leb(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return result, pos
+
+def canonical_hash(data):
+    """
+    sha256 over the module with all custom sections (id 0) removed, or None if the
+    section structure is malformed.
+    """
+    if data[:4] != WASM_MAGIC or len(data) < 8:
+        return None
+    digest = hashlib.sha256(data[:8])
+    pos = 8
+    try:
+        while pos < len(data):
+            start = pos
+            section_id = data[pos]
+            size, pos = read_leb(data, pos + 1)
+            end = pos + size
+            if end > len(data):
+                return None
+            if section_id != 0:
+                digest.update(data[start:end])
+            pos = end
+    except IndexError:
+        return None
+    return digest.hexdigest()
+
+def looks_like_wat(text):
+    return re.search(r"^\s*(?:;;[^\n]*\n\s*)*\(module\b", text) is not None
+
+WAT_TOKEN = re.compile(r"""\s+|;;[^\n]*|\(;|[()]|"(?:[^"\\]|\\.)*"|[^\s()";]+""", re.DOTALL)
+WAT_ESCAPES = {"n": b"\n", "t": b"\t", "r": b"\r", '"': b'"', "'": b"'", "\\": b"\\"}
+
+def wat_string(token):
+    """Bytes of a WAT string literal (with its quotes)."""
+    out = bytearray()
+    body = token[1:-1]
+    i = 0
+    while i < len(body):
+        c = body[i]
+        if c != "\\":
+            out += c.encode()
+            i += 1
+        elif body[i + 1] in WAT_ESCAPES:
+            out += WAT_ESCAPES[body[i + 1]]
+            i += 2
+        elif body[i + 1] == "u":
+            end = body.index("}", i)
+            out += chr(int(body[i + 3:end], 16)).encode()
+            i = end + 1
+        else:
+            out.append(int(body[i + 1:i + 3], 16))
+            i += 3
+    return bytes(out)
+
+def script_forms(text):
+    """
+    Top-level forms of a WAT/WAST text as (start, end, tokens) with the tokens directly inside
+    each form, or None unless the text is nothing but balanced forms and comments.
+    """
+    forms = []
+    depth = start = pos = 0
+    tokens = []
+    while pos < len(text):
+        m = WAT_TOKEN.match(text, pos)
+        if m is None:
+            return None
+        token = m.group()
+        if token == "(;":
+            # Block comments nest
+            level, pos = 1, m.end()
+            while level:
+                nxt = min((i for i in (text.find("(;", pos), text.find(";)", pos)) if i >= 0), default=-1)
+                if nxt < 0:
+                    return None
+                level += 1 if text.startswith("(;", nxt) else -1
+                pos = nxt + 2
+            continue
+        pos = m.end()
+        if token.isspace() or token.startswith(";;"):
+            continue
+        if token == "(":
+            if depth == 0:
+                start, tokens = m.start(), []
+            depth += 1
+        elif token == ")":
+            if depth == 0:
+                return None
+            depth -= 1
+            if depth == 0:
+                forms.append((start, pos, tokens))
+        elif depth == 0:
+            return None
+        elif depth == 1:
+            tokens.append(token)
+    return forms if depth == 0 else None
+
+def script_modules(text):
+    """
+    Yields (kind, module) for the module commands of a WAST script, in order: (module ...) as
+    WAT, (module binary "...") as the binary and (module quote "...") as the quoted WAT.
+    Modules inside assertions (assert_invalid, assert_malformed, ...) are not yielded.
+    """
+    for start, end, tokens in script_forms(text) or ():
+        if not tokens or tokens[0] != "module":
+            continue
+        rest = tokens[1:]
+        if rest and rest[0].startswith("$"):
+            rest = rest[1:]
+        if rest and rest[0] in ("binary", "quote"):
+            data = b"".join(wat_string(t) for t in rest[1:] if t.startswith('"'))
+            if rest[0] == "binary":
+                yield "wasm", data
+            else:
+                yield "wat", "(module " + data.decode("utf-8", errors="replace") + ")"
+        else:
+            yield "wat", text[start:end]
+
+def module_candidates(name, data):
+    """
+    Yields (member, kind, bytes) for the modules in one artifact: the file itself, the
+    members of an archive, or the module commands of a WAST script (member "#<k>", after
+    the archive member name if any). kind is "wasm" or "wat"; dropped candidates come with
+    no bytes and kind "unrecognized" (a module file holding neither) or "archive" (unreadable).
+    """
+    lower = name.lower()
+    if lower.endswith(ARCHIVE_SUFFIXES):
+        try:
+            if lower.endswith(".zip"):
+                with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                    members = [(m, archive.read(m)) for m in sorted(archive.namelist()) if not m.endswith("/")]
+            else:
+                with tarfile.open(fileobj=io.BytesIO(data)) as archive:
+                    members = [(m.name, archive.extractfile(m).read())
+                               for m in sorted(archive.getmembers(), key=lambda m: m.name) if m.isfile()]
+        except (tarfile.TarError, zipfile.BadZipFile, EOFError, OSError):
+            yield None, "archive", None
+            return
+        for member, content in members:
+            for part, kind, module in module_candidates(member, content):
+                yield member + (part or ""), kind, module
+        return
+    if data[:4] == WASM_MAGIC:
+        yield None, "wasm", data
+        return
+    text = data.decode("utf-8", errors="replace")
+    forms = script_forms(text)
+    if forms and not (len(forms) == 1 and looks_like_wat(text)):
+        # A WAST script (or WAT followed by assertions): each module command is a candidate
+        modules = list(script_modules(text))
+        for k, (kind, module) in enumerate(modules, start=1):
+            yield f"#{k}", kind, module
+        if modules:
+            return
+    elif looks_like_wat(text):
+        yield None, "wat", text
+        return
+    if lower.endswith(MODULE_SUFFIXES):
+        yield None, "unrecognized", None
+
+def process_artifact(path, tools, objects_dir):
+    """
+    Assembles and validates the modules of one artifact. Valid modules are stored under
+    objects_dir by canonical hash.
+
+    Returns:
+        list: One {"member", "status", "canonical"} record per module candidate.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    records = []
+    for member, kind, module in module_candidates(os.path.basename(path), data):
+        record = {"member": member, "kind": kind, "status": "ok", "canonical": None}
+        if kind in DROPPED:
+            record["status"] = DROPPED[kind]
+            records.append(record)
+            continue
+        if kind == "wat":
+            module = wat_to_wasm(module, tools)
+            if module is None:
+                record["status"] = "assemble_failed"
+                records.append(record)
+                continue
+        canonical = canonical_hash(module)
+        if canonical is None or not is_valid(module, tools):
+            record["status"] = "invalid"
+        else:
+            record["canonical"] = canonical
+            object_path = os.path.join(objects_dir, f"{canonical}.wasm")
+            if not os.path.exists(object_path):
+                fd, tmp = tempfile.mkstemp(dir=objects_dir)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(module)
+                os.replace(tmp, object_path)
+        records.append(record)
+    return records
+
+def scan_issue_dir(issue_dir):
+    """Lists the candidate artifact files of one issue directory (recursively), sorted."""
+    artifacts = []
+    for root, _, files in os.walk(issue_dir):
+        for name in files:
+            lower = name.lower()
+            if lower.endswith(MODULE_SUFFIXES + ARCHIVE_SUFFIXES):
+                artifacts.append(os.path.join(root, name))
+    return sorted(artifacts)
+
+def seed_name(runtime, issue, k):
+    """seed_<runtime>_<issue>.wasm for an issue's first module, seed_<runtime>_<issue>-<k>.wasm after."""
+    return f"seed_{runtime}_{issue}.wasm" if k == 1 else f"seed_{runtime}_{issue}-{k}.wasm"
+
+def build_seed_corpus(output_dir, sources, workers=None):
+    """
+    Builds the seed corpus in output_dir/seeds and writes output_dir/manifest.json.
+
+    Args:
+        output_dir (str): Directory for the seeds, manifest and build cache.
+        sources (dict): Runtime target (as in TARGET_TO_REPO) -> issues directory.
+        workers (int): Number of parallel workers (default: CPU count).
+
+    Returns:
+        list: The manifest entries, one per seed.
+    """
+    workers = workers or os.cpu_count() or 4
+    tools = find_tools()
+    objects_dir = os.path.join(output_dir, OBJECTS_DIR)
+    os.makedirs(objects_dir, exist_ok=True)
+
+    cache_path = os.path.join(output_dir, CACHE_FILENAME)
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cache = json.load(f)
+
+    # Scan all issue directories in parallel
+    issue_dirs = []
+    for runtime, issues_directory in sorted(sources.items()):
+        # Issues of the runtime's repository (<owner>_<repo>/<number>, see process_issues.py),
+        # and <number> directories of older runs
+        directories = [issues_directory]
+        if runtime in TARGET_TO_REPO:
+            repo = "/".join(TARGET_TO_REPO[runtime])
+            directories.insert(0, os.path.dirname(issue_directory(issues_directory, repo, 0)))
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            for entry in sorted(os.listdir(directory), key=lambda e: (len(e), e)):
+                if entry.isdigit() and os.path.isdir(os.path.join(directory, entry)):
+                    issue_dirs.append((runtime, entry, os.path.join(directory, entry)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        listings = list(executor.map(lambda d: scan_issue_dir(d[2]), issue_dirs))
+
+    # Assemble and validate only artifacts whose cache entry is missing or stale
+    artifacts = []
+    todo = []
+    for (runtime, issue, issue_dir), paths in zip(issue_dirs, listings):
+        for path in paths:
+            stat = os.stat(path)
+            key = os.path.abspath(path)
+            signature = [stat.st_size, stat.st_mtime_ns]
+            artifacts.append((runtime, issue, issue_dir, path, key))
+            entry = cache.get(key)
+            if entry is None or entry["stat"] != signature or entry.get("version") != CACHE_VERSION or \
+                    entry.get("validator") != tools["validator"] or any(
+                    r["canonical"] and not os.path.exists(os.path.join(objects_dir, f"{r['canonical']}.wasm"))
+                    for r in entry["modules"]):
+                todo.append((key, path, signature))
+    print(f"Found {len(artifacts)} artifacts in {len(issue_dirs)} issues, {len(todo)} new or changed")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda t: process_artifact(t[1], tools, objects_dir), todo)
+        for (key, path, signature), records in zip(todo, results):
+            cache[key] = {"stat": signature, "version": CACHE_VERSION, "validator": tools["validator"],
+                          "modules": records}
+    live = {key for *_, key in artifacts}
+    cache = {key: entry for key, entry in cache.items() if key in live}
+    with open(cache_path + ".tmp", "w") as f:
+        json.dump(cache, f)
+    os.replace(cache_path + ".tmp", cache_path)
+
+    # Deduplicate by canonical hash: the first occurrence becomes the seed
+    seeds = {}
+    per_issue = {}
+    status_counts = {}
+    for runtime, issue, issue_dir, path, key in artifacts:
+        for record in cache[key]["modules"]:
+            status_counts[record["status"]] = status_counts.get(record["status"], 0) + 1
+            if record["status"] != "ok":
+                continue
+            source = os.path.relpath(path, os.path.dirname(issue_dir))
+            if record["member"]:
+                source += f":{record['member']}"
+            canonical = record["canonical"]
+            if canonical in seeds:
+                seeds[canonical]["duplicates"].append({"runtime": runtime, "issue": issue, "source": source})
+                continue
+            k = per_issue[(runtime, issue)] = per_issue.get((runtime, issue), 0) + 1
+            seeds[canonical] = {
+                "seed": seed_name(runtime, issue, k),
+                "runtime": runtime,
+                "issue": issue,
+                "repository": "/".join(TARGET_TO_REPO.get(runtime, ("", ""))),
+                "source": source,
+                "canonical_hash": canonical,
+                "size": os.path.getsize(os.path.join(objects_dir, f"{canonical}.wasm")),
+                "duplicates": [],
+            }
+
+    seeds_dir = os.path.join(output_dir, SEEDS_DIR)
+    os.makedirs(seeds_dir, exist_ok=True)
+    wanted = {entry["seed"]: canonical for canonical, entry in seeds.items()}
+    for name in os.listdir(seeds_dir):
+        if name not in wanted:
+            os.remove(os.path.join(seeds_dir, name))
+    for name, canonical in wanted.items():
+        seed_path = os.path.join(seeds_dir, name)
+        object_path = os.path.join(objects_dir, f"{canonical}.wasm")
+        if os.path.exists(seed_path):
+            if os.path.samefile(seed_path, object_path):
+                continue
+            os.remove(seed_path)
+        try:
+            os.link(object_path, seed_path)
+        except OSError:
+            shutil.copyfile(object_path, seed_path)
+
+    manifest = sorted(seeds.values(), key=lambda e: (e["runtime"], int(e["issue"]), e["seed"]))
+    with open(os.path.join(output_dir, MANIFEST_FILENAME), "w") as f:
+        json.dump({"seeds": manifest, "validator": tools["validator"], "artifact_status": status_counts}, f, indent=2)
+    duplicates = sum(len(e["duplicates"]) for e in manifest)
+    print(f"Wrote {len(manifest)} seeds ({duplicates} duplicates dropped) to {seeds_dir}; "
+          f"validated with {tools['validator']}; artifact status: {status_counts}")
+    return manifest
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or not all("=" in arg for arg in sys.argv[2:]):
+        print("Usage: python build_seed_corpus.py <output_dir> <runtime>=<issues_directory> [...]")
+        sys.exit(1)
+    sources = dict(arg.split("=", 1) for arg in sys.argv[2:])
+    unknown = [runtime for runtime in sources if runtime not in TARGET_TO_REPO]
+    if unknown:
+        print(f"Unknown runtime(s) {unknown}; expected one of {sorted(TARGET_TO_REPO)}")
+        sys.exit(1)
+    build_seed_corpus(sys.argv[1], sources)
@@ -1,93 +1,123 @@
-import subprocess
-import json
+"""
+Collects the bug issues of a GitHub repository with their comments into an issue store
+(issues.db) and exports them as issues.json.
+
+Usage:
+    python collect_issues.py <owner> <repo> <limit> <storage_dir> [concurrency] [--full]
+
+limit bounds the issues fetched by one run. A first (or --full) sync fetches the newest
+<limit> issues, like `gh issue list --limit`; later syncs fetch the <limit> least recently
+updated of the issues changed since the last one, so repeated limited syncs catch up in order.
+"""
+import asyncio
 import sys
 import os
 
-def collect_issues_and_comments(owner, repo, limit):
+from github_api import GitHubClient, GitHubError, fetch_issues
+from issue_store import IssueStore
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pipeline"))
+import spans
+
+def collect_issues_and_comments(owner, repo, limit, concurrency=8, since=None):
     """
-    Collects issues and their discussions/comments from a GitHub repository using the gh CLI.
+    Collects issues and their discussions/comments from a GitHub repository using the REST API.
+    Issues are listed page by page and their comments are fetched concurrently over a pooled
+    HTTP client that backs off on rate limits. Set GITHUB_API_URL to collect from another API
+    root, e.g. the offline fixture server in fake_github.py.
 
     Args:
         owner (str): The owner of the repository.
         repo (str): The repository name.
         limit (int): The maximum number of issues to retrieve.
+        concurrency (int): The maximum number of requests in flight.
+        since (str): Only retrieve issues created or updated at or after this ISO 8601 timestamp.
 
     Returns:
-        dict: A dictionary where keys are issue numbers and values are the issue details including comments.
+        tuple: A dictionary where keys are issue numbers and values are the issue details including
+        comments, and one from issue numbers to the updatedAt of issues whose comments failed.
     """
-    repository = f"{owner}/{repo}"
-    issues_data = {}
+    async def collect():
+        async with GitHubClient(concurrency=concurrency) as client:
+            with spans.span("fetch_issues", repository=f"{owner}/{repo}", since=since):
+                issues_data, failed = await fetch_issues(client, owner, repo, labels="bug,Bug", limit=limit, since=since)
+            print(f"Used {client.requests} API requests")
+            spans.count("github.requests", client.requests)
+            return issues_data, failed
 
     try:
-        # Retrieve the list of issues as JSON containing issue numbers.
-        # Filter for issues with "bug" or "Bug" labels
-        list_cmd = [
-            'gh', 'issue', 'list',
-            '--repo', repository,
-            '--state', 'all',
-            '--limit', str(limit),
-            '--label', 'bug,Bug',
-            '--json', 'number'
-        ]
-        list_output = subprocess.check_output(list_cmd)
-        issues = json.loads(list_output)
-        print(f"Retrieved {len(issues)} issues from {repository}")
-    except subprocess.CalledProcessError as e:
+        return asyncio.run(collect())
+    except GitHubError as e:
         print("Error while listing issues:", e)
-        return {}
+        return {}, {}
     except Exception as e:
         print("Unexpected error:", e)
-        return {}
+        return {}, {}
 
-    # For each issue number, retrieve detailed info and comments.
-    for i, issue in enumerate(issues, 1):
-        issue_number = issue.get("number")
-        if issue_number is None:
-            continue
-        
-        print(f"Processing issue {i}/{len(issues)}: #{issue_number}")
-        
-        try:
-            view_cmd = [
-                'gh', 'issue', 'view', str(issue_number),
-                '--repo', repository,
-                '--comments',
-                '--json', 'number,url,title,body,comments'
-            ]
-            view_output = subprocess.check_output(view_cmd)
-            issue_detail = json.loads(view_output)
-            issues_data[issue_number] = issue_detail
-        except subprocess.CalledProcessError as e:
-            print(f"Error while viewing issue {issue_number}:", e)
-        except Exception as e:
-            print(f"Unexpected error for issue {issue_number}:", e)
+def sync_issues(owner, repo, limit, storage_dir, concurrency=8, full=False):
+    """
+    Incrementally syncs issues and their comments into the per-issue store (issues.db) in storage_dir.
+    Only issues created or changed since the repository's high-water mark (the largest updatedAt
+    stored so far) are fetched; a first sync, or full=True, fetches everything.
 
-    return issues_data
+    Args:
+        owner (str): Repository owner.
+        repo (str): Repository name.
+        limit (int): Maximum number of issues to retrieve in this sync: the newest ones on a
+            first or full sync, else the least recently updated of the changed ones.
+        storage_dir (str): Directory holding issues.db.
+        concurrency (int): The maximum number of requests in flight.
+        full (bool): Ignore the high-water mark and fetch all issues.
+
+    Returns:
+        int: The number of new or changed issues.
+    """
+    repository = f"{owner}/{repo}"
+    with IssueStore.in_directory(storage_dir) as store:
+        since = None if full else store.high_water(repository)
+        if since:
+            print(f"Fetching issues of {repository} updated since {since}")
+        data, failed = collect_issues_and_comments(owner, repo, limit, concurrency, since)
+        with spans.span("store", issues=len(data)):
+            changed = store.upsert(repository, data, failed)
+        print(f"{changed} new or changed issues stored (high-water mark: {store.high_water(repository)})")
+        if failed:
+            print(f"{len(failed)} issues failed and are fetched again by the next sync")
+    return changed
 
-def store_issues_json(owner, repo, limit, output_file="issues.json"):
+def store_issues_json(owner, repo, limit, output_file="issues.json", concurrency=8, full=False):
     """
-    Collects issues and their comments from a specified GitHub repo and stores the result in a JSON file.
+    Syncs issues and their comments from a specified GitHub repo into the issue store next to
+    output_file and writes the complete stored set as a JSON file.
 
     Args:
         owner (str): Repository owner.
         repo (str): Repository name.
         limit (int): Maximum number of issues to retrieve.
         output_file (str): The filename where the JSON output will be stored.
+        concurrency (int): The maximum number of requests in flight.
+        full (bool): Ignore the high-water mark and fetch all issues.
     """
-    data = collect_issues_and_comments(owner, repo, limit)
+    storage_dir = os.path.dirname(os.path.abspath(output_file))
+    sync_issues(owner, repo, limit, storage_dir, concurrency, full)
     try:
-        with open(output_file, "w") as fp:
-            json.dump(data, fp, indent=2)
+        with IssueStore.in_directory(storage_dir) as store, spans.span("export_json"):
+            total = store.export_json(output_file, f"{owner}/{repo}")
         print(f"Issues and comments have been successfully saved to {output_file}")
-        print(f"Total issues collected: {len(data)}")
+        print(f"Total issues stored: {total}")
     except IOError as e:
         print("Error writing JSON to file:", e)
 
 # Example usage:
 if __name__ == "__main__":
+    if len(sys.argv) < 5:
+        print(__doc__.strip())
+        sys.exit(1)
     owner = sys.argv[1]   # Replace with the actual repository owner
     repo  = sys.argv[2]    # Replace with the actual repository name
     limit = int(sys.argv[3])
-    storage_dir = sys.argv[4]  # Directory path to store issues.json
+    storage_dir = sys.argv[4]  # Directory path to store issues.db and issues.json
+    concurrency = int(sys.argv[5]) if len(sys.argv) > 5 and sys.argv[5].isdigit() else 8
+    full = "--full" in sys.argv[5:]  # Refetch everything instead of syncing from the high-water mark
 
-    store_issues_json(owner, repo, limit, os.path.join(storage_dir, "issues.json"))
\ No newline at end of file
+    store_issues_json(owner, repo, limit, os.path.join(storage_dir, "issues.json"), concurrency, full)
\ No newline at end of file
@@ -0,0 +1,378 @@
+"""
+Corpus minimization (cmin): picks a small subset of a seed corpus that keeps everything the
+corpus covers and every distinct oracle behaviour it shows.
+
+Every seed has a set of features:
+  - coverage: the edges it hits in each instrumented runtime build, one file per seed and
+    build as written by afl-showmap ("<edge>:<hit count>" lines) or plain edge ids, one per
+    line. With --hitcounts, the AFL hit count bucket of an edge counts as well, as in afl-cmin.
+  - outcome signatures: the output blocks of replay_wasm.sh for the seed (one per invoked
+    function), normalized like dedup_output.py does, so seeds that dedup_output.py would
+    keep apart are kept apart here too.
+
+The subset covers the union of all features, by greedy weighted set cover: the seed with the
+most uncovered features per unit of cost is taken next, cost being the seed's size (times
+its replay time with --times, so small and fast seeds are preferred). Scores only decrease,
+so stale heap entries are re-scored when they come up (lazy greedy). Feature sets are sparse
+bitsets (the uint64 words a seed touches and their bits), so scoring a seed is a popcount
+over its own words. Seeds the greedy pass made redundant are then dropped, costliest first.
+
+Coverage and output files are parsed in worker processes. The selected seeds are written
+to a directory (or a corpus pack) together with cmin.json, the provenance: the inputs, and
+for every selected seed its size, cost, selection order and the features it added.
+
+Usage:
+    python corpus_cmin.py <corpus dir | .tar.gz | .pack> -o <out_dir | out.pack>
+                          [--coverage BUILD=DIR ...] [--outputs DIR ...] [--hitcounts]
+                          [--times spans.jsonl | times.csv] [--jobs N] [--dry-run]
+e.g.
+    python corpus_cmin.py rtbench.pack -o rtbench-cmin.pack --coverage wamr=showmap/wamr \\
+        --coverage wasmtime=showmap/wasmtime --outputs replay/output
+"""
+import argparse
+import csv
+import hashlib
+import heapq
+import json
+import os
+import shutil
+import sys
+import tarfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from corpus_pack import CorpusPack, iter_source, seed_metadata, write_pack
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "exec_oracle"))
+from dedup_output import MIN_INPUT_LINES, normalize_numeric_outputs
+from oracle_results import testcase_name
+
+PROVENANCE_FILENAME = "cmin.json"
+# Suffixes of coverage files next to the seed name (afl-showmap keeps the input's name)
+COVERAGE_SUFFIXES = (".wasm", ".txt", ".cov", ".map")
+# Upper ends of AFL's hit count classes 1, 2, 3, 4-7, 8-15, 16-31, 32-127, 128+
+HIT_BUCKETS = np.array([1, 2, 3, 4, 8, 16, 32, 128])
+EDGE_BITS = 40
+
+if hasattr(np, "bitwise_count"):
+    def popcount(words):
+        return int(np.bitwise_count(words).sum())
+else:
+    # numpy < 2.0
+    _BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        return int(_BYTE_COUNTS[np.ascontiguousarray(words).view(np.uint8)].sum(dtype=np.int64))
+
+def seed_stem(name):
+    """Seed name as used by coverage and output files: the basename without .wasm."""
+    return os.path.basename(name).removesuffix(".wasm")
+
+# ----------- corpus -----------
+
+def corpus_sizes(source):
+    """{member name: size} of the seeds of a directory, tarball or corpus pack."""
+    if source.endswith(".pack"):
+        with CorpusPack(source) as pack:
+            return {entry["name"]: entry["size"] for entry in pack.entries}
+    if os.path.isdir(source):
+        sizes = {}
+        for root, _, files in os.walk(source):
+            for f in files:
+                if f.endswith(".wasm"):
+                    path = os.path.join(root, f)
+                    sizes[os.path.relpath(path, source)] = os.path.getsize(path)
+        return sizes
+    with tarfile.open(source, "r:*") as archive:
+        return {m.name.removeprefix("./"): m.size for m in archive if m.isfile() and m.name.endswith(".wasm")}
+
+def write_selection(source, names, output):
+    """Writes the named members of source to a directory or, for a .pack output, a corpus pack."""
+    wanted = set(names)
+    if source.endswith(".pack"):
+        with CorpusPack(source) as pack:
+            entries = [entry for entry in pack.entries if entry["name"] in wanted]
+            if output.endswith(".pack"):
+                # Members are copied as stored, without recompressing
+                write_pack(output, ((entry, pack.stored(entry)) for entry in entries))
+            else:
+                pack.extract(entries, output)
+        return
+    members = ((name, data) for name, data in iter_source(source) if name in wanted)
+    if output.endswith(".pack"):
+        write_pack(output, ((dict(seed_metadata(name), name=name), data) for name, data in members))
+        return
+    for name, data in members:
+        path = os.path.join(output, name)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+# ----------- features -----------
+
+def parse_edge(edge):
+    """Edge id of a coverage line: decimal, zero-padded as afl-showmap writes it (%06u), or 0x hex."""
+    if edge[:2].lower() == "0x":
+        return int(edge, 16)
+    return int(edge, 10)
+
+def read_coverage(job):
+    """[(seed stem, int64 feature keys)] for coverage files of one build (run in worker processes)."""
+    build, paths, hitcounts = job
+    results = []
+    for path in paths:
+        edges, counts = [], []
+        with open(path) as f:
+            for line in f:
+                edge, _, count = line.strip().partition(":")
+                if not edge:
+                    continue
+                edges.append(parse_edge(edge))
+                counts.append(int(count) if count else 1)
+        keys = np.array(edges, dtype=np.int64)
+        if hitcounts:
+            buckets = np.searchsorted(HIT_BUCKETS, np.array(counts), side="right") - 1
+            keys = (keys << 3) | np.clip(buckets, 0, 7)
+        name = os.path.basename(path)
+        for suffix in COVERAGE_SUFFIXES:
+            name = name.removesuffix(suffix)
+        results.append((name, np.unique((np.int64(build) << EDGE_BITS) | keys)))
+    return results
+
+def read_signatures(paths):
+    """[(seed stem, signature digest)] for replay outputs, normalized like dedup_output.py."""
+    results = []
+    for path in paths:
+        with open(path, encoding="ISO-8859-1") as f:
+            lines = f.readlines()
+        if len(lines) < MIN_INPUT_LINES:
+            continue
+        block, numbers, counter = [], {}, 1
+        for line in lines:
+            line = line.strip()
+            if "DIFF" in line:
+                continue
+            normalized, counter = normalize_numeric_outputs(line, numbers, counter)
+            block.append(normalized)
+        digest = hashlib.sha1("\n".join(block).strip().encode()).hexdigest()
+        results.append((testcase_name(os.path.basename(path)), digest))
+    return results
+
+def parallel_map(function, jobs, workers):
+    """Concatenated results of function over jobs, in worker processes when there are several jobs."""
+    if workers == 1 or len(jobs) < 2:
+        return [result for job in jobs for result in function(job)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [result for results in pool.map(function, jobs) for result in results]
+
+def chunks(items, workers):
+    size = max(64, -(-len(items) // (4 * workers)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def listing(directory, suffix=None):
+    with os.scandir(directory) as entries:
+        return sorted(e.path for e in entries if e.is_file() and (suffix is None or e.name.endswith(suffix)))
+
+def read_times(path):
+    """{seed stem: seconds}: replay "testcase" spans of a spans.jsonl trace, or name,seconds rows."""
+    times = {}
+    if path.endswith(".jsonl"):
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pipeline"))
+        from spans import read_trace
+        for s in read_trace(path)[0]:
+            if s["name"] == "testcase" and "testcase" in s.get("args", {}):
+                stem = seed_stem(s["args"]["testcase"])
+                times[stem] = times.get(stem, 0) + s["dur"] / 1e6
+        return times
+    with open(path, newline="") as f:
+        for row in csv.reader(f, delimiter="\t" if path.endswith(".tsv") else ","):
+            try:
+                times[seed_stem(row[0])] = float(row[1])
+            except (IndexError, ValueError):
+                continue  # header or malformed row
+    return times
+
+class FeatureSets:
+    """
+    Features of the seeds: ids[indptr[i]:indptr[i + 1]] are the sorted feature ids of seed i;
+    ids below n_edges are coverage, the others outcome signatures. words[i] and masks[i] are the
+    same set as a sparse bitset (the uint64 words it touches and its bits within them).
+    """
+
+    def __init__(self, seed_features, n_edges, n_features):
+        self.n_edges = n_edges
+        self.n_features = n_features
+        self.indptr = np.zeros(len(seed_features) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum([len(f) for f in seed_features])
+        self.ids = np.concatenate(seed_features) if seed_features else np.zeros(0, dtype=np.int64)
+        self.words, self.masks = [], []
+        for features in seed_features:
+            words, inverse = np.unique(features >> 6, return_inverse=True)
+            masks = np.zeros(len(words), dtype=np.uint64)
+            np.bitwise_or.at(masks, inverse, np.left_shift(np.uint64(1), (features & 63).astype(np.uint64)))
+            self.words.append(words)
+            self.masks.append(masks)
+
+    def features(self, i):
+        return self.ids[self.indptr[i]:self.indptr[i + 1]]
+
+    def all_set(self):
+        """Bitset with every feature of some seed set."""
+        bits = np.zeros(-(-self.n_features // 64), dtype=np.uint64)
+        for words, masks in zip(self.words, self.masks):
+            bits[words] |= masks
+        return bits
+
+def build_features(stems, coverage, outputs, hitcounts, workers):
+    """FeatureSets over stems (seed order), and the number of distinct signatures."""
+    index = {stem: i for i, stem in enumerate(stems)}
+    keys = [[] for _ in stems]
+    jobs = [(b, paths, hitcounts) for b, (_, directory) in enumerate(coverage)
+            for paths in chunks(listing(directory), workers)]
+    for stem, seed_keys in parallel_map(read_coverage, jobs, workers):
+        if stem in index:
+            keys[index[stem]].append(seed_keys)
+    seed_keys = [np.concatenate(k) if k else np.zeros(0, dtype=np.int64) for k in keys]
+    # Compact edge ids: every distinct (build, edge) key that some seed of the corpus hits
+    vocabulary = np.unique(np.concatenate(seed_keys)) if seed_keys else np.zeros(0, dtype=np.int64)
+    edges = [np.searchsorted(vocabulary, k).astype(np.int64) for k in seed_keys]
+
+    signatures = {}
+    seed_signatures = [set() for _ in stems]
+    paths = [path for directory in outputs for path in listing(directory, ".txt")]
+    for stem, digest in parallel_map(read_signatures, chunks(paths, workers), workers):
+        if stem in index:
+            seed_signatures[index[stem]].add(signatures.setdefault(digest, len(vocabulary) + len(signatures)))
+    features = [np.union1d(e, np.fromiter(s, dtype=np.int64, count=len(s))) for e, s in zip(edges, seed_signatures)]
+    return FeatureSets(features, len(vocabulary), len(vocabulary) + len(signatures)), len(signatures)
+
+# ----------- set cover -----------
+
+def greedy_cover(sets, costs):
+    """
+    Seeds (indices) covering every feature, in selection order, with the (edges, signatures)
+    each added: lazy greedy on uncovered features per unit of cost. Ties go to the cheaper,
+    then the earlier seed, so the result is deterministic.
+    """
+    uncovered = sets.all_set()
+    heap = [(-popcount(sets.masks[i]) / costs[i], costs[i], i) for i in range(len(costs)) if len(sets.masks[i])]
+    heapq.heapify(heap)
+    chosen = []
+    while heap:
+        _, cost, i = heapq.heappop(heap)
+        words, masks = sets.words[i], sets.masks[i]
+        new = uncovered[words] & masks
+        gain = popcount(new)
+        if gain == 0:
+            continue
+        score = gain / cost
+        if heap and score < -heap[0][0]:
+            heapq.heappush(heap, (-score, cost, i))
+            continue
+        signature_ids = sets.features(i)[sets.features(i) >= sets.n_edges]
+        new_signatures = int(np.count_nonzero(
+            (uncovered[signature_ids >> 6] >> (signature_ids & 63).astype(np.uint64)) & np.uint64(1)))
+        uncovered[words] &= ~masks
+        chosen.append((i, gain - new_signatures, new_signatures))
+    return chosen
+
+def drop_redundant(sets, chosen, costs):
+    """Removes chosen seeds whose features all other chosen seeds cover, costliest first."""
+    counts = np.zeros(sets.n_features, dtype=np.int32)
+    for i, _, _ in chosen:
+        counts[sets.features(i)] += 1
+    keep = {i for i, _, _ in chosen}
+    for i, _, _ in sorted(chosen, key=lambda c: (-costs[c[0]], c[0])):
+        features = sets.features(i)
+        if np.all(counts[features] >= 2):
+            counts[features] -= 1
+            keep.discard(i)
+    return [c for c in chosen if c[0] in keep]
+
+# ----------- command line -----------
+
+def parse_builds(values, parser):
+    builds = []
+    for value in values:
+        build, sep, directory = value.partition("=")
+        if not sep or not os.path.isdir(directory):
+            parser.error(f"expected BUILD=DIR with an existing directory, got {value!r}")
+        builds.append((build, directory))
+    return builds
+
+def main():
+    parser = argparse.ArgumentParser(description="Coverage- and outcome-preserving seed corpus minimization")
+    parser.add_argument("corpus", help="Seed directory, tarball (rtbench.tar.gz) or corpus pack")
+    parser.add_argument("-o", "--output", help="Output directory, or a .pack file")
+    parser.add_argument("--coverage", action="append", default=[], metavar="BUILD=DIR",
+                        help="Per-seed coverage files of an instrumented runtime build (repeatable)")
+    parser.add_argument("--outputs", action="append", default=[], metavar="DIR",
+                        help="replay_wasm.sh output directory of the corpus (repeatable)")
+    parser.add_argument("--hitcounts", action="store_true", help="Count AFL hit count buckets as features")
+    parser.add_argument("--times", help="Replay times (spans.jsonl trace or name,seconds CSV) to weigh seeds by")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes for parsing")
+    parser.add_argument("--dry-run", action="store_true", help="Only report the selection")
+    args = parser.parse_args()
+
+    coverage = parse_builds(args.coverage, parser)
+    if not coverage and not args.outputs:
+        parser.error("give --coverage and/or --outputs")
+    if not args.output and not args.dry_run:
+        parser.error("give -o/--output (or --dry-run)")
+
+    sizes = corpus_sizes(args.corpus)
+    names = sorted(sizes)
+    stems = [seed_stem(name) for name in names]
+    sets, n_signatures = build_features(stems, coverage, args.outputs, args.hitcounts, args.jobs)
+
+    costs = np.array([max(1, sizes[name]) for name in names], dtype=np.float64)
+    if args.times:
+        times = read_times(args.times)
+        known = [times[stem] for stem in stems if stem in times]
+        default = float(np.median(known)) if known else 1.0
+        costs *= np.array([max(times.get(stem, default), 1e-3) for stem in stems])
+
+    chosen = drop_redundant(sets, greedy_cover(sets, costs), costs)
+    no_data = int(np.count_nonzero(np.diff(sets.indptr) == 0))
+    bytes_out = sum(sizes[names[i]] for i, _, _ in chosen)
+    print(f"{len(chosen)} of {len(names)} seeds cover {sets.n_edges} edges and {n_signatures} outcome signatures "
+          f"({bytes_out} of {sum(sizes.values())} bytes); {no_data} seeds had no coverage or outputs")
+    if args.dry_run:
+        for i, edges, signatures in chosen:
+            print(f"{names[i]}\t{sizes[names[i]]}\t+{edges} edges\t+{signatures} signatures")
+        return
+
+    if not args.output.endswith(".pack"):
+        shutil.rmtree(args.output, ignore_errors=True)
+        os.makedirs(args.output)
+    write_selection(args.corpus, [names[i] for i, _, _ in chosen], args.output)
+    provenance = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "corpus": os.path.abspath(args.corpus),
+        "coverage": {build: os.path.abspath(directory) for build, directory in coverage},
+        "outputs": [os.path.abspath(directory) for directory in args.outputs],
+        "hitcounts": args.hitcounts,
+        "times": os.path.abspath(args.times) if args.times else None,
+        "seeds_in": len(names),
+        "seeds_without_data": no_data,
+        "seeds_out": len(chosen),
+        "bytes_in": sum(sizes.values()),
+        "bytes_out": bytes_out,
+        "edges": sets.n_edges,
+        "signatures": n_signatures,
+        "selected": [{"name": names[i], "size": sizes[names[i]], "cost": round(float(costs[i]), 3), "order": order,
+                      "new_edges": edges, "new_signatures": signatures,
+                      "edges": int(np.count_nonzero(sets.features(i) < sets.n_edges)),
+                      "signatures": int(np.count_nonzero(sets.features(i) >= sets.n_edges))}
+                     for order, (i, edges, signatures) in enumerate(chosen)],
+    }
+    path = f"{args.output}.{PROVENANCE_FILENAME}" if args.output.endswith(".pack") \
+        else os.path.join(args.output, PROVENANCE_FILENAME)
+    with open(path, "w") as f:
+        json.dump(provenance, f, indent=1)
+    print(f"Wrote the selection to {args.output} (provenance: {path})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+Indexed corpus pack: a single file holding the seed corpus (rtbench) with random access,
+replacing rtbench.tar.gz for consumers that only need some of the modules.
+
+Layout:
+    magic  b"WASMPACK"                          8 bytes
+    header version (u32), index length (u64)   little endian
+    index  JSON list of member entries          index length bytes
+    data   member payloads back to back
+
+Each index entry records name, sha256 and size of the module, its offset and stored size
+within the data region, its codec ("raw" or "zlib", chosen per member) and the seed
+metadata runtime, issue and age_months (None when unknown). Readers memory-map the pack:
+raw members are returned as zero-copy memoryviews, compressed ones are inflated on access,
+and nothing else is read.
+
+Usage:
+    python corpus_pack.py pack <out.pack> <rtbench.tar.gz | directory> [--store] [--issues DIR ...]
+    python corpus_pack.py unpack <pack> <out_dir> [filters]
+    python corpus_pack.py filter <pack> <out.pack> [filters]
+    python corpus_pack.py list <pack> [--names] [filters]
+    python corpus_pack.py cat <pack> <name>
+    python corpus_pack.py stage <pack> <dir> [--max-staged N] [filters]
+Filters: --runtime NAME (repeatable), --issue N, --min-age MONTHS, --max-age MONTHS, --glob PATTERN
+"""
+import argparse
+import fnmatch
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tarfile
+import tempfile
+import time
+import zlib
+
+from get_age import parse_seed
+
+MAGIC = b"WASMPACK"
+VERSION = 1
+HEADER = struct.Struct("<8sIQ")
+
+class CorpusPack:
+    """Memory-mapped reader of a corpus pack."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_len = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a corpus pack")
+        if version != VERSION:
+            raise ValueError(f"{path} has unsupported pack version {version}")
+        self.data_start = HEADER.size + index_len
+        self.entries = json.loads(self.map[HEADER.size:self.data_start])
+        self.by_name = {entry["name"]: entry for entry in self.entries}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.file.close()
+        try:
+            self.map.close()
+        except BufferError:
+            # Views returned by view() or stored() are still alive: the mapping is released
+            # together with the last of them instead
+            pass
+        self.map = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return name in self.by_name
+
+    def names(self):
+        return [entry["name"] for entry in self.entries]
+
+    def stored(self, entry):
+        """Zero-copy view of the member as stored in the pack."""
+        start = self.data_start + entry["offset"]
+        return memoryview(self.map)[start:start + entry["stored_size"]]
+
+    def view(self, name):
+        """The module bytes: a zero-copy memoryview for raw members, inflated bytes otherwise."""
+        entry = self.by_name[name]
+        data = self.stored(entry)
+        if entry["codec"] == "zlib":
+            return zlib.decompress(data)
+        return data
+
+    def read(self, name):
+        return bytes(self.view(name))
+
+    def select(self, runtimes=None, issue=None, min_age=None, max_age=None, pattern=None):
+        """Index entries matching all given filters."""
+        selected = []
+        for entry in self.entries:
+            if runtimes and entry.get("runtime") not in runtimes:
+                continue
+            if issue is not None and entry.get("issue") != str(issue):
+                continue
+            age = entry.get("age_months")
+            if min_age is not None and (age is None or age < min_age):
+                continue
+            if max_age is not None and (age is None or age > max_age):
+                continue
+            if pattern and not fnmatch.fnmatch(entry["name"], pattern):
+                continue
+            selected.append(entry)
+        return selected
+
+    def extract(self, entries, out_dir):
+        """Writes the given members to out_dir (member names may contain subdirectories)."""
+        for entry in entries:
+            path = os.path.join(out_dir, entry["name"])
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(self.view(entry["name"]))
+
+    def stage(self, entries, out_dir, max_staged=None, poll_interval=0.05):
+        """
+        Writes each member to a private subdirectory of out_dir (keeping its basename) and yields
+        its path as soon as it is written, so a consumer can start on it (and remove it) while
+        the rest are staged. The pack is opened and its index read once for all members.
+        With max_staged, at most that many of the subdirectories exist at a time: the next
+        member waits until the consumer has removed one.
+        """
+        staged = []
+        for entry in entries:
+            while max_staged is not None:
+                staged = [d for d in staged if os.path.exists(d)]
+                if len(staged) < max_staged:
+                    break
+                time.sleep(poll_interval)
+            member_dir = tempfile.mkdtemp(prefix="member.", dir=out_dir)
+            staged.append(member_dir)
+            path = os.path.join(member_dir, os.path.basename(entry["name"]))
+            with open(path, "wb") as f:
+                f.write(self.view(entry["name"]))
+            yield path
+
+def seed_metadata(name, ages=None):
+    """runtime, issue and age of a member, from its seed name (see get_age.parse_seed)."""
+    runtime, issue = parse_seed(os.path.basename(name))
+    return {"runtime": runtime, "issue": issue, "age_months": (ages or {}).get(os.path.basename(name))}
+
+def write_pack(path, members, store=False):
+    """
+    Writes a pack from (metadata, data) pairs, metadata holding at least "name".
+    Members are zlib-compressed when that makes them smaller, unless store is set.
+    Metadata that is an index entry of another pack (with "codec") marks data as
+    already stored in that codec; it is copied unchanged.
+
+    Returns:
+        int: The number of members written.
+    """
+    entries = []
+    names = set()
+    out_dir = os.path.dirname(os.path.abspath(path))
+    with tempfile.TemporaryFile(dir=out_dir) as spool:
+        offset = 0
+        for meta, data in members:
+            if meta["name"] in names:
+                raise ValueError(f"Duplicate member name {meta['name']}")
+            names.add(meta["name"])
+            if "codec" in meta:
+                stored, codec, size, digest = bytes(data), meta["codec"], meta["size"], meta["sha256"]
+            else:
+                data = bytes(data)
+                stored, codec, size, digest = data, "raw", len(data), hashlib.sha256(data).hexdigest()
+                if not store:
+                    compressed = zlib.compress(data, 6)
+                    if len(compressed) < len(data):
+                        stored, codec = compressed, "zlib"
+            spool.write(stored)
+            entries.append({
+                "name": meta["name"],
+                "sha256": digest,
+                "size": size,
+                "offset": offset,
+                "stored_size": len(stored),
+                "codec": codec,
+                "runtime": meta.get("runtime"),
+                "issue": meta.get("issue"),
+                "age_months": meta.get("age_months"),
+            })
+            offset += len(stored)
+
+        index = json.dumps(entries, separators=(",", ":")).encode()
+        fd, tmp = tempfile.mkstemp(dir=out_dir, suffix=".pack.tmp")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(HEADER.pack(MAGIC, VERSION, len(index)))
+                out.write(index)
+                spool.seek(0)
+                shutil.copyfileobj(spool, out, 1 << 20)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+    return len(entries)
+
+def iter_source(source):
+    """Yields (name, data) for the .wasm files of a tarball or directory, sorted by name."""
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths.extend(os.path.join(root, f) for f in files if f.endswith(".wasm"))
+        for path in sorted(paths):
+            with open(path, "rb") as f:
+                yield os.path.relpath(path, source), f.read()
+        return
+    with tarfile.open(source, "r:*") as archive:
+        members = sorted((m for m in archive if m.isfile() and m.name.endswith(".wasm")), key=lambda m: m.name)
+        for member in members:
+            yield member.name.removeprefix("./"), archive.extractfile(member).read()
+
+def seed_ages(names, issue_dirs):
+    """Age in months per seed basename, from the collected issues (no remote lookups)."""
+    if not issue_dirs:
+        return {}
+    from get_age import build_issue_index, get_issue_ages
+    basenames = sorted({os.path.basename(name) for name in names})
+    results, _, _ = get_issue_ages(basenames, build_issue_index(issue_dirs), fetch_missing=False)
+    return {entry: months for entry, (_, months) in results.items() if months is not None}
+
+def add_filter_args(parser):
+    parser.add_argument("--runtime", action="append", help="Keep members of this runtime (repeatable)")
+    parser.add_argument("--issue", help="Keep members of this issue number")
+    parser.add_argument("--min-age", type=int, help="Keep members whose issue is at least this many months old")
+    parser.add_argument("--max-age", type=int, help="Keep members whose issue is at most this many months old")
+    parser.add_argument("--glob", help="Keep members whose name matches this pattern")
+
+def selected(pack, args):
+    return pack.select(args.runtime, args.issue, args.min_age, args.max_age, args.glob)
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexed, randomly accessible corpus pack")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("pack", help="Build a pack from rtbench.tar.gz or a directory of seeds")
+    p.add_argument("output")
+    p.add_argument("source")
+    p.add_argument("--store", action="store_true", help="Store members uncompressed (zero-copy reads)")
+    p.add_argument("--issues", nargs="*", default=[], help="Issue directories to take seed ages from")
+
+    p = commands.add_parser("unpack", help="Extract (selected) members to a directory")
+    p.add_argument("pack")
+    p.add_argument("output_dir")
+    add_filter_args(p)
+
+    p = commands.add_parser("filter", help="Write the selected members to a new pack")
+    p.add_argument("pack")
+    p.add_argument("output")
+    add_filter_args(p)
+
+    p = commands.add_parser("list", help="List (selected) members")
+    p.add_argument("pack")
+    p.add_argument("--names", action="store_true", help="Print member names only")
+    add_filter_args(p)
+
+    p = commands.add_parser("cat", help="Write one member to stdout")
+    p.add_argument("pack")
+    p.add_argument("name")
+
+    p = commands.add_parser("stage", help="Write (selected) members one per private subdirectory, printing their paths")
+    p.add_argument("pack")
+    p.add_argument("output_dir")
+    p.add_argument("--max-staged", type=int, metavar="N",
+                   help="Wait while N staged members have not been removed by the consumer")
+    add_filter_args(p)
+
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        members = list(iter_source(args.source))
+        ages = seed_ages([name for name, _ in members], args.issues)
+        count = write_pack(args.output, ((dict(seed_metadata(name, ages), name=name), data)
+                                         for name, data in members), args.store)
+        print(f"Packed {count} modules into {args.output} ({os.path.getsize(args.output)} bytes)")
+        return
+
+    with CorpusPack(args.pack) as pack:
+        if args.command == "cat":
+            sys.stdout.buffer.write(pack.view(args.name))
+        elif args.command == "stage":
+            # One path per line, flushed right away. A consumer such as parallel reads ahead of
+            # what it runs, so the pipe alone does not bound staging: --max-staged does
+            for path in pack.stage(selected(pack, args), args.output_dir, args.max_staged):
+                print(path, flush=True)
+        elif args.command == "list":
+            for entry in selected(pack, args):
+                if args.names:
+                    print(entry["name"])
+                else:
+                    print(f"{entry['name']}\t{entry['size']}\t{entry['codec']}\t{entry['runtime']}\t"
+                          f"{entry['issue']}\t{entry['age_months']}\t{entry['sha256']}")
+        elif args.command == "unpack":
+            entries = selected(pack, args)
+            pack.extract(entries, args.output_dir)
+            print(f"Extracted {len(entries)} of {len(pack)} modules to {args.output_dir}")
+        elif args.command == "filter":
+            entries = selected(pack, args)
+            # Members are copied as stored, without recompressing
+            count = write_pack(args.output, ((entry, pack.stored(entry)) for entry in entries))
+            print(f"Wrote {count} of {len(pack)} modules to {args.output}")
+
+if __name__ == "__main__":
+    main()
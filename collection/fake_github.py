@@ -0,0 +1,188 @@
+"""
+Local stand-in for the parts of the GitHub REST API used by the collection
+scripts, serving recorded fixtures so the pipeline can run offline.
+
+A fixture directory holds one <owner>__<repo>.json per repository:
+    {"issues": [<REST issue>, ...], "comments": {"<number>": [<REST comment>, ...]}}
+
+Usage:
+    python fake_github.py serve <fixture_dir> [port] [rate_limit] [latency_ms]
+    python fake_github.py record <owner> <repo> <limit> <fixture_dir>
+
+Point the collectors at it with GITHUB_API_URL=http://127.0.0.1:<port>.
+"""
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from github_api import GitHubClient
+
+
+def load_fixtures(fixture_dir):
+    fixtures = {}
+    for entry in sorted(os.listdir(fixture_dir)):
+        if entry.endswith(".json") and "__" in entry:
+            owner, repo = entry[:-len(".json")].split("__", 1)
+            with open(os.path.join(fixture_dir, entry)) as f:
+                fixtures[(owner, repo)] = json.load(f)
+    return fixtures
+
+
+class FakeGitHub(ThreadingHTTPServer):
+    """
+    Serves /repos/<owner>/<repo>/issues and /repos/<owner>/<repo>/issues/<n>/comments
+    with GitHub's paging (per_page, page, Link headers), filters (state, labels,
+    since) and rate-limit headers. With rate_limit set, at most that many requests
+    are answered per window; later ones get the 403 GitHub sends on an exhausted quota.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, fixtures, port=0, rate_limit=None, window=60, latency=0.0):
+        super().__init__(("127.0.0.1", port), FakeGitHubHandler)
+        self.fixtures = fixtures
+        self.rate_limit = rate_limit
+        self.window = window
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.window_start = time.time()
+        self.used = 0
+        self.requests = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def take_quota(self):
+        """Returns (allowed, remaining, reset) for one request."""
+        with self.lock:
+            self.requests += 1
+            now = time.time()
+            if now - self.window_start >= self.window:
+                self.window_start, self.used = now, 0
+            reset = int(self.window_start + self.window) + 1
+            if self.rate_limit is None:
+                return True, 5000, reset
+            if self.used >= self.rate_limit:
+                return False, 0, reset
+            self.used += 1
+            return True, self.rate_limit - self.used, reset
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=()):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in headers:
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        allowed, remaining, reset = server.take_quota()
+        rate_headers = [("X-RateLimit-Limit", str(server.rate_limit or 5000)),
+                        ("X-RateLimit-Remaining", str(remaining)),
+                        ("X-RateLimit-Reset", str(reset))]
+        if not allowed:
+            self.send_json(403, {"message": "API rate limit exceeded"}, rate_headers)
+            return
+
+        parts = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        segments = parts.path.strip("/").split("/")
+        if len(segments) < 4 or segments[0] != "repos" or segments[3] != "issues":
+            self.send_json(404, {"message": "Not Found"}, rate_headers)
+            return
+        fixture = server.fixtures.get((segments[1], segments[2]))
+        if fixture is None:
+            self.send_json(404, {"message": "Not Found"}, rate_headers)
+            return
+
+        if len(segments) == 4:
+            items = self.filter_issues(fixture["issues"], query)
+        elif len(segments) == 6 and segments[5] == "comments":
+            items = fixture.get("comments", {}).get(segments[4], [])
+        else:
+            self.send_json(404, {"message": "Not Found"}, rate_headers)
+            return
+
+        per_page = min(int(query.get("per_page", 30)), 100)
+        page = int(query.get("page", 1))
+        page_items = items[(page - 1) * per_page:page * per_page]
+        headers = list(rate_headers)
+        if page * per_page < len(items):
+            next_query = dict(query, page=page + 1)
+            headers.append(("Link", f'<{server.url}{parts.path}?{urlencode(next_query)}>; rel="next"'))
+        self.send_json(200, page_items, headers)
+
+    @staticmethod
+    def filter_issues(issues, query):
+        state = query.get("state", "open")
+        labels = [l.lower() for l in query.get("labels", "").split(",") if l]
+        since = query.get("since")
+        selected = []
+        for issue in issues:
+            if state != "all" and issue.get("state") != state:
+                continue
+            names = {label["name"].lower() for label in issue.get("labels", [])}
+            if any(label not in names for label in labels):
+                continue
+            if since and issue.get("updated_at", "") < since:
+                continue
+            selected.append(issue)
+        key = "updated_at" if query.get("sort") == "updated" else "created_at"
+        selected.sort(key=lambda issue: issue.get(key, ""), reverse=query.get("direction", "desc") == "desc")
+        return selected
+
+
+def serve(fixture_dir, port=0, rate_limit=None, window=60, latency=0.0):
+    """Starts the server in a background thread and returns it (stop with shutdown())."""
+    server = FakeGitHub(load_fixtures(fixture_dir), port, rate_limit, window, latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def record(owner, repo, limit, fixture_dir, labels="bug,Bug"):
+    """Records the raw REST issues and comments of a repository as a fixture file."""
+    async with GitHubClient() as client:
+        issues = await client.list_issues(owner, repo, labels=labels, limit=limit)
+        comments = await asyncio.gather(*(client.list_comments(owner, repo, issue["number"]) for issue in issues))
+    os.makedirs(fixture_dir, exist_ok=True)
+    fixture = {"issues": issues,
+               "comments": {str(issue["number"]): c for issue, c in zip(issues, comments) if c}}
+    path = os.path.join(fixture_dir, f"{owner}__{repo}.json")
+    with open(path, "w") as f:
+        json.dump(fixture, f, indent=2)
+    print(f"Recorded {len(issues)} issues to {path}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("serve", "record"):
+        print("Usage: python fake_github.py serve <fixture_dir> [port] [rate_limit] [latency_ms]")
+        print("       python fake_github.py record <owner> <repo> <limit> <fixture_dir>")
+        sys.exit(1)
+
+    if sys.argv[1] == "record":
+        asyncio.run(record(sys.argv[2], sys.argv[3], int(sys.argv[4]), sys.argv[5]))
+    else:
+        port = int(sys.argv[3]) if len(sys.argv) > 3 else 8765
+        rate_limit = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        latency = float(sys.argv[5]) / 1000 if len(sys.argv) > 5 else 0.0
+        server = FakeGitHub(load_fixtures(sys.argv[2]), port, rate_limit, latency=latency)
+        print(f"Serving fixtures from {sys.argv[2]} at {server.url}")
+        server.serve_forever()
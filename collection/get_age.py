@@ -1,9 +1,15 @@
 import subprocess
 import json
+import os
+import sys
 from datetime import datetime, timezone
 import math
 import re
 
+import numpy as np
+
+from issue_store import IssueStore, STORE_FILENAME, issue_repo
+
 TARGET_TO_REPO = {
     "wasmtime": ("bytecodealliance", "wasmtime"),
     "wasmer": ("wasmerio", "wasmer"),
@@ -18,17 +24,17 @@ def bucket_months(months: float) -> int:
 def parse_seed(entry: str):
     """
     Parse both formats:
-    1. 'seed_wamr_2390.wasm'
+    1. 'seed_wamr_2390.wasm' (or 'seed_wamr_2390-2.wasm' for further modules of the issue)
     2. 'wasmtime (wasmtime_4669___start)'
     Returns (target, issue_number) or (None, None).
     """
     entry = entry.strip()
 
-    # Format 1: seed_target_issue.wasm
+    # Format 1: seed_target_issue[-k].wasm
     if entry.startswith("seed_") and entry.endswith(".wasm"):
         try:
             _, target, issue_str = entry.replace(".wasm", "").split("_")
-            return target, issue_str
+            return target, re.sub(r"-\d+$", "", issue_str)
         except ValueError:
             return None, None
 
@@ -45,57 +51,159 @@ def parse_seed(entry: str):
 
     return None, None
 
-def get_issue_ages(entries):
+REPO_TO_TARGET = {f"{owner}/{repo}": target for target, (owner, repo) in TARGET_TO_REPO.items()}
+
+# Age bands of the RQ5 lineage plot (plots/rq5/lineage_sankey/lineage.py), by upper bound in
+# months; plots/dataset.py bins lineage ages with age_band as well
+AGE_BANDS = {12: "12 months", 24: "24 months", 36: "36 months", 48: "48 months", 72: "72 months"}
+
+GRAPHQL_BATCH = 100
+
+def age_band(months):
+    """
+    Returns the lineage-plot age band label of an age in months: the smallest band holding it,
+    from 0 (issues younger than a month) up; ages beyond the oldest band are kept in it.
+    None for a missing or negative age.
+    """
+    if months is None or not months >= 0:
+        return None
+    for bound, label in AGE_BANDS.items():
+        if months <= bound:
+            return label
+    return AGE_BANDS[max(AGE_BANDS)]
+
+def build_issue_index(issue_dirs):
+    """
+    Builds the issue-metadata index from collected issues: {(target, issue_number): createdAt}.
+    Each directory is read from its issue store (issues.db) if present, else from its issues.json;
+    the repository of issues.json entries is taken from their URL.
+    """
+    index = {}
+    for issue_dir in issue_dirs:
+        if os.path.exists(os.path.join(issue_dir, STORE_FILENAME)):
+            with IssueStore.in_directory(issue_dir) as store:
+                for repo, number, detail in store.issues():
+                    target = REPO_TO_TARGET.get(repo)
+                    if target and detail.get("createdAt"):
+                        index[(target, str(number))] = detail["createdAt"]
+            continue
+        issues_file = os.path.join(issue_dir, "issues.json")
+        if not os.path.exists(issues_file):
+            print(f"[No issue store or issues.json in {issue_dir}]")
+            continue
+        with open(issues_file) as f:
+            for number, detail in json.load(f).items():
+                target = REPO_TO_TARGET.get(issue_repo(detail))
+                if target and detail.get("createdAt"):
+                    index[(target, str(number))] = detail["createdAt"]
+    return index
+
+def fetch_created_at(keys):
+    """
+    Fetches createdAt for (target, issue_number) keys missing from the index, with one GraphQL
+    query per repository and batch of up to GRAPHQL_BATCH issues instead of one request per seed.
+    Returns {(target, issue_number): createdAt or an "[Error: ...]" string}.
+    """
+    found = {}
+    by_target = {}
+    for target, number in keys:
+        by_target.setdefault(target, []).append(number)
+
+    for target, numbers in by_target.items():
+        owner, repo = TARGET_TO_REPO[target]
+        for i in range(0, len(numbers), GRAPHQL_BATCH):
+            batch = numbers[i:i + GRAPHQL_BATCH]
+            fields = " ".join(f"i{n}: issueOrPullRequest(number: {int(n)}) {{ ... on Issue {{ createdAt }} "
+                              f"... on PullRequest {{ createdAt }} }}" for n in batch)
+            query = f'query {{ repository(owner: "{owner}", name: "{repo}") {{ {fields} }} }}'
+            try:
+                output = subprocess.check_output(["gh", "api", "graphql", "-f", f"query={query}"], text=True)
+                repository = json.loads(output)["data"]["repository"]
+                for n in batch:
+                    issue = repository.get(f"i{n}")
+                    found[(target, n)] = issue["createdAt"] if issue else "[Error: issue not found]"
+            except Exception as e:
+                for n in batch:
+                    found[(target, n)] = f"[Error: {e}]"
+    return found
+
+def get_issue_ages(entries, index=None, now=None, fetch_missing=True):
+    """
+    Computes the age in months of the issue each seed entry was taken from.
+
+    Args:
+        entries (iterable): Seed entries in either naming accepted by parse_seed.
+        index (dict): Issue-metadata index from build_issue_index; entries it misses are
+            fetched remotely in batches.
+        now (datetime): Reference time (default: now, UTC).
+        fetch_missing (bool): Fetch entries missing from the index remotely; otherwise they are
+            reported as not found.
+
+    Returns:
+        tuple: ({entry: (createdAt or error, age in months or None)}, average raw age,
+            average age snapped to the next 12-month block)
+    """
+    index = index or {}
+    now = now or datetime.now(timezone.utc)
     results = {}
-    now = datetime.now(timezone.utc)
-    raw_months = []
+    keys = {}
 
     for entry in entries:
         target, issue_str = parse_seed(entry)
         if not target or not issue_str:
             results[entry] = ("[Unrecognized format]", None)
             continue
-
-        repo_info = TARGET_TO_REPO.get(target)
-        if not repo_info:
+        if target not in TARGET_TO_REPO:
             results[entry] = (f"[Unknown target: {target}]", None)
             continue
-
-        owner, repo = repo_info
-        issue_number = issue_str
-
-        try:
-            view_cmd = [
-                "gh", "issue", "view", issue_number,
-                "--repo", f"{owner}/{repo}",
-                "--json", "createdAt"
-            ]
-            output = subprocess.check_output(view_cmd, text=True)
-            issue_detail = json.loads(output)
-            created_at_str = issue_detail.get("createdAt")
-            created_at = datetime.fromisoformat(created_at_str.replace("Z", "+00:00"))
-
-            diff_months = (now - created_at).days / 30.44
-            age_months = int(diff_months)
-            results[entry] = (created_at_str, age_months)
-            raw_months.append(age_months)
-
-        except Exception as e:
-            results[entry] = (f"[Error: {e}]", None)
-
-    avg_raw = sum(raw_months) / len(raw_months) if raw_months else 0
+        keys[entry] = (target, issue_str)
+
+    misses = sorted({key for key in keys.values() if key not in index})
+    if misses and fetch_missing:
+        print(f"Fetching {len(misses)} issues missing from the index")
+        index = {**index, **fetch_created_at(misses)}
+    elif misses:
+        index = {**index, **{key: "[Not in index]" for key in misses}}
+
+    # One vectorized pass over all resolved entries
+    resolved = [(entry, index[key]) for entry, key in keys.items() if not index[key].startswith("[")]
+    for entry, key in keys.items():
+        if index[key].startswith("["):
+            results[entry] = (index[key], None)
+
+    raw_months = np.array([], dtype=np.int64)
+    if resolved:
+        created = np.array([ts.replace("Z", "") for _, ts in resolved], dtype="datetime64[s]")
+        reference = np.datetime64(now.astimezone(timezone.utc).replace(tzinfo=None), "s")
+        days = (reference - created) // np.timedelta64(1, "D")
+        raw_months = (days / 30.44).astype(np.int64)
+        for (entry, ts), months in zip(resolved, raw_months.tolist()):
+            results[entry] = (ts, months)
+
+    # Keep the entries in input order
+    results = {entry: results[entry] for entry in dict.fromkeys(entries) if entry in results}
+
+    avg_raw = float(raw_months.mean()) if raw_months.size else 0
     avg_bucketed = bucket_months(avg_raw) if avg_raw > 0 else 0
 
     return results, avg_raw, avg_bucketed
 
 
-# Example usage
+# Example usage:
+#   python get_age.py [entries_file] [issues_directory ...]
+# entries_file lists one seed entry per line; the issue directories (holding issues.db or
+# issues.json from collect_issues.py) build the index, and entries they miss are fetched remotely.
 if __name__ == "__main__":
     entries = "seed_wamr_2397.wasm","seed_wamr_2728.wasm","seed_wamr_2732.wasm","seed_wamr_2847.wasm","seed_wamr_2849.wasm","seed_wamr_3210.wasm","seed_wasmedge_2080.wasm","seed_wasmedge_2748.wasm","seed_wasmedge_3019.wasm","seed_wasmtime_8255.wasm"
+    if len(sys.argv) > 1:
+        with open(sys.argv[1]) as f:
+            entries = [line.strip() for line in f if line.strip()]
+    index = build_issue_index(sys.argv[2:])
 
-    results, avg_raw, avg_bucket = get_issue_ages(entries)
+    results, avg_raw, avg_bucket = get_issue_ages(entries, index)
     for entry, (ts, months) in results.items():
         print(f"{entry} → created: {ts}, age: {months} months")
 
     print(f"\nAverage raw age: {avg_raw:.2f} months")
     print(f"Average age (snapped to next block): {avg_bucket} months")
+    print(f"Age band: {age_band(avg_bucket) or '[unknown]'}")
@@ -0,0 +1,299 @@
+import asyncio
+import http.client
+import json
+import os
+import queue
+import random
+import re
+import subprocess
+import time
+from urllib.parse import urlencode, urlsplit
+
+DEFAULT_API_URL = "https://api.github.com"
+NEXT_LINK_PATTERN = re.compile(r'<([^>]+)>;\s*rel="next"')
+
+
+class GitHubError(Exception):
+    def __init__(self, status, url, message):
+        super().__init__(f"HTTP {status} for {url}: {message}")
+        self.status = status
+        self.url = url
+
+
+def get_token():
+    """
+    Returns the API token from $GITHUB_TOKEN / $GH_TOKEN, falling back to the
+    token of the logged-in gh CLI user. Returns None for anonymous access.
+    """
+    token = os.environ.get("GITHUB_TOKEN") or os.environ.get("GH_TOKEN")
+    if token:
+        return token
+    try:
+        return subprocess.check_output(["gh", "auth", "token"], text=True, stderr=subprocess.DEVNULL).strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class UrllibTransport:
+    """
+    Standard-library transport: a fixed pool of keep-alive http.client
+    connections used from worker threads, so no third-party package is needed.
+    """
+
+    def __init__(self, base_url, pool_size=8, timeout=60):
+        parts = urlsplit(base_url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.timeout = timeout
+        self.pool = queue.LifoQueue()
+        for _ in range(pool_size):
+            self.pool.put(None)
+
+    def _connect(self):
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(self.netloc, timeout=self.timeout)
+
+    def _request(self, method, url, headers, body):
+        parts = urlsplit(url)
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        conn = self.pool.get()
+        try:
+            for attempt in range(2):
+                if conn is None:
+                    conn = self._connect()
+                try:
+                    conn.request(method, target, body=body, headers=headers)
+                    response = conn.getresponse()
+                    data = response.read()
+                    return response.status, {k.lower(): v for k, v in response.getheaders()}, data
+                except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                    # Server closed an idle keep-alive connection: reconnect once
+                    conn.close()
+                    conn = None
+                    if attempt:
+                        raise
+        except BaseException:
+            if conn is not None:
+                conn.close()
+            conn = None
+            raise
+        finally:
+            self.pool.put(conn)
+
+    async def request(self, method, url, headers, body=None):
+        return await asyncio.to_thread(self._request, method, url, headers, body)
+
+    async def close(self):
+        while not self.pool.empty():
+            conn = self.pool.get_nowait()
+            if conn is not None:
+                conn.close()
+
+
+class AiohttpTransport:
+    """aiohttp transport sharing one pooled ClientSession for all requests."""
+
+    def __init__(self, base_url, pool_size=8, timeout=60):
+        import aiohttp
+        self.aiohttp = aiohttp
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = None
+
+    async def request(self, method, url, headers, body=None):
+        if self.session is None:
+            self.session = self.aiohttp.ClientSession(
+                connector=self.aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=self.aiohttp.ClientTimeout(total=self.timeout))
+        async with self.session.request(method, url, headers=headers, data=body) as response:
+            data = await response.read()
+            return response.status, {k.lower(): v for k, v in response.headers.items()}, data
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+
+def default_transport(base_url, pool_size):
+    """aiohttp when it is installed, otherwise the standard-library pool."""
+    try:
+        return AiohttpTransport(base_url, pool_size)
+    except ImportError:
+        return UrllibTransport(base_url, pool_size)
+
+
+class GitHubClient:
+    """
+    Async GitHub REST client with bounded concurrency, pagination and
+    rate-limit handling. The transport is pluggable: anything with async
+    request(method, url, headers, body) -> (status, headers, bytes) and close().
+
+    The API root defaults to $GITHUB_API_URL, so the whole collection can be
+    pointed at the local fixture server in fake_github.py.
+    """
+
+    def __init__(self, base_url=None, token=None, concurrency=8, transport=None, max_retries=6):
+        self.base_url = (base_url or os.environ.get("GITHUB_API_URL") or DEFAULT_API_URL).rstrip("/")
+        self.token = token if token is not None else get_token()
+        self.transport = transport or default_transport(self.base_url, concurrency)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.max_retries = max_retries
+        # Shared pause: once the quota is exhausted no request is sent before the reset
+        self.resume_at = 0.0
+        self.requests = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.transport.close()
+
+    def _headers(self):
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+            "User-Agent": "wasm-fuzzing-study-collector",
+        }
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return headers
+
+    def _rate_limit_delay(self, status, headers, attempt):
+        """Seconds to wait before retrying, or None if the response is final."""
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+        if status in (403, 429) and headers.get("x-ratelimit-remaining") == "0":
+            return max(0.0, float(headers.get("x-ratelimit-reset", time.time())) - time.time()) + 1
+        if status == 429 or status >= 500:
+            return min(60.0, 2 ** attempt) * (0.5 + random.random() / 2)
+        return None
+
+    async def get(self, url, params=None):
+        """GET `url` (absolute or relative to the API root). Returns (json, headers)."""
+        if not url.startswith("http"):
+            url = f"{self.base_url}{url}"
+        if params:
+            url = f"{url}?{urlencode(params)}"
+        for attempt in range(self.max_retries + 1):
+            wait = self.resume_at - time.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            async with self.semaphore:
+                try:
+                    status, headers, data = await self.transport.request("GET", url, self._headers())
+                except (OSError, asyncio.TimeoutError) as e:
+                    if attempt == self.max_retries:
+                        raise
+                    status, headers, data = 0, {}, str(e).encode()
+            self.requests += 1
+            if headers.get("x-ratelimit-remaining") == "0" and "x-ratelimit-reset" in headers:
+                self.resume_at = max(self.resume_at, float(headers["x-ratelimit-reset"]) + 1)
+            if 200 <= status < 300:
+                return json.loads(data or b"null"), headers
+            delay = self._rate_limit_delay(status, headers, attempt) if status else 2 ** attempt
+            if delay is None or attempt == self.max_retries:
+                raise GitHubError(status, url, data[:200].decode(errors="replace"))
+            print(f"HTTP {status or 'error'} for {url}, retrying in {delay:.1f}s")
+            if status in (403, 429):
+                self.resume_at = max(self.resume_at, time.time() + delay)
+            await asyncio.sleep(delay)
+
+    async def paginate(self, url, params=None, limit=None):
+        """Yields the items of every page of a list endpoint, following Link: rel="next"."""
+        count = 0
+        page, headers = await self.get(url, params)
+        while True:
+            for item in page:
+                yield item
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+            match = NEXT_LINK_PATTERN.search(headers.get("link", ""))
+            if not match:
+                return
+            page, headers = await self.get(match.group(1))
+
+    async def list_issues(self, owner, repo, labels=None, state="all", since=None, limit=None):
+        """
+        Issues of the repository (pull requests, which the issues API also returns, are skipped).
+
+        Without since, issues come in the API's default order, newest first, so limit keeps the
+        newest issues as `gh issue list --limit` does. With since (an incremental sync), they
+        come least recently updated first: limit then keeps the oldest changes, so the
+        high-water mark of a limited sync never passes changes that were not fetched and the
+        next sync continues where this one stopped.
+        """
+        params = {"state": state, "per_page": 100}
+        if labels:
+            params["labels"] = labels
+        if since:
+            params.update(since=since, sort="updated", direction="asc")
+        issues = []
+        async for issue in self.paginate(f"/repos/{owner}/{repo}/issues", params):
+            if "pull_request" in issue:
+                continue
+            issues.append(issue)
+            if limit is not None and len(issues) >= limit:
+                break
+        return issues
+
+    async def list_comments(self, owner, repo, number):
+        return [c async for c in self.paginate(f"/repos/{owner}/{repo}/issues/{number}/comments", {"per_page": 100})]
+
+
+def to_gh_comment(comment):
+    """Converts a REST comment to the shape of `gh issue view --json comments`."""
+    user = comment.get("user") or {}
+    return {
+        "id": comment.get("node_id"),
+        "author": {"login": user.get("login")},
+        "authorAssociation": comment.get("author_association"),
+        "body": comment.get("body") or "",
+        "createdAt": comment.get("created_at"),
+        "url": comment.get("html_url"),
+    }
+
+
+def to_gh_issue(issue, comments):
+    """Converts a REST issue to the shape of `gh issue view --json number,url,title,body,comments`."""
+    return {
+        "number": issue["number"],
+        "url": issue.get("html_url"),
+        "title": issue.get("title") or "",
+        "body": issue.get("body") or "",
+        "comments": [to_gh_comment(c) for c in comments],
+        "createdAt": issue.get("created_at"),
+        "updatedAt": issue.get("updated_at"),
+    }
+
+
+async def fetch_issues(client, owner, repo, labels="bug,Bug", limit=None, since=None):
+    """
+    Lists the matching issues and fetches all of their comments concurrently.
+
+    Returns:
+        tuple: (issue number -> issue details in gh CLI JSON shape, issue number -> updatedAt
+        of the issues whose comments could not be fetched).
+    """
+    issues = await client.list_issues(owner, repo, labels=labels, since=since, limit=limit)
+    print(f"Retrieved {len(issues)} issues from {owner}/{repo}")
+    done = 0
+
+    async def with_comments(issue):
+        nonlocal done
+        comments = await client.list_comments(owner, repo, issue["number"]) if issue.get("comments") else []
+        done += 1
+        if done % 50 == 0 or done == len(issues):
+            print(f"Fetched comments for {done}/{len(issues)} issues")
+        return to_gh_issue(issue, comments)
+
+    results = await asyncio.gather(*(with_comments(issue) for issue in issues), return_exceptions=True)
+    issues_data, failed = {}, {}
+    for issue, result in zip(issues, results):
+        if isinstance(result, Exception):
+            print(f"Error while fetching comments of issue {issue['number']}: {result}")
+            failed[issue["number"]] = issue.get("updated_at")
+            continue
+        issues_data[issue["number"]] = result
+    return issues_data, failed
@@ -0,0 +1,152 @@
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime, timezone
+
+STORE_FILENAME = "issues.db"
+BATCH_SIZE = 1000  # Rows read per query by issues() and pending()
+ISSUE_URL = re.compile(r"https://github\.com/([^/]+/[^/]+)/issues/")
+
+
+def issue_repo(detail):
+    """owner/repo of an issue, from its URL (None when it has none)."""
+    m = ISSUE_URL.match(detail.get("url") or "")
+    return m.group(1) if m else None
+
+
+def issue_directory(issues_directory, repo, number):
+    """
+    Directory of an issue's extracted files: <owner>_<repo>/<number>, so issues with the same
+    number in different repositories stay apart (just <number> when the repository is unknown).
+    """
+    if repo:
+        return os.path.join(issues_directory, repo.replace("/", "_"), str(number))
+    return os.path.join(issues_directory, str(number))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    repo TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    updated_at TEXT,
+    data TEXT NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (repo, number)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    repo TEXT PRIMARY KEY,
+    high_water TEXT,
+    synced_at TEXT
+);
+"""
+
+
+class IssueStore:
+    """
+    Persistent per-issue store (SQLite) replacing the monolithic issues.json.
+
+    Each issue is one row keyed by (repo, number) holding its gh-shaped JSON and
+    the updatedAt it was stored with. Per repository, `sync_state` records the
+    high-water mark: the largest updatedAt seen, from which the next sync asks
+    only for issues created or changed since. Storing a changed issue clears its
+    `processed` flag, so process_issues.py only handles issues that changed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    @classmethod
+    def in_directory(cls, directory):
+        return cls(os.path.join(directory, STORE_FILENAME))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def high_water(self, repo):
+        row = self.conn.execute("SELECT high_water FROM sync_state WHERE repo = ?", (repo,)).fetchone()
+        return row[0] if row else None
+
+    def upsert(self, repo, issues, failed=None):
+        """
+        Stores gh-shaped issue details (dict number -> detail) and advances the
+        repository's high-water mark, but not past the earliest updatedAt in failed
+        (number -> updatedAt of issues the sync could not fetch), so that the next
+        sync asks for those issues again.
+
+        Returns:
+            int: The number of issues that were new or had changed.
+        """
+        changed = 0
+        high_water = self.high_water(repo)
+        with self.conn:
+            for number, detail in issues.items():
+                updated_at = detail.get("updatedAt")
+                row = self.conn.execute("SELECT updated_at FROM issues WHERE repo = ? AND number = ?",
+                                        (repo, int(number))).fetchone()
+                if row is not None and row[0] == updated_at:
+                    continue
+                self.conn.execute(
+                    "INSERT INTO issues (repo, number, updated_at, data) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (repo, number) DO UPDATE SET updated_at = excluded.updated_at, data = excluded.data, processed = 0",
+                    (repo, int(number), updated_at, json.dumps(detail)))
+                changed += 1
+                if updated_at and (high_water is None or updated_at > high_water):
+                    high_water = updated_at
+            earliest_failed = min((u for u in (failed or {}).values() if u), default=None)
+            if earliest_failed and (high_water is None or earliest_failed < high_water):
+                high_water = earliest_failed
+            self.conn.execute(
+                "INSERT INTO sync_state (repo, high_water, synced_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (repo) DO UPDATE SET high_water = excluded.high_water, synced_at = excluded.synced_at",
+                (repo, high_water, datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")))
+        return changed
+
+    def select(self, condition, repo=None):
+        """
+        Yields (repo, number, detail) of the issues matching condition in key order, reading
+        BATCH_SIZE rows at a time by key range, so no rows pile up in memory and no cursor stays
+        open while the caller commits (e.g. mark_processed between rows).
+        """
+        conditions = [condition]
+        args = []
+        if repo is not None:
+            conditions.append("repo = ?")
+            args.append(repo)
+        query = ("SELECT repo, number, data FROM issues WHERE " + " AND ".join(conditions)
+                 + " AND (repo, number) > (?, ?) ORDER BY repo, number LIMIT ?")
+        last = ("", -1)
+        while True:
+            batch = self.conn.execute(query, (*args, *last, BATCH_SIZE)).fetchall()
+            for row_repo, number, data in batch:
+                yield row_repo, number, json.loads(data)
+            if len(batch) < BATCH_SIZE:
+                return
+            last = batch[-1][:2]
+
+    def issues(self, repo=None):
+        """Yields (repo, number, detail) for every stored issue."""
+        return self.select("1", repo)
+
+    def pending(self, repo=None):
+        """Yields (repo, number, detail) for issues not processed since they last changed."""
+        return self.select("processed = 0", repo)
+
+    def mark_processed(self, repo, number):
+        with self.conn:
+            self.conn.execute("UPDATE issues SET processed = 1 WHERE repo = ? AND number = ?", (repo, int(number)))
+
+    def export_json(self, output_file, repo=None):
+        """Writes the stored issues as the legacy issues.json dict (number -> detail)."""
+        data = {str(number): detail for _, number, detail in self.issues(repo)}
+        with open(output_file, "w") as fp:
+            json.dump(data, fp, indent=2)
+        return len(data)
@@ -1,158 +1,397 @@
+import hashlib
 import json
 import re
 import os
+import shutil
 import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from issue_store import IssueStore, STORE_FILENAME, issue_directory, issue_repo
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pipeline"))
+import spans
+
+# Define keywords to trigger processing
+KEYWORDS = ["bug", "failure", "error", "fault", "inconsistent", "different", "sigsegv", "segfault"]
+KEYWORD_PATTERN = re.compile("|".join(KEYWORDS), re.IGNORECASE)
+
+# Regex pattern to extract code blocks with an optional language identifier.
+# It captures:
+#   group(1): language (if provided) right after ```
+#   group(2): the code content until the closing ```
+CODE_BLOCK_PATTERN = re.compile(r"```(?:([\w+\-\.]+)?\s*\n)?(.*?)```", re.DOTALL)
 
-def download_file(url, directory):
+# Regex to match URLs to files with specific extensions (tar, tar.gz, zip, wasm, aot, txt, wat)
+FILE_EXTS = r"(?:tar(?:\.gz)?|zip|wasm|aot|txt|wat)"
+LINK_PATTERN = re.compile(r"(https?://\S+\." + FILE_EXTS + r")", re.IGNORECASE)
+
+# Downloaded files are stored once under objects/<sha256[:2]>/<sha256> and linked into issue
+# directories; downloads.jsonl records every fetched URL so interrupted runs resume without refetching.
+OBJECTS_DIR = "objects"
+MANIFEST_FILENAME = "downloads.jsonl"
+# Characters that can continue a JSON number
+NUMBER_CHARS = frozenset("0123456789+-.eE")
+
+def make_session(pool_size=8):
     """
-    Downloads the file from the URL and saves it in the specified directory.
-    Returns the local file path.
+    Returns a requests session shared by all download workers, with a connection pool sized for
+    them and retries (with backoff, honouring Retry-After) on connection errors and 429/5xx.
+    """
+    retry = Retry(total=5, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=["GET"], respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = "Mozilla/5.0"
+    return session
+
+class ObjectStore:
+    """
+    Content-addressed download store shared by the worker threads. Each URL is fetched at most
+    once, even when several issues link it or workers ask for it concurrently, and identical
+    content from different URLs is stored once.
+    """
+
+    def __init__(self, issues_directory, session):
+        self.objects_dir = os.path.join(issues_directory, OBJECTS_DIR)
+        self.manifest_path = os.path.join(issues_directory, MANIFEST_FILENAME)
+        self.session = session
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.urls = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Truncated last line of an interrupted run
+                    if os.path.exists(self.object_path(entry["sha256"])):
+                        self.urls[entry["url"]] = entry["sha256"]
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def fetch(self, url, refresh=False):
+        """
+        Returns the sha256 of the content at url, downloading it unless an earlier (or concurrent)
+        fetch already stored it. With refresh, an earlier fetch is not reused (for pages that
+        change, like issue pages); concurrent fetches are still shared. Returns None if the
+        download failed.
+        """
+        with self.lock:
+            if url in self.urls and not refresh:
+                return self.urls[url]
+            event = self.inflight.get(url)
+            owner = event is None
+            if owner:
+                event = self.inflight[url] = threading.Event()
+        if not owner:
+            event.wait()
+            with self.lock:
+                return self.urls.get(url)
+
+        try:
+            with spans.span("download"):
+                response = self.session.get(url, timeout=60)
+                response.raise_for_status()
+                data = response.content
+            spans.count("download.bytes", len(data))
+            digest = hashlib.sha256(data).hexdigest()
+            path = self.object_path(digest)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            with self.lock:
+                self.urls[url] = digest
+                with open(self.manifest_path, "a") as f:
+                    f.write(json.dumps({"url": url, "sha256": digest, "size": len(data)}) + "\n")
+            return digest
+        except Exception as e:
+            print(f"Failed to download {url}: {e}")
+            return None
+        finally:
+            with self.lock:
+                del self.inflight[url]
+            event.set()
+
+    def link(self, digest, file_path):
+        """Places the stored object at file_path (hard link, or a copy across filesystems)."""
+        if os.path.lexists(file_path):
+            os.remove(file_path)
+        try:
+            os.link(self.object_path(digest), file_path)
+        except OSError:
+            shutil.copyfile(self.object_path(digest), file_path)
+
+def download_file(objects, url, directory, file_name=None, refresh=False):
+    """
+    Downloads the file from the URL through the object store and places it in the specified directory.
+    With refresh the URL is downloaded again even if it was fetched before.
+    Returns the local file path, or None if the download failed.
     """
     # Extract file name from URL (remove any query parameters)
-    local_filename = url.split('/')[-1].split('?')[0]
+    local_filename = file_name or url.split('/')[-1].split('?')[0]
     file_path = os.path.join(directory, local_filename)
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        with open(file_path, 'wb') as f:
-            f.write(response.content)
-        print(f"Downloaded file from {url} to {file_path}")
-    except Exception as e:
-        print(f"Failed to download {url}: {e}")
+    digest = objects.fetch(url, refresh)
+    if digest is None:
+        return None
+    objects.link(digest, file_path)
+    print(f"Downloaded file from {url} to {file_path}")
     return file_path
 
-def process_issues(issues_directory):
+def iter_json_object(path, chunk_size=1 << 20):
     """
-    Loads the issues JSON, filters issues with comments that have any of the target keywords,
-    extracts code blocks in triple backticks and links to certain file types,
-    and then downloads/stores the files/code blocks in a dedicated directory for each issue.
+    Streams the (key, value) pairs of the top-level JSON object in path without loading the whole
+    file, decoding one member at a time with raw_decode as chunks arrive.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r") as f:
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def more():
+            nonlocal buffer, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+        def skip_ws():
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return
+                more()
+
+        def decode():
+            nonlocal pos
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    # A number followed only by number characters up to the end of the buffer
+                    # (e.g. "1." or "1e" of "1.5" or "1e3") may continue in the next chunk
+                    number = isinstance(value, (int, float)) and not isinstance(value, bool)
+                    if eof or not (number and all(c in NUMBER_CHARS for c in buffer[end:])):
+                        pos = end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                more()
+
+        skip_ws()
+        if buffer[pos:pos + 1] != "{":
+            raise ValueError(f"{path} does not contain a JSON object")
+        pos += 1
+        while True:
+            skip_ws()
+            if buffer[pos:pos + 1] == "}":
+                return
+            key = decode()
+            skip_ws()
+            if buffer[pos:pos + 1] != ":":
+                raise ValueError(f"Malformed JSON object in {path}")
+            pos += 1
+            skip_ws()
+            value = decode()
+            yield key, value
+            skip_ws()
+            if buffer[pos:pos + 1] == ",":
+                pos += 1
+
+def iter_issues(issues_directory, store=None, reprocess_all=False):
+    """
+    Yields (repo, issue_number, issue_detail) to process. From an issue store only issues
+    that are new or changed since they were last processed are yielded, unless reprocess_all
+    is set; without a store, issues.json is streamed and every issue is yielded (repo is then None).
     """
-    # Define keywords to trigger processing
-    keywords = ["bug", "failure", "error", "fault", "inconsistent", "different", "sigsegv", "segfault"]
-    keyword_pattern = re.compile("|".join(keywords), re.IGNORECASE)
-    
-    # Regex pattern to extract code blocks with an optional language identifier.
-    # It captures:
-    #   group(1): language (if provided) right after ```
-    #   group(2): the code content until the closing ```
-    code_block_pattern = re.compile(r"```(?:([\w+\-\.]+)?\s*\n)?(.*?)```", re.DOTALL)
-    
-    # Regex to match URLs to files with specific extensions (tar, tar.gz, zip, wasm, aot, txt, wat)
-    file_exts = r"(?:tar(?:\.gz)?|zip|wasm|aot|txt|wat)"
-    link_pattern = re.compile(r"(https?://\S+\." + file_exts + r")", re.IGNORECASE)
-    
+    if store is not None:
+        yield from (store.issues() if reprocess_all else store.pending())
+        return
+
     issues_file = os.path.join(issues_directory, "issues.json")
-    # Load the JSON file with issues data
+    # Stream the JSON file with issues data
     try:
-        with open(issues_file, "r") as f:
-            issues_data = json.load(f)
+        for issue_number, issue_detail in iter_json_object(issues_file):
+            yield None, issue_number, issue_detail
     except Exception as e:
         print(f"Error reading {issues_file}: {e}")
-        return
 
-    # Process each issue by its number
-    for issue_number, issue_detail in issues_data.items():
-        comments = issue_detail.get("comments", [])
-        issue_triggered = False
-        code_blocks = []  # List of tuples: (extension, code)
-        file_links = []
+def code_block_extension(lang, block):
+    """Determines the file extension for a code block."""
+    if lang:
+        # Use the language name (lowercased) as the extension.
+        return lang.lower()
+    # No language provided – use a heuristic to detect WAT code.
+    lower_block = block.lower()
+    if "module" in lower_block and "func" in lower_block:
+        return "wat"
+    return "txt"
 
-        # Check the issue title for keywords.
-        title = issue_detail.get("title", "")
-        if keyword_pattern.search(title):
-            issue_triggered = True
+def extract_issue(issue_detail):
+    """
+    Checks the issue for the target keywords and extracts code blocks and file links.
+    The issue body is always searched; comments only when they contain a keyword themselves.
 
-        # Check the issue body for keywords.
-        body = issue_detail.get("body", "")
-        if keyword_pattern.search(body):
-            issue_triggered = True
+    Returns:
+        tuple: (issue_triggered, code_blocks as (extension, code) tuples, file_links)
+    """
+    issue_triggered = False
+    code_blocks = []
+    file_links = []
+
+    # Check the issue title and body for keywords.
+    title = issue_detail.get("title", "")
+    body = issue_detail.get("body", "")
+    if KEYWORD_PATTERN.search(title) or KEYWORD_PATTERN.search(body):
+        issue_triggered = True
 
-        # Extract code blocks and file links from the issue body.
-        found_body_codes = code_block_pattern.findall(body)
-        if found_body_codes:
-            for lang, block in found_body_codes:
+    # Extract code blocks and file links from the issue body.
+    for lang, block in CODE_BLOCK_PATTERN.findall(body):
+        block = block.strip()
+        code_blocks.append((code_block_extension(lang, block), block))
+    file_links.extend(LINK_PATTERN.findall(body))
+
+    # Evaluate each comment for the keywords, code blocks, and file links.
+    for comment in issue_detail.get("comments", []):
+        comment_body = comment.get("body", "")
+        # If any keyword is found, mark issue as triggered
+        if KEYWORD_PATTERN.search(comment_body):
+            issue_triggered = True
+            for lang, block in CODE_BLOCK_PATTERN.findall(comment_body):
                 block = block.strip()
-                if lang:
-                    ext = lang.lower()
-                else:
-                    lower_block = block.lower()
-                    ext = "wat" if "module" in lower_block and "func" in lower_block else "txt"
-                code_blocks.append((ext, block))
-        found_body_links = link_pattern.findall(body)
-        if found_body_links:
-            file_links.extend(found_body_links)
-        
-        # Evaluate each comment for the keywords, code blocks, and file links.
-        for comment in comments:
-            comment_body = comment.get("body", "")
-            # If any keyword is found, mark issue as triggered
-            if keyword_pattern.search(comment_body):
-                issue_triggered = True
-
-                # Extract code blocks with optional language identifier.
-                found_code = code_block_pattern.findall(comment_body)
-                if found_code:
-                    for lang, block in found_code:
-                        block = block.strip()
-                        # Determine the file extension for the code block.
-                        if lang:
-                            # Use the language name (lowercased) as the extension.
-                            ext = lang.lower()
-                        else:
-                            # No language provided – use a heuristic to detect WAT code.
-                            lower_block = block.lower()
-                            if "module" in lower_block and "func" in lower_block:
-                                ext = "wat"
-                            else:
-                                ext = "txt"
-                        code_blocks.append((ext, block))
-                
-                # Extract file links if present.
-                found_links = link_pattern.findall(comment_body)
-                if found_links:
-                    file_links.extend(found_links)
-        
-        # Only proceed if the issue was triggered and we have at least one code block or file link.
-        if issue_triggered and (code_blocks or file_links):
-            target_dir = os.path.join(issues_directory, str(issue_number))
-            os.makedirs(target_dir, exist_ok=True)
-            print(f"Processing issue {issue_number}: created directory {target_dir}")
-
-            # Download the complete issue page as HTML.
-            issue_url = issue_detail.get("url")
+                code_blocks.append((code_block_extension(lang, block), block))
+            file_links.extend(LINK_PATTERN.findall(comment_body))
+
+    return issue_triggered, code_blocks, file_links
+
+def process_issue(issue_number, issue_detail, issues_directory, objects, repo=None):
+    """
+    Extracts and stores the code blocks, issue page and linked files of one issue, in its
+    directory <owner>_<repo>/<number> (see issue_store.issue_directory). The repository is
+    taken from the issue's URL when not given.
+
+    Returns:
+        bool: False if any download failed (the issue should be retried), True otherwise.
+    """
+    with spans.span("extract_issue"):
+        issue_triggered, code_blocks, file_links = extract_issue(issue_detail)
+
+    # Only proceed if the issue was triggered and we have at least one code block or file link.
+    if not (issue_triggered and (code_blocks or file_links)):
+        print(f"Skipping issue {issue_number}: no relevant code blocks or file links found.")
+        return True
+
+    target_dir = issue_directory(issues_directory, repo or issue_repo(issue_detail), issue_number)
+    os.makedirs(target_dir, exist_ok=True)
+    print(f"Processing issue {issue_number}: created directory {target_dir}")
+    complete = True
+
+    # Download the complete issue page as HTML. The page changes with the issue (which is why it
+    # is being processed again), so the copy fetched for an earlier version is not reused.
+    issue_url = issue_detail.get("url")
+    if issue_url:
+        html_file_path = download_file(objects, issue_url, target_dir, f"{issue_number}.html", refresh=True)
+        if html_file_path:
+            print(f"Saved issue page to {html_file_path}")
+        else:
+            print(f"Error downloading issue HTML for issue {issue_number}")
+            complete = False
+
+    # Save each extracted code block with its determined extension.
+    for idx, (ext, code) in enumerate(code_blocks, start=1):
+        file_name = f"code_block_{idx}.{ext}"
+        file_path = os.path.join(target_dir, file_name)
+        try:
+            with open(file_path, "w") as f:
+                f.write(code)
+            print(f"Saved code block to {file_path}")
+        except Exception as e:
+            print(f"Error writing code block file {file_path}: {e}")
+
+    # Download all files from links (each distinct URL is fetched once across all issues).
+    for url in file_links:
+        if download_file(objects, url, target_dir) is None:
+            complete = False
+    return complete
+
+def process_issues(issues_directory, reprocess_all=False, workers=8):
+    """
+    Streams the issues to process, filters issues with comments that have any of the target keywords,
+    extracts code blocks in triple backticks and links to certain file types,
+    and then downloads/stores the files/code blocks in a dedicated directory for each issue.
+
+    Issues are handled by a pool of workers sharing one pooled HTTP session and a content-addressed
+    object store. Issues taken from the issue store are marked processed once all their downloads
+    succeeded, so a rerun after partial failures only retries the incomplete issues, and URLs
+    already fetched (recorded in downloads.jsonl) are never downloaded again, except issue pages,
+    which are fetched fresh whenever their issue changed.
+    """
+    # Prefer the incremental issue store written by collect_issues.py over issues.json
+    store = None
+    if os.path.exists(os.path.join(issues_directory, STORE_FILENAME)):
+        store = IssueStore.in_directory(issues_directory)
+
+    objects = ObjectStore(issues_directory, make_session(workers))
+    # Bound the number of queued issues so streaming keeps memory flat
+    slots = threading.BoundedSemaphore(workers * 4)
+    processed = 0
+    failed = 0
+    pending = []
+
+    def finish(done):
+        nonlocal processed, failed
+        for repo, issue_number, future in done:
             try:
-                headers = {'User-Agent': 'Mozilla/5.0'}
-                response = requests.get(issue_url, headers=headers)
-                response.raise_for_status()
-                html_file_path = os.path.join(target_dir, "{0}.html".format(issue_number))
-                with open(html_file_path, "w", encoding="utf-8") as f:
-                    f.write(response.text)
-                print(f"Saved issue page to {html_file_path}")
+                complete = future.result()
             except Exception as e:
-                print(f"Error downloading issue HTML for issue {issue_number}: {e}")
+                print(f"Error processing issue {issue_number}: {e}")
+                complete = False
+            if complete:
+                processed += 1
+                if store is not None:
+                    store.mark_processed(repo, issue_number)
+            else:
+                failed += 1
 
-            # Save each extracted code block with its determined extension.
-            for idx, (ext, code) in enumerate(code_blocks, start=1):
-                file_name = f"code_block_{idx}.{ext}"
-                file_path = os.path.join(target_dir, file_name)
-                try:
-                    with open(file_path, "w") as f:
-                        f.write(code)
-                    print(f"Saved code block to {file_path}")
-                except Exception as e:
-                    print(f"Error writing code block file {file_path}: {e}")
-            
-            # Download all files from links.
-            for url in file_links:
-                download_file(url, target_dir)
-        else:
-            print(f"Skipping issue {issue_number}: no relevant code blocks or file links found.")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for repo, issue_number, issue_detail in iter_issues(issues_directory, store, reprocess_all):
+            slots.acquire()
+            future = executor.submit(process_issue, issue_number, issue_detail, issues_directory, objects, repo)
+            future.add_done_callback(lambda _: slots.release())
+            pending.append((repo, issue_number, future))
+            # Mark finished issues from this thread (the store connection is not shared with workers)
+            done = [entry for entry in pending if entry[2].done()]
+            if done:
+                pending = [entry for entry in pending if entry not in done]
+                finish(done)
+        executor.shutdown(wait=True)
+        finish(pending)
+
+    if store is not None:
+        store.close()
+    print(f"Processed {processed} issues, {failed} incomplete (rerun to retry their downloads)")
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python process_issues.py <issues_directory>")
+        print("Usage: python process_issues.py <issues_directory> [--all] [workers]")
         sys.exit(1)
     issues_directory = sys.argv[1]
-    process_issues(issues_directory)
-
+    workers = next((int(arg) for arg in sys.argv[2:] if arg.isdigit()), 8)
+    with spans.span("process_issues", directory=issues_directory):
+        process_issues(issues_directory, reprocess_all="--all" in sys.argv[2:], workers=workers)
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus_cmin import EDGE_BITS, read_coverage
+
+def test_read_coverage_afl_showmap_format(tmp_path):
+    # afl-showmap writes "%06u:%u" lines
+    path = tmp_path / "seed_wamr_1.wasm"
+    path.write_text("000258:3\n001024:1\n000007:128\n")
+    [(name, keys)] = read_coverage((2, [str(path)], False))
+    assert name == "seed_wamr_1"
+    assert (keys == (np.int64(2) << EDGE_BITS) | np.array([7, 258, 1024])).all()
+
+def test_read_coverage_hitcounts_and_hex(tmp_path):
+    path = tmp_path / "seed_wamr_2.cov"
+    path.write_text("0x10\n000008:1\n000008:1\n")
+    [(_, plain)] = read_coverage((0, [str(path)], False))
+    assert plain.tolist() == [8, 16]
+    [(_, bucketed)] = read_coverage((0, [str(path)], True))
+    assert len(bucketed) == 2 and (bucketed >> 3).tolist() == [8, 16]
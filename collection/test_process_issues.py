@@ -0,0 +1,25 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from issue_store import issue_directory, issue_repo
+from process_issues import iter_json_object
+
+DATA = {"1": {"title": "a", "score": 1.5, "n": -12e3, "ok": True, "x": None}, "22": 1e3, "3": 0.25, "4": [1.5, 2], "5": 17}
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1 << 20])
+def test_iter_json_object_numbers_across_chunks(tmp_path, chunk_size):
+    path = tmp_path / "issues.json"
+    path.write_text(json.dumps(DATA, indent=1))
+    assert dict(iter_json_object(str(path), chunk_size)) == DATA
+
+def test_issue_directory_keeps_repositories_apart(tmp_path):
+    wasmtime = {"url": "https://github.com/bytecodealliance/wasmtime/issues/7"}
+    wasmer = {"url": "https://github.com/wasmerio/wasmer/issues/7"}
+    paths = {issue_directory(str(tmp_path), issue_repo(detail), 7) for detail in (wasmtime, wasmer)}
+    assert paths == {str(tmp_path / "bytecodealliance_wasmtime" / "7"), str(tmp_path / "wasmerio_wasmer" / "7")}
+    assert issue_directory(str(tmp_path), None, 7) == str(tmp_path / "7")
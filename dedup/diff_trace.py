@@ -1,6 +1,12 @@
 import argparse
 import lldb
 import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pipeline"))
+import spans
 
 # ----------- Command-Line Arguments -----------
 parser = argparse.ArgumentParser(description="LLDB instruction-level tracer with stdout match halt")
@@ -50,7 +56,8 @@ print(f"Breakpoint set at ID {bp.GetID()}")
 launch_info = lldb.SBLaunchInfo(PROGRAM_ARGS)
 launch_info.SetWorkingDirectory(".")
 error = lldb.SBError()
-process = target.Launch(launch_info, error)
+with spans.span("launch", program=PROGRAM_PATH):
+  process = target.Launch(launch_info, error)
 
 if error.Fail():
   print("Launch failed:", error.GetCString())
@@ -75,6 +82,7 @@ while True:
 # ----------- Begin Instruction-Level Trace -----------
 trace = []
 stdout_collected = ""
+step_start = time.time_ns() // 1000
 
 while process.IsValid() and process.GetState() != lldb.eStateExited:
   thread = process.GetSelectedThread()
@@ -106,6 +114,9 @@ while process.IsValid() and process.GetState() != lldb.eStateExited:
   # Step to next instruction
   thread.StepInstruction(False)
 
+spans.record("step", step_start, time.time_ns() // 1000, instructions=len(trace))
+spans.count("trace.instructions", len(trace))
+
 # ----------- Dump to Output File -----------
 with open(TRACE_OUTPUT_FILE, "w") as f:
   for line in trace:
@@ -37,10 +37,18 @@ trace_output_file=$4
 # ---------------------------------------------------------------------
 rm $trace_output_file 2&>/dev/null
 
+# ----------------------------------------------
+# Time the LLDB run as a span when SPANS_FILE is set (see pipeline/spans.py)
+# ----------------------------------------------
+spans_run=()
+if [[ -n "$SPANS_FILE" ]]; then
+    spans_run=(python3 "$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/../pipeline/spans.py" run --arg program="$program_path" lldb_trace --)
+fi
+
 # ----------------------------------------------
 # Run LLDB with inline commands
 # ----------------------------------------------
-lldb --batch \
+"${spans_run[@]}" lldb --batch \
     --one-line "script import trace_callback" \
     --one-line "script trace_callback.path_filter = '$path_filter'" \
     --one-line "script trace_callback.trace_output_file = '$trace_output_file'" \
@@ -0,0 +1,221 @@
+#!/usr/bin/python3
+"""
+Deterministic fake of the runtimes invoked by replay_wasm.sh (wasmtime, wasmer, iwasm, wamrc,
+wasmedge) and of wasm-objdump, for benchmarking the oracle without the real runtimes.
+
+Called through shims named after the tools (see run_bench.py); the first argument is the
+tool. The tier is found from the tool and its flags the way replay_wasm.sh invokes them, and
+its outcome and latency follow from a seeded profile (profile.json): a testcase (module
+content, function) draws one consensus outcome (a value, a trap, a validation error, a crash
+or a hang), and each tier deviates from it with the profile's divergence probability. All
+draws hash the seed, module digest, function and tier, so a corpus replays identically on
+every run and every machine. Outputs mimic each runtime's wording closely enough for the
+postprocessing of replay_wasm.sh to classify them; a crash is a real SIGSEGV and a hang
+sleeps until the replay timeout kills it.
+
+Compilers (wasmtime compile, wamrc, wasmedge compile) write the module itself as their
+artifact, so running the artifact draws from the same module digest.
+
+Environment: FAKE_RUNTIME_PROFILE (profile JSON), FAKE_RUNTIME_SEED (overrides its seed).
+
+Usage:
+  python3 fake_runtime.py <wasmtime|wasmer|iwasm|wamrc|wasmedge|wasm-objdump> <args of the tool> ...
+"""
+import hashlib
+import json
+import math
+import os
+import random
+import signal
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "reduce"))
+
+DEFAULT_PROFILE = os.path.join(HERE, "profile.json")
+OUTCOMES = ["value", "trap", "invalid", "crash", "hang"]
+# Flags of the tools that take a separate value
+VALUE_FLAGS = {"-o", "--invoke", "-f", "-W"}
+ARTIFACT_SUFFIXES = (".cwasm", ".aot", ".so")
+
+def load_profile():
+  with open(os.environ.get("FAKE_RUNTIME_PROFILE") or DEFAULT_PROFILE) as f:
+    profile = json.load(f)
+  if os.environ.get("FAKE_RUNTIME_SEED"):
+    profile["seed"] = int(os.environ["FAKE_RUNTIME_SEED"])
+  return profile
+
+def draw(profile, *keys):
+  """Random generator seeded by the profile seed and keys (stable across processes and machines)."""
+  digest = hashlib.sha256(":".join(str(k) for k in (profile["seed"],) + keys).encode()).digest()
+  return random.Random(int.from_bytes(digest[:8], "little"))
+
+def choose(rng, weights):
+  names = list(weights)
+  return rng.choices(names, weights=[weights[n] for n in names])[0]
+
+def parse_command(tool, args):
+  """(tier, function or None, input file, -o output) of one tool invocation."""
+  flags, positional, values = set(), [], {}
+  i = 0
+  while i < len(args):
+    arg = args[i]
+    if arg in VALUE_FLAGS and i + 1 < len(args):
+      values[arg] = args[i + 1]
+      i += 2
+      continue
+    if arg.startswith("-"):
+      flags.add(arg.split("=", 1)[0])
+    else:
+      positional.append(arg)
+    i += 1
+  command = positional[0] if positional and positional[0] in ("run", "compile") else None
+  if command:
+    positional = positional[1:]
+  path = positional[0] if positional else None
+  func = values.get("--invoke") or values.get("-f")
+  output = values.get("-o")
+
+  if tool == "wasmtime":
+    tier = "wasmtime_compile" if command == "compile" else \
+      "wasmtime_compiled" if "--allow-precompiled" in flags else "wasmtime"
+  elif tool == "wasmer":
+    tier = "wasmer_llvm" if "--llvm" in flags else "wasmer_cranelift"
+  elif tool == "wamrc":
+    tier = "wamr_compiler"
+  elif tool == "iwasm":
+    tier = "wamr_jit" if "--llvm-jit" in flags else "wamr_aot"
+  elif tool == "wasmedge":
+    if command == "compile":
+      tier = "wasmedge_compile"
+      output = positional[1] if len(positional) > 1 else None
+    else:
+      tier = "wasmedge_interp" if "--force-interpreter" in flags else \
+        "wasmedge_compiled" if path and path.endswith(ARTIFACT_SUFFIXES) else "wasmedge_jit"
+      func = positional[1] if len(positional) > 1 else None
+  else:
+    raise SystemExit(f"fake_runtime: unknown tool {tool!r}")
+  return tier, func, path, output
+
+def outcome(profile, digest, func, tier):
+  """(kind, detail) of a tier: the testcase's consensus outcome unless this tier diverges."""
+  consensus = draw(profile, digest, func)
+  kind = choose(consensus, profile["outcomes"])
+  detail = consensus.randrange(-2 ** 31, 2 ** 31) if kind == "value" else choose(consensus, profile["traps"])
+  deviation = draw(profile, digest, func, tier)
+  if deviation.random() < profile["divergence"]:
+    kind = choose(deviation, {k: w for k, w in profile["outcomes"].items() if k != kind} or profile["outcomes"])
+    detail = deviation.randrange(-2 ** 31, 2 ** 31) if kind == "value" else choose(deviation, profile["traps"])
+  return kind, detail
+
+def latency_s(profile, digest, func, tier, size):
+  median, sigma = profile["latency_ms"].get(tier, [10, 0.3])
+  rng = draw(profile, digest, func, tier, "latency")
+  ms = median * math.exp(sigma * rng.gauss(0, 1)) + profile.get("compile_ms_per_kb", {}).get(tier, 0) * size / 1024
+  return ms / 1000
+
+def trap_message(tool, path, func, trap):
+  if tool == "wasmtime":
+    return (f"Error: failed to run main module `{path}`\n\nCaused by:\n    0: failed to invoke `{func}`\n"
+            f"    1: error while executing at wasm backtrace:\n           0:   0x2a - <unknown>!<wasm function 0>\n"
+            f"    2: wasm trap: {trap}", 134)
+  if tool == "wasmer":
+    return f"error: RuntimeError: {trap}\n    at <unnamed> ({os.path.basename(path)}[0]:0x2a)", 1
+  if tool == "iwasm":
+    return f"Exception: {'native stack overflow' if trap == 'call stack exhausted' else trap}", 1
+  return f"[error] execution failed: {trap}, Code: 0x83\n[error]     When executing function name: \"{func}\"", 1
+
+def invalid_message(tool):
+  return {
+    "wasmtime": "Error: failed to parse WebAssembly module\n\nCaused by:\n    type mismatch (at offset 0x2a)",
+    "wasmer": "error: Validation error: type mismatch: expected i32, found f64 (at offset 0x2a)",
+    "wamrc": "Error: WASM module load failed: type mismatch",
+    "iwasm": "WASM module load failed: type mismatch",
+    "wasmedge": "[error] loading failed: validation failed, Code: 0x21",
+  }[tool]
+
+def value_output(tool, value, func):
+  if func is None:
+    return ""
+  if tool == "wasmtime":
+    sys.stderr.write("warning: using `--invoke` with a function that returns values is experimental "
+                     "and may break in the future\n")
+    return f"{value}"
+  if tool == "iwasm":
+    return f"{value & 0xFFFFFFFF:#x}:i32"
+  return f"{value}"
+
+def run_tool(tool, args, profile):
+  tier, func, path, output = parse_command(tool, args)
+  try:
+    with open(path, "rb") as f:
+      data = f.read()
+  except (TypeError, OSError):
+    print(f"Error: No such file or directory: {path}", file=sys.stderr)
+    return 1
+  digest = hashlib.sha256(data).hexdigest()
+  kind, detail = outcome(profile, digest, func or "nofunc", tier)
+  time.sleep(latency_s(profile, digest, func or "nofunc", tier, len(data)))
+
+  if tier in ("wasmtime_compile", "wamr_compiler", "wasmedge_compile"):
+    # Compilers only fail on invalid modules; runtime outcomes show when the artifact runs
+    if kind == "invalid":
+      print(invalid_message(tool), file=sys.stderr)
+      return 1
+    with open(output, "wb") as f:
+      f.write(data)
+    if tool == "wamrc":
+      print(f"Create AoT compiler with:\n  target:        x86_64\nCompile success, file {output} was generated.")
+    return 0
+  if kind == "hang":
+    time.sleep(profile.get("hang_s", 3600))
+    return 0
+  if kind == "crash":
+    sys.stdout.flush()
+    signal.signal(signal.SIGSEGV, signal.SIG_DFL)
+    os.kill(os.getpid(), signal.SIGSEGV)
+  if kind == "invalid":
+    print(invalid_message(tool), file=sys.stderr)
+    return 1
+  if kind == "trap":
+    message, status = trap_message(tool, path, func, detail)
+    print(message, file=sys.stderr)
+    return status
+  print(value_output(tool, detail, func))
+  return 0
+
+def objdump(args):
+  """The export section in wasm-objdump -x format (what replay_wasm.sh greps for)."""
+  from wasm_module import KIND_FUNC, SEC_EXPORT, Reader
+  with open(args[-1], "rb") as f:
+    data = f.read()
+  r = Reader(data, 8)
+  while not r.eof():
+    sid = r.byte()
+    payload = r.bytes(r.u())
+    if sid != SEC_EXPORT:
+      continue
+    sr = Reader(payload)
+    count = sr.u()
+    print(f"Export[{count}]:")
+    for _ in range(count):
+      name = sr.name().decode("utf-8", "replace")
+      kind = sr.byte()
+      index = sr.u()
+      if kind == KIND_FUNC:
+        print(f" - func[{index}] <{name}> -> \"{name}\"")
+    print("Code[0]:")
+  return 0
+
+def main():
+  if len(sys.argv) < 2:
+    print(__doc__.strip().splitlines()[-1])
+    return 2
+  tool, args = os.path.basename(sys.argv[1]), sys.argv[2:]
+  if tool == "wasm-objdump":
+    return objdump(args)
+  return run_tool(tool, args, load_profile())
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,270 @@
+#!/usr/bin/python3
+"""
+Oracle benchmark: replays a synthetic corpus through replay_wasm.sh and dedup_output.py
+against the deterministic fake runtimes of fake_runtime.py, and records
+
+  - testcases_per_s:  testcases / (replay + dedup wall time)
+  - replay_s, dedup_s: wall time of each step
+  - replay_rss_mb, dedup_rss_mb: peak RSS of the largest process of each step
+  - outputs, unique:  output files and deduplicated outputs (identical on every run of the
+                      same corpus and profile, which the benchmark checks)
+  - stages:           latency (count, mean, p50, p95 in ms) of discovery, compilation,
+                      execution and postprocessing per runtime call and of whole testcases,
+                      from the timing spans replay_wasm.sh and dedup_output.py record
+
+The corpus is generated from --seed: --count modules whose sizes are log-normal around
+--size-kb and whose export counts are uniform in --exports (the first seven exports carry
+the names replay_wasm.sh invokes). Outcomes and latencies come from the seeded profile
+(profile.json), so a report depends only on the code under test and the machine; reports
+record the git revision and the corpus and profile digests, and --compare only compares
+reports of the same corpus and profile.
+
+Results are written as bench/results/<stamp>.json plus a markdown table. replay_wasm.sh
+needs GNU parallel and timeout.
+
+Usage:
+  python3 run_bench.py [--count 200] [--seed 1] [--size-kb 4] [--exports 1-12] [--func lookup]
+                       [--profile profile.json] [--repeat 3] [--keep DIR]
+  python3 run_bench.py --compare old.json new.json
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ORACLE_DIR = os.path.dirname(BENCH_DIR)
+REPO_DIR = os.path.dirname(ORACLE_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+sys.path.insert(0, os.path.join(REPO_DIR, "reduce"))
+sys.path.insert(0, os.path.join(REPO_DIR, "pipeline"))
+from spans import read_trace
+from wasm_module import I32, MAGIC, SEC_CODE, SEC_EXPORT, SEC_FUNCTION, SEC_TYPE, VERSION, enc_name, enc_s, enc_u, enc_vec
+
+REPLAY_WASM = os.path.join(ORACLE_DIR, "replay_wasm.sh")
+DEDUP_OUTPUT = os.path.join(ORACLE_DIR, "dedup_output.py")
+FAKE_RUNTIME = os.path.join(BENCH_DIR, "fake_runtime.py")
+FAKE_TOOLS = ["wasmtime", "wasmer", "iwasm", "wamrc", "wasmedge", "wasm-objdump"]
+
+# Exports replay_wasm.sh invokes (its whitelist); further exports are discovered and skipped
+EXPORT_NAMES = ["main", "_start", "f", "foo", "to_test", "s", "_main"]
+# Spans reported per runtime as well
+PER_RUNTIME = ("compile", "execute")
+
+# ----------- corpus -----------
+
+def section(sid, payload):
+  return bytes([sid]) + enc_u(len(payload)) + payload
+
+def make_module(rng, size, exports):
+  """A valid module of about size bytes with `exports` exported () -> i32 functions."""
+  names = [EXPORT_NAMES[i] if i < len(EXPORT_NAMES) else f"export_{i}" for i in range(exports)]
+  body_size = max(8, (size - 40 - sum(len(n) + 4 for n in names)) // exports)
+  bodies = []
+  for _ in range(exports):
+    code = bytearray()
+    # i32.const/drop pairs up to the body size, then the result
+    while len(code) < body_size - 8:
+      code += b"\x41" + enc_s(rng.randrange(-2 ** 20, 2 ** 20)) + b"\x1a"
+    code += b"\x41" + enc_s(rng.randrange(-2 ** 31, 2 ** 31)) + b"\x0b"
+    body = enc_vec([]) + bytes(code)
+    bodies.append(enc_u(len(body)) + body)
+  return (MAGIC + VERSION
+          + section(SEC_TYPE, enc_vec([b"\x60" + enc_vec([]) + enc_vec([I32])]))
+          + section(SEC_FUNCTION, enc_vec([enc_u(0)] * exports))
+          + section(SEC_EXPORT, enc_vec([enc_name(n.encode()) + b"\x00" + enc_u(i) for i, n in enumerate(names)]))
+          + section(SEC_CODE, enc_vec(bodies)))
+
+def make_corpus(directory, count, seed, size_kb, sigma, exports):
+  """Writes case<i>.wasm files; returns the SHA-256 over the corpus."""
+  rng = random.Random(seed)
+  digest = hashlib.sha256()
+  os.makedirs(directory, exist_ok=True)
+  for i in range(count):
+    size = int(size_kb * 1024 * math.exp(sigma * rng.gauss(0, 1)))
+    data = make_module(rng, size, rng.randint(*exports))
+    name = f"case{i:05d}.wasm"
+    with open(os.path.join(directory, name), "wb") as f:
+      f.write(data)
+    digest.update(name.encode() + hashlib.sha256(data).digest())
+  return digest.hexdigest()
+
+def make_fake_bin(directory):
+  """Shims named after the runtimes, all running fake_runtime.py (without site imports, to start fast)."""
+  os.makedirs(directory, exist_ok=True)
+  for tool in FAKE_TOOLS:
+    path = os.path.join(directory, tool)
+    with open(path, "w") as f:
+      f.write(f"#!/bin/sh\nexec {sys.executable} -S {FAKE_RUNTIME} {tool} \"$@\"\n")
+    os.chmod(path, 0o755)
+
+# ----------- measurement -----------
+
+def run_measured(cmd, env):
+  """(wall seconds, peak RSS in MB of the largest process of the tree, exit status)."""
+  start = time.perf_counter()
+  proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+  _, status, usage = os.wait4(proc.pid, 0)
+  proc.returncode = os.waitstatus_to_exitcode(status)
+  return time.perf_counter() - start, usage.ru_maxrss / 1024, proc.returncode
+
+def percentile(values, q):
+  values = sorted(values)
+  return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+def stage_latencies(spans):
+  """{stage: {count, mean_ms, p50_ms, p95_ms}} over span durations, also per runtime for PER_RUNTIME."""
+  durations = {}
+  for s in spans:
+    durations.setdefault(s["name"], []).append(s["dur"] / 1000)
+    if s["name"] in PER_RUNTIME and "runtime" in s.get("args", {}):
+      durations.setdefault(f"{s['name']}[{s['args']['runtime']}]", []).append(s["dur"] / 1000)
+  return {name: {"count": len(values), "mean_ms": round(statistics.fmean(values), 2),
+                 "p50_ms": round(percentile(values, 0.5), 2), "p95_ms": round(percentile(values, 0.95), 2)}
+          for name, values in sorted(durations.items())}
+
+def run_once(corpus_dir, work_dir, args, env):
+  """One replay + dedup of a fresh copy of the corpus."""
+  shutil.rmtree(work_dir, ignore_errors=True)
+  shutil.copytree(corpus_dir, work_dir)
+  trace = os.path.join(work_dir, "spans.jsonl")
+  env = dict(env, SPANS_FILE=trace)
+
+  replay_s, replay_rss, status = run_measured(["bash", args.replay, args.func, work_dir], env)
+  if status != 0:
+    raise SystemExit(f"replay exited with {status}")
+  output_dir = os.path.join(work_dir, "output")
+  dedup_s, dedup_rss, status = run_measured([sys.executable, DEDUP_OUTPUT, output_dir], env)
+  if status != 0:
+    raise SystemExit(f"dedup exited with {status}")
+
+  outputs = len([n for n in os.listdir(output_dir) if n.endswith(".txt")])
+  unique = len(os.listdir(os.path.join(output_dir, "deduped")))
+  spans, _ = read_trace(trace)
+  return {"replay_s": round(replay_s, 3), "dedup_s": round(dedup_s, 3),
+          "testcases_per_s": round(args.count / (replay_s + dedup_s), 3),
+          "replay_rss_mb": round(replay_rss, 1), "dedup_rss_mb": round(dedup_rss, 1),
+          "outputs": outputs, "unique": unique}, spans
+
+def file_digest(path):
+  with open(path, "rb") as f:
+    return hashlib.sha256(f.read()).hexdigest()
+
+def git_rev():
+  result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                          stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+  return result.stdout.strip() or "unknown"
+
+# ----------- reports -----------
+
+SUMMARY_KEYS = ["testcases_per_s", "replay_s", "dedup_s", "replay_rss_mb", "dedup_rss_mb"]
+
+def markdown(report):
+  s = report["summary"]
+  lines = [f"# Oracle benchmark ({report['git_rev']}, {report['date']})", "",
+           f"{report['corpus']['count']} testcases (seed {report['corpus']['seed']}, "
+           f"corpus {report['corpus']['digest'][:12]}, profile {report['profile_digest'][:12]}), "
+           f"func={report['func']}, {len(report['runs'])} runs (medians)", "",
+           "| testcases/s | replay (s) | dedup (s) | replay RSS (MB) | dedup RSS (MB) | outputs | unique |",
+           "|---|---|---|---|---|---|---|",
+           f"| {s['testcases_per_s']} | {s['replay_s']} | {s['dedup_s']} | {s['replay_rss_mb']} "
+           f"| {s['dedup_rss_mb']} | {s['outputs']} | {s['unique']} |", "",
+           "| stage | count | mean (ms) | p50 (ms) | p95 (ms) |", "|---|---|---|---|---|"]
+  for name, st in report["stages"].items():
+    lines.append(f"| {name} | {st['count']} | {st['mean_ms']} | {st['p50_ms']} | {st['p95_ms']} |")
+  return "\n".join(lines) + "\n"
+
+def compare(old_path, new_path):
+  with open(old_path) as f:
+    old = json.load(f)
+  with open(new_path) as f:
+    new = json.load(f)
+  if (old["corpus"], old["profile_digest"], old["func"]) != (new["corpus"], new["profile_digest"], new["func"]):
+    raise SystemExit("Reports are of different corpora, profiles or functions; not comparable")
+  print(f"{old['git_rev']} -> {new['git_rev']}")
+  print("| metric | old | new | change |")
+  print("|---|---|---|---|")
+  rows = [(key, old["summary"][key], new["summary"][key]) for key in SUMMARY_KEYS]
+  rows += [(f"{name} p50 (ms)", old["stages"][name]["p50_ms"], st["p50_ms"])
+           for name, st in new["stages"].items() if name in old["stages"]]
+  for name, a, b in rows:
+    print(f"| {name} | {a} | {b} | {(b - a) / a * 100 if a else 0:+.1f}% |")
+
+def parse_range(value):
+  low, _, high = value.partition("-")
+  return int(low), int(high or low)
+
+def main():
+  parser = argparse.ArgumentParser(description="Benchmark the replay + dedup oracle on fake runtimes")
+  parser.add_argument("--count", type=int, default=200, help="Testcases in the synthetic corpus")
+  parser.add_argument("--seed", type=int, default=1, help="Corpus seed")
+  parser.add_argument("--size-kb", type=float, default=4, help="Median module size")
+  parser.add_argument("--size-sigma", type=float, default=0.8, help="Log-normal spread of module sizes")
+  parser.add_argument("--exports", type=parse_range, default=(1, 12), metavar="MIN-MAX", help="Exports per module")
+  parser.add_argument("--func", default="lookup", help="Function argument of replay_wasm.sh (lookup: all exports)")
+  parser.add_argument("--profile", default=os.path.join(BENCH_DIR, "profile.json"), help="Fake runtime profile")
+  parser.add_argument("--replay", default=REPLAY_WASM, help="Replay script to benchmark")
+  parser.add_argument("--repeat", type=int, default=3, help="Runs (the summary holds their medians)")
+  parser.add_argument("--keep", help="Keep the corpus and the last run's outputs in this directory")
+  parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two JSON reports")
+  args = parser.parse_args()
+
+  if args.compare:
+    compare(*args.compare)
+    return
+  missing = [tool for tool in ("parallel", "timeout") if shutil.which(tool) is None]
+  if missing and os.path.abspath(args.replay) == REPLAY_WASM:
+    raise SystemExit(f"replay_wasm.sh needs {' and '.join(missing)}")
+
+  root = args.keep or tempfile.mkdtemp(prefix="oracle_bench_")
+  try:
+    corpus_dir = os.path.join(root, "corpus")
+    shutil.rmtree(corpus_dir, ignore_errors=True)
+    corpus_digest = make_corpus(corpus_dir, args.count, args.seed, args.size_kb, args.size_sigma, args.exports)
+    bin_dir = os.path.join(root, "bin")
+    make_fake_bin(bin_dir)
+    env = dict(os.environ, PATH=f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+               FAKE_RUNTIME_PROFILE=os.path.abspath(args.profile))
+    env.pop("SPANS_STACK", None)
+
+    runs, spans = [], []
+    for i in range(args.repeat):
+      result, run_spans = run_once(corpus_dir, os.path.join(root, "run"), args, env)
+      print(f"[*] run {i + 1}: {result['testcases_per_s']} testcases/s, replay {result['replay_s']}s, "
+            f"dedup {result['dedup_s']}s, {result['outputs']} outputs, {result['unique']} unique")
+      runs.append(result)
+      spans += run_spans
+    if len({(r["outputs"], r["unique"]) for r in runs}) > 1:
+      print("[!] Runs disagree on the outputs: the replay is not deterministic", file=sys.stderr)
+  finally:
+    if not args.keep:
+      shutil.rmtree(root, ignore_errors=True)
+
+  summary = {key: round(statistics.median(r[key] for r in runs), 3) for key in SUMMARY_KEYS}
+  summary.update(outputs=runs[-1]["outputs"], unique=runs[-1]["unique"])
+  stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+  report = {"git_rev": git_rev(), "date": stamp, "cpus": os.cpu_count(), "func": args.func,
+            "corpus": {"count": args.count, "seed": args.seed, "size_kb": args.size_kb,
+                       "size_sigma": args.size_sigma, "exports": list(args.exports), "digest": corpus_digest},
+            "profile_digest": file_digest(args.profile), "summary": summary, "runs": runs,
+            "stages": stage_latencies(spans)}
+  os.makedirs(RESULTS_DIR, exist_ok=True)
+  json_path = os.path.join(RESULTS_DIR, f"{stamp}.json")
+  with open(json_path, "w") as f:
+    json.dump(report, f, indent=2)
+  with open(os.path.join(RESULTS_DIR, f"{stamp}.md"), "w") as f:
+    f.write(markdown(report))
+  print(markdown(report))
+  print(f"[+] Report written to {json_path}")
+
+if __name__ == "__main__":
+  main()
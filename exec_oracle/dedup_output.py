@@ -5,6 +5,9 @@ import sys
 import re
 from pathlib import Path
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pipeline"))
+import spans
+
 MIN_INPUT_LINES = 10
 to_remove = []
 
@@ -94,23 +97,27 @@ if __name__ == "__main__":
   deduped_dir = output_dir / "deduped"
   Path(deduped_dir).mkdir(parents=True, exist_ok=True)
 
-  for file in output_dir.glob("*.txt"):
-    with open(file, 'r', encoding="ISO-8859-1") as output_file:
-      input_lines = output_file.readlines()
-      # print(input_lines)
-
-      if len(input_lines) < MIN_INPUT_LINES:
-        to_remove.append(file)
-      else:
-        # Deduplicated mapping using normalization
-        build_normalized_output_to_test_id_map(file.name, input_lines)
-
-  # Print normalized deduped blocks
-  for (outputs, file_name) in unique_output_diffs.items():
-    with open(deduped_dir / f"{file_name}.txt", "w+") as deduped_output_file:
-      deduped_output_file.write(outputs + "\n")
-
-  # Remove incomplete files
-  for file in to_remove:
-    os.remove(file)
-      
+  with spans.span("dedup_output", dir=str(output_dir)):
+    with spans.span("normalize"):
+      for file in output_dir.glob("*.txt"):
+        spans.count("dedup.files")
+        with open(file, 'r', encoding="ISO-8859-1") as output_file:
+          input_lines = output_file.readlines()
+          # print(input_lines)
+
+          if len(input_lines) < MIN_INPUT_LINES:
+            to_remove.append(file)
+          else:
+            # Deduplicated mapping using normalization
+            build_normalized_output_to_test_id_map(file.name, input_lines)
+
+    # Print normalized deduped blocks
+    with spans.span("write", unique=len(unique_output_diffs)):
+      for (outputs, file_name) in unique_output_diffs.items():
+        with open(deduped_dir / f"{file_name}.txt", "w+") as deduped_output_file:
+          deduped_output_file.write(outputs + "\n")
+
+    # Remove incomplete files
+    spans.count("dedup.incomplete", len(to_remove))
+    for file in to_remove:
+      os.remove(file)
@@ -0,0 +1,218 @@
+#!/usr/bin/python3
+"""
+Parse the outputs of replay_wasm.sh into per-testcase results.
+
+Each output file (<testcase>__<func>.txt, or its deduped/ copy) has one line per tier,
+"<tier>: <exit code>:<>:<output>". A testcase diverges when some tiers disagree with the
+majority outcome; the runtimes owning those tiers are its buggy runtimes. Outputs are
+compared in the normalized form of dedup_output.py, so raw and deduped outputs agree.
+
+The lineage command writes the rows in the format of plots/rq5/data/lineage_diagram.tsv
+(bug_id, seed_runtime, avg_seed_age_months, mode, buggy_runtime; one row per buggy runtime),
+so the lineage plot can be regenerated for a whole campaign.
+
+Usage:
+  python oracle_results.py lineage <mode>=<output_dir> ... [--pack corpus.pack] [-o lineage.tsv] [--jobs N]
+  python oracle_results.py summary <output_dir> ...
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+
+from dedup_output import MIN_INPUT_LINES, normalize_numeric_outputs
+
+# Tiers written by replay_wasm.sh, in output order
+TIERS = ["wasmtime", "wasmtime_compiled", "wasmer_cranelift", "wasmer_llvm", "wamr_compiler",
+         "wamr_aot", "wamr_jit", "wasmedge_jit", "wasmedge_interp", "wasmedge_compiled"]
+RUNTIMES = ["wasmtime", "wasmer", "wamr", "wasmedge"]
+# Tier lines are "<runtime>[_<configuration>]: <outcome>"; other runtimes and tiers are fine too
+TIER_NAME = re.compile(r"[a-z][a-z0-9]*(_[a-z0-9]+)*")
+
+SEED_NAME = re.compile(r"seed_([a-z]+)_(\d+)")
+LINEAGE_COLUMNS = ["bug_id", "seed_runtime", "avg_seed_age_months", "mode", "buggy_runtime"]
+
+@lru_cache(maxsize=1 << 16)
+def normalize_outcome(outcome):
+  """
+  Outcome in dedup_output.py's normalized form. Numeric outputs are kept as they are: they
+  only need to compare equal to the same numbers, which the per-file numbering also gives.
+  """
+  normalized, _ = normalize_numeric_outputs(outcome, {}, 1)
+  if normalized.endswith(":<>:num1") and not outcome.endswith("num1"):
+    return outcome
+  return normalized
+
+def tier_runtime(tier):
+  return tier.split("_", 1)[0]
+
+def is_execution_tier(tier):
+  # wamr_compiler (and any *_compiler) only reports whether AOT compilation succeeded
+  return not tier.endswith("_compiler")
+
+def complete_lines(runtimes=None):
+  """
+  Lines of a complete raw output file: one per tier of TIERS replayed for runtimes (as with
+  REPLAY_TIERS of replay_wasm.sh), or MIN_INPUT_LINES for a replay of all runtimes.
+  """
+  if not runtimes:
+    return MIN_INPUT_LINES
+  return sum(tier_runtime(tier) in runtimes for tier in TIERS)
+
+def runtime_order(runtimes):
+  """Runtimes in RUNTIMES order, unknown ones after them by name."""
+  return sorted(runtimes, key=lambda rt: (RUNTIMES.index(rt) if rt in RUNTIMES else len(RUNTIMES), rt))
+
+def parse_output(lines):
+  """Normalized outcome ("<exit>:<>:<output>") per tier of one output file."""
+  outcomes = {}
+  for line in lines:
+    tier, sep, outcome = line.partition(":")
+    if not sep or "DIFF" in line or not TIER_NAME.fullmatch(tier):
+      continue
+    outcomes[tier] = normalize_outcome(outcome.strip())
+  return outcomes
+
+def divergent_tiers(outcomes):
+  """Execution tiers whose outcome disagrees with the majority outcome, in file order."""
+  values = [outcome for tier, outcome in outcomes.items() if is_execution_tier(tier)]
+  if not values:
+    return []
+  majority = Counter(values).most_common(1)[0][0]
+  return [tier for tier, outcome in outcomes.items() if is_execution_tier(tier) and outcome != majority]
+
+def buggy_runtimes(outcomes):
+  """Runtimes with an execution tier that disagrees with the majority outcome."""
+  return runtime_order({tier_runtime(tier) for tier in divergent_tiers(outcomes)})
+
+def output_key(file_name):
+  """<testcase>__<func> from an output file name, the same for its raw and its deduped (.txt.txt) copy."""
+  name = file_name
+  while name.endswith(".txt"):
+    name = name[:-len(".txt")]
+  return name
+
+def testcase_name(file_name):
+  """<testcase> from <testcase>__<func>.txt (deduped copies add another .txt)."""
+  return output_key(file_name).rsplit("__", 1)[0]
+
+def seed_runtime(name):
+  """Runtime of the seed a testcase descends from (seed_<runtime>_<issue> in its name), or None."""
+  match = SEED_NAME.search(name)
+  return match.group(1) if match else None
+
+def output_files(output_dir):
+  """Result files of an output directory: its deduped/ outputs when present, else the raw ones."""
+  deduped = os.path.join(output_dir, "deduped")
+  directory = deduped if os.path.isdir(deduped) else output_dir
+  with os.scandir(directory) as entries:
+    return sorted(entry.path for entry in entries if entry.name.endswith(".txt") and entry.is_file())
+
+def read_results(paths, min_lines=MIN_INPUT_LINES):
+  """(file name, outcomes) for complete output files (raw ones with at least min_lines lines)."""
+  results = []
+  for path in paths:
+    with open(path, encoding="ISO-8859-1") as f:
+      lines = f.readlines()
+    if len(lines) < min_lines and os.path.basename(os.path.dirname(path)) != "deduped":
+      continue
+    results.append((os.path.basename(path), parse_output(lines)))
+  return results
+
+def parse_files(paths, jobs=None, min_lines=MIN_INPUT_LINES):
+  """
+  Yields (file name, outcomes) for the complete output files among paths (see read_results),
+  parsed in worker processes when there are many.
+  """
+  workers = jobs or os.cpu_count() or 1
+  if workers == 1 or len(paths) < 1000:
+    yield from read_results(paths, min_lines)
+    return
+  chunk = max(1000, len(paths) // (4 * workers))
+  read = partial(read_results, min_lines=min_lines)
+  with ProcessPoolExecutor(max_workers=workers) as pool:
+    for results in pool.map(read, (paths[i:i + chunk] for i in range(0, len(paths), chunk))):
+      yield from results
+
+def iter_results(output_dir, jobs=None):
+  """Yields (file name, outcomes) for the outputs of a directory."""
+  yield from parse_files(output_files(output_dir), jobs)
+
+def lineage_rows(output_dir, mode, ages=None, jobs=None):
+  """Yields lineage rows (LINEAGE_COLUMNS) for the divergent testcases of an output directory."""
+  ages = ages or {}
+  for file_name, outcomes in iter_results(output_dir, jobs):
+    buggy = buggy_runtimes(outcomes)
+    if not buggy:
+      continue
+    name = testcase_name(file_name)
+    seed = SEED_NAME.search(name)
+    age = ages.get(f"{seed.group(0)}.wasm") if seed else None
+    for runtime in buggy:
+      yield [file_name.split(".txt")[0], seed_runtime(name) or "", "" if age is None else age, mode, runtime]
+
+def pack_ages(pack_path):
+  """Seed age in months per seed base name (seed_<runtime>_<issue>.wasm) from a corpus pack index."""
+  sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "collection"))
+  from corpus_pack import CorpusPack
+  ages = {}
+  with CorpusPack(pack_path) as pack:
+    for entry in pack.entries:
+      if entry.get("age_months") is not None:
+        seed = SEED_NAME.search(os.path.basename(entry["name"]))
+        if seed:
+          ages.setdefault(f"{seed.group(0)}.wasm", entry["age_months"])
+  return ages
+
+def main():
+  parser = argparse.ArgumentParser(description="Results of replay_wasm.sh outputs")
+  commands = parser.add_subparsers(dest="command", required=True)
+
+  p = commands.add_parser("lineage", help="Write lineage rows (lineage_diagram.tsv format) of divergent testcases")
+  p.add_argument("campaigns", nargs="+", help="<mode>=<output_dir>, mode being e.g. wasmaker, wapplique or transplantation")
+  p.add_argument("--pack", help="Corpus pack whose index provides the seed ages")
+  p.add_argument("-o", "--output", help="Output TSV (default: stdout)")
+  p.add_argument("--jobs", type=int, help="Worker processes for parsing")
+
+  p = commands.add_parser("summary", help="Count divergent testcases per buggy runtime")
+  p.add_argument("output_dirs", nargs="+")
+
+  args = parser.parse_args()
+
+  if args.command == "summary":
+    for output_dir in args.output_dirs:
+      total = divergent = 0
+      per_runtime = Counter()
+      for _, outcomes in iter_results(output_dir):
+        total += 1
+        buggy = buggy_runtimes(outcomes)
+        divergent += bool(buggy)
+        per_runtime.update(buggy)
+      print(f"{output_dir}: {total} testcases, {divergent} divergent")
+      for runtime in runtime_order(set(RUNTIMES) | set(per_runtime)):
+        print(f"  {runtime}: {per_runtime[runtime]}")
+    return
+
+  ages = pack_ages(args.pack) if args.pack else {}
+  out = open(args.output, "w", newline="") if args.output else sys.stdout
+  try:
+    writer = csv.writer(out, delimiter="\t", lineterminator="\n")
+    writer.writerow(LINEAGE_COLUMNS)
+    rows = 0
+    for campaign in args.campaigns:
+      mode, output_dir = campaign.split("=", 1)
+      for row in lineage_rows(output_dir, mode, ages, args.jobs):
+        writer.writerow(row)
+        rows += 1
+  finally:
+    if args.output:
+      out.close()
+  if args.output:
+    print(f"Wrote {rows} lineage rows to {args.output}")
+
+if __name__ == "__main__":
+  main()
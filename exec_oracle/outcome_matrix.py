@@ -0,0 +1,320 @@
+#!/usr/bin/python3
+"""
+Outcome matrix: the replay_wasm.sh outputs of a campaign as a testcase x tier matrix of
+interned outcome codes, for questions like "which testcases have wamr_aot disagreeing with
+wamr_jit while every other tier agrees" without going through the text files again.
+
+Outcomes are interned in the normalized form of oracle_results.py (so raw and deduped outputs
+agree); a tier missing from an output file is MISSING. The matrix lives in a directory:
+  codes.bin       int32 codes, one row per output file (memory-mapped read-only)
+  index.json      tiers (columns) and the output directories rows came from
+  outcomes.json   the outcome of each code
+  testcases.tsv   <output directory index> <tab> <output file name>, one line per row
+Updating only parses output files not in the matrix yet and appends their rows.
+
+Queries run over the memory map in chunks of CHUNK_ROWS rows, with a fixed number of NumPy
+operations per chunk and tier:
+  - a row diverges when its present tiers do not all have the same code,
+  - its disagreement pattern is the partition of its tiers into groups of equal outcome,
+    each tier labelled by the first column of its group, and packed into one integer,
+  - patterns are ranked by how many rows have them.
+Queries consider the execution tiers (see oracle_results.is_execution_tier) unless --tiers
+names others.
+
+Usage:
+  python outcome_matrix.py update <matrix_dir> <output_dir> ... [--runtimes R1,R2,...] [--jobs N]
+  python outcome_matrix.py patterns <matrix_dir> [--tiers T1,T2,...] [--top N] [--all]
+  python outcome_matrix.py rows <matrix_dir> (--pattern ID | --isolate TIER ... | --divergent) [--tiers ...]
+e.g.
+  python outcome_matrix.py rows campaign.matrix --isolate wamr_aot
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from oracle_results import TIERS, complete_lines, is_execution_tier, output_files, output_key, parse_files
+
+MISSING = -1
+CHUNK_ROWS = 1 << 20
+# Rows are appended in blocks of this many
+WRITE_ROWS = 1 << 16
+# Patterns are packed in base len(tiers) + 1, which int64 holds for up to this many tiers
+MAX_PATTERN_TIERS = 15
+
+class OutcomeMatrix:
+  """Memory-mapped testcase x tier matrix of outcome codes; codes[i, j] for row i and tiers[j]."""
+
+  def __init__(self, path):
+    self.path = path
+    self.tiers = []
+    self.sources = []
+    self.outcomes = []
+    self.rows = 0
+    if os.path.exists(os.path.join(path, "index.json")):
+      with open(os.path.join(path, "index.json")) as f:
+        index = json.load(f)
+      self.tiers, self.sources, self.rows = index["tiers"], index["sources"], index["rows"]
+      with open(os.path.join(path, "outcomes.json")) as f:
+        self.outcomes = json.load(f)
+    self.codes = self.map()
+
+  def file(self, name):
+    return os.path.join(self.path, name)
+
+  def map(self):
+    if not self.rows:
+      return np.zeros((0, len(self.tiers)), dtype=np.int32)
+    return np.memmap(self.file("codes.bin"), dtype=np.int32, mode="r", shape=(self.rows, len(self.tiers)))
+
+  def save_index(self):
+    for name, data in (("outcomes.json", self.outcomes),
+                       ("index.json", {"tiers": self.tiers, "sources": self.sources, "rows": self.rows})):
+      tmp = self.file(f"{name}.{os.getpid()}.tmp")
+      with open(tmp, "w") as f:
+        json.dump(data, f)
+      os.replace(tmp, self.file(name))
+
+  def testcases(self, rows=None):
+    """Yields (output directory, output file name) of each row, or of the given sorted rows."""
+    if not self.rows:
+      return
+    wanted = iter(rows) if rows is not None else None
+    next_row = next(wanted, None) if wanted else None
+    with open(self.file("testcases.tsv")) as f:
+      for i, line in enumerate(f):
+        if wanted is not None:
+          if next_row is None:
+            return
+          if i != next_row:
+            continue
+          next_row = next(wanted, None)
+        source, name = line.rstrip("\n").split("\t", 1)
+        yield self.sources[int(source)], name
+
+  def widen(self, tiers):
+    """Adds tier columns (MISSING in existing rows), rewriting codes.bin chunk by chunk."""
+    old = self.codes
+    self.tiers = self.tiers + tiers
+    tmp = self.file(f"codes.bin.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+      for start in range(0, self.rows, CHUNK_ROWS):
+        chunk = np.full((min(CHUNK_ROWS, self.rows - start), len(self.tiers)), MISSING, dtype=np.int32)
+        chunk[:, :old.shape[1]] = old[start:start + len(chunk)]
+        f.write(chunk.tobytes())
+    del old
+    os.replace(tmp, self.file("codes.bin"))
+
+  def update(self, output_dir, jobs=None, runtimes=None):
+    """
+    Appends the rows of the complete output files of output_dir, replayed for runtimes (default:
+    all), not in the matrix yet; returns how many.
+    """
+    os.makedirs(self.path, exist_ok=True)
+    source = os.path.abspath(output_dir)
+    if source not in self.sources:
+      self.sources.append(source)
+    # Rows an interrupted update appended after the last saved index are dropped
+    seen = set()
+    with open(self.file("testcases.tsv"), "a+b") as f:
+      f.seek(0)
+      for _ in range(self.rows):
+        source_index, name = f.readline().decode().rstrip("\n").split("\t", 1)
+        if self.sources[int(source_index)] == source:
+          seen.add(output_key(name))
+      f.truncate()
+    if os.path.exists(self.file("codes.bin")):
+      os.truncate(self.file("codes.bin"), self.rows * len(self.tiers) * np.dtype(np.int32).itemsize)
+    # Keyed by testcase and function: the deduped/ copies that replace the raw outputs are the same rows
+    new = [path for path in output_files(output_dir) if output_key(os.path.basename(path)) not in seen]
+    if not new:
+      return 0
+    if not self.tiers:
+      self.widen(list(TIERS))
+    code = {outcome: i for i, outcome in enumerate(self.outcomes)}
+    column = {tier: j for j, tier in enumerate(self.tiers)}
+    source_index = self.sources.index(source)
+    added = 0
+    block, names = [], []
+
+    def flush():
+      nonlocal added
+      rows = np.full((len(block), len(self.tiers)), MISSING, dtype=np.int32)
+      for i, cells in enumerate(block):
+        rows[i, [j for j, _ in cells]] = [c for _, c in cells]
+      with open(self.file("codes.bin"), "ab") as f:
+        f.write(rows.tobytes())
+      with open(self.file("testcases.tsv"), "a") as f:
+        f.writelines(f"{source_index}\t{name}\n" for name in names)
+      self.rows += len(block)
+      added += len(block)
+      block.clear()
+      names.clear()
+
+    for file_name, outcomes in parse_files(new, jobs, complete_lines(runtimes)):
+      new_tiers = [tier for tier in outcomes if tier not in column]
+      if new_tiers:
+        if block:
+          flush()
+        self.codes = self.map()
+        self.widen(new_tiers)
+        column = {tier: j for j, tier in enumerate(self.tiers)}
+      cells = []
+      for tier, outcome in outcomes.items():
+        if outcome not in code:
+          code[outcome] = len(self.outcomes)
+          self.outcomes.append(outcome)
+        cells.append((column[tier], code[outcome]))
+      block.append(cells)
+      names.append(file_name)
+      if len(block) == WRITE_ROWS:
+        flush()
+    if block:
+      flush()
+    self.save_index()
+    self.codes = self.map()
+    return added
+
+  def columns(self, tiers=None):
+    """Column indices of the given tiers (default: the execution tiers)."""
+    if tiers is None:
+      return [j for j, tier in enumerate(self.tiers) if is_execution_tier(tier)]
+    unknown = [tier for tier in tiers if tier not in self.tiers]
+    if unknown:
+      raise ValueError(f"Unknown tiers {', '.join(unknown)} (the matrix has {', '.join(self.tiers)})")
+    return [self.tiers.index(tier) for tier in tiers]
+
+  def chunks(self, columns):
+    """Yields (first row, codes of the columns) over the matrix in chunks of CHUNK_ROWS rows."""
+    for start in range(0, self.rows, CHUNK_ROWS):
+      yield start, np.asarray(self.codes[start:start + CHUNK_ROWS][:, columns])
+
+def divergent(codes):
+  """Rows whose present codes are not all equal."""
+  present = codes != MISSING
+  high = np.where(present, codes, np.iinfo(np.int32).min).max(axis=1)
+  low = np.where(present, codes, np.iinfo(np.int32).max).min(axis=1)
+  return present.any(axis=1) & (low < high)
+
+def pattern_keys(codes):
+  """
+  Disagreement pattern of each row: every tier is labelled by the first column with the same
+  code (len(columns) when missing), and the labels are packed in base len(columns) + 1.
+  """
+  rows, width = codes.shape
+  if width > MAX_PATTERN_TIERS:
+    raise ValueError(f"Patterns take at most {MAX_PATTERN_TIERS} tiers, got {width}")
+  keys = np.zeros(rows, dtype=np.int64)
+  for j in range(width):
+    label = np.full(rows, j, dtype=np.int64)
+    for k in range(j - 1, -1, -1):
+      label[codes[:, k] == codes[:, j]] = k
+    label[codes[:, j] == MISSING] = width
+    keys += label * (width + 1) ** j
+  return keys
+
+def describe_pattern(key, tiers):
+  """Groups of equal outcome of a pattern, the largest last, e.g. "wamr_aot | wamr_jit wasmtime ..."."""
+  width = len(tiers)
+  groups, missing = {}, []
+  for j, tier in enumerate(tiers):
+    label = key // (width + 1) ** j % (width + 1)
+    (missing if label == width else groups.setdefault(label, [])).append(tier)
+  text = " | ".join(" ".join(group) for group in sorted(groups.values(), key=lambda g: (len(g), tiers.index(g[0]))))
+  return text + (f"  (missing: {' '.join(missing)})" if missing else "")
+
+def count_patterns(matrix, columns, only_divergent=True):
+  """[(pattern key, rows, first row)], most frequent first."""
+  counts, first = {}, {}
+  for start, codes in matrix.chunks(columns):
+    rows = np.flatnonzero(divergent(codes)) if only_divergent else np.arange(len(codes))
+    keys, index, n = np.unique(pattern_keys(codes[rows]), return_index=True, return_counts=True)
+    for key, i, c in zip(keys.tolist(), index.tolist(), n.tolist()):
+      counts[key] = counts.get(key, 0) + c
+      first.setdefault(key, start + int(rows[i]))
+  return sorted(((key, c, first[key]) for key, c in counts.items()), key=lambda p: (-p[1], p[2]))
+
+def isolated(codes, isolate):
+  """Rows where the isolate columns each differ from the other columns, which all agree."""
+  rest = np.ones(codes.shape[1], dtype=bool)
+  rest[isolate] = False
+  others = codes[:, rest]
+  present = others != MISSING
+  consensus = np.where(present, others, np.iinfo(np.int32).max).min(axis=1)
+  agree = present.any(axis=1) & ~divergent(others)
+  for j in isolate:
+    agree &= (codes[:, j] != MISSING) & (codes[:, j] != consensus)
+  return agree
+
+def main():
+  parser = argparse.ArgumentParser(description="Testcase x tier outcome matrix of replay outputs")
+  commands = parser.add_subparsers(dest="command", required=True)
+
+  p = commands.add_parser("update", help="Add the outputs of replay output directories")
+  p.add_argument("matrix")
+  p.add_argument("output_dirs", nargs="+")
+  p.add_argument("--runtimes", default=os.environ.get("REPLAY_TIERS", "").replace(" ", ","),
+                 help="Comma-separated runtimes the outputs were replayed with, for their expected number "
+                      "of lines (default: $REPLAY_TIERS, else all)")
+  p.add_argument("--jobs", type=int, help="Worker processes for parsing")
+
+  p = commands.add_parser("patterns", help="Disagreement patterns, most frequent first")
+  p.add_argument("matrix")
+  p.add_argument("--tiers", help="Comma-separated tiers to compare (default: the execution tiers)")
+  p.add_argument("--top", type=int, default=20, help="Patterns to print (0: all)")
+  p.add_argument("--all", action="store_true", help="Include rows where all tiers agree")
+
+  p = commands.add_parser("rows", help="Output files matching a query")
+  p.add_argument("matrix")
+  p.add_argument("--tiers", help="Comma-separated tiers to compare (default: the execution tiers)")
+  query = p.add_mutually_exclusive_group(required=True)
+  query.add_argument("--pattern", type=lambda value: int(value, 0), help="Pattern ID (see patterns, with the same --tiers)")
+  query.add_argument("--isolate", nargs="+", metavar="TIER", help="Tiers that disagree with all others, which agree")
+  query.add_argument("--divergent", action="store_true", help="All divergent rows")
+  args = parser.parse_args()
+
+  matrix = OutcomeMatrix(args.matrix)
+  if args.command == "update":
+    for output_dir in args.output_dirs:
+      added = matrix.update(output_dir, args.jobs, [r for r in args.runtimes.split(",") if r])
+      print(f"{output_dir}: {added} new outputs", file=sys.stderr)
+    print(f"{matrix.rows} rows x {len(matrix.tiers)} tiers, {len(matrix.outcomes)} distinct outcomes", file=sys.stderr)
+    return
+
+  try:
+    columns = matrix.columns(args.tiers.split(",") if args.tiers else None)
+    if args.command == "rows" and args.isolate:
+      columns = sorted(set(columns) | set(matrix.columns(args.isolate)))
+  except ValueError as e:
+    parser.error(str(e))
+  tiers = [matrix.tiers[j] for j in columns]
+
+  if args.command == "patterns":
+    patterns = count_patterns(matrix, columns, not args.all)
+    total = sum(c for _, c, _ in patterns)
+    print(f"{total} of {matrix.rows} rows {'' if args.all else 'diverge '}in {len(patterns)} patterns", file=sys.stderr)
+    patterns = patterns[:args.top or None]
+    firsts = sorted({first for _, _, first in patterns})
+    examples = dict(zip(firsts, (name for _, name in matrix.testcases(firsts))))
+    print("id\trows\tshare\tpattern\texample")
+    for key, rows, first in patterns:
+      print(f"{key:#x}\t{rows}\t{rows / max(total, 1):.2%}\t{describe_pattern(key, tiers)}\t{examples[first]}")
+    return
+
+  selected = []
+  for start, codes in matrix.chunks(columns):
+    if args.divergent:
+      mask = divergent(codes)
+    elif args.pattern is not None:
+      mask = pattern_keys(codes) == args.pattern
+    else:
+      mask = isolated(codes, [tiers.index(tier) for tier in args.isolate])
+    selected.append(start + np.flatnonzero(mask))
+  rows = np.concatenate(selected).tolist() if selected else []
+  for directory, name in matrix.testcases(rows):
+    print(os.path.join(directory, name))
+
+if __name__ == "__main__":
+  main()
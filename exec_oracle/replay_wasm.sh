@@ -3,6 +3,16 @@
 # Set recursion limit equivalent
 ulimit -s unlimited
 
+# Timing spans (see pipeline/spans.py) are only recorded when SPANS_FILE names a trace file. Every
+# runtime call is timed, so the lines are appended here directly instead of through spans.py's CLI.
+# Usage: span_record <name> <start> <end> [<json args>]   (times as in $EPOCHREALTIME)
+span_record() {
+  local start=${2//[.,]/} end=${3//[.,]/}
+  printf '{"name":"%s","stack":"%s","ts":%s,"dur":%s,"pid":%s,"tid":%s,"proc":"replay_wasm.sh","args":{%s}}\n' \
+    "$1" "${SPANS_STACK:+$SPANS_STACK;}$1" "$start" "$((end - start))" $$ $$ "$4" >> "$SPANS_FILE"
+}
+export -f span_record
+
 normalize_one_number() {
     if [[ $1 =~ ^-?[0-9]+(\.[0-9]+)?([eE][+-]?[0-9]+)?$ || $1 =~ ^(0x) ]]; then
         # Print the scientific notation number
@@ -313,8 +323,10 @@ run_command() {
   # echo "Running: $cmd"
   
   local output
+  local start=$EPOCHREALTIME
   output=$(timeout -s SIGKILL --foreground 10 bash -c "$cmd" 2>&1)
   local exit_status=$?
+  local executed=$EPOCHREALTIME
 
   if [[ $exit_status -eq 124 ]]; then
     # Exit code 124 indicates the timeout was reached
@@ -338,10 +350,27 @@ run_command() {
 
   # echo "$output"
   processed_output=$(postprocess_common "$runtime" "$output")
+
+  if [[ -n "$SPANS_FILE" ]]; then
+    # wasmtimec, wamrc and wasmedgec are the ahead-of-time compilers
+    local phase="execute"
+    [[ "$runtime" == *c ]] && phase="compile"
+    local args="\"runtime\":\"$runtime\",\"status\":$exit_status"
+    span_record "$phase" "$start" "$executed" "$args"
+    span_record postprocess "$executed" "$EPOCHREALTIME" "$args"
+  fi
   echo "$exit_status:<>:$processed_output"
 }
 export -f run_command
 
+# REPLAY_TIERS (e.g. "wamr wasmedge") restricts a replay to the tiers of these runtimes. Such a
+# partial replay writes output/parts/<testcase>/<func>.<runtimes>.txt instead of the output
+# file, for exec_oracle/transplant_scheduler.py to merge once every runtime has run.
+replay_tier() {
+  [[ -z "$REPLAY_TIERS" || " $REPLAY_TIERS " == *" $1 "* ]]
+}
+export -f replay_tier
+
 wasm_exported_funcs() {
   wasm-objdump -x -- "$1" 2>/dev/null \
     | sed -n '/^Export\[/,/^[A-Za-z]\+\[/p' \
@@ -383,8 +412,18 @@ delegate() {
     # =======================================================================================================
     local -a exported_funcs
 
+    # Spans of this testcase nest under a "testcase" span of its own
+    local outer_stack="$SPANS_STACK"
+    local testcase_start=$EPOCHREALTIME
+    if [[ -n "$SPANS_FILE" ]]; then
+      export SPANS_STACK="${SPANS_STACK:+$SPANS_STACK;}testcase"
+    fi
+
     if [[ "$func_name" == "lookup" ]]; then
       mapfile -t exported_funcs < <(wasm_exported_funcs "$wasm_file")
+      if [[ -n "$SPANS_FILE" ]]; then
+        span_record discover "$testcase_start" "$EPOCHREALTIME" "\"exports\":${#exported_funcs[@]}"
+      fi
     else
       exported_funcs=("$func_name")
     fi
@@ -410,6 +449,10 @@ delegate() {
     # run only the exported functions that are have been filtered
     for fn in "${filtered[@]}"; do
       output_filename="$wasm_dir/output/${wasm_filename}__${fn}.txt"
+      if [[ -n "$REPLAY_TIERS" ]]; then
+        output_filename="$wasm_dir/output/parts/${wasm_filename}/${fn}.${REPLAY_TIERS// /+}.txt"
+        mkdir -p "${output_filename%/*}"
+      fi
       # echo "$output_filename"
 
       # =======================================================================================================
@@ -419,138 +462,189 @@ delegate() {
         return 0
       fi
 
+      # =======================================================================================================
+      # Private artifact directory and partial output file for this run, so concurrent replays of
+      # testcases sharing a name never overwrite each other's compiled artifacts or half-written outputs
+      # =======================================================================================================
+      artifact_dir=$(mktemp -d "$REPLAY_TMPDIR/${wasm_filename}__${fn}.XXXXXX")
+      partial_filename=$(mktemp "$wasm_dir/output/.${wasm_filename}__${fn}.XXXXXX")
+
       # =======================================================================================================
       # wasmtime
       # =======================================================================================================
-      wasmtime_cmd_trail=""
+      if replay_tier wasmtime; then
+        wasmtime_cmd_trail=""
 
-      if [[ "$fn" == "nofunc" ]]; then
-        wasmtime_cmd_trail="$wasm_file"
-      else
-        wasmtime_cmd_trail="--invoke $fn $wasm_file"
-      fi
-      wasmtime_output=$(run_command "wasmtime" "RUST_LOG="" wasmtime run -W all-proposals=y $wasmtime_cmd_trail")
-      echo "wasmtime:  $wasmtime_output" >> $output_filename
-
-      cwasm_file="$wasm_dir/tmpdir/$wasm_filename.cwasm"
-      wasmtime_compile_output=$(run_command "wasmtimec" "RUST_LOG="" wasmtime compile -W all-proposals=y -o $cwasm_file $wasm_file")
-      cwasm_output=""
-      if [[ "$wasmtime_compile_output" == *"Error"* ]]; then
-        cwasm_output="1:<>:"$(postprocess_wasmtime "$wasmtime_compile_output")
-      else
         if [[ "$fn" == "nofunc" ]]; then
-          wasmtime_cmd_trail="$cwasm_file"
+          wasmtime_cmd_trail="$wasm_file"
+        else
+          wasmtime_cmd_trail="--invoke $fn $wasm_file"
+        fi
+        wasmtime_output=$(run_command "wasmtime" "RUST_LOG="" wasmtime run -W all-proposals=y $wasmtime_cmd_trail")
+        echo "wasmtime:  $wasmtime_output" >> $partial_filename
+
+        cwasm_file="$artifact_dir/$wasm_filename.cwasm"
+        wasmtime_compile_output=$(run_command "wasmtimec" "RUST_LOG="" wasmtime compile -W all-proposals=y -o $cwasm_file $wasm_file")
+        cwasm_output=""
+        if [[ "$wasmtime_compile_output" == *"Error"* ]]; then
+          cwasm_output="1:<>:"$(postprocess_wasmtime "$wasmtime_compile_output")
         else
-          wasmtime_cmd_trail="--invoke $fn $cwasm_file"
+          if [[ "$fn" == "nofunc" ]]; then
+            wasmtime_cmd_trail="$cwasm_file"
+          else
+            wasmtime_cmd_trail="--invoke $fn $cwasm_file"
+          fi
+          cwasm_output=$(run_command "wasmtime" "RUST_LOG="" wasmtime run --allow-precompiled -W all-proposals=y $wasmtime_cmd_trail")
         fi
-        cwasm_output=$(run_command "wasmtime" "RUST_LOG="" wasmtime run --allow-precompiled -W all-proposals=y $wasmtime_cmd_trail")
+        echo "wasmtime_compiled: $cwasm_output" >> $partial_filename
       fi
-      echo "wasmtime_compiled: $cwasm_output" >> $output_filename
 
       # =======================================================================================================
       # wasmer
       # =======================================================================================================
-      wasmer_cmd_trail=""
+      if replay_tier wasmer; then
+        wasmer_cmd_trail=""
 
-      # singlepass does not support simd instructions as of version 6.0.0 (so skipping)
-      # wasmer_output=$(run_command "wasmer" "wasmer run --singlepass $wasm_file --invoke main")
-      # echo "wasmer output:    $wasmer_output" >> $output_filename
+        # singlepass does not support simd instructions as of version 6.0.0 (so skipping)
+        # wasmer_output=$(run_command "wasmer" "wasmer run --singlepass $wasm_file --invoke main")
+        # echo "wasmer output:    $wasmer_output" >> $partial_filename
 
-      if [[ "$fn" == "nofunc" ]]; then
-        wasmer_cmd_trail="$wasm_file"
-      else
-        wasmer_cmd_trail="$wasm_file --invoke $fn"
-      fi
-      wasmer_output=$(run_command "wasmer" "RUST_LOG="" wasmer run --enable-simd --enable-threads --enable-verifier --enable-reference-types --enable-multi-value --enable-bulk-memory --enable-relaxed-simd --enable-extended-const --cranelift $wasmer_cmd_trail")
-      echo "wasmer_cranelift:    $wasmer_output" >> $output_filename
+        if [[ "$fn" == "nofunc" ]]; then
+          wasmer_cmd_trail="$wasm_file"
+        else
+          wasmer_cmd_trail="$wasm_file --invoke $fn"
+        fi
+        wasmer_output=$(run_command "wasmer" "RUST_LOG="" wasmer run --enable-simd --enable-threads --enable-verifier --enable-reference-types --enable-multi-value --enable-bulk-memory --enable-relaxed-simd --enable-extended-const --cranelift $wasmer_cmd_trail")
+        echo "wasmer_cranelift:    $wasmer_output" >> $partial_filename
 
-      wasmer_output=$(run_command "wasmer" "RUST_LOG="" wasmer run --enable-simd --enable-threads --enable-verifier --enable-reference-types --enable-multi-value --enable-bulk-memory --enable-relaxed-simd --enable-extended-const --enable-exceptions --llvm $wasmer_cmd_trail")
-      echo "wasmer_llvm:    $wasmer_output" >> $output_filename
+        wasmer_output=$(run_command "wasmer" "RUST_LOG="" wasmer run --enable-simd --enable-threads --enable-verifier --enable-reference-types --enable-multi-value --enable-bulk-memory --enable-relaxed-simd --enable-extended-const --enable-exceptions --llvm $wasmer_cmd_trail")
+        echo "wasmer_llvm:    $wasmer_output" >> $partial_filename
+      fi
 
       # =======================================================================================================
       # wamr
       # =======================================================================================================
-      iwasm_cmd_trail=""
+      if replay_tier wamr; then
+        iwasm_cmd_trail=""
 
-      aot_file="$wasm_dir/tmpdir/$wasm_filename.aot"
-      wamrc_output=$(run_command "wamrc" "wamrc --xip --enable-builtin-intrinsics=all --enable-multi-thread --bounds-checks=1 -o $aot_file $wasm_file")
-      echo "wamr_compiler:     $wamrc_output" >> $output_filename
+        aot_file="$artifact_dir/$wasm_filename.aot"
+        wamrc_output=$(run_command "wamrc" "wamrc --xip --enable-builtin-intrinsics=all --enable-multi-thread --bounds-checks=1 -o $aot_file $wasm_file")
+        echo "wamr_compiler:     $wamrc_output" >> $partial_filename
 
-      wamr_output=""
-      if [[ "$wamrc_output" == *"compilation_failed"* ]]; then
-        wamr_output=$(run_command "wamr" "wamrc --xip --enable-builtin-intrinsics=all --enable-multi-thread --bounds-checks=1 -o $aot_file $wasm_file")
-      else
-        if [[ "$fn" == "nofunc" ]]; then
-          iwasm_cmd_trail="$aot_file"
+        wamr_output=""
+        if [[ "$wamrc_output" == *"compilation_failed"* ]]; then
+          wamr_output=$(run_command "wamr" "wamrc --xip --enable-builtin-intrinsics=all --enable-multi-thread --bounds-checks=1 -o $aot_file $wasm_file")
         else
-          iwasm_cmd_trail="-f $fn $aot_file"
+          if [[ "$fn" == "nofunc" ]]; then
+            iwasm_cmd_trail="$aot_file"
+          else
+            iwasm_cmd_trail="-f $fn $aot_file"
+          fi
+          wamr_output=$(run_command "wamr" "iwasm --heap-size=0 $iwasm_cmd_trail")
         fi
-        wamr_output=$(run_command "wamr" "iwasm --heap-size=0 $iwasm_cmd_trail")
-      fi
-      echo "wamr_aot:      $wamr_output" >> $output_filename
+        echo "wamr_aot:      $wamr_output" >> $partial_filename
 
-      if [[ "$fn" == "nofunc" ]]; then
-        iwasm_cmd_trail="$wasm_file"
-      else
-        iwasm_cmd_trail="-f $fn $wasm_file"
+        if [[ "$fn" == "nofunc" ]]; then
+          iwasm_cmd_trail="$wasm_file"
+        else
+          iwasm_cmd_trail="-f $fn $wasm_file"
+        fi
+        wamr_output=$(run_command "wamr" "iwasm --heap-size=0 --llvm-jit $iwasm_cmd_trail")
+        echo "wamr_jit:      $wamr_output" >> $partial_filename
       fi
-      wamr_output=$(run_command "wamr" "iwasm --heap-size=0 --llvm-jit $iwasm_cmd_trail")
-      echo "wamr_jit:      $wamr_output" >> $output_filename
 
       # =======================================================================================================
       # wasmedge
       # =======================================================================================================
-      wasmedge_cmd_trail=""
-
-      if [[ "$fn" == "nofunc" ]]; then
-        wasmedge_cmd_trail="$wasm_file"
-      else
-        wasmedge_cmd_trail="run $wasm_file $fn"
-      fi
-      wasmedge_output=$(run_command "wasmedge" "wasmedge --enable-all --enable-jit $wasmedge_cmd_trail")
-      if [[ "$wamr_output" == *"stack_overflow"* && "$wasmedge_output" == *"timeout"* ]]; then
-        wasmedge_output="stack_overflow"
-      fi
-      echo "wasmedge_jit:  $wasmedge_output" >> $output_filename
+      if replay_tier wasmedge; then
+        wasmedge_cmd_trail=""
 
-      wasmedgei_output=$(run_command "wasmedge" "wasmedge --enable-all --force-interpreter $wasmedge_cmd_trail")
-      if [[ "$wamr_output" == *"stack_overflow"* && "$wasmedgei_output" == *"timeout"* ]]; then
-        wasmedgei_output="stack_overflow"
-      fi
-      echo "wasmedge_interp: $wasmedgei_output" >> $output_filename
-
-      so_file="$wasm_dir/tmpdir/$wasm_filename.so"
-      wasmedge_compile_output=$(run_command "wasmedgec" "wasmedge compile --enable-all $wasm_file $so_file")
-      wasmedgec_output=""
-      if [[ "$wasmedge_compile_output" == *"Error"* || "$wasmedge_compile_output" == *"error"* ]]; then
-        wasmedgec_output="1:<>:"$(postprocess_wasmedge "$wasmedge_compile_output")
-      else
         if [[ "$fn" == "nofunc" ]]; then
-          wasmedge_cmd_trail="$so_file"
+          wasmedge_cmd_trail="$wasm_file"
         else
-          wasmedge_cmd_trail="run $so_file $fn"
+          wasmedge_cmd_trail="run $wasm_file $fn"
         fi
-        wasmedgec_output=$(run_command "wasmedge" "wasmedge --enable-all $wasmedge_cmd_trail")
-      fi
-      if [[ "$wamr_output" == *"stack_overflow"* && "$wasmedgec_output" == *"timeout"* ]]; then
-        wasmedgec_output="stack_overflow"
+        wasmedge_output=$(run_command "wasmedge" "wasmedge --enable-all --enable-jit $wasmedge_cmd_trail")
+        if [[ "$wamr_output" == *"stack_overflow"* && "$wasmedge_output" == *"timeout"* ]]; then
+          wasmedge_output="stack_overflow"
+        fi
+        echo "wasmedge_jit:  $wasmedge_output" >> $partial_filename
+
+        wasmedgei_output=$(run_command "wasmedge" "wasmedge --enable-all --force-interpreter $wasmedge_cmd_trail")
+        if [[ "$wamr_output" == *"stack_overflow"* && "$wasmedgei_output" == *"timeout"* ]]; then
+          wasmedgei_output="stack_overflow"
+        fi
+        echo "wasmedge_interp: $wasmedgei_output" >> $partial_filename
+
+        so_file="$artifact_dir/$wasm_filename.so"
+        wasmedge_compile_output=$(run_command "wasmedgec" "wasmedge compile --enable-all $wasm_file $so_file")
+        wasmedgec_output=""
+        if [[ "$wasmedge_compile_output" == *"Error"* || "$wasmedge_compile_output" == *"error"* ]]; then
+          wasmedgec_output="1:<>:"$(postprocess_wasmedge "$wasmedge_compile_output")
+        else
+          if [[ "$fn" == "nofunc" ]]; then
+            wasmedge_cmd_trail="$so_file"
+          else
+            wasmedge_cmd_trail="run $so_file $fn"
+          fi
+          wasmedgec_output=$(run_command "wasmedge" "wasmedge --enable-all $wasmedge_cmd_trail")
+        fi
+        if [[ "$wamr_output" == *"stack_overflow"* && "$wasmedgec_output" == *"timeout"* ]]; then
+          wasmedgec_output="stack_overflow"
+        fi
+        echo "wasmedge_compiled: $wasmedgec_output" >> $partial_filename
       fi
-      echo "wasmedge_compiled: $wasmedgec_output" >> $output_filename
+
+      # Hand the complete output over atomically
+      mv -f "$partial_filename" "$output_filename"
+      rm -rf "$artifact_dir"
     done
+
+    if [[ -n "$SPANS_FILE" ]]; then
+      export SPANS_STACK="$outer_stack"
+      span_record testcase "$testcase_start" "$EPOCHREALTIME" "\"testcase\":\"$wasm_filename\""
+    fi
   fi
 
   sleep 2
 }
 export -f delegate
 
+# Replay one member of a corpus pack, staged in its own directory of the private tmpdir by
+# `corpus_pack.py stage`, like a testcase of $wasm_dir, and drop the copy again (the pack is
+# never unpacked as a whole)
+delegate_packed() {
+  wasm_dir="$1"
+  func_name="$2"
+  member_file="$3"
+
+  delegate "$wasm_dir" "$func_name" "$member_file"
+  rm -rf "$(dirname "$member_file")"
+}
+export -f delegate_packed
+
 # =========================================================================================================
 
 # Main script logic
 func_name=$1
 wasm_dir=$2
+# Optional: replay only this testcase (its outputs still go to $wasm_dir/output)
+testcase_file=$3
+
+# A corpus pack (see collection/corpus_pack.py) can be replayed directly: outputs go to
+# <pack without .pack>/output, and REPLAY_PACK_FILTER (e.g. "--runtime wamr --max-age 24")
+# selects the members to replay
+pack_file=""
+if [[ -f "$wasm_dir" && "$wasm_dir" == *.pack ]]; then
+  pack_file=$(realpath "$wasm_dir")
+  wasm_dir="${pack_file%.pack}"
+  mkdir -p "$wasm_dir"
+  export CORPUS_PACK="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/../collection/corpus_pack.py"
+fi
 
 # rm -rf $wasm_dir/tmpdir 2>/dev/null
-mkdir -p "$wasm_dir/tmpdir" 2>/dev/null
+export REPLAY_TMPDIR="${REPLAY_TMPDIR:-$wasm_dir/tmpdir}"
+mkdir -p "$REPLAY_TMPDIR" 2>/dev/null
 
 # rm -rf "$wasm_dir/output" 2>/dev/null
 mkdir -p "$wasm_dir/output" 2>/dev/null
@@ -559,7 +653,15 @@ mkdir -p "$wasm_dir/output" 2>/dev/null
 
 echo "Executing testcases. This might take a while."
 
-find "$wasm_dir" -type f -name "*.wasm" | parallel -j 720 delegate "$wasm_dir" "$func_name" {}
+if [[ -n "$testcase_file" ]]; then
+  delegate "$wasm_dir" "$func_name" "$testcase_file"
+elif [[ -n "$pack_file" ]]; then
+  # One process reads the pack and stages the members as parallel consumes them; parallel
+  # reads ahead of the jobs it runs, so staging is bounded to twice the jobs explicitly
+  python3 "$CORPUS_PACK" stage "$pack_file" "$REPLAY_TMPDIR" --max-staged 1440 $REPLAY_PACK_FILTER | parallel -j 720 delegate_packed "$wasm_dir" "$func_name" {}
+else
+  find "$wasm_dir" -type f -name "*.wasm" | parallel -j 720 delegate "$wasm_dir" "$func_name" {}
+fi
 
 wait
 exit 0
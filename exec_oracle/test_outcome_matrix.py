@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from oracle_results import TIERS
+from outcome_matrix import OutcomeMatrix, count_patterns
+
+DEDUP_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dedup_output.py")
+
+def test_update_after_dedup_adds_no_rows(tmp_path):
+  output_dir = tmp_path / "output"
+  output_dir.mkdir()
+  for i in range(6):
+    with open(output_dir / f"seed_wamr_{i}_t__main.txt", "w") as f:
+      for tier in TIERS:
+        f.write(f"{tier}: 0:<>:{i % 3 if tier.startswith('wasmer') else 'ok'}\n")
+  matrix = OutcomeMatrix(str(tmp_path / "matrix"))
+  assert matrix.update(str(output_dir)) == 6
+  outcomes = list(matrix.outcomes)
+  patterns = count_patterns(matrix, matrix.columns())
+
+  subprocess.run([sys.executable, DEDUP_OUTPUT, str(output_dir)], check=True, capture_output=True)
+  assert matrix.update(str(output_dir)) == 0
+  assert matrix.rows == 6
+  assert matrix.outcomes == outcomes
+  assert count_patterns(matrix, matrix.columns()) == patterns
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from oracle_results import TIERS
+from transplant_matrix import TransplantMatrix
+
+DEDUP_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dedup_output.py")
+
+def write_outputs(output_dir, count):
+  """count outputs of wamr seeds on which the wasmer tiers disagree with all others."""
+  os.makedirs(output_dir)
+  for i in range(count):
+    with open(os.path.join(output_dir, f"seed_wamr_{i}_t__main.txt"), "w") as f:
+      for tier in TIERS:
+        f.write(f"{tier}: 0:<>:{i + 1 if tier.startswith('wasmer') else 0}\n")
+
+def test_update_after_dedup_counts_nothing_twice(tmp_path):
+  output_dir = str(tmp_path / "output")
+  write_outputs(output_dir, 3)
+  matrix = TransplantMatrix()
+  assert matrix.update(output_dir) == 3
+  counts = matrix.counts.copy()
+  assert counts[matrix.origins.index("wamr"), matrix.targets.index("wasmer")] == 3
+
+  subprocess.run([sys.executable, DEDUP_OUTPUT, output_dir], check=True, capture_output=True)
+  assert os.listdir(os.path.join(output_dir, "deduped"))
+  assert matrix.update(output_dir) == 0
+  assert (matrix.counts == counts).all()
+  assert matrix.tested() == {"wamr": 3}
+
+def test_state_round_trip_keeps_keys(tmp_path):
+  output_dir = str(tmp_path / "output")
+  write_outputs(output_dir, 2)
+  state = str(tmp_path / "state.json")
+  matrix = TransplantMatrix()
+  matrix.update(output_dir)
+  matrix.save(state)
+  subprocess.run([sys.executable, DEDUP_OUTPUT, output_dir], check=True, capture_output=True)
+  matrix = TransplantMatrix.load(state)
+  assert matrix.update(output_dir) == 0
+  assert matrix.tested() == {"wamr": 2}
@@ -0,0 +1,159 @@
+#!/usr/bin/python3
+"""
+Transplantation matrix: how many testcases derived from a runtime's seeds (origin, from the
+seed name) diverge on another runtime or tier (target), counted from replay_wasm.sh outputs.
+
+Targets are the runtimes (level "runtime") or the tiers (level "tier", e.g. wasmer_llvm vs
+wasmer_cranelift) that disagree with a testcase's majority outcome. Origins and targets are
+whatever occurs in the outputs, so new runtimes and tiers need no code changes.
+
+The matrix is kept in a state file together with the output files already counted; updating
+it only parses outputs that landed since, and adds them with one bincount.
+
+Usage:
+  python transplant_matrix.py <state.json> [<output_dir> ...] [--level runtime|tier] [--runtimes R1,R2,...] [--jobs N]
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+
+import numpy as np
+
+from oracle_results import (complete_lines, divergent_tiers, output_files, output_key, parse_files,
+                            runtime_order, seed_runtime, testcase_name, tier_runtime)
+
+class TransplantMatrix:
+  """Counts per (origin runtime, target runtime or tier); counts[i, j] for origins[i], targets[j]."""
+
+  def __init__(self, level="runtime"):
+    if level not in ("runtime", "tier"):
+      raise ValueError(f"Unknown level {level!r}")
+    self.level = level
+    self.origins = []
+    self.targets = []
+    self.counts = np.zeros((0, 0), dtype=np.int64)
+    self.seen = {}      # output directory -> outputs counted (output_key: raw and deduped copies are one)
+
+  @classmethod
+  def load(cls, path, level="runtime"):
+    if not os.path.exists(path):
+      return cls(level)
+    with open(path) as f:
+      state = json.load(f)
+    matrix = cls(state["level"])
+    matrix.origins = state["origins"]
+    matrix.targets = state["targets"]
+    matrix.counts = np.array(state["counts"], dtype=np.int64).reshape(len(matrix.origins), len(matrix.targets))
+    matrix.seen = {directory: set(map(output_key, names)) for directory, names in state["seen"].items()}
+    return matrix
+
+  def save(self, path):
+    state = {"level": self.level, "origins": self.origins, "targets": self.targets,
+             "counts": self.counts.tolist(), "seen": {d: sorted(names) for d, names in self.seen.items()}}
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+      json.dump(state, f)
+    os.replace(tmp, path)
+
+  def indices(self, labels, axis):
+    """Index of each label along axis (0: origins, 1: targets), growing the matrix for new labels."""
+    names = self.origins if axis == 0 else self.targets
+    position = {name: i for i, name in enumerate(names)}
+    for label in labels:
+      if label not in position:
+        position[label] = len(names)
+        names.append(label)
+    grow = len(names) - self.counts.shape[axis]
+    if grow:
+      pad = [(0, grow), (0, 0)] if axis == 0 else [(0, 0), (0, grow)]
+      self.counts = np.pad(self.counts, pad)
+    return np.fromiter((position[label] for label in labels), dtype=np.int64, count=len(labels))
+
+  def add(self, origins, targets):
+    """Adds one count per (origin, target) pair."""
+    if not origins:
+      return
+    rows = self.indices(origins, 0)
+    cols = self.indices(targets, 1)
+    shape = self.counts.shape
+    self.counts += np.bincount(rows * shape[1] + cols, minlength=shape[0] * shape[1]).reshape(shape)
+
+  def pairs(self, results):
+    """(origin, target) pairs of parsed results, one per divergent target of each testcase."""
+    origins, targets = [], []
+    for file_name, outcomes in results:
+      origin = seed_runtime(testcase_name(file_name))
+      if origin is None:
+        continue
+      tiers = divergent_tiers(outcomes)
+      for target in (tiers if self.level == "tier" else dict.fromkeys(map(tier_runtime, tiers))):
+        origins.append(origin)
+        targets.append(target)
+    return origins, targets
+
+  def update(self, output_dir, jobs=None, runtimes=None):
+    """
+    Counts the complete outputs of output_dir not counted before, for a replay of runtimes
+    (default: all); returns how many were new. Incomplete outputs are left for a later update.
+    """
+    key = os.path.abspath(output_dir)
+    seen = self.seen.setdefault(key, set())
+    new = [path for path in output_files(output_dir) if output_key(os.path.basename(path)) not in seen]
+    if not new:
+      return 0
+    counted = []
+
+    def results():
+      for file_name, outcomes in parse_files(new, jobs, complete_lines(runtimes)):
+        counted.append(output_key(file_name))
+        yield file_name, outcomes
+
+    self.add(*self.pairs(results()))
+    seen.update(counted)
+    return len(counted)
+
+  def tested(self):
+    """Output files counted per origin runtime (what the counts of its row are out of)."""
+    origins = Counter(seed_runtime(testcase_name(name)) for names in self.seen.values() for name in names)
+    origins.pop(None, None)
+    return origins
+
+  def ordered(self):
+    """(origins, targets, counts) with runtimes in the usual order and tiers grouped by runtime."""
+    origins = runtime_order(self.origins)
+    runtimes = runtime_order({tier_runtime(t) for t in self.targets})
+    targets = sorted(self.targets, key=lambda t: (runtimes.index(tier_runtime(t)), t))
+    rows = [self.origins.index(o) for o in origins]
+    cols = [self.targets.index(t) for t in targets]
+    return origins, targets, self.counts[np.ix_(rows, cols)]
+
+def main():
+  parser = argparse.ArgumentParser(description="Origin x target transplantation matrix from replay outputs")
+  parser.add_argument("state", help="State file (created when missing)")
+  parser.add_argument("output_dirs", nargs="*", help="replay_wasm.sh output directories to add")
+  parser.add_argument("--level", choices=["runtime", "tier"],
+                      help="Target granularity of a new state file (default: runtime)")
+  parser.add_argument("--runtimes", default=os.environ.get("REPLAY_TIERS", "").replace(" ", ","),
+                      help="Comma-separated runtimes the outputs were replayed with, for their expected number "
+                           "of lines (default: $REPLAY_TIERS, else all)")
+  parser.add_argument("--jobs", type=int, help="Worker processes for parsing")
+  args = parser.parse_args()
+  runtimes = [runtime for runtime in args.runtimes.split(",") if runtime]
+
+  matrix = TransplantMatrix.load(args.state, args.level or "runtime")
+  if args.level and matrix.level != args.level:
+    print(f"Note: {args.state} counts per {matrix.level}, ignoring --level {args.level}", file=sys.stderr)
+  for output_dir in args.output_dirs:
+    added = matrix.update(output_dir, args.jobs, runtimes)
+    print(f"{output_dir}: {added} new outputs", file=sys.stderr)
+  matrix.save(args.state)
+
+  origins, targets, counts = matrix.ordered()
+  print("origin\t" + "\t".join(targets))
+  for origin, row in zip(origins, counts):
+    print(origin + "\t" + "\t".join("-" if tier_runtime(t) == origin else str(c) for t, c in zip(targets, row)))
+
+if __name__ == "__main__":
+  main()
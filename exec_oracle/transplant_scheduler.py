@@ -0,0 +1,348 @@
+#!/usr/bin/python3
+"""
+Transplantation scheduler: replays a corpus one (seed, target runtime) pair at a time, most
+promising pairs first, so divergences turn up early while every pair still gets replayed.
+
+A pair is the tiers of one runtime run on one seed (replay_wasm.sh with REPLAY_TIERS set). It
+counts as divergent when a tier of its runtime disagrees with the majority outcome of all the
+seed's tiers replayed so far; a seed's earlier pairs are relabelled as its later ones arrive.
+
+The chance that a pair diverges is estimated per target runtime from the rate of its features,
+combined like naive Bayes (log odds relative to the target's overall rate are added up):
+  - the seed's origin runtime (get_age.parse_seed), starting from the divergences per origin and
+    target counted by transplant_matrix.py (--history),
+  - the age of the seed's issue, in 12-month buckets (from collected issues, --issues),
+  - module features: its size class and the sections it has.
+Each rate is pulled towards the target's overall rate by PRIOR_WEIGHT pseudo-trials, so features
+without data do not move a score. Pairs run in order of estimated chance per second of replay
+(mean replay time of the target so far) and the estimates are updated as each pair finishes.
+Pairs with the same features score the same, so pairs are queued per feature class and only
+the classes are rescored.
+
+Once all runtimes ran on a seed, its partial outputs are merged into the usual output files
+(<corpus>/output/<testcase>__<func>.txt), so dedup_output.py, oracle_results.py and
+transplant_matrix.py work on them as on a full replay; --history is updated with them at the
+end. Replayed seeds and runtimes are skipped when the scheduler is run again.
+
+Every finished pair is appended to the log (default <corpus>/output/schedule.jsonl);
+--order filesystem replays pairs in the order replay_wasm.sh would, as a baseline for the
+time to the first divergence.
+
+Usage:
+  python transplant_scheduler.py <corpus_dir> [--func lookup] [--history transplant.json] [--issues DIR ...]
+                                 [--jobs N] [--order priority|filesystem] [--log schedule.jsonl]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from oracle_results import RUNTIMES, divergent_tiers, parse_output, tier_runtime
+from transplant_matrix import TransplantMatrix
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "collection"))
+sys.path.insert(0, os.path.join(HERE, "..", "reduce"))
+from corpus_pack import seed_ages
+from get_age import bucket_months, parse_seed
+from wasm_module import DecodeError, Reader
+
+REPLAY = os.path.join(HERE, "replay_wasm.sh")
+# Pseudo-trials pulling the divergence rate of a feature towards its target's overall rate
+PRIOR_WEIGHT = 10
+# replay_wasm.sh reports a wasmedge timeout as a stack overflow when wamr_jit overflowed the stack
+WASMEDGE_TIMEOUT = re.compile(r"^(wasmedge_[a-z]+:\s*)\S*timeout.*$")
+
+def module_features(path):
+  """Size class (in powers of two of KiB) and the non-custom sections of a module."""
+  with open(path, "rb") as f:
+    data = f.read()
+  features = [f"size:{max(0, len(data).bit_length() - 10)}"]
+  try:
+    r = Reader(data, 8)
+    while not r.eof():
+      sid = r.byte()
+      r.pos += r.u()
+      if sid:
+        features.append(f"section:{sid}")
+  except DecodeError:
+    features.append("malformed")
+  return sorted(set(features))
+
+def find_seeds(corpus_dir):
+  """Testcases of a corpus in the order replay_wasm.sh finds them (skipping its own directories)."""
+  seeds = []
+  for root, dirs, files in os.walk(corpus_dir):
+    dirs[:] = [d for d in dirs if d not in ("output", "tmpdir")]
+    seeds.extend(os.path.join(root, f) for f in files if f.endswith(".wasm"))
+  return seeds
+
+def testcase_stem(path):
+  return os.path.basename(path).replace(".wasm", "", 1)
+
+# ----------- partial outputs -----------
+
+def parts_dir(output_dir, stem):
+  return os.path.join(output_dir, "parts", stem)
+
+def fix_wasmedge_timeouts(lines):
+  """What replay_wasm.sh does when wamr and wasmedge run together (see WASMEDGE_TIMEOUT)."""
+  if not any(line.startswith("wamr_jit:") and "stack_overflow" in line for line in lines):
+    return lines
+  return [WASMEDGE_TIMEOUT.sub(r"\1stack_overflow", line.rstrip("\n")) + "\n" for line in lines]
+
+def read_parts(output_dir, stem, runtimes):
+  """{func: output lines} of a testcase from the partial outputs of the given runtimes, in RUNTIMES order."""
+  directory = parts_dir(output_dir, stem)
+  if not os.path.isdir(directory):
+    return {}
+  funcs = sorted({name[:-len(".txt")].rsplit(".", 1)[0] for name in os.listdir(directory) if name.endswith(".txt")})
+  outputs = {}
+  for func in funcs:
+    lines = []
+    for runtime in RUNTIMES:
+      path = os.path.join(directory, f"{func}.{runtime}.txt")
+      if runtime in runtimes and os.path.exists(path):
+        with open(path, encoding="ISO-8859-1") as f:
+          lines.extend(f.readlines())
+    outputs[func] = fix_wasmedge_timeouts(lines)
+  return outputs
+
+def divergent_runtimes(output_dir, stem, runtimes):
+  """Runtimes with a tier that disagrees with the majority of the testcase's replayed tiers."""
+  divergent = set()
+  for lines in read_parts(output_dir, stem, runtimes).values():
+    divergent.update(tier_runtime(tier) for tier in divergent_tiers(parse_output(lines)))
+  return divergent
+
+def merge_parts(output_dir, stem):
+  """Writes the output files of a testcase from the partial outputs of all runtimes."""
+  for func, lines in read_parts(output_dir, stem, RUNTIMES).items():
+    path = os.path.join(output_dir, f"{stem}__{func}.txt")
+    tmp = os.path.join(output_dir, f".{stem}__{func}.{os.getpid()}")
+    with open(tmp, "w", encoding="ISO-8859-1") as f:
+      f.writelines(lines)
+    os.replace(tmp, path)
+  shutil.rmtree(parts_dir(output_dir, stem), ignore_errors=True)
+
+def done_runtimes(output_dir, stem):
+  directory = parts_dir(output_dir, stem)
+  if not os.path.isdir(directory):
+    return set()
+  return {name[:-len(".txt")].rsplit(".", 1)[1] for name in os.listdir(directory) if name.endswith(".txt")}
+
+# ----------- model -----------
+
+class DivergenceModel:
+  """
+  Divergence counts per feature key (a feature of a pair and its target runtime) and per target,
+  and the priority of pair classes: pairs with the same target and feature keys.
+  """
+
+  def __init__(self):
+    self.key_index = {}
+    self.hits = np.zeros(0)
+    self.trials = np.zeros(0)
+    self.target_hits = np.zeros(len(RUNTIMES))
+    self.target_trials = np.zeros(len(RUNTIMES))
+    self.target_seconds = np.zeros(len(RUNTIMES))
+    self.target_timed = np.zeros(len(RUNTIMES))
+
+  def keys(self, features, target):
+    """Key indices of a pair's features, adding new keys."""
+    indices = []
+    for feature in features:
+      key = (feature, target)
+      if key not in self.key_index:
+        self.key_index[key] = len(self.key_index)
+      indices.append(self.key_index[key])
+    grow = len(self.key_index) - len(self.hits)
+    if grow:
+      self.hits = np.concatenate([self.hits, np.zeros(grow)])
+      self.trials = np.concatenate([self.trials, np.zeros(grow)])
+    return indices
+
+  def add_history(self, matrix):
+    """Starts the origin rates from a transplantation matrix (per tier: the most divergent tier)."""
+    tested = matrix.tested()
+    for i, origin in enumerate(matrix.origins):
+      for t, target in enumerate(RUNTIMES):
+        columns = [j for j, name in enumerate(matrix.targets) if tier_runtime(name) == target]
+        hits = min(max((matrix.counts[i, j] for j in columns), default=0), tested[origin])
+        [key] = self.keys([f"origin:{origin}"], target)
+        self.hits[key] += hits
+        self.trials[key] += tested[origin]
+        self.target_hits[t] += hits
+        self.target_trials[t] += tested[origin]
+
+  def observe(self, keys, target, diverged, seconds=None):
+    self.trials[keys] += 1
+    self.hits[keys] += diverged
+    self.target_trials[target] += 1
+    self.target_hits[target] += diverged
+    if seconds is not None:
+      self.target_seconds[target] += seconds
+      self.target_timed[target] += 1
+
+  def relabel(self, keys, target, delta):
+    self.hits[keys] += delta
+    self.target_hits[target] += delta
+
+  def priorities(self, class_keys, class_target):
+    """Estimated divergences per second of replay of each class (class_keys padded with -1)."""
+    base = (self.target_hits + 1) / (self.target_trials + 2)
+    seconds = np.where(self.target_timed > 0, self.target_seconds / np.maximum(self.target_timed, 1), 1.0)
+    b = base[class_target][:, None]
+    rate = (self.hits[class_keys] + PRIOR_WEIGHT * b) / (self.trials[class_keys] + PRIOR_WEIGHT)
+    log_odds = np.log(b / (1 - b))
+    log_odds = log_odds[:, 0] + np.where(class_keys >= 0, np.log(rate / (1 - rate)) - log_odds, 0).sum(axis=1)
+    return 1 / (1 + np.exp(-log_odds)) / seconds[class_target]
+
+# ----------- scheduling -----------
+
+def replay(corpus_dir, func, seed, runtime):
+  env = dict(os.environ, REPLAY_TIERS=runtime)
+  subprocess.run(["bash", REPLAY, func, corpus_dir, seed], env=env,
+                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+
+def main():
+  parser = argparse.ArgumentParser(description="Replay (seed, target runtime) pairs most promising first")
+  parser.add_argument("corpus_dir", help="Directory of .wasm testcases, as given to replay_wasm.sh")
+  parser.add_argument("--func", default="lookup", help="Function to invoke, as for replay_wasm.sh (default: lookup)")
+  parser.add_argument("--history", help="transplant_matrix.py state file to start from (updated at the end)")
+  parser.add_argument("--issues", nargs="*", default=[], help="Issue directories to take seed ages from")
+  parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Pairs replayed at a time")
+  parser.add_argument("--order", choices=["priority", "filesystem"], default="priority",
+                      help="Pair order (filesystem: as replay_wasm.sh, for comparison)")
+  parser.add_argument("--log", help="Log of finished pairs (default: <corpus_dir>/output/schedule.jsonl)")
+  args = parser.parse_args()
+
+  corpus_dir = args.corpus_dir.rstrip("/")
+  output_dir = os.path.join(corpus_dir, "output")
+  os.makedirs(output_dir, exist_ok=True)
+  with os.scandir(output_dir) as entries:
+    replayed = {entry.name.rsplit("__", 1)[0] for entry in entries if entry.name.endswith(".txt") and "__" in entry.name}
+  seeds = [seed for seed in find_seeds(corpus_dir) if testcase_stem(seed) not in replayed]
+  stems = [testcase_stem(seed) for seed in seeds]
+  ages = seed_ages([os.path.basename(seed) for seed in seeds], args.issues)
+
+  model = DivergenceModel()
+  if args.history and os.path.exists(args.history):
+    matrix = TransplantMatrix.load(args.history)
+    model.add_history(matrix)
+
+  # Pairs (seed index, target index), queued per class of equal target and feature keys
+  class_index, class_keys, class_target, queues = {}, [], [], []
+  pair_keys = {}
+  done = [set() for _ in seeds]
+  labels = {}
+  for s, seed in enumerate(seeds):
+    origin = parse_seed(os.path.basename(seed))[0] or "unknown"
+    months = ages.get(os.path.basename(seed))
+    features = [f"origin:{origin}", f"age:{bucket_months(months) if months is not None else 'unknown'}"]
+    features += module_features(seed)
+    done[s] = done_runtimes(output_dir, stems[s]) & set(RUNTIMES)
+    for t, target in enumerate(RUNTIMES):
+      keys = model.keys(features, target)
+      pair_keys[s, t] = keys
+      if target in done[s]:
+        continue
+      key = (t, tuple(keys))
+      if key not in class_index:
+        class_index[key] = len(queues)
+        class_keys.append(keys)
+        class_target.append(t)
+        queues.append(deque())
+      queues[class_index[key]].append((s, t))
+  width = max((len(k) for k in class_keys), default=0)
+  class_keys = np.array([k + [-1] * (width - len(k)) for k in class_keys], dtype=np.int64).reshape(len(queues), width)
+  class_target = np.array(class_target, dtype=np.int64)
+  filesystem_order = deque(sorted(pair for queue in queues for pair in queue))
+
+  def update_labels(s):
+    """Relabels the finished pairs of a seed; returns whether the newest label diverged."""
+    divergent = divergent_runtimes(output_dir, stems[s], done[s])
+    for target in done[s]:
+      t = RUNTIMES.index(target)
+      label = target in divergent
+      if (s, t) in labels and labels[s, t] != label:
+        model.relabel(pair_keys[s, t], t, 1 if label else -1)
+      labels[s, t] = label
+    return divergent
+
+  # Pairs replayed by an earlier run count as observed
+  for s in range(len(seeds)):
+    for target in done[s]:
+      t = RUNTIMES.index(target)
+      model.observe(pair_keys[s, t], t, False)
+      labels[s, t] = False
+    if done[s]:
+      update_labels(s)
+
+  def next_pair():
+    if args.order == "filesystem":
+      s, t = filesystem_order.popleft()
+      return s, t, None
+    priority = model.priorities(class_keys, class_target)
+    priority[[i for i, queue in enumerate(queues) if not queue]] = -np.inf
+    best = int(np.argmax(priority))
+    s, t = queues[best].popleft()
+    return s, t, float(priority[best])
+
+  remaining = sum(len(queue) for queue in queues)
+  print(f"{remaining} pairs of {len(seeds)} seeds in {len(queues)} classes", file=sys.stderr)
+  log = open(args.log or os.path.join(output_dir, "schedule.jsonl"), "a")
+  began = time.monotonic()
+  first_divergence = None
+  running = {}
+  rank = 0
+  with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+    while remaining or running:
+      while remaining and len(running) < args.jobs:
+        s, t, priority = next_pair()
+        remaining -= 1
+        future = pool.submit(replay, corpus_dir, args.func, seeds[s], RUNTIMES[t])
+        running[future] = (s, t, priority, rank, time.monotonic())
+        rank += 1
+      finished, _ = wait(running, return_when=FIRST_COMPLETED)
+      for future in finished:
+        s, t, priority, pair_rank, start = running.pop(future)
+        future.result()
+        seconds = time.monotonic() - start
+        done[s].add(RUNTIMES[t])
+        labels[s, t] = False
+        model.observe(pair_keys[s, t], t, False, seconds)
+        diverged = RUNTIMES[t] in update_labels(s)
+        if diverged and first_divergence is None:
+          first_divergence = (time.monotonic() - began, pair_rank)
+        if len(done[s]) == len(RUNTIMES):
+          merge_parts(output_dir, stems[s])
+        log.write(json.dumps({"seed": stems[s], "target": RUNTIMES[t], "rank": pair_rank, "priority": priority,
+                              "elapsed": round(time.monotonic() - began, 3), "seconds": round(seconds, 3),
+                              "diverged": diverged}) + "\n")
+        log.flush()
+  log.close()
+  try:
+    os.rmdir(os.path.join(output_dir, "parts"))
+  except OSError:
+    pass  # seeds with runtimes still to replay
+
+  divergent = sum(labels.values())
+  print(f"Replayed {rank} pairs in {time.monotonic() - began:.1f}s; {divergent} divergent pairs", file=sys.stderr)
+  if first_divergence:
+    print(f"First divergence after {first_divergence[0]:.1f}s (pair #{first_divergence[1] + 1})", file=sys.stderr)
+  if args.history:
+    matrix = TransplantMatrix.load(args.history)
+    print(f"{args.history}: {matrix.update(output_dir)} new outputs", file=sys.stderr)
+    matrix.save(args.history)
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Feature matrix of seed corpora (rtbench, specbench, wasmbench, llvmbench, ...).
+
+Every module is decoded once (reduce/wasm_module.py) into one row of FEATURES: module and
+section sizes, index-space counts, a histogram of opcode classes, proposal usage flags
+(SIMD, threads, GC, reference types, ...) and control nesting statistics. Rows are cached
+per module sha256, so a corpus is only decoded again for modules that were not seen before.
+
+The matrix is saved as .npz (names, corpus, sha256, columns, matrix), or as Parquet when
+the output ends in .parquet (needs pyarrow). Summaries and comparisons between corpora are
+computed on the matrix, without touching the corpora again.
+
+Usage:
+    python corpus_features.py extract <out.npz | out.parquet> <corpus>=<directory | corpus.pack> ... [--jobs N]
+    python corpus_features.py summary <features> [--stat mean|median|std|sum|frac] [--columns PATTERN ...]
+    python corpus_features.py compare <features> <corpus_a> <corpus_b> [--columns PATTERN ...]
+"""
+import argparse
+import fnmatch
+import hashlib
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "reduce"))
+sys.path.insert(0, os.path.join(HERE, "..", "collection"))
+
+from wasm_module import (BLOCK_OPS, KIND_FUNC, KIND_MEMORY, SEC_DATACOUNT, SEC_TABLE, SEC_TAG, V128,
+                         DecodeError, Module, Reader, iter_depths)
+
+SECTION_NAMES = ["custom", "type", "import", "function", "table", "memory", "global", "export",
+                 "start", "element", "code", "data", "datacount", "tag"]
+OPCODE_CLASSES = ["control", "parametric", "variable", "table", "memory", "const", "numeric",
+                  "reference", "simd", "atomic", "gc"]
+PROPOSALS = ["simd", "threads", "gc", "reference_types", "typed_func_refs", "bulk_memory", "exceptions",
+             "tail_call", "multi_value", "multi_memory", "memory64", "sign_ext", "sat_float_to_int"]
+COUNTS = ["types", "imports", "func_imports", "exports", "funcs", "globals", "memories", "tables",
+          "elems", "datas", "customs"]
+NESTING = ["instrs", "opaque_funcs", "max_depth", "avg_depth", "mean_func_max_depth"]
+
+FEATURES = (["valid", "size"] + [f"sec_{name}" for name in SECTION_NAMES] + [f"n_{name}" for name in COUNTS]
+            + [f"op_{name}" for name in OPCODE_CLASSES] + [f"uses_{name}" for name in PROPOSALS] + NESTING)
+COLUMN = {name: i for i, name in enumerate(FEATURES)}
+
+DEFAULT_CACHE = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+                             "wasm_fuzzing_study", "features.npz")
+
+# Single-byte opcodes that belong to a proposal rather than the MVP
+OP_PROPOSALS = {0x06: "exceptions", 0x07: "exceptions", 0x08: "exceptions", 0x09: "exceptions",
+                0x0A: "exceptions", 0x18: "exceptions", 0x19: "exceptions", 0x1F: "exceptions",
+                0x12: "tail_call", 0x13: "tail_call", 0x14: "typed_func_refs", 0x15: "tail_call",
+                0x1C: "reference_types", 0x25: "reference_types", 0x26: "reference_types",
+                0xD0: "reference_types", 0xD1: "reference_types", 0xD2: "reference_types",
+                0xD3: "typed_func_refs", 0xD4: "typed_func_refs", 0xD5: "typed_func_refs",
+                0xD6: "typed_func_refs"}
+for _op in range(0xC0, 0xC5):
+    OP_PROPOSALS[_op] = "sign_ext"
+PREFIX_CLASSES = {0xFD: "simd", 0xFE: "atomic", 0xFB: "gc"}
+PREFIX_PROPOSALS = {0xFD: "simd", 0xFE: "threads", 0xFB: "gc"}
+
+def opcode_class(op):
+    if isinstance(op, tuple):
+        prefix, sub = op
+        if prefix != 0xFC:
+            return PREFIX_CLASSES[prefix]
+        if sub < 8:
+            return "numeric"
+        return "memory" if sub < 12 else "table"
+    if op < 0x1A or op == 0x1F:
+        return "control"
+    if op < 0x1D:
+        return "parametric"
+    if op < 0x25:
+        return "variable"
+    if op < 0x27:
+        return "table"
+    if op < 0x41:
+        return "memory"
+    if op < 0x45:
+        return "const"
+    if op < 0xC5:
+        return "numeric"
+    return "reference"
+
+def opcode_proposal(op):
+    if isinstance(op, tuple):
+        prefix, sub = op
+        if prefix != 0xFC:
+            return PREFIX_PROPOSALS[prefix]
+        if sub < 8:
+            return "sat_float_to_int"
+        return "bulk_memory" if sub < 15 else "reference_types"
+    return OP_PROPOSALS.get(op)
+
+def iter_body(func):
+    """Yields (instruction, depth) over a function body, see wasm_module.iter_depths."""
+    r = Reader(func.raw)
+    for _ in range(r.u()):
+        r.u()
+        r.valtype()
+    return iter_depths(r)
+
+def section_sizes(data):
+    """Payload bytes per known section id, read from the section headers only."""
+    sizes = [0] * len(SECTION_NAMES)
+    r = Reader(data, 8)
+    while not r.eof():
+        sid = r.byte()
+        size = r.u()
+        if sid < len(sizes):
+            sizes[sid] += size
+        r.pos += size
+    return sizes
+
+def extract_features(data):
+    """
+    One row of FEATURES for a module. A module that does not decode gets valid 0, its size,
+    and NaN for everything else.
+    """
+    row = np.full(len(FEATURES), np.nan)
+    row[COLUMN["size"]] = len(data)
+    try:
+        module = Module(data)
+        sizes = section_sizes(data)
+    except (DecodeError, IndexError, ValueError):
+        row[COLUMN["valid"]] = 0
+        return row
+    row[COLUMN["valid"]] = 1
+    for name, size in zip(SECTION_NAMES, sizes):
+        row[COLUMN[f"sec_{name}"]] = size
+
+    sections = {sid: payload for sid, payload in module.sections}
+    tables = Reader(sections[SEC_TABLE]).u() if SEC_TABLE in sections else 0
+    imported_memories = module.imported(KIND_MEMORY)
+    counts = {"types": len(module.types), "imports": len(module.imports),
+              "func_imports": len(module.imported(KIND_FUNC)), "exports": len(module.exports),
+              "funcs": len(module.funcs), "globals": len(module.globals),
+              "memories": len(module.memories) + len(imported_memories), "tables": tables,
+              "elems": len(module.elems), "datas": len(module.datas), "customs": len(module.customs)}
+    for name, count in counts.items():
+        row[COLUMN[f"n_{name}"]] = count
+
+    uses = set()
+    classes = dict.fromkeys(OPCODE_CLASSES, 0)
+    mem_flags = list(module.memories) + [imp.mem_flags for imp in imported_memories]
+    if any(flags & 0x02 for flags in mem_flags):
+        uses.add("threads")
+    if any(flags & 0x04 for flags in mem_flags):
+        uses.add("memory64")
+    if len(mem_flags) > 1:
+        uses.add("multi_memory")
+    if tables > 1:
+        uses.add("reference_types")
+    if SEC_DATACOUNT in sections:
+        uses.add("bulk_memory")
+    if SEC_TAG in sections:
+        uses.add("exceptions")
+    if not module.type_section_ok:
+        uses.add("gc")
+    valtypes = [g.valtype for g in module.globals]
+    for functype in module.types:
+        if functype is not None:
+            valtypes.extend(functype.params + functype.results)
+            if len(functype.results) > 1:
+                uses.add("multi_value")
+
+    instrs = depth_sum = max_depth = opaque = 0
+    func_depths = []
+    for func in module.funcs:
+        valtypes.extend(valtype for _, valtype in func.locals)
+        if func.body is None:
+            opaque += 1
+            continue
+        func_max = 0
+        for ins, depth in iter_body(func):
+            op = ins.op
+            instrs += 1
+            depth_sum += depth
+            classes[opcode_class(op)] += 1
+            proposal = opcode_proposal(op)
+            if proposal:
+                uses.add(proposal)
+            if op in BLOCK_OPS:
+                depth += 1
+                if ins.fields[0][0] == "s":
+                    uses.add("multi_value")
+            func_max = max(func_max, depth)
+        func_depths.append(func_max)
+        max_depth = max(max_depth, func_max)
+    if V128 in valtypes:
+        uses.add("simd")
+
+    for name, count in classes.items():
+        row[COLUMN[f"op_{name}"]] = count
+    for name in PROPOSALS:
+        row[COLUMN[f"uses_{name}"]] = name in uses
+    row[COLUMN["instrs"]] = instrs
+    row[COLUMN["opaque_funcs"]] = opaque
+    row[COLUMN["max_depth"]] = max_depth
+    row[COLUMN["avg_depth"]] = depth_sum / instrs if instrs else 0.0
+    row[COLUMN["mean_func_max_depth"]] = np.mean(func_depths) if func_depths else 0.0
+    return row
+
+def iter_corpus(source):
+    """Yields (name, loader) for the modules of a corpus directory (recursive) or pack."""
+    if os.path.isfile(source) and source.endswith(".pack"):
+        from corpus_pack import CorpusPack
+        with CorpusPack(source) as pack:
+            for name in sorted(pack.names()):
+                yield name, lambda name=name: pack.read(name)
+        return
+    if not os.path.isdir(source):
+        raise FileNotFoundError(f"Corpus '{source}' is neither a directory nor a corpus pack")
+    paths = []
+    for root, _, files in os.walk(source):
+        paths.extend(os.path.join(root, f) for f in files if f.endswith(".wasm"))
+    for path in sorted(paths):
+        def load(path=path):
+            with open(path, "rb") as f:
+                return f.read()
+        yield os.path.relpath(path, source), load
+
+def load_cache(path):
+    """Cached rows as a dict sha256 -> row; empty when the cache was built with other columns."""
+    if not path or not os.path.exists(path):
+        return {}
+    with np.load(path) as cached:
+        if list(cached["columns"]) != FEATURES:
+            return {}
+        return dict(zip(cached["hashes"].tolist(), cached["rows"]))
+
+def save_cache(path, rows):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp, columns=np.array(FEATURES), hashes=np.array(list(rows), dtype="U64"),
+             rows=np.array(list(rows.values())).reshape(len(rows), len(FEATURES)))
+    os.replace(tmp, path)
+
+def build_matrix(corpora, cache, jobs=None):
+    """
+    Feature matrix of the given corpora (name -> directory or pack). Modules missing from
+    cache (dict sha256 -> row, updated in place) are decoded in a process pool.
+
+    Returns:
+        dict: names, corpus, sha256 (one entry per module), columns and matrix (modules x columns).
+    """
+    names, labels, hashes = [], [], []
+    missing = {}
+    for corpus, source in corpora.items():
+        for name, load in iter_corpus(source):
+            data = load()
+            digest = hashlib.sha256(data).hexdigest()
+            names.append(name)
+            labels.append(corpus)
+            hashes.append(digest)
+            if digest not in cache and digest not in missing:
+                missing[digest] = data
+    if jobs == 1 or len(missing) <= 1:
+        cache.update(zip(missing, map(extract_features, missing.values())))
+    else:
+        workers = jobs or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(missing) // (4 * workers))
+            cache.update(zip(missing, pool.map(extract_features, missing.values(), chunksize=chunksize)))
+    matrix = np.array([cache[digest] for digest in hashes]).reshape(len(hashes), len(FEATURES))
+    return {"names": np.array(names), "corpus": np.array(labels), "sha256": np.array(hashes),
+            "columns": np.array(FEATURES), "matrix": matrix}
+
+def save_features(path, features):
+    if path.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.table({"name": features["names"], "corpus": features["corpus"], "sha256": features["sha256"],
+                          **{column: features["matrix"][:, i] for i, column in enumerate(features["columns"])}})
+        pq.write_table(table, path)
+    else:
+        np.savez_compressed(path, **features)
+
+def load_features(path):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+        columns = [c for c in table.column_names if c not in ("name", "corpus", "sha256")]
+        return {"names": np.array(table["name"].to_pylist()), "corpus": np.array(table["corpus"].to_pylist()),
+                "sha256": np.array(table["sha256"].to_pylist()), "columns": np.array(columns),
+                "matrix": np.column_stack([table[c].to_numpy() for c in columns])}
+    with np.load(path) as f:
+        return {key: f[key] for key in f.files}
+
+def select_columns(columns, patterns):
+    """Indices of the columns matching any of the glob patterns (all columns without patterns)."""
+    if not patterns:
+        return np.arange(len(columns))
+    return np.array([i for i, c in enumerate(columns) if any(fnmatch.fnmatch(c, p) for p in patterns)], dtype=int)
+
+def corpus_stat(features, stat="mean", patterns=None):
+    """
+    One statistic per corpus and column over the valid modules.
+
+    Returns:
+        tuple: (corpus labels, column names, array corpora x columns).
+    """
+    cols = select_columns(list(features["columns"]), patterns)
+    valid = features["matrix"][:, list(features["columns"]).index("valid")] == 1
+    labels, inverse = np.unique(features["corpus"], return_inverse=True)
+    values = features["matrix"][:, cols]
+    reduce = {"mean": np.nanmean, "median": np.nanmedian, "std": np.nanstd, "sum": np.nansum,
+              "frac": lambda a, axis: np.nanmean(a > 0, axis=axis)}[stat]
+    table = np.full((len(labels), len(cols)), np.nan)
+    for i in range(len(labels)):
+        rows = values[(inverse == i) & valid]
+        if len(rows):
+            table[i] = reduce(rows, axis=0)
+    return labels, features["columns"][cols], table
+
+def print_table(row_labels, col_labels, table):
+    width = max(len(str(label)) for label in row_labels)
+    print(f"{'feature':<{width}}\t" + "\t".join(str(c) for c in col_labels))
+    for label, values in zip(row_labels, table):
+        print(f"{label:<{width}}\t" + "\t".join(f"{v:.3f}" for v in values))
+
+def main():
+    parser = argparse.ArgumentParser(description="Feature matrix of WebAssembly seed corpora")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("extract", help="Decode corpora into a feature matrix")
+    p.add_argument("output")
+    p.add_argument("corpora", nargs="+", help="<corpus>=<directory | corpus.pack>")
+    p.add_argument("--jobs", type=int, help="Worker processes (default: one per CPU)")
+    p.add_argument("--cache", default=DEFAULT_CACHE, help=f"Per-module row cache (default: {DEFAULT_CACHE})")
+    p.add_argument("--no-cache", action="store_true", help="Neither read nor write the cache")
+
+    p = commands.add_parser("summary", help="One statistic per feature and corpus")
+    p.add_argument("features")
+    p.add_argument("--stat", default="mean", choices=["mean", "median", "std", "sum", "frac"],
+                   help="frac is the share of modules where the feature is non-zero")
+    p.add_argument("--columns", nargs="*", help="Feature name patterns, e.g. 'uses_*' 'sec_code'")
+
+    p = commands.add_parser("compare", help="Means of two corpora side by side with their ratio")
+    p.add_argument("features")
+    p.add_argument("a")
+    p.add_argument("b")
+    p.add_argument("--columns", nargs="*", help="Feature name patterns")
+
+    args = parser.parse_args()
+
+    if args.command == "extract":
+        corpora = dict(spec.split("=", 1) for spec in args.corpora)
+        cache_path = None if args.no_cache else args.cache
+        cache = load_cache(cache_path)
+        cached = len(cache)
+        features = build_matrix(corpora, cache, args.jobs)
+        if cache_path and len(cache) != cached:
+            save_cache(cache_path, cache)
+        save_features(args.output, features)
+        print(f"Wrote {len(features['names'])} modules x {len(FEATURES)} features to {args.output} "
+              f"({len(cache) - cached} newly decoded)")
+        return
+
+    features = load_features(args.features)
+    if args.command == "summary":
+        labels, columns, table = corpus_stat(features, args.stat, args.columns)
+        print_table(columns, labels, table.T)
+    else:
+        labels, columns, table = corpus_stat(features, "mean", args.columns)
+        for corpus in (args.a, args.b):
+            if corpus not in labels:
+                print(f"Error: no corpus '{corpus}' in {args.features} (have: {', '.join(labels)})")
+                sys.exit(1)
+        a = table[list(labels).index(args.a)]
+        b = table[list(labels).index(args.b)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = a / b
+        print_table(columns, [args.a, args.b, f"{args.a}/{args.b}"], np.column_stack([a, b, ratio]))
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,311 @@
 #!/usr/bin/env python3
+"""
+Size statistics of the files below a directory (or the modules of a corpus pack).
+
+The tree is traversed with os.scandir by a pool of threads, which fold sizes in bounded
+batches into constant-memory, mergeable summaries, merged as directories complete: exact
+count, sum and sum of squares (sizes are integers, so mean and SD need no floating point
+accumulation), min/max, a KLL sketch for the quantiles and an optional power-of-two histogram. Nothing per file is
+kept, so the memory use does not grow with the number of files.
+
+Usage:
+    python measure_file_stats.py <directory | corpus.pack> [--group dir|runtime] [--group-regex PATTERN]
+                                 [--histogram] [--workers N]
+"""
+import argparse
+import math
 import os
+import random
+import re
 import sys
-import statistics
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-def main(directory):
-    if not os.path.isdir(directory):
-        print(f"Usage: {sys.argv[0]} <directory>")
-        sys.exit(1)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "collection"))
+
+QUANTILES = (0.5, 0.9, 0.99)
+# Sizes buffered per group before they are folded into a summary while scanning a directory
+BATCH_SIZE = 4096
+# Sizes a KLLSketch keeps exactly before it starts compacting
+EXACT_ITEMS = 10000
+
+class KLLSketch:
+    """
+    Mergeable quantile sketch (Karnin, Lang, Liberty 2016). Level h holds items of weight 2**h;
+    a full level is sorted and every other item is promoted. Up to `exact` items are all kept
+    (no compaction), so the quantiles of up to that many sizes are exact; beyond it the rank
+    error is about 1.7/k.
+    """
+
+    def __init__(self, k=800, c=2 / 3, seed=None, exact=EXACT_ITEMS):
+        self.k = k
+        self.c = c
+        self.exact = exact
+        self.rng = random.Random(seed)
+        self.levels = [[]]
+        self.size = 0
+        self.max_size = self.capacity(0)
+
+    def capacity(self, h):
+        return int(math.ceil(self.c ** (len(self.levels) - h - 1) * self.k)) + 1
+
+    def grow(self):
+        self.levels.append([])
+        self.max_size = sum(self.capacity(h) for h in range(len(self.levels)))
+
+    def compress(self):
+        if len(self.levels) == 1 and self.size <= self.exact:
+            return
+        while self.size >= self.max_size:
+            for h, items in enumerate(self.levels):
+                if len(items) >= self.capacity(h):
+                    if h + 1 == len(self.levels):
+                        self.grow()
+                    items.sort()
+                    keep = items.pop() if len(items) % 2 else None
+                    self.levels[h + 1].extend(items[self.rng.random() < 0.5::2])
+                    items[:] = [] if keep is None else [keep]
+                    break
+            self.size = sum(len(items) for items in self.levels)
+
+    def update(self, values):
+        self.levels[0].extend(values)
+        self.size += len(values)
+        self.compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.grow()
+        for h, items in enumerate(other.levels):
+            self.levels[h].extend(items)
+        self.size = sum(len(items) for items in self.levels)
+        self.compress()
+
+    def quantiles(self, qs):
+        """
+        The q-quantiles of the weighted items: the first value whose cumulative weight reaches
+        q * total, averaged with the next value when it reaches it exactly. While the sketch is
+        exact, the 0.5-quantile of an even number of sizes is thus the mean of the two middle
+        ones, as with statistics.median.
+        """
+        weighted = sorted((value, 1 << h) for h, items in enumerate(self.levels) for value in items)
+        if not weighted:
+            return [None] * len(qs)
+        total = sum(w for _, w in weighted)
+        results = []
+        for q in qs:
+            target, seen = q * total, 0
+            for i, (value, weight) in enumerate(weighted):
+                seen += weight
+                if seen >= target:
+                    break
+            if seen == target and i + 1 < len(weighted):
+                value = (value + weighted[i + 1][0]) / 2
+            results.append(value)
+        return results
+
+class SizeStats:
+    """Running summary of a stream of file sizes; mergeable across threads and groups."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.squares = 0
+        self.min = None
+        self.max = None
+        self.sketch = KLLSketch()
+        self.histogram = {}
+
+    def update(self, sizes):
+        if not sizes:
+            return
+        self.count += len(sizes)
+        self.total += sum(sizes)
+        self.squares += sum(size * size for size in sizes)
+        low, high = min(sizes), max(sizes)
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        self.sketch.update(sizes)
+        for size in sizes:
+            bucket = size.bit_length()
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
 
-    sizes = []
-    for root, _, files in os.walk(directory):
-        for f in files:
-            path = os.path.join(root, f)
+    def merge(self, other):
+        if not other.count:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.squares += other.squares
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+        for bucket, count in other.histogram.items():
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + count
+
+    @property
+    def mean(self):
+        return self.total / self.count
+
+    @property
+    def sd(self):
+        # Population SD from exact integer power sums
+        return math.sqrt(self.count * self.squares - self.total * self.total) / self.count
+
+def group_function(mode, pattern):
+    """
+    Returns a function (top-level subdirectory, file name) -> group name, or None for no grouping.
+    """
+    if pattern:
+        regex = re.compile(pattern)
+        def by_regex(top, name):
+            match = regex.search(name)
+            if not match:
+                return "(unmatched)"
+            return match.group(1) if regex.groups else match.group(0)
+        return by_regex
+    if mode == "dir":
+        return lambda top, name: top
+    if mode == "runtime":
+        from get_age import parse_seed
+        return lambda top, name: parse_seed(name)[0] or "(unknown)"
+    return None
+
+def scan_directory(path, top, group):
+    """
+    SizeStats of the files directly in path, by group, and its subdirectories as (path, top)
+    pairs. Sizes are folded into the summaries BATCH_SIZE at a time, so huge directories are
+    not buffered as a whole.
+    """
+    stats = {}
+    batches = {}
+    subdirs = []
+    errors = []
+    with os.scandir(path) as entries:
+        for entry in entries:
             try:
-                sizes.append(os.path.getsize(path))
-            except Exception as e:
-                print(f"Warning: could not read {path}: {e}")
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append((entry.path, top or entry.name))
+                    continue
+                size = entry.stat().st_size
+            except OSError as e:
+                errors.append(f"Warning: could not read {entry.path}: {e}")
+                continue
+            key = group(top or ".", entry.name) if group else None
+            if key not in batches:
+                batches[key] = array("q")
+            batch = batches[key]
+            batch.append(size)
+            if len(batch) >= BATCH_SIZE:
+                stats.setdefault(key, SizeStats()).update(batch)
+                del batch[:]
+    for key, batch in batches.items():
+        if batch:
+            stats.setdefault(key, SizeStats()).update(batch)
+    return stats, subdirs, errors
+
+def directory_stats(directory, group=None, workers=8):
+    """
+    Traverses directory with a pool of scandir threads, merging each directory's per-group
+    SizeStats as it completes.
+
+    Returns:
+        dict: group name (None without grouping) -> SizeStats.
+    """
+    stats = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {pool.submit(scan_directory, directory, None, group)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    summaries, subdirs, errors = future.result()
+                except OSError as e:
+                    print(f"Warning: could not scan directory: {e}")
+                    continue
+                for message in errors:
+                    print(message)
+                for path, top in subdirs:
+                    pending.add(pool.submit(scan_directory, path, top, group))
+                for key, summary in summaries.items():
+                    stats.setdefault(key, SizeStats()).merge(summary)
+    return stats
+
+def pack_stats(pack_path, group=None):
+    """Module sizes straight from a corpus pack's index, without reading any member."""
+    from corpus_pack import CorpusPack
+    by_group = {}
+    with CorpusPack(pack_path) as pack:
+        for entry in pack.entries:
+            parts = entry["name"].split("/")
+            key = group(parts[0] if len(parts) > 1 else ".", parts[-1]) if group else None
+            by_group.setdefault(key, array("q")).append(entry["size"])
+    stats = {}
+    for key, sizes in by_group.items():
+        stats[key] = SizeStats()
+        stats[key].update(sizes)
+    return stats
+
+def format_size(size):
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size} {unit}"
+        size //= 1024
+    return f"{size} TiB"
 
-    if not sizes:
+def print_stats(stats, histogram=False):
+    p50, p90, p99 = stats.sketch.quantiles(QUANTILES)
+    print(f"Count: {stats.count}")
+    print(f"Min: {stats.min} bytes")
+    print(f"Max: {stats.max} bytes")
+    print(f"Mean: {stats.mean:.2f} bytes")
+    print(f"Median: {p50:.2f} bytes")
+    print(f"P90: {p90:.2f} bytes")
+    print(f"P99: {p99:.2f} bytes")
+    print(f"SD: {stats.sd:.2f} bytes")
+    if histogram:
+        print("Histogram:")
+        peak = max(stats.histogram.values())
+        for bucket in sorted(stats.histogram):
+            count = stats.histogram[bucket]
+            low = 0 if bucket == 0 else 1 << (bucket - 1)
+            label = "0 B" if bucket == 0 else f"[{format_size(low)}, {format_size(1 << bucket)})"
+            print(f"  {label:>22} {count:>10} {'#' * max(1, round(40 * count / peak))}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming size statistics of a directory tree or corpus pack")
+    parser.add_argument("source", help="Directory or corpus pack")
+    parser.add_argument("--group", choices=["dir", "runtime"],
+                        help="Group by top-level subdirectory or by seed runtime (seed_<runtime>_<issue>.wasm)")
+    parser.add_argument("--group-regex", help="Group by the first capture group (or the match) of a regex on the file name")
+    parser.add_argument("--histogram", action="store_true", help="Print a power-of-two size histogram")
+    parser.add_argument("--workers", type=int, default=min(32, 4 * (os.cpu_count() or 1)),
+                        help="Directory scanning threads")
+    args = parser.parse_args()
+
+    group = group_function(args.group, args.group_regex)
+    if os.path.isfile(args.source) and args.source.endswith(".pack"):
+        stats = pack_stats(args.source, group)
+    elif not os.path.isdir(args.source):
+        parser.print_usage()
+        sys.exit(1)
+    else:
+        stats = directory_stats(args.source, group, args.workers)
+
+    if not stats:
         print("No files found.")
         return
 
-    sizes.sort()
-    n = len(sizes)
-    print(f"Count: {n}")
-    print(f"Min: {min(sizes)} bytes")
-    print(f"Max: {max(sizes)} bytes")
-    print(f"Mean: {statistics.fmean(sizes):.2f} bytes")
-    print(f"Median: {statistics.median(sizes):.2f} bytes")
-    print(f"SD: {statistics.pstdev(sizes):.2f} bytes")
+    if group is None:
+        print_stats(stats[None], args.histogram)
+        return
+    overall = SizeStats()
+    for key in sorted(stats):
+        print(f"== {key} ==")
+        print_stats(stats[key], args.histogram)
+        print()
+        overall.merge(stats[key])
+    print("== all ==")
+    print_stats(overall, args.histogram)
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print(f"Usage: {sys.argv[0]} <directory>")
-        sys.exit(1)
-    main(sys.argv[1])
-
+    main()
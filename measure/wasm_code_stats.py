@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Control-flow statistics of WebAssembly modules, decoded straight from the code section.
+
+For every function body the instructions are decoded with the opcode table of
+reduce/wasm_module.py in one pass, giving its size in bytes, instruction count and
+exact maximum and average control nesting depth (blocks, loops, ifs and try blocks
+enclosing each instruction). Other sections are skipped without being parsed.
+
+The summary is the one measure_avg_nesting_depths.sh printed: one line per module with
+its nesting depth (the deepest nesting of any of its functions), then count, mean and
+standard deviation over the modules. Modules are analysed in parallel and the results are
+cached per content hash, so re-running over a grown corpus only decodes the new modules.
+
+Usage:
+    python wasm_code_stats.py <directory | corpus.pack> [--detail] [--jobs N] [--cache FILE | --no-cache]
+"""
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "reduce"))
+sys.path.insert(0, os.path.join(HERE, "..", "collection"))
+
+from wasm_module import BLOCK_OPS, MAGIC, SEC_CODE, VERSION, DecodeError, Reader, iter_depths
+
+# Bump when the statistics change so stale cache entries are recomputed
+STATS_VERSION = 1
+DEFAULT_CACHE = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+                             "wasm_fuzzing_study", "code_stats.json")
+
+def function_stats(r, end):
+    """
+    Statistics of one code section entry, the reader positioned after its size.
+
+    Returns:
+        dict: size, instrs, max_depth and avg_depth; instrs and the depths are None when
+        the body uses an opcode the table does not know.
+    """
+    size = end - r.pos
+    try:
+        for _ in range(r.u()):
+            r.u()
+            r.valtype()
+        instrs = depth_sum = max_depth = 0
+        for ins, depth in iter_depths(r):
+            instrs += 1
+            depth_sum += depth
+            if ins.op in BLOCK_OPS:
+                depth += 1
+            if depth > max_depth:
+                max_depth = depth
+        if r.pos != end:
+            raise DecodeError("function body size mismatch")
+    except DecodeError:
+        r.pos = end
+        return {"size": size, "instrs": None, "max_depth": None, "avg_depth": None}
+    return {"size": size, "instrs": instrs, "max_depth": max_depth,
+            "avg_depth": depth_sum / instrs if instrs else 0.0}
+
+def module_stats(data):
+    """
+    Per-function statistics of a module.
+
+    Returns:
+        dict: functions (list of function_stats), max_depth (deepest nesting over the
+        decoded functions), opaque (functions that could not be decoded) and error
+        (None, or why the module could not be read).
+    """
+    result = {"functions": [], "max_depth": 0, "opaque": 0, "error": None}
+    try:
+        if bytes(data[:4]) != MAGIC or bytes(data[4:8]) != VERSION:
+            raise DecodeError("not a core WebAssembly module")
+        r = Reader(data, 8)
+        while not r.eof():
+            sid = r.byte()
+            size = r.u()
+            if sid != SEC_CODE:
+                r.pos += size
+                continue
+            sr = Reader(data, r.pos, r.pos + size)
+            for _ in range(sr.u()):
+                body_size = sr.u()
+                body_end = sr.pos + body_size
+                if body_end > sr.end:
+                    raise DecodeError("function body exceeds the code section")
+                result["functions"].append(function_stats(Reader(data, sr.pos, body_end), body_end))
+                sr.pos = body_end
+            r.pos += size
+        if r.pos != r.end:
+            raise DecodeError("section exceeds the module")
+    except DecodeError as e:
+        result["error"] = str(e)
+    for func in result["functions"]:
+        if func["max_depth"] is None:
+            result["opaque"] += 1
+        else:
+            result["max_depth"] = max(result["max_depth"], func["max_depth"])
+    return result
+
+def analyse(data):
+    return module_stats(memoryview(data))
+
+def load_cache(path):
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get("version") != STATS_VERSION:
+        return {}
+    return cache.get("modules", {})
+
+def save_cache(path, modules):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"version": STATS_VERSION, "modules": modules}, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+def iter_directory(directory):
+    """Yields (name, sha256, loader) for the .wasm files directly inside directory."""
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.endswith(".wasm") and os.path.isfile(path):
+            with open(path, "rb") as f:
+                data = f.read()
+            yield name, hashlib.sha256(data).hexdigest(), lambda data=data: data
+
+def iter_pack(pack):
+    """Yields (name, sha256, loader) for the members of a corpus pack; the index has the hashes."""
+    for entry in sorted(pack.entries, key=lambda entry: entry["name"]):
+        yield entry["name"], entry["sha256"], lambda name=entry["name"]: pack.read(name)
+
+def collect_stats(modules, cache, jobs=None):
+    """
+    Statistics for (name, sha256, loader) triples, decoding only modules missing from cache
+    (a dict sha256 -> stats, updated in place).
+
+    Returns:
+        list: (name, stats) in input order.
+    """
+    names = []
+    missing = {}
+    for name, digest, load in modules:
+        names.append((name, digest))
+        if digest not in cache and digest not in missing:
+            missing[digest] = load()
+    if jobs == 1 or len(missing) <= 1:
+        cache.update(zip(missing, map(analyse, missing.values())))
+    else:
+        workers = jobs or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(missing) // (4 * workers))
+            cache.update(zip(missing, pool.map(analyse, missing.values(), chunksize=chunksize)))
+    return [(name, cache[digest]) for name, digest in names]
+
+def print_detail(results):
+    print("module\tfunction\tsize\tinstrs\tmax_depth\tavg_depth")
+    for name, stats in results:
+        for index, func in enumerate(stats["functions"]):
+            avg = "-" if func["avg_depth"] is None else f"{func['avg_depth']:.2f}"
+            instrs = "-" if func["instrs"] is None else func["instrs"]
+            max_depth = "-" if func["max_depth"] is None else func["max_depth"]
+            print(f"{name}\t{index}\t{func['size']}\t{instrs}\t{max_depth}\t{avg}")
+
+def print_summary(source, results):
+    print(f"Analyzing .wasm files in: {source}")
+    print("----------------------------------------")
+    depths = []
+    for name, stats in results:
+        if stats["error"] is not None:
+            print(f"Warning: skipping {name}: {stats['error']}", file=sys.stderr)
+            continue
+        if stats["opaque"]:
+            print(f"Warning: {name}: {stats['opaque']} function(s) use unknown opcodes and were not measured",
+                  file=sys.stderr)
+        print(f"{name}: avg nesting depth = {stats['max_depth']}")
+        depths.append(stats["max_depth"])
+
+    if not depths:
+        print("No .wasm files found in directory")
+        return
+    print("----------------------------------------")
+    print(f"Number of .wasm files analyzed: {len(depths)}")
+    print(f"Overall average nesting depth: {statistics.fmean(depths):.2f}")
+    print(f"Standard deviation: {statistics.pstdev(depths):.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Nesting depth and size statistics of WebAssembly functions")
+    parser.add_argument("source", help="Directory of .wasm files (not recursive) or a corpus pack")
+    parser.add_argument("--detail", action="store_true", help="Print per-function statistics as TSV instead of the summary")
+    parser.add_argument("--jobs", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE, help=f"Per-module result cache (default: {DEFAULT_CACHE})")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the cache")
+    args = parser.parse_args()
+
+    cache_path = None if args.no_cache else args.cache
+    cache = load_cache(cache_path)
+    cached = len(cache)
+
+    if os.path.isfile(args.source) and args.source.endswith(".pack"):
+        from corpus_pack import CorpusPack
+        with CorpusPack(args.source) as pack:
+            results = collect_stats(iter_pack(pack), cache, args.jobs)
+    elif os.path.isdir(args.source):
+        results = collect_stats(iter_directory(args.source), cache, args.jobs)
+    else:
+        print(f"Error: Directory '{args.source}' does not exist")
+        sys.exit(1)
+
+    if cache_path and len(cache) != cached:
+        save_cache(cache_path, cache)
+
+    if args.detail:
+        print_detail(results)
+    else:
+        print_summary(args.source, results)
+
+if __name__ == "__main__":
+    main()
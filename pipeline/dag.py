@@ -0,0 +1,261 @@
+"""
+A small task DAG with content-hash caching, for the stages of the study (see run_pipeline.py).
+
+Tasks belong to stages. Each task declares its input files or directories, the tasks it
+depends on and its parameters, and writes its results to a directory of its own,
+<workdir>/<stage>/<task>. A task's key is the SHA-256 of its stage version, parameters,
+input contents and the output digests of its dependencies. Its record
+(<workdir>/.pipeline/<stage>/<task>.json) stores that key and the digest of what it wrote.
+A task whose key matches its record is not run again. When a rerun produces the same output
+digest, the tasks downstream of it keep their keys and are not run either. Changing an input
+therefore recomputes only the work that depends on it.
+
+Tasks run as soon as their dependencies finish, on a thread pool per stage (the work is
+done by subprocesses), so each stage has its own parallelism. A task can add tasks when it
+finishes (Task.expand), e.g. one reduction per divergence found by a replay shard, and
+those run while other shards are still being replayed. With SPANS_FILE set (see spans.py),
+every task that runs is a span named after its stage, and the scripts it starts nest under it.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import spans
+
+RECORDS_DIR = ".pipeline"
+
+class TaskError(Exception):
+    """A task's action failed; the message says why."""
+
+class Stage:
+    """A kind of task: name, worker threads and a version to bump when its action changes."""
+
+    def __init__(self, name, jobs=1, version=1):
+        self.name = name
+        self.jobs = jobs
+        self.version = version
+
+class Task:
+    """
+    One unit of work of a stage.
+
+    action(task, out_dir) does the work, writing to out_dir (a fresh directory, or the
+    previous output when incremental is set) and raising TaskError on failure. expand(task),
+    when given, returns further tasks once this one is done, whether it ran or was cached.
+    fingerprint lists the paths (relative to the output) that make up the output digest,
+    for outputs that also hold bookkeeping files; by default the whole output counts.
+    """
+
+    def __init__(self, stage, name, action, inputs=(), deps=(), params=None, expand=None,
+                 incremental=False, fingerprint=None):
+        self.stage = stage
+        self.name = name
+        self.action = action
+        self.inputs = list(inputs)
+        self.deps = list(deps)
+        self.params = params or {}
+        self.expand = expand
+        self.incremental = incremental
+        self.fingerprint = fingerprint
+        self.output = None      # output directory, set by the pipeline
+        self.digest = None      # output digest, set once done
+        self.state = "pending"  # pending, cached, done, failed or skipped
+
+    @property
+    def id(self):
+        return f"{self.stage}/{self.name}"
+
+def safe_name(name):
+    return re.sub(r"[^A-Za-z0-9._=+-]", "_", name)
+
+class Hasher:
+    """SHA-256 of files and directory trees, remembering file digests by (path, size, mtime)."""
+
+    def __init__(self):
+        self.files = {}
+        self.lock = threading.Lock()
+
+    def file(self, path):
+        st = os.stat(path)
+        key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        with self.lock:
+            if key in self.files:
+                return self.files[key]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        with self.lock:
+            self.files[key] = digest.hexdigest()
+        return self.files[key]
+
+    def path(self, path, only=None):
+        """Digest of a file, or of a tree (relative paths and file digests, in sorted order)."""
+        if not os.path.exists(path):
+            return "missing"
+        if os.path.isfile(path):
+            return self.file(path)
+        digest = hashlib.sha256()
+        roots = [os.path.join(path, p) for p in only] if only else [path]
+        for root in roots:
+            if os.path.isfile(root):
+                digest.update(f"{os.path.relpath(root, path)}:{self.file(root)}\n".encode())
+                continue
+            for directory, dirs, files in os.walk(root):
+                dirs.sort()
+                for name in sorted(files):
+                    full = os.path.join(directory, name)
+                    digest.update(f"{os.path.relpath(full, path)}:{self.file(full)}\n".encode())
+        return digest.hexdigest()
+
+class Pipeline:
+    """Runs tasks of the given stages below workdir; see the module docstring."""
+
+    def __init__(self, workdir, stages, force=(), log=print):
+        self.workdir = os.path.abspath(workdir)
+        self.stages = {stage.name: stage for stage in stages}
+        self.force = set(force)
+        self.log = log
+        self.tasks = {}
+        self.hasher = Hasher()
+
+    def add(self, task):
+        if task.stage not in self.stages:
+            raise ValueError(f"Unknown stage {task.stage!r} of task {task.name!r}")
+        if task.id in self.tasks:
+            return self.tasks[task.id]
+        task.deps = [self.add(dep) for dep in task.deps]
+        task.output = os.path.join(self.workdir, task.stage, safe_name(task.name))
+        self.tasks[task.id] = task
+        return task
+
+    def record_path(self, task):
+        return os.path.join(self.workdir, RECORDS_DIR, task.stage, f"{safe_name(task.name)}.json")
+
+    def key(self, task):
+        digest = hashlib.sha256()
+        stage = self.stages[task.stage]
+        digest.update(f"{task.stage}:{stage.version}:{task.name}\n".encode())
+        digest.update(json.dumps(task.params, sort_keys=True).encode())
+        # Inputs count by content, so moving a file (e.g. into another shard) keeps the key
+        for i, path in enumerate(task.inputs):
+            digest.update(f"\n{i}:{self.hasher.path(path)}".encode())
+        for dep in task.deps:
+            digest.update(f"\n{dep.id}:{dep.digest}".encode())
+        return digest.hexdigest()
+
+    def cached(self, task, key):
+        if task.stage in self.force:
+            return None
+        try:
+            with open(self.record_path(task)) as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get("key") != key or not os.path.isdir(task.output):
+            return None
+        return record.get("digest")
+
+    def execute(self, task, key):
+        """Runs a task into a temporary directory and publishes it as its output; returns its digest."""
+        tmp = f"{task.output}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        if task.incremental and os.path.isdir(task.output):
+            shutil.copytree(task.output, tmp, symlinks=True)
+        else:
+            os.makedirs(tmp)
+        start = time.perf_counter()
+        with spans.span(task.stage, task=task.name):
+            task.action(task, tmp)
+        digest = self.hasher.path(tmp, task.fingerprint)
+        # Swap the new output in; the record is only written once it is in place
+        old = f"{task.output}.old"
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(task.output):
+            os.replace(task.output, old)
+        os.replace(tmp, task.output)
+        shutil.rmtree(old, ignore_errors=True)
+        record = self.record_path(task)
+        os.makedirs(os.path.dirname(record), exist_ok=True)
+        with open(f"{record}.tmp", "w") as f:
+            json.dump({"key": key, "digest": digest, "seconds": round(time.perf_counter() - start, 3)}, f)
+        os.replace(f"{record}.tmp", record)
+        return digest
+
+    def ready(self, task):
+        return all(dep.state in ("cached", "done") for dep in task.deps)
+
+    def run(self):
+        """Runs every task (including tasks added by expand) to completion; returns the failed tasks."""
+        pools = {name: ThreadPoolExecutor(max_workers=max(1, stage.jobs), thread_name_prefix=name)
+                 for name, stage in self.stages.items()}
+        running = {}
+        active = set()
+        try:
+            while True:
+                self.settle()
+                progressed = False
+                for task in list(self.tasks.values()):
+                    if task.state != "pending" or task.id in active or not self.ready(task):
+                        continue
+                    key = self.key(task)
+                    digest = self.cached(task, key)
+                    if digest is not None:
+                        task.digest, task.state = digest, "cached"
+                        self.finish(task)
+                        progressed = True
+                        continue
+                    running[pools[task.stage].submit(self.execute, task, key)] = task
+                    active.add(task.id)
+                if progressed:
+                    continue    # cached tasks may have made others ready
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    active.discard(task.id)
+                    try:
+                        task.digest = future.result()
+                    except Exception as e:
+                        task.state = "failed"
+                        reason = str(e) if isinstance(e, TaskError) else f"{type(e).__name__}: {e}"
+                        self.log(f"[{task.stage}] {task.name}: FAILED: {reason}")
+                        continue
+                    task.state = "done"
+                    self.log(f"[{task.stage}] {task.name}: done")
+                    self.finish(task)
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=True)
+        return [task for task in self.tasks.values() if task.state == "failed"]
+
+    def finish(self, task):
+        if task.expand:
+            for new in task.expand(task) or ():
+                self.add(new)
+
+    def settle(self):
+        """Marks pending tasks whose dependencies failed as skipped."""
+        changed = True
+        while changed:
+            changed = False
+            for task in self.tasks.values():
+                if task.state == "pending" and any(dep.state in ("failed", "skipped") for dep in task.deps):
+                    task.state = "skipped"
+                    changed = True
+
+    def summary(self, out=sys.stdout):
+        for name in self.stages:
+            states = {}
+            for task in self.tasks.values():
+                if task.stage == name:
+                    states[task.state] = states.get(task.state, 0) + 1
+            if states:
+                print(f"{name}: " + ", ".join(f"{count} {state}" for state, count in sorted(states.items())), file=out)
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline of the study on the task DAG of dag.py:
+
+    collect   collection/collect_issues.py, one task per runtime (incremental sync)
+    extract   collection/process_issues.py on a copy of the collected issues, per runtime
+    seeds     collection/build_seed_corpus.py over all extracted runtimes, or the .wasm files
+              of an existing corpus ("seeds" in the config)
+    replay    exec_oracle/replay_wasm.sh on shards of the seeds
+    dedup     exec_oracle/dedup_output.py on each shard's outputs
+    reduce    reduce/wasm_reducer.py with lithium_predicate.py, per divergent testcase
+    trace     dedup/trace.sh under LLDB, per reduced testcase and configured runtime
+
+Every stage writes below the work directory (<workdir>/<stage>/<task>) and passes paths on
+explicitly, so no script runs with a placeholder path or depends on the working directory.
+Reductions start as soon as the shard that found their divergence is deduplicated, while
+the other shards are still replaying. Seeds are assigned to shards by a hash of their
+name, so adding seeds only replays the shards they land in.
+
+The config is a JSON file:
+
+    {
+      "workdir": "work",                       (relative to the config file)
+      "runtimes": ["wasmtime", "wamr"],        (collected repositories, see get_age.TARGET_TO_REPO)
+      "issue_limit": 1000,
+      "seeds": null,                           (or a directory of .wasm seeds: skips collection)
+      "function": "_start",                    (function replay_wasm.sh invokes)
+      "shard_size": 200,
+      "replay": null,                          (replay script, default exec_oracle/replay_wasm.sh)
+      "reduce": true,
+      "trace": {"wasmtime": {"program": "/usr/bin/wasmtime", "args": "run {wasm}", "filter": "wasmtime"}},
+      "jobs": {"collect": 2, "extract": 2, "replay": 1, "dedup": 2, "reduce": 4, "trace": 1}
+    }
+
+Usage:
+    python run_pipeline.py <config.json> [--workdir DIR] [--jobs STAGE=N ...] [--force STAGE ...]
+                           [--until STAGE] [--spans TRACE]
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import zlib
+
+import spans
+from dag import Pipeline, Stage, Task, TaskError
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, os.path.join(ROOT, "collection"))
+sys.path.insert(0, os.path.join(ROOT, "exec_oracle"))
+from get_age import TARGET_TO_REPO
+from oracle_results import divergent_tiers, parse_output, testcase_name, tier_runtime
+
+STAGES = ["collect", "extract", "seeds", "replay", "dedup", "reduce", "trace"]
+DEFAULT_JOBS = {"collect": 2, "extract": 2, "seeds": 1, "replay": 1, "dedup": 2,
+                "reduce": max(1, (os.cpu_count() or 1) // 2), "trace": 1}
+
+COLLECT_ISSUES = os.path.join(ROOT, "collection", "collect_issues.py")
+PROCESS_ISSUES = os.path.join(ROOT, "collection", "process_issues.py")
+BUILD_SEED_CORPUS = os.path.join(ROOT, "collection", "build_seed_corpus.py")
+REPLAY_WASM = os.path.join(ROOT, "exec_oracle", "replay_wasm.sh")
+DEDUP_OUTPUT = os.path.join(ROOT, "exec_oracle", "dedup_output.py")
+WASM_REDUCER = os.path.join(ROOT, "reduce", "wasm_reducer.py")
+LITHIUM_PREDICATE = os.path.join(ROOT, "reduce", "lithium_predicate.py")
+TRACE = os.path.join(ROOT, "dedup", "trace.sh")
+
+def run(command, out_dir, cwd=None, env=None):
+    """Runs a stage command, logging next to the task's output; raises TaskError when it fails."""
+    log_path = f"{out_dir.removesuffix('.tmp')}.log"
+    with open(log_path, "w") as log:
+        result = subprocess.run(command, cwd=cwd, env=spans.environ({**os.environ, **(env or {})}),
+                                stdout=log, stderr=subprocess.STDOUT)
+    if result.returncode != 0:
+        raise TaskError(f"{os.path.basename(command[1])} exited with {result.returncode} (see {log_path})")
+
+def link_or_copy(source, dest):
+    try:
+        os.link(source, dest)
+    except OSError:
+        shutil.copyfile(source, dest)
+
+class StudyPipeline:
+    """The tasks of the study for one config; see the module docstring."""
+
+    def __init__(self, config, workdir, until="trace"):
+        self.config = config
+        self.function = config.get("function", "_start")
+        self.shard_size = config.get("shard_size", 200)
+        self.replay_script = os.path.abspath(config.get("replay") or REPLAY_WASM)
+        self.trace = config.get("trace") or {}
+        self.last = STAGES.index(until)
+        self.workdir = workdir
+
+    def wanted(self, stage):
+        return STAGES.index(stage) <= self.last
+
+    # ----------- issues and seeds -----------
+
+    def collect(self, runtime):
+        owner, repo = TARGET_TO_REPO[runtime]
+        def action(task, out_dir):
+            run([sys.executable, COLLECT_ISSUES, owner, repo, str(task.params["limit"]), out_dir,
+                 str(self.config.get("collect_concurrency", 8))], out_dir)
+        # Syncs from the previous run's store; only the exported issues tell whether anything changed
+        return Task("collect", runtime, action, params={"repository": f"{owner}/{repo}",
+                                                        "limit": self.config.get("issue_limit", 1000)},
+                    incremental=True, fingerprint=["issues.json"])
+
+    def extract(self, runtime):
+        def action(task, out_dir):
+            # The issue store and its JSON export; downloads of earlier runs are kept in out_dir
+            collected = task.deps[0].output
+            for name in os.listdir(collected):
+                source = os.path.join(collected, name)
+                if os.path.isfile(source):
+                    shutil.copy2(source, os.path.join(out_dir, name))
+            run([sys.executable, PROCESS_ISSUES, out_dir, str(self.config.get("download_workers", 8))], out_dir)
+        return Task("extract", runtime, action, inputs=[PROCESS_ISSUES], deps=[self.collect(runtime)],
+                    incremental=True)
+
+    def seeds(self):
+        if self.config.get("seeds"):
+            source = os.path.abspath(self.config["seeds"])
+            def action(task, out_dir):
+                os.makedirs(os.path.join(out_dir, "seeds"))
+                for name in sorted(os.listdir(source)):
+                    if name.endswith(".wasm"):
+                        link_or_copy(os.path.join(source, name), os.path.join(out_dir, "seeds", name))
+            return Task("seeds", "corpus", action, inputs=[source], expand=self.shards)
+        def action(task, out_dir):
+            run([sys.executable, BUILD_SEED_CORPUS, out_dir] + [f"{t.name}={t.output}" for t in task.deps], out_dir)
+        return Task("seeds", "corpus", action, inputs=[BUILD_SEED_CORPUS], deps=self.extracts("extract"),
+                    incremental=True, fingerprint=["seeds"], expand=self.shards)
+
+    def extracts(self, stage):
+        """The collect or extract tasks of the configured runtimes."""
+        make = self.collect if stage == "collect" else self.extract
+        return [make(runtime) for runtime in self.config.get("runtimes", sorted(TARGET_TO_REPO))]
+
+    def roots(self):
+        """Tasks to start from; the others are their dependencies or are added as they finish."""
+        if self.last < STAGES.index("seeds") and not self.config.get("seeds"):
+            return self.extracts(STAGES[self.last])
+        return [self.seeds()]
+
+    # ----------- replay and dedup -----------
+
+    def shards(self, seeds):
+        if not self.wanted("replay"):
+            return []
+        seeds_dir = os.path.join(seeds.output, "seeds")
+        names = sorted(name for name in os.listdir(seeds_dir) if name.endswith(".wasm"))
+        # A power of two, so the shard of a seed only changes when the corpus doubles or halves
+        count = 1 << max(0, math.ceil(math.log2(max(1, len(names) / self.shard_size))))
+        shards = {}
+        for name in names:
+            shards.setdefault(zlib.crc32(name.encode()) % count, []).append(os.path.join(seeds_dir, name))
+        return [self.dedup(self.replay(f"shard-{i:04d}-of-{count:04d}", paths)) for i, paths in sorted(shards.items())]
+
+    def replay(self, name, paths):
+        def action(task, out_dir):
+            for path in paths:
+                link_or_copy(path, os.path.join(out_dir, os.path.basename(path)))
+            run(["bash", self.replay_script, self.function, out_dir], out_dir)
+            # Keep only the outputs
+            for path in paths:
+                os.remove(os.path.join(out_dir, os.path.basename(path)))
+            shutil.rmtree(os.path.join(out_dir, "tmpdir"), ignore_errors=True)
+        return Task("replay", name, action, inputs=paths + [self.replay_script],
+                    params={"function": self.function})
+
+    def dedup(self, replay):
+        def action(task, out_dir):
+            for name in os.listdir(os.path.join(replay.output, "output")):
+                if name.endswith(".txt"):
+                    shutil.copyfile(os.path.join(replay.output, "output", name), os.path.join(out_dir, name))
+            run([sys.executable, DEDUP_OUTPUT, out_dir], out_dir)
+        return Task("dedup", replay.name, action, inputs=[DEDUP_OUTPUT], deps=[replay],
+                    fingerprint=["deduped"], expand=self.divergences)
+
+    def divergences(self, dedup):
+        """One reduction (or trace, without reduction) per divergent deduplicated output."""
+        if not self.wanted("reduce"):
+            return []
+        deduped_dir = os.path.join(dedup.output, "deduped")
+        seeds_dir = os.path.join(self.workdir, "seeds", "corpus", "seeds")
+        tasks = []
+        for name in sorted(os.listdir(deduped_dir)):
+            path = os.path.join(deduped_dir, name)
+            with open(path, encoding="ISO-8859-1") as f:
+                tiers = divergent_tiers(parse_output(f.readlines()))
+            if not tiers:
+                continue
+            # replay_wasm.sh names outputs <testcase without .wasm>__<func>.txt
+            testcase = testcase_name(name)
+            wasm = os.path.join(seeds_dir, testcase if testcase.endswith(".wasm") else f"{testcase}.wasm")
+            runtimes = sorted({tier_runtime(tier) for tier in tiers})
+            if self.config.get("reduce", True):
+                tasks.append(self.reduce(wasm, path, runtimes))
+            else:
+                tasks.extend(self.traces(wasm, runtimes))
+        return tasks
+
+    # ----------- reduction and tracing -----------
+
+    def reduce(self, wasm, reference, runtimes):
+        stem = os.path.splitext(os.path.basename(wasm))[0]
+        def action(task, out_dir):
+            testcase = os.path.join(out_dir, f"{stem}.wasm")
+            shutil.copyfile(wasm, testcase)
+            # lithium_predicate.py compares each candidate's deduplicated output with <FILENAME>.txt
+            shutil.copyfile(reference, os.path.join(out_dir, f"{stem}.txt"))
+            env = {"WASM_DIR": out_dir, "FILENAME": stem, "FUNC_NAME": self.function,
+                   "REPLAY_WASM": self.replay_script, "DEDUP_OUTPUT": DEDUP_OUTPUT}
+            run([sys.executable, WASM_REDUCER, "--predicate", LITHIUM_PREDICATE, "--keep-export", self.function,
+                 "-o", os.path.join(out_dir, "reduced.wasm"), testcase], out_dir, env=env)
+        def expand(task):
+            reduced = os.path.join(task.output, "reduced.wasm")
+            return self.traces(reduced if os.path.exists(reduced) else wasm, runtimes, stem)
+        return Task("reduce", stem, action, inputs=[wasm, reference, WASM_REDUCER, LITHIUM_PREDICATE,
+                                                    self.replay_script],
+                    params={"function": self.function, "runtimes": runtimes}, expand=expand)
+
+    def traces(self, wasm, runtimes, stem=None):
+        if not self.wanted("trace"):
+            return []
+        stem = stem or os.path.splitext(os.path.basename(wasm))[0]
+        tasks = []
+        for runtime in runtimes:
+            if runtime not in self.trace:
+                continue
+            spec = self.trace[runtime]
+            def action(task, out_dir, spec=spec):
+                args = spec.get("args", "{wasm}").format(wasm=wasm, function=self.function)
+                run(["bash", TRACE, spec["program"], args, spec.get("filter", runtime),
+                     os.path.join(out_dir, "trace.txt")], out_dir, cwd=os.path.dirname(TRACE))
+            tasks.append(Task("trace", f"{stem}--{runtime}", action, inputs=[wasm, TRACE],
+                              params={"runtime": runtime, **spec}))
+        return tasks
+
+def parse_jobs(values, parser):
+    jobs = {}
+    for value in values:
+        stage, sep, count = value.partition("=")
+        if not sep or stage not in STAGES or not count.isdigit():
+            parser.error(f"expected <stage>=<jobs> with a stage of {', '.join(STAGES)}, got {value!r}")
+        jobs[stage] = int(count)
+    return jobs
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the study pipeline with cached stage outputs")
+    parser.add_argument("config", help="Pipeline config (JSON)")
+    parser.add_argument("--workdir", help="Work directory (default: the config's, relative to the config file)")
+    parser.add_argument("--jobs", action="append", default=[], metavar="STAGE=N",
+                        help="Concurrent tasks of a stage (repeatable)")
+    parser.add_argument("--force", action="append", default=[], choices=STAGES,
+                        help="Rerun the tasks of a stage even if cached, e.g. collect to sync new issues")
+    parser.add_argument("--until", choices=STAGES, default=STAGES[-1], help="Last stage to run")
+    parser.add_argument("--spans", help="Append timing spans of all stages to this trace file (see spans.py)")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = json.load(f)
+    config_dir = os.path.dirname(os.path.abspath(args.config))
+    if config.get("seeds"):
+        config["seeds"] = os.path.join(config_dir, config["seeds"])
+    if config.get("replay"):
+        config["replay"] = os.path.join(config_dir, config["replay"])
+    workdir = os.path.abspath(args.workdir or os.path.join(config_dir, config.get("workdir", "work")))
+    jobs = {**DEFAULT_JOBS, **config.get("jobs", {}), **parse_jobs(args.jobs, parser)}
+
+    if args.spans:
+        spans.configure(os.path.abspath(args.spans))
+    study = StudyPipeline(config, workdir, args.until)
+    pipeline = Pipeline(workdir, [Stage(name, jobs[name]) for name in STAGES], force=args.force)
+    for task in study.roots():
+        pipeline.add(task)
+    failed = pipeline.run()
+    pipeline.summary()
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Nested timing spans and counters for the scripts of the study, written to an append-only
+trace file and exported for chrome://tracing (or Perfetto) and for flamegraphs.
+
+Tracing is off unless SPANS_FILE names the trace file. Then every finished span appends one
+JSON line (name, ';'-joined stack of enclosing spans, start and duration in microseconds,
+pid, thread and arguments), and the counters of a process are appended when it exits. The
+stack of open spans is passed to child processes in SPANS_STACK, so the spans of a replay
+started by a reduction predicate started by the pipeline nest under each other. When
+SPANS_FILE is not set, span() returns a shared no-op object and count() returns at once.
+
+In Python:
+
+    import spans
+    with spans.span("dedup", files=len(paths)) as s:
+        ...
+        spans.count("dedup.removed")
+        s.annotate(unique=len(unique))
+
+From shell scripts, through the CLI (only worth calling when SPANS_FILE is set):
+
+    python3 spans.py run [--arg K=V ...] NAME -- COMMAND ...   (exit status passed through)
+    python3 spans.py record [--arg K=V ...] [--pid PID] NAME START END ...
+                                                    (times as in $EPOCHREALTIME)
+
+replay_wasm.sh times every runtime call and appends its lines itself (span_record), which
+costs a printf instead of a Python start per span.
+
+Exporting a trace:
+
+    python3 spans.py chrome  TRACE [-o trace.json]
+    python3 spans.py folded  TRACE [-o stacks.folded]     (flamegraph.pl / speedscope input)
+    python3 spans.py summary TRACE
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+FILE_ENV = "SPANS_FILE"
+STACK_ENV = "SPANS_STACK"
+
+_fd = None
+_lock = threading.Lock()
+_local = threading.local()
+_counters = {}
+_process = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else "python"
+_INHERITED = [name for name in os.environ.get(STACK_ENV, "").split(";") if name]
+
+def frame_name(name):
+    """Stack frames are ';'-separated in the trace and in folded stacks."""
+    return str(name).replace(";", ":")
+
+def configure(path):
+    """Starts writing spans to path (as if SPANS_FILE were set), also for child processes."""
+    global _fd
+    if _fd is not None:
+        os.close(_fd)
+    os.environ[FILE_ENV] = path
+    _fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+def enabled():
+    return _fd is not None
+
+def _open():
+    """Open spans of this thread."""
+    opened = getattr(_local, "open", None)
+    if opened is None:
+        opened = _local.open = []
+    return opened
+
+def _stack():
+    """
+    Names of the spans open in this thread, below those inherited from the parent process or,
+    in other threads, those open in the main thread (kept in SPANS_STACK for child processes).
+    """
+    if threading.current_thread() is threading.main_thread():
+        base = _INHERITED
+    else:
+        base = [name for name in os.environ.get(STACK_ENV, "").split(";") if name]
+    return base + [s.name for s in _open()]
+
+def _write(record):
+    # One write per line: O_APPEND keeps the lines of concurrent processes whole
+    os.write(_fd, (json.dumps(record, separators=(",", ":")) + "\n").encode())
+
+class Span:
+    """An open span; use span() to get one."""
+
+    __slots__ = ("name", "args", "start", "wall", "stack")
+
+    def __init__(self, name, args):
+        self.name = frame_name(name)
+        self.args = args
+
+    def annotate(self, **args):
+        self.args.update(args)
+
+    def __enter__(self):
+        self.stack = ";".join(_stack() + [self.name])
+        _open().append(self)
+        if threading.current_thread() is threading.main_thread():
+            os.environ[STACK_ENV] = self.stack
+        self.wall = time.time_ns() // 1000
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = (time.perf_counter_ns() - self.start) // 1000
+        _open().pop()
+        if threading.current_thread() is threading.main_thread():
+            parent = self.stack.rpartition(";")[0]
+            if parent:
+                os.environ[STACK_ENV] = parent
+            else:
+                os.environ.pop(STACK_ENV, None)
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        _write({"name": self.name, "stack": self.stack, "ts": self.wall, "dur": duration,
+                "pid": os.getpid(), "tid": threading.get_native_id(), "proc": _process, "args": self.args})
+        return False
+
+class _NoSpan:
+    __slots__ = ()
+
+    def annotate(self, **args):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NO_SPAN = _NoSpan()
+
+def span(name, **args):
+    """Context manager timing the enclosed block as a child of the innermost open span."""
+    if _fd is None:
+        return _NO_SPAN
+    return Span(name, args)
+
+def count(name, value=1):
+    """Adds value to a counter of this process (written at exit) and of the innermost open span."""
+    if _fd is None:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+    opened = _open()
+    if opened:
+        opened[-1].args[name] = opened[-1].args.get(name, 0) + value
+
+def environ(env=None):
+    """Environment for a child process, carrying the calling thread's open spans."""
+    env = dict(os.environ if env is None else env)
+    if _fd is not None:
+        stack = _stack()
+        if stack:
+            env[STACK_ENV] = ";".join(stack)
+    return env
+
+def record(name, start_us, end_us, pid=None, process=None, **args):
+    """Appends a span timed by the caller (wall-clock microseconds) below the open spans."""
+    if _fd is None:
+        return
+    # Spans of another process (a shell script) go on that process's own track
+    tid = pid or threading.get_native_id()
+    _write({"name": frame_name(name), "stack": ";".join(_stack() + [frame_name(name)]), "ts": int(start_us),
+            "dur": max(0, int(end_us - start_us)), "pid": pid or os.getpid(), "tid": tid,
+            "proc": process or _process, "args": args})
+
+def _flush_counters():
+    if _fd is None or not _counters:
+        return
+    now = time.time_ns() // 1000
+    with _lock:
+        for name, value in sorted(_counters.items()):
+            _write({"counter": name, "value": value, "ts": now, "pid": os.getpid(), "proc": _process,
+                    "stack": ";".join(_stack())})
+        _counters.clear()
+
+if os.environ.get(FILE_ENV):
+    configure(os.environ[FILE_ENV])
+atexit.register(_flush_counters)
+
+# ----------- reading and exporting traces -----------
+
+def read_trace(path):
+    """(spans, counters) of a trace file; a line cut short by a killed process is skipped."""
+    spans, counters = [], []
+    with open(path, errors="replace") as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            (counters if "counter" in event else spans).append(event)
+    return spans, counters
+
+def chrome_trace(spans, counters):
+    """Trace-event JSON object: complete events per span, counter events, process names."""
+    events = []
+    names = {}
+    for s in spans:
+        names.setdefault(s["pid"], s.get("proc", ""))
+        events.append({"ph": "X", "name": s["name"], "cat": s["stack"].split(";", 1)[0],
+                       "ts": s["ts"], "dur": s["dur"], "pid": s["pid"], "tid": s["tid"],
+                       "args": {**s.get("args", {}), "stack": s["stack"]}})
+    for c in counters:
+        names.setdefault(c["pid"], c.get("proc", ""))
+        events.append({"ph": "C", "name": c["counter"], "ts": c["ts"], "pid": c["pid"], "tid": 0,
+                       "args": {"value": c["value"]}})
+    events.sort(key=lambda e: (e["ts"], -e.get("dur", 0)))
+    for pid, name in names.items():
+        events.append({"ph": "M", "name": "process_name", "pid": pid, "tid": 0, "args": {"name": f"{name} ({pid})"}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+def folded_stacks(spans):
+    """
+    {stack: self time in microseconds}: a span's duration minus that of the spans directly
+    below it. Spans of parallel children can add up to more than their parent's duration;
+    such parents get no self time.
+    """
+    total = {}
+    for s in spans:
+        total[s["stack"]] = total.get(s["stack"], 0) + s["dur"]
+    children = {}
+    for stack, duration in total.items():
+        parent, sep, _ = stack.rpartition(";")
+        if sep:
+            children[parent] = children.get(parent, 0) + duration
+    return {stack: max(0, duration - children.get(stack, 0)) for stack, duration in total.items()}
+
+def summary(spans, counters, out=sys.stdout):
+    by_name = {}
+    for s in spans:
+        calls, duration, longest = by_name.get(s["name"], (0, 0, 0))
+        by_name[s["name"]] = (calls + 1, duration + s["dur"], max(longest, s["dur"]))
+    selfs = {}
+    for stack, self_time in folded_stacks(spans).items():
+        name = stack.rsplit(";", 1)[-1]
+        selfs[name] = selfs.get(name, 0) + self_time
+    print(f"{'span':<32} {'calls':>8} {'total s':>10} {'self s':>10} {'mean ms':>10} {'max ms':>10}", file=out)
+    for name, (calls, duration, longest) in sorted(by_name.items(), key=lambda item: -item[1][1]):
+        print(f"{name:<32} {calls:>8} {duration / 1e6:>10.3f} {selfs.get(name, 0) / 1e6:>10.3f} "
+              f"{duration / calls / 1e3:>10.2f} {longest / 1e3:>10.2f}", file=out)
+    totals = {}
+    for c in counters:
+        totals[c["counter"]] = totals.get(c["counter"], 0) + c["value"]
+    if totals:
+        print(file=out)
+        for name, value in sorted(totals.items()):
+            print(f"{name:<32} {value:>12}", file=out)
+
+# ----------- command line -----------
+
+def parse_pairs(values, error):
+    args = {}
+    for value in values:
+        key, sep, raw = value.partition("=")
+        if not sep:
+            error(f"expected K=V, got {value!r}")
+        args[key] = raw
+    return args
+
+def micros(seconds):
+    """Microseconds of a decimal seconds string such as $EPOCHREALTIME, without float rounding."""
+    whole, _, fraction = seconds.partition(".")
+    return int(whole) * 1000000 + int((fraction + "000000")[:6])
+
+def main():
+    # Imported here so that importing this module stays cheap for the scripts it times
+    import argparse
+    import subprocess
+    global _process
+    parser = argparse.ArgumentParser(description="Timing spans: record from shell scripts, export traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("run", help="Run a command as a span (a plain exec when tracing is off)")
+    p.add_argument("name")
+    p.add_argument("--arg", action="append", default=[], metavar="K=V")
+    p.add_argument("cmd", nargs=argparse.REMAINDER)
+    p = commands.add_parser("record", help="Record spans timed by the caller: NAME START END ...")
+    p.add_argument("--arg", action="append", default=[], metavar="K=V")
+    p.add_argument("--pid", type=int, help="Process the spans belong to (e.g. $BASHPID)")
+    p.add_argument("--proc", help="Name of that process")
+    p.add_argument("spans", nargs="+", metavar="NAME START END")
+    for name, help_text in (("chrome", "Export to the Chrome trace-event format"),
+                            ("folded", "Export folded stacks (self time in microseconds)"),
+                            ("summary", "Time per span name and counter totals")):
+        p = commands.add_parser(name, help=help_text)
+        p.add_argument("trace")
+        if name != "summary":
+            p.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        cmd = args.cmd[1:] if args.cmd[:1] == ["--"] else args.cmd
+        if not cmd:
+            parser.error("run: no command given")
+        if _fd is None:
+            os.execvp(cmd[0], cmd)
+        _process = os.path.basename(cmd[0])
+        with span(args.name, **parse_pairs(args.arg, parser.error)) as s:
+            returncode = subprocess.run(cmd, env=environ()).returncode
+            s.annotate(status=returncode)
+        sys.exit(returncode if returncode >= 0 else 128 - returncode)
+    if args.command == "record":
+        if len(args.spans) % 3:
+            parser.error("record: expected NAME START END triples")
+        extra = parse_pairs(args.arg, parser.error)
+        for i in range(0, len(args.spans), 3):
+            name, start, end = args.spans[i:i + 3]
+            record(name, micros(start), micros(end), args.pid, args.proc, **extra)
+        return
+
+    spans, counters = read_trace(args.trace)
+    if args.command == "summary":
+        summary(spans, counters)
+        return
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        if args.command == "chrome":
+            json.dump(chrome_trace(spans, counters), out)
+        else:
+            for stack, self_time in sorted(folded_stacks(spans).items()):
+                if self_time:
+                    print(f"{stack} {self_time}", file=out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == "__main__":
+    main()
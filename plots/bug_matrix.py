@@ -0,0 +1,185 @@
+"""
+Queries over the rq3/rq4 bug spreadsheet (WASM_Fuzzing_Study_Bugs.csv) as a boolean matrix.
+
+The spreadsheet has one row per bug and, among summary columns, one column per technique
+and seed corpus ("wadiff-specbench", "wasmaker-rtbench", ...; "transplant" counts as
+transplantation of rtbench). Those columns become a bugs x (technique, corpus) boolean
+matrix, and every query is a few array operations on it: unique bugs of a corpus, detection
+counts per technique or corpus, pairwise overlaps (a matrix product) and the marginal
+contribution of each corpus (the bugs lost without it).
+
+Results of new campaigns go into separate CSV files (BugID plus <technique>-<corpus>
+columns, non-empty or nonzero meaning found) passed with --results; they are joined on the
+bug id, so the spreadsheet itself is never rewritten and new bugs add rows.
+
+Usage:
+    python bug_matrix.py [--csv FILE] [--results FILE]... summary
+    python bug_matrix.py unique    <corpus> [--technique T]
+    python bug_matrix.py counts    [--by technique|corpus|column]
+    python bug_matrix.py overlap   [--by technique|corpus|column]
+    python bug_matrix.py marginal  [--by technique|corpus] [--technique T]
+"""
+import argparse
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dataset import dataset, load_bugs
+
+# <technique>-<corpus> result columns; "<technique>-any" columns are summaries
+RESULT_COLUMN = re.compile(r"(?P<technique>[a-z][a-z0-9_]*)-(?P<corpus>[a-z][a-z0-9_]*)")
+# Columns named after a technique alone, with the corpus they ran on
+SINGLE_CORPUS_COLUMNS = {"transplant": ("transplant", "rtbench")}
+
+def result_column(name):
+    """(technique, corpus) of a result column name, or None for summary and other columns."""
+    if name in SINGLE_CORPUS_COLUMNS:
+        return SINGLE_CORPUS_COLUMNS[name]
+    match = RESULT_COLUMN.fullmatch(name)
+    if not match or match.group("corpus") == "any":
+        return None
+    return match.group("technique"), match.group("corpus")
+
+class BugMatrix:
+    """found[i, j]: bug bug_ids[i] was found by technique techniques[j] on corpus corpora[j]."""
+
+    def __init__(self, bug_ids, columns, found):
+        self.bug_ids = np.asarray(bug_ids, dtype=object)
+        self.columns = list(columns)
+        self.found = np.asarray(found, dtype=bool)
+        self.techniques = np.array([result_column(c)[0] for c in self.columns], dtype=object)
+        self.corpora = np.array([result_column(c)[1] for c in self.columns], dtype=object)
+
+    @classmethod
+    def from_frame(cls, df, id_column="bug_id"):
+        """From a frame with one row per bug; result columns are boolean or finding counts."""
+        columns = [c for c in df.columns if c != id_column and result_column(c)]
+        found = df[columns].fillna(0).to_numpy().astype(bool) if columns else np.zeros((len(df), 0), dtype=bool)
+        return cls(df[id_column].astype(str).to_numpy(), columns, found)
+
+    @classmethod
+    def load(cls, path=None, results=()):
+        """The spreadsheet (dataset.bugs by default) joined with the result files of new campaigns."""
+        df = dataset.bugs if path is None else load_bugs(path)
+        matrix = cls.from_frame(df)
+        for result in results:
+            matrix = matrix.join(cls.from_frame(read_results(result)))
+        return matrix
+
+    def join(self, other):
+        """Union of two matrices by bug id; columns present in both are ORed."""
+        bug_ids = list(dict.fromkeys(list(self.bug_ids) + list(other.bug_ids)))
+        columns = list(dict.fromkeys(self.columns + other.columns))
+        rows = {bug: i for i, bug in enumerate(bug_ids)}
+        cols = {column: j for j, column in enumerate(columns)}
+        found = np.zeros((len(bug_ids), len(columns)), dtype=bool)
+        for matrix in (self, other):
+            r = np.array([rows[bug] for bug in matrix.bug_ids], dtype=np.int64)
+            c = np.array([cols[column] for column in matrix.columns], dtype=np.int64)
+            found[np.ix_(r, c)] |= matrix.found
+        return BugMatrix(bug_ids, columns, found)
+
+    def select(self, technique=None, corpus=None):
+        """Matrix restricted to the columns of a technique and/or corpus."""
+        keep = np.ones(len(self.columns), dtype=bool)
+        if technique:
+            keep &= self.techniques == technique
+        if corpus:
+            keep &= self.corpora == corpus
+        return BugMatrix(self.bug_ids, [c for c, k in zip(self.columns, keep) if k], self.found[:, keep])
+
+    def grouped(self, by="corpus"):
+        """(labels, bugs x labels boolean matrix): found by any column of each technique or corpus."""
+        if by == "column":
+            return list(self.columns), self.found
+        keys = self.techniques if by == "technique" else self.corpora
+        labels, codes = np.unique(keys, return_inverse=True)
+        onehot = np.zeros((len(self.columns), len(labels)), dtype=np.int32)
+        onehot[np.arange(len(self.columns)), codes] = 1
+        return list(labels), (self.found.astype(np.int32) @ onehot) > 0
+
+    def counts(self, by="corpus"):
+        """Bugs detected per technique, corpus or column."""
+        labels, found = self.grouped(by)
+        return pd.Series(found.sum(axis=0), index=labels, name="bugs").sort_values(ascending=False)
+
+    def unique(self, corpus, by="corpus"):
+        """Bug ids found with corpus (a technique when by="technique") and with no other."""
+        labels, found = self.grouped(by)
+        if corpus not in labels:
+            raise KeyError(f"Unknown {by} {corpus!r} (have: {', '.join(labels)})")
+        only = found[:, labels.index(corpus)] & (found.sum(axis=1) == 1)
+        return list(self.bug_ids[only])
+
+    def overlap(self, by="corpus"):
+        """Pairwise overlap: bugs found by both labels (the diagonal holds each label's count)."""
+        labels, found = self.grouped(by)
+        both = found.T.astype(np.int32) @ found.astype(np.int32)
+        return pd.DataFrame(both, index=labels, columns=labels)
+
+    def marginal(self, by="corpus"):
+        """
+        Marginal contribution of each label: bugs lost if it were dropped (found by it only),
+        and its share of all bugs found.
+        """
+        labels, found = self.grouped(by)
+        total = int(found.any(axis=1).sum())
+        only = found & (found.sum(axis=1) == 1)[:, None]
+        lost = only.sum(axis=0)
+        return pd.DataFrame({"bugs": found.sum(axis=0), "lost_without": lost,
+                             "share_lost": lost / total if total else 0.0}, index=labels)
+
+def read_results(path):
+    """Result file of a campaign: BugID (or bug_id) and result columns; empty, 0 or FALSE is not found."""
+    raw = pd.read_csv(path, dtype=str, keep_default_na=False)
+    id_column = "BugID" if "BugID" in raw.columns else "bug_id"
+    df = pd.DataFrame({"bug_id": raw[id_column].str.strip()})
+    for column in raw.columns:
+        if column != id_column and result_column(column.strip()):
+            values = raw[column].str.strip().str.upper()
+            df[column.strip()] = ~values.isin(["", "0", "FALSE"])
+    return df[df["bug_id"].ne("")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Queries over the bug spreadsheet")
+    parser.add_argument("--csv", help="Spreadsheet to load (default: rq3/WASM_Fuzzing_Study_Bugs.csv, cached)")
+    parser.add_argument("--results", action="append", default=[], metavar="FILE",
+                        help="Result file of a new campaign to join (repeatable)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("summary", help="Bugs and columns, with the per-technique and per-corpus counts")
+    p = commands.add_parser("unique", help="Bugs found only with one corpus")
+    p.add_argument("corpus")
+    p.add_argument("--technique", help="Only consider this technique's columns")
+    for name, help_text in (("counts", "Bugs detected per label"), ("overlap", "Bugs found by both of two labels")):
+        p = commands.add_parser(name, help=help_text)
+        p.add_argument("--by", choices=["technique", "corpus", "column"], default="corpus")
+    p = commands.add_parser("marginal", help="Bugs lost without each corpus (or technique)")
+    p.add_argument("--by", choices=["technique", "corpus"], default="corpus")
+    p.add_argument("--technique", help="Only consider this technique's columns")
+    args = parser.parse_args()
+
+    matrix = BugMatrix.load(args.csv, args.results)
+    if args.command == "summary":
+        found = int(matrix.found.any(axis=1).sum())
+        print(f"{len(matrix.bug_ids)} bugs ({found} found by some column), {len(matrix.columns)} columns")
+        for by in ("technique", "corpus"):
+            print(f"\nper {by}:")
+            print(matrix.counts(by).to_string())
+    elif args.command == "unique":
+        try:
+            bugs = matrix.select(technique=args.technique).unique(args.corpus)
+        except KeyError as e:
+            parser.error(e.args[0])
+        print("\n".join(bugs))
+        print(f"{len(bugs)} bugs found only with {args.corpus}", file=sys.stderr)
+    elif args.command == "counts":
+        print(matrix.counts(args.by).to_string())
+    elif args.command == "overlap":
+        print(matrix.overlap(args.by).to_string())
+    else:
+        print(matrix.select(technique=args.technique).marginal(args.by).to_string(float_format="%.3f"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Set algebra over bug lists with bitmaps, and UpSet plots of the result.
+
+Every bug gets an integer id (its position in BugSets.ids) and every set (a seed corpus, a
+fuzzer, a fuzzer on a corpus, ...) becomes a bitmap over the bug ids, packed into uint64
+words. Set and intersection sizes are popcounts of ANDed bitmaps. The exclusive
+intersections (bugs found by exactly a given combination of sets) are counted from each
+bug's membership signature, the bits of all sets for that bug, with one np.unique, so the
+cost grows with the number of bugs and not with the 2**n combinations of n sets.
+
+UpSet plots (Lex et al. 2014) show the exclusive intersections as bars above a matrix of
+the sets taking part in each, and scale to many more sets than Venn diagrams.
+
+Usage:
+    python bug_sets.py [column ...] [--lists FILE ...] [--top N] [-o upset.pdf]
+        column: boolean/count columns of the rq3 bug table (default: the fuzzer x corpus columns)
+        --lists: plain bug lists, one id per line, named after the file (e.g. rq2/venn/*.txt)
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dataset import dataset
+
+# Fuzzer x seed corpus columns of the rq3 bug table
+FUZZERS = ["wadiff", "wasmaker", "wapplique"]
+
+if hasattr(np, "bitwise_count"):
+    def popcount(words):
+        return int(np.bitwise_count(words).sum())
+else:
+    # numpy < 2.0
+    _BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        return int(_BYTE_COUNTS[words.view(np.uint8)].sum(dtype=np.int64))
+
+class BugSets:
+    """Named sets of bug ids as bitmaps: bitmaps[i] holds the bugs of names[i], bit j for ids[j]."""
+
+    def __init__(self, names, ids, membership):
+        """membership: boolean array (sets x bugs)."""
+        self.names = list(names)
+        self.ids = list(ids)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        packed = np.packbits(np.asarray(membership, dtype=bool), axis=1, bitorder="little")
+        words = -(-packed.shape[1] // 8)
+        padded = np.zeros((len(self.names), words * 8), dtype=np.uint8)
+        padded[:, :packed.shape[1]] = packed
+        self.bitmaps = padded.view(np.uint64)
+
+    @classmethod
+    def from_sets(cls, sets):
+        """From a mapping set name -> iterable of bug ids."""
+        ids = list(dict.fromkeys(bug for members in sets.values() for bug in members))
+        position = {bug: j for j, bug in enumerate(ids)}
+        membership = np.zeros((len(sets), len(ids)), dtype=bool)
+        for i, members in enumerate(sets.values()):
+            membership[i, [position[bug] for bug in members]] = True
+        return cls(sets.keys(), ids, membership)
+
+    @classmethod
+    def from_pairs(cls, df, set_column, id_column):
+        """From a long frame with one (set, bug id) row per finding."""
+        names = df[set_column].astype("category").cat.remove_unused_categories()
+        bugs = df[id_column].astype("category")
+        membership = np.zeros((len(names.cat.categories), len(bugs.cat.categories)), dtype=bool)
+        membership[names.cat.codes.to_numpy(), bugs.cat.codes.to_numpy()] = True
+        return cls(names.cat.categories, bugs.cat.categories, membership)
+
+    @classmethod
+    def from_table(cls, df, columns, id_column="bug_id"):
+        """From a wide frame with one row per bug and a boolean or count column per set."""
+        membership = df[columns].to_numpy().astype(bool).T
+        return cls(columns, df[id_column], membership)
+
+    def bitmap(self, names):
+        """AND of the bitmaps of the named sets."""
+        rows = [self.index[name] for name in names]
+        return np.bitwise_and.reduce(self.bitmaps[rows], axis=0)
+
+    def size(self, name):
+        return popcount(self.bitmaps[self.index[name]])
+
+    def intersection_size(self, *names):
+        """Number of bugs in all of the named sets."""
+        return popcount(self.bitmap(names))
+
+    def members(self, *names):
+        """Bug ids in all of the named sets."""
+        bits = np.unpackbits(self.bitmap(names).view(np.uint8), bitorder="little")[:len(self.ids)]
+        return [self.ids[j] for j in np.flatnonzero(bits)]
+
+    def signatures(self):
+        """Membership signature of every bug: a (bugs x ceil(sets / 8)) uint8 array of packed set bits."""
+        membership = np.unpackbits(self.bitmaps.view(np.uint8), axis=1, bitorder="little")[:, :len(self.ids)]
+        return np.packbits(membership.T, axis=1, bitorder="little")
+
+    def exclusive(self):
+        """
+        Exclusive intersections: one row per combination of sets that some bugs belong to
+        exactly, with a boolean column per set, its degree (number of sets) and its size,
+        largest first.
+        """
+        signatures, counts = np.unique(self.signatures(), axis=0, return_counts=True)
+        membership = np.unpackbits(signatures, axis=1, bitorder="little")[:, :len(self.names)].astype(bool)
+        df = pd.DataFrame(membership, columns=self.names)
+        df["degree"] = membership.sum(axis=1)
+        df["size"] = counts
+        df = df[df["degree"] > 0]
+        return df.sort_values(["size", "degree"], ascending=[False, True], kind="stable").reset_index(drop=True)
+
+def plot_upset(sets, path, top=30, title=None):
+    """UpSet plot of the `top` largest exclusive intersections of sets, written to path."""
+    import matplotlib.pyplot as plt
+
+    combos = sets.exclusive().head(top)
+    names = [name for name in sets.names if combos[name].any()]
+    sizes = {name: sets.size(name) for name in names}
+    names.sort(key=lambda name: -sizes[name])
+    x = np.arange(len(combos))
+    y = np.arange(len(names))
+
+    fig = plt.figure(figsize=(max(6, 0.35 * len(combos) + 3), max(4, 0.3 * len(names) + 3)))
+    grid = fig.add_gridspec(2, 2, width_ratios=[4, 1], height_ratios=[2, max(1, 0.2 * len(names))],
+                            wspace=0.02, hspace=0.02)
+    ax_bars = fig.add_subplot(grid[0, 0])
+    ax_matrix = fig.add_subplot(grid[1, 0], sharex=ax_bars)
+    ax_sizes = fig.add_subplot(grid[1, 1], sharey=ax_matrix)
+
+    ax_bars.bar(x, combos["size"], color="#333333", width=0.6)
+    for xi, size in zip(x, combos["size"]):
+        ax_bars.text(xi, size, str(size), ha="center", va="bottom", fontsize=9)
+    ax_bars.set_ylabel("Bugs (exclusive)", fontsize=11)
+    ax_bars.spines[["top", "right"]].set_visible(False)
+    ax_bars.tick_params(axis="x", bottom=False, labelbottom=False)
+    if title:
+        ax_bars.set_title(title, fontsize=13, fontweight="bold")
+
+    # Dot matrix: sets x intersections, filled where the set takes part
+    member = combos[names].to_numpy().T
+    xs, ys = np.meshgrid(x, y)
+    ax_matrix.scatter(xs.ravel(), ys.ravel(), s=60, color="#dddddd", zorder=1)
+    ax_matrix.scatter(xs[member], ys[member], s=60, color="#333333", zorder=2)
+    for xi in x:
+        rows = np.flatnonzero(member[:, xi])
+        if len(rows) > 1:
+            ax_matrix.plot([xi, xi], [rows.min(), rows.max()], color="#333333", linewidth=2, zorder=1)
+    ax_matrix.set_xlim(-0.6, len(combos) - 0.4)
+    ax_matrix.set_ylim(len(names) - 0.5, -0.5)
+    ax_matrix.set_yticks(y)
+    ax_matrix.set_yticklabels(names, fontsize=10)
+    ax_matrix.tick_params(axis="both", left=False, bottom=False, labelbottom=False)
+    for spine in ax_matrix.spines.values():
+        spine.set_visible(False)
+
+    ax_sizes.barh(y, [sizes[name] for name in names], color="#0072B2", height=0.6)
+    ax_sizes.set_xlabel("Set size", fontsize=11)
+    ax_sizes.tick_params(axis="y", left=False, labelleft=False)
+    ax_sizes.spines[["top", "right"]].set_visible(False)
+
+    fig.savefig(path, dpi=300, bbox_inches="tight")
+    plt.close(fig)
+
+def fuzzer_columns(df):
+    """<fuzzer>-<corpus> columns of the rq3 bug table (the -any summaries excluded)."""
+    return [c for c in df.columns if c.split("-", 1)[0] in FUZZERS and not c.endswith("-any")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Exclusive intersections of bug sets and their UpSet plot")
+    parser.add_argument("columns", nargs="*", help="Columns of the rq3 bug table to use as sets")
+    parser.add_argument("--lists", nargs="+", help="Bug list files (one id per line) to use as sets instead")
+    parser.add_argument("--top", type=int, default=30, help="Intersections shown in the plot")
+    parser.add_argument("-o", "--output", help="Write an UpSet plot here (otherwise print the intersections)")
+    args = parser.parse_args()
+
+    if args.lists:
+        sets = {}
+        for path in args.lists:
+            with open(path) as f:
+                sets[os.path.splitext(os.path.basename(path))[0]] = [line.strip() for line in f if line.strip()]
+        bug_sets = BugSets.from_sets(sets)
+    else:
+        df = dataset.bugs
+        columns = args.columns or fuzzer_columns(df)
+        unknown = [c for c in columns if c not in df.columns]
+        if unknown:
+            parser.error(f"unknown column(s) {', '.join(unknown)}")
+        bug_sets = BugSets.from_table(df, columns)
+
+    if args.output:
+        plot_upset(bug_sets, args.output, args.top)
+        return
+    combos = bug_sets.exclusive()
+    for _, row in combos.iterrows():
+        members = [name for name in bug_sets.names if row[name]]
+        print(f"{row['size']}\t{' & '.join(members)}")
+    print(f"{len(bug_sets.ids)} bugs in {len(bug_sets.names)} sets, {len(combos)} non-empty intersections",
+          file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
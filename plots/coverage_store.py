@@ -0,0 +1,280 @@
+"""
+Coverage time series of fuzzing campaigns, from the fuzzers' progress logs to the curves of
+rq2/coverage_progress.
+
+ingest walks a campaign directory laid out as <runtime>/<seed corpus>/<repetition>/...
+(see --layout) and reads every progress log in it: AFL++ plot_data files, or any CSV with a
+time column (relative_time, unix_time, seconds) and a coverage column (map_size, coverage,
+edges_found). Logs are read in chunks, coverage is made cumulative, and only the samples
+where it grows are kept (plus the last one, which marks the end of the run). That loses
+nothing of the step curve, so a multi-day run sampled every second shrinks to a few
+thousand rows. Runs are appended to a Parquet store one row group at a time.
+
+curves resamples the runs of each (runtime, seed corpus) onto a common time grid, averages
+the repetitions with a 95% confidence band (Student t), and downsamples the mean curve with
+largest-triangle-three-buckets (LTTB), keeping the band at the same points. The plots read
+the curves through load_curves, which caches them in plots/.cache.
+
+Usage:
+    python coverage_store.py ingest <campaign_dir> -o coverage.parquet [--layout REGEX] [--log-name plot_data]
+    python coverage_store.py curves coverage.parquet [--metric coverage|edges] [--points N] [-o curves.csv]
+"""
+import argparse
+import hashlib
+import math
+import os
+import re
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from dataset import BENCHMARKS, CACHE_DIR, RUNTIMES, normalize_runtime
+
+# Bump when the curves computed from a store change
+CURVES_VERSION = 1
+
+DEFAULT_LAYOUT = r"(?P<runtime>[^/]+)/(?P<seed>[^/]+)/(?P<repetition>[^/]+)"
+CHUNK_ROWS = 1 << 18
+# Resolution of the common time grid the runs are resampled onto, before LTTB
+MAX_GRID = 20000
+
+TIME_COLUMNS = ["relative_time", "seconds", "time", "unix_time"]
+METRIC_COLUMNS = {
+    "coverage": ["map_size", "coverage", "bitmap_cvg"],
+    "edges": ["edges_found", "edges"],
+}
+
+# Two-sided 95% Student t quantiles by degrees of freedom; 1.96 beyond
+T95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228, 2.201, 2.179, 2.160,
+       2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086, 2.080, 2.074, 2.069, 2.064, 2.060, 2.056,
+       2.052, 2.048, 2.045, 2.042]
+
+# ----------- ingestion -----------
+
+def log_columns(path):
+    """Column names of a progress log from its header ("# relative_time, cycles_done, ...")."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        header = f.readline()
+    return [name.strip().lower() for name in header.lstrip("#").split(",")]
+
+def pick(columns, candidates):
+    return next((name for name in candidates if name in columns), None)
+
+def numeric(values):
+    # map_size is written as a percentage ("12.34%")
+    return pd.to_numeric(values.str.rstrip("%"), errors="coerce").to_numpy(dtype=np.float64)
+
+def read_log(path):
+    """
+    Change points of a progress log: (seconds, coverage, edges) arrays holding the first
+    sample, every sample where a cumulative metric grows, and the last sample. Metrics
+    missing from the log are NaN.
+    """
+    columns = log_columns(path)
+    time_column = pick(columns, TIME_COLUMNS)
+    metrics = [pick(columns, METRIC_COLUMNS[metric]) for metric in ("coverage", "edges")]
+    if time_column is None or not any(metrics):
+        raise ValueError(f"{path}: no time or coverage column in header {columns}")
+    usecols = [time_column] + [name for name in metrics if name]
+
+    parts = []
+    start = None
+    best = np.full(2, -np.inf)      # cumulative maximum of each metric so far
+    last = None
+    reader = pd.read_csv(path, names=columns, skiprows=1, usecols=usecols, skipinitialspace=True,
+                         chunksize=CHUNK_ROWS, dtype=str, on_bad_lines="skip")
+    for chunk in reader:
+        seconds = numeric(chunk[time_column])
+        values = np.column_stack([numeric(chunk[name]) if name else np.full(len(chunk), np.nan)
+                                  for name in metrics])
+        valid = ~np.isnan(seconds)
+        seconds, values = seconds[valid], values[valid]
+        if not len(seconds):
+            continue
+        if start is None:
+            start = seconds[0] if time_column == "unix_time" else 0.0
+        cumulative = np.fmax.accumulate(np.vstack([best, values]), axis=0)
+        grows = (cumulative[1:] > cumulative[:-1]).any(axis=1)
+        parts.append((seconds[grows] - start, cumulative[1:][grows]))
+        best = cumulative[-1]
+        last = (seconds[-1] - start, best)
+    if last is None:
+        return np.empty(0), np.empty(0), np.empty(0)
+    seconds = np.concatenate([p[0] for p in parts] + [[last[0]]])
+    values = np.vstack([p[1] for p in parts] + [last[1][None, :]])
+    # The last sample only marks the end of the run when coverage did not grow there
+    if len(seconds) > 1 and seconds[-1] == seconds[-2]:
+        seconds, values = seconds[:-1], values[:-1]
+    values[np.isinf(values)] = np.nan
+    return seconds, values[:, 0], values[:, 1]
+
+def find_logs(campaign_dir, layout=DEFAULT_LAYOUT, log_name="plot_data"):
+    """
+    Yields (runtime, seed, repetition, path) for the progress logs below campaign_dir whose
+    directory path (relative to campaign_dir) starts with a match of layout.
+    """
+    regex = re.compile(layout)
+    seen = set()
+    for root, dirs, files in os.walk(campaign_dir):
+        dirs.sort()
+        if log_name not in files:
+            continue
+        relative = os.path.relpath(root, campaign_dir).replace(os.sep, "/")
+        match = regex.match(relative)
+        if not match:
+            print(f"Warning: {os.path.join(root, log_name)} does not match the layout, skipped", file=sys.stderr)
+            continue
+        raw_runtime = match.group("runtime")
+        runtime = normalize_runtime(raw_runtime) or raw_runtime.lower()
+        seed = match.group("seed").lower()
+        repetition = match.group("repetition")
+        # Several fuzzer instances of one repetition (AFL++ -M/-S) are separate runs
+        if (runtime, seed, repetition) in seen:
+            repetition = f"{repetition}/{os.path.basename(root)}"
+        seen.add((runtime, seed, repetition))
+        yield runtime, seed, repetition, os.path.join(root, log_name)
+
+def ingest(campaign_dir, store, layout=DEFAULT_LAYOUT, log_name="plot_data"):
+    """Writes the change points of every progress log of a campaign to a Parquet store; returns (runs, rows)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([("runtime", pa.string()), ("seed", pa.string()), ("repetition", pa.string()),
+                        ("seconds", pa.float64()), ("coverage", pa.float64()), ("edges", pa.float64())])
+    runs = rows = 0
+    tmp = f"{store}.{os.getpid()}.tmp"
+    with pq.ParquetWriter(tmp, schema, compression="zstd") as writer:
+        for runtime, seed, repetition, path in find_logs(campaign_dir, layout, log_name):
+            try:
+                seconds, coverage, edges = read_log(path)
+            except (OSError, ValueError) as e:
+                print(f"Warning: could not read {path}: {e}", file=sys.stderr)
+                continue
+            if not len(seconds):
+                continue
+            n = len(seconds)
+            writer.write_table(pa.table([pa.array([runtime] * n), pa.array([seed] * n),
+                                         pa.array([repetition] * n), seconds, coverage, edges], schema=schema))
+            runs += 1
+            rows += n
+    os.replace(tmp, store)
+    return runs, rows
+
+# ----------- curves -----------
+
+def lttb(x, y, n_out):
+    """
+    Indices of the n_out points of (x, y) kept by largest-triangle-three-buckets
+    (Steinarsson 2013): the first and last point, and from each bucket in between the point
+    forming the largest triangle with the previous kept point and the next bucket's mean.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.append(np.linspace(1, n - 1, n_out - 1).astype(np.int64), n)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_x = x[edges[i + 1]:edges[i + 2]].mean()
+        next_y = y[edges[i + 1]:edges[i + 2]].mean()
+        areas = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(np.argmax(areas))
+        keep[i + 1] = a
+    return keep
+
+def step_values(seconds, values, grid):
+    """Step curve of one run at the grid times; NaN before its first and after its last sample."""
+    index = np.searchsorted(seconds, grid, side="right") - 1
+    result = values[np.clip(index, 0, None)]
+    return np.where((index >= 0) & (grid <= seconds[-1]), result, np.nan)
+
+def band(samples):
+    """Mean, 95% confidence bounds and number of runs over the rows (runs) of samples, per column."""
+    runs = (~np.isnan(samples)).sum(axis=0)
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        # Grid points covered by no run or a single run give NaN here; they are masked below
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(samples, axis=0)
+        sd = np.nanstd(samples, axis=0, ddof=1)
+    t = np.array(T95 + [1.96])[np.clip(runs - 1, 1, len(T95) + 1) - 1]
+    half = np.where(runs > 1, t * np.nan_to_num(sd) / np.sqrt(np.maximum(runs, 1)), 0.0)
+    return mean, mean - half, mean + half, runs
+
+def ordered(values, known):
+    return sorted(values, key=lambda v: (known.index(v) if v in known else len(known), v))
+
+def coverage_curves(store, metric="coverage", points=500):
+    """
+    Mean curve and 95% band over the repetitions of each (runtime, seed), downsampled to at
+    most `points` points: runtime, seed, seconds, hours, mean, low, high, runs.
+    """
+    df = pd.read_parquet(store, columns=["runtime", "seed", "repetition", "seconds", metric])
+    df = df.dropna(subset=[metric])
+    frames = []
+    for (runtime, seed), pair in df.groupby(["runtime", "seed"], sort=False):
+        runs = [(group["seconds"].to_numpy(), group[metric].to_numpy())
+                for _, group in pair.groupby("repetition", sort=False)]
+        end = max(seconds[-1] for seconds, _ in runs)
+        step = max(1.0, math.ceil(end / MAX_GRID))
+        grid = np.arange(0.0, end + step, step)
+        grid[-1] = min(grid[-1], end)
+        mean, low, high, count = band(np.vstack([step_values(s, v, grid) for s, v in runs]))
+        valid = ~np.isnan(mean)
+        grid, mean, low, high, count = grid[valid], mean[valid], low[valid], high[valid], count[valid]
+        keep = lttb(grid, mean, points)
+        frames.append(pd.DataFrame({"runtime": runtime, "seed": seed, "seconds": grid[keep],
+                                    "mean": mean[keep], "low": low[keep], "high": high[keep],
+                                    "runs": count[keep].astype("int32")}))
+    if not frames:
+        return pd.DataFrame(columns=["runtime", "seed", "seconds", "hours", "mean", "low", "high", "runs"])
+    curves = pd.concat(frames, ignore_index=True)
+    curves.insert(3, "hours", curves["seconds"] / 3600)
+    curves["runtime"] = pd.Categorical(curves["runtime"], ordered(curves["runtime"].unique(), RUNTIMES))
+    curves["seed"] = pd.Categorical(curves["seed"], ordered(curves["seed"].unique(), BENCHMARKS))
+    return curves
+
+def load_curves(store, metric="coverage", points=500):
+    """coverage_curves of a store, cached in plots/.cache until the store changes."""
+    st = os.stat(store)
+    key = f"{CURVES_VERSION}:{os.path.abspath(store)}:{st.st_size}:{st.st_mtime_ns}:{metric}:{points}"
+    path = os.path.join(CACHE_DIR, f"curves-{hashlib.sha256(key.encode()).hexdigest()[:16]}.pkl")
+    if os.path.exists(path):
+        return pd.read_pickle(path)
+    curves = coverage_curves(store, metric, points)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    curves.to_pickle(tmp)
+    os.replace(tmp, path)
+    return curves
+
+def main():
+    parser = argparse.ArgumentParser(description="Coverage time series of fuzzing campaigns")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("ingest", help="Store the coverage change points of a campaign's progress logs")
+    p.add_argument("campaign_dir")
+    p.add_argument("-o", "--output", required=True, help="Parquet store to write")
+    p.add_argument("--layout", default=DEFAULT_LAYOUT,
+                   help="Regex with runtime, seed and repetition groups, matched against the log's directory "
+                        "relative to campaign_dir (default: %(default)s)")
+    p.add_argument("--log-name", default="plot_data", help="File name of the progress logs (default: %(default)s)")
+
+    p = commands.add_parser("curves", help="Print the downsampled mean curves with their confidence bands")
+    p.add_argument("store")
+    p.add_argument("--metric", choices=list(METRIC_COLUMNS), default="coverage")
+    p.add_argument("--points", type=int, default=500, help="Points per curve after downsampling")
+    p.add_argument("-o", "--output", help="CSV to write (default: stdout)")
+
+    args = parser.parse_args()
+    if args.command == "ingest":
+        runs, rows = ingest(args.campaign_dir, args.output, args.layout, args.log_name)
+        print(f"Stored {runs} runs ({rows} change points) in {args.output}")
+        return
+    curves = coverage_curves(args.store, args.metric, args.points)
+    curves.to_csv(args.output or sys.stdout, index=False, float_format="%.6g")
+
+if __name__ == "__main__":
+    main()
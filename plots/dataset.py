@@ -0,0 +1,307 @@
+"""
+Shared data layer of the plot scripts.
+
+Every raw source under plots/ (CSV, TSV and the bug-set lists) is parsed once by a loader
+here. The loader normalises runtime names, dates and modes and stores the result as a
+typed Parquet file in plots/.cache. Cache files are named after the SHA-256 of their source
+files and of LOADER_VERSION, so editing a source or a loader invalidates exactly the frames
+built from it. Plots access frames lazily through `dataset`:
+
+    from dataset import dataset
+    df = dataset.lineage          # loaded (or built and cached) on first access
+
+Runtime columns hold the lowercase runtime keys of RUNTIMES; RUNTIME_DISPLAY maps them to
+the names shown in figures.
+
+Usage:
+    python dataset.py [--rebuild] [frame ...]    # build the cache and print a summary
+"""
+import argparse
+import csv
+import glob
+import hashlib
+import os
+import re
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+PLOTS_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(PLOTS_DIR, ".cache")
+
+# The age bands are defined with the seed ages they bin, in collection/get_age.py
+sys.path.insert(0, os.path.join(PLOTS_DIR, "..", "collection"))
+from get_age import AGE_BANDS, age_band
+
+# Bump when a loader changes its output
+LOADER_VERSION = 3
+
+RUNTIMES = ["wasmtime", "wasmer", "wamr", "wasmedge"]
+RUNTIME_DISPLAY = {"wasmtime": "Wasmtime", "wasmer": "Wasmer", "wamr": "WAMR", "wasmedge": "WasmEdge"}
+BENCHMARKS = ["llvmbench", "rtbench", "wasmbench", "specbench"]
+MODES = ["wapplique", "wasmaker", "both_fuzzers", "transplantation"]
+
+DATE_FORMATS = ["%b-%d-%Y", "%B-%d-%Y", "%m-%d-%Y", "%Y-%m-%d", "%b %d %Y", "%B %d %Y"]
+
+def normalize_runtime(raw):
+    """Lowercase runtime key of a runtime name ("WasmEdge", " wamr ", "wasmer (llvm)"), or None."""
+    if raw is None or pd.isna(raw):
+        return None
+    name = re.split(r"[ (]", str(raw).strip().lower())[0]
+    return name if name in RUNTIMES else None
+
+def runtime_keys(series):
+    """normalize_runtime over a Series, computed once per distinct name; unknown names become NA."""
+    series = series.astype("string")
+    keys = {name: normalize_runtime(name) for name in series.dropna().unique()}
+    return series.map(keys).astype("string")
+
+def runtime_lists(series):
+    """Runtime keys of "/"-separated runtime lists such as "wasmtime/wamr", as lists."""
+    series = series.astype("string")
+    lists = {raw: [rt for rt in map(normalize_runtime, raw.split("/")) if rt] for raw in series.dropna().unique()}
+    return series.map(lists)
+
+def split_runtimes(series):
+    """
+    Runtime keys of "/"-separated runtime lists, one per row of the result (indexed like
+    series, in list order); placeholders such as "#REF!" are dropped.
+    """
+    return runtime_lists(series).explode().dropna()
+
+def age_bands(months):
+    """
+    AGE_BANDS label of seed ages in months, as collection/get_age.py age_band assigns them
+    (computed once per distinct age); missing or negative ages are NA.
+    """
+    months = pd.to_numeric(pd.Series(months), errors="coerce")
+    labels = {m: age_band(m) for m in months.dropna().unique()}
+    return categorical(months.map(labels), list(AGE_BANDS.values()))
+
+def parse_month(raw):
+    """First day of the month of a date in any of DATE_FORMATS ("May-5-2024", "2024-05-05", ...)."""
+    s = (raw or "").strip().strip('"').replace("\t", " ")
+    if s.endswith(","):
+        s = s[:-1].strip()
+    for fmt in DATE_FORMATS:
+        try:
+            dt = datetime.strptime(s, fmt)
+            return datetime(dt.year, dt.month, 1)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date format: {raw!r}")
+
+def categorical(values, categories):
+    return pd.Categorical(values, categories=categories)
+
+# ----------- loaders -----------
+
+def load_coverage(path):
+    """rq2 coverage over time: runtime, seed, hour, coverage (percent)."""
+    df = pd.read_csv(path)
+    df["runtime"] = categorical(runtime_keys(df["runtime"]), RUNTIMES)
+    df["seed"] = categorical(df["seed"].str.strip().str.lower(), BENCHMARKS)
+    return df.astype({"hour": "int32", "coverage": "float64"})[["runtime", "seed", "hour", "coverage"]]
+
+def load_timeline(path):
+    """
+    rq1 transplantation timeline (bug.csv, no header): reveal_runtime, report_runtime,
+    test_id, report_date, reveal_date, both dates snapped to the month.
+    """
+    rows = []
+    with open(path, newline="") as f:
+        for i, row in enumerate(csv.reader(f), start=1):
+            if not row or all(not c.strip() for c in row):
+                continue
+            if len(row) < 5:
+                raise ValueError(f"{path}: row {i} has fewer than 5 columns: {row}")
+            reveal, report = normalize_runtime(row[0]), normalize_runtime(row[1])
+            if reveal is None or report is None:
+                raise ValueError(f"{path}: unknown runtime on row {i}: {row[:2]} (allowed: {', '.join(RUNTIMES)})")
+            rows.append({"reveal_runtime": reveal, "report_runtime": report, "test_id": row[2].strip().strip('"'),
+                         "report_date": parse_month(row[3]), "reveal_date": parse_month(row[4])})
+    if not rows:
+        raise ValueError(f"No data loaded from {path}")
+    df = pd.DataFrame(rows)
+    for column in ("reveal_runtime", "report_runtime"):
+        df[column] = categorical(df[column], RUNTIMES)
+    return df
+
+def normalize_lineage(df):
+    """
+    Typed lineage rows from raw bug_id, seed_runtime (a "/"-separated list), avg_seed_age_months,
+    mode and buggy_runtime columns: adds seed_runtimes (the list's runtime keys) and age_band.
+    """
+    df = df.reset_index(drop=True)
+    out = pd.DataFrame({"bug_id": df["bug_id"].astype("string"),
+                        "seed_runtime": df["seed_runtime"].astype("string").replace("", pd.NA)})
+    out["seed_runtimes"] = runtime_lists(out["seed_runtime"]).map("/".join, na_action="ignore").fillna("").astype("string")
+    out["avg_seed_age_months"] = pd.to_numeric(df["avg_seed_age_months"], errors="coerce").astype("Int64")
+    out["age_band"] = age_bands(out["avg_seed_age_months"])
+    out["mode"] = categorical(df["mode"].astype("string").str.strip().str.lower(), MODES)
+    out["buggy_runtime"] = categorical(runtime_keys(df["buggy_runtime"]), RUNTIMES)
+    return out
+
+def expand_lineage(df):
+    """
+    One row per (seed runtime, buggy runtime) pair of each normalized lineage row with a known
+    seed runtime, mode and age band: bug_id, seed_runtime, age_band, mode, buggy_runtime.
+    """
+    df = df.dropna(subset=["seed_runtime", "buggy_runtime", "mode", "age_band"])
+    seeds = split_runtimes(df["seed_runtime"])
+    out = df.loc[seeds.index, ["bug_id", "age_band", "mode", "buggy_runtime"]]
+    out.insert(1, "seed_runtime", categorical(seeds.to_numpy(), RUNTIMES))
+    return out.reset_index(drop=True)
+
+def load_lineage(path):
+    """
+    rq5 test case lineage, one row per bug: bug_id, seed_runtime (the raw "/"-separated list),
+    seed_runtimes (its keys), avg_seed_age_months, age_band, mode, buggy_runtime.
+    """
+    return normalize_lineage(pd.read_csv(path, sep="\t", dtype=str, keep_default_na=False))
+
+def load_lineage_edges(path):
+    """rq5 lineage expanded by expand_lineage."""
+    return expand_lineage(load_lineage(path))
+
+def oracle_lineage(campaigns, pack=None, jobs=None):
+    """
+    Normalized lineage rows of the divergent testcases of replay_wasm.sh output directories
+    (campaigns: mode -> output directory), read with exec_oracle/oracle_results.py. Seed ages
+    come from the index of a corpus pack when given.
+    """
+    sys.path.insert(0, os.path.join(PLOTS_DIR, "..", "exec_oracle"))
+    import oracle_results
+    ages = oracle_results.pack_ages(pack) if pack else {}
+    rows = [row for mode, output_dir in campaigns.items()
+            for row in oracle_results.lineage_rows(output_dir, mode, ages, jobs)]
+    return normalize_lineage(pd.DataFrame(rows, columns=oracle_results.LINEAGE_COLUMNS, dtype=object))
+
+def load_seed_bugs(*paths):
+    """rq2 bugs found per seed benchmark (<benchmark>.txt lists): benchmark, bug_id."""
+    rows = []
+    for path in paths:
+        benchmark = os.path.splitext(os.path.basename(path))[0]
+        with open(path) as f:
+            rows.extend((benchmark, bug) for bug in dict.fromkeys(line.strip() for line in f) if bug)
+    df = pd.DataFrame(rows, columns=["benchmark", "bug_id"])
+    df["benchmark"] = categorical(df["benchmark"], BENCHMARKS)
+    df["bug_id"] = df["bug_id"].astype("string")
+    return df
+
+def load_bugs(path):
+    """
+    rq3/rq4 bug table (WASM_Fuzzing_Study_Bugs.csv): one row per bug with its link, the
+    runtime and compiler parsed from the bug id, integer finding counts per technique and
+    benchmark (wadiff-*, wasmaker-*, wapplique-*, transplant, rtbench (...)) and boolean
+    any/found-by columns. The title, blank and TOTAL rows are dropped.
+    """
+    raw = pd.read_csv(path, skiprows=2, dtype=str, keep_default_na=False)
+    raw = raw[raw["BugID"].str.strip().ne("") & ~raw["BugID"].str.startswith("TOTAL")]
+    df = pd.DataFrame({"bug_id": raw["BugID"].str.strip().astype("string"),
+                       "link": raw["link"].str.strip().astype("string")})
+    parts = df["bug_id"].str.removeprefix("reported_").str.split("_")
+    df["runtime"] = categorical(runtime_keys(parts.str[0]), RUNTIMES)
+    df["backend"] = parts.str[1].astype("string")
+    for column in raw.columns[2:]:
+        values = raw[column].str.strip().str.upper()
+        if values.isin(["TRUE", "FALSE", ""]).all() and values.isin(["TRUE", "FALSE"]).any():
+            df[column] = values.eq("TRUE")
+        else:
+            df[column] = pd.to_numeric(values.replace("", "0"), errors="coerce").fillna(0).astype("int32")
+    return df.reset_index(drop=True)
+
+def plots_path(*parts):
+    return os.path.join(PLOTS_DIR, *parts)
+
+# name -> (loader, source files relative to plots/)
+FRAMES = {
+    "coverage": (load_coverage, ["rq2/coverage_progress/data.csv"]),
+    "timeline": (load_timeline, ["rq1/transplantation_timeline/bug.csv"]),
+    "lineage": (load_lineage, ["rq5/data/lineage_diagram.tsv"]),
+    "lineage_edges": (load_lineage_edges, ["rq5/data/lineage_diagram.tsv"]),
+    "seed_bugs": (load_seed_bugs, [f"rq2/venn/{benchmark}.txt" for benchmark in BENCHMARKS]),
+    "bugs": (load_bugs, ["rq3/WASM_Fuzzing_Study_Bugs.csv"]),
+}
+
+# ----------- cache -----------
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def source_hash(name):
+    """SHA-256 over the loader version, the frame name and the contents of its sources."""
+    _, sources = FRAMES[name]
+    digest = hashlib.sha256(f"{LOADER_VERSION}:{name}".encode())
+    for source in sources:
+        with open(plots_path(source), "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+def cache_path(name):
+    # Parquet needs pyarrow; without it frames are cached as pickles, which keep the dtypes too
+    ext = "parquet" if parquet_available() else "pkl"
+    return os.path.join(CACHE_DIR, f"{name}-{source_hash(name)[:16]}.{ext}")
+
+def build(name, rebuild=False):
+    """Loads a frame from the cache, building and caching it when its sources changed."""
+    path = cache_path(name)
+    if not rebuild and os.path.exists(path):
+        return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_pickle(path)
+    loader, sources = FRAMES[name]
+    df = loader(*(plots_path(source) for source in sources))
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    for stale in glob.glob(os.path.join(CACHE_DIR, f"{name}-*")):
+        os.remove(stale)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if path.endswith(".parquet"):
+        df.to_parquet(tmp, index=False)
+    else:
+        df.to_pickle(tmp)
+    os.replace(tmp, path)
+    return df
+
+class Dataset:
+    """Lazily loaded frames of FRAMES, by attribute (dataset.coverage) or key (dataset["coverage"])."""
+
+    def __init__(self):
+        self.frames = {}
+
+    def __getitem__(self, name):
+        if name not in FRAMES:
+            raise KeyError(f"Unknown frame {name!r} (have: {', '.join(FRAMES)})")
+        if name not in self.frames:
+            self.frames[name] = build(name)
+        return self.frames[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name not in FRAMES:
+            raise AttributeError(name)
+        return self[name]
+
+    def build_all(self, names=None, rebuild=False):
+        for name in names or FRAMES:
+            self.frames[name] = build(name, rebuild)
+
+dataset = Dataset()
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the cached plot data frames")
+    parser.add_argument("frames", nargs="*", help=f"Frames to build (default: all of {', '.join(FRAMES)})")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the cache")
+    args = parser.parse_args()
+    unknown = [name for name in args.frames if name not in FRAMES]
+    if unknown:
+        parser.error(f"unknown frame(s) {', '.join(unknown)}")
+    dataset.build_all(args.frames, args.rebuild)
+    for name in args.frames or FRAMES:
+        df = dataset[name]
+        print(f"{name}: {len(df)} rows, {len(df.columns)} columns -> {os.path.relpath(cache_path(name), PLOTS_DIR)}")
+
+if __name__ == "__main__":
+    main()
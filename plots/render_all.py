@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Renders the paper figures incrementally, in parallel worker processes.
+
+Every figure declares its plot script, the input files it reads (relative to plots/), the
+data frames (dataset.py) built from them and the parameters passed to the script's
+main(out_dir, **params). A figure's stamp is the SHA-256 of all of these, of the repository
+modules the script imports (directly or through other modules, found by parsing their
+imports) and of the contents of files or directories that parameters name; the stamps of
+the last successful renders are kept in plots/.cache/figures.json, and a figure is only
+rendered again when its stamp changed or its output is missing.
+
+Stale figures are rendered by a process pool. The shared frames are built once up front so
+the workers only read the cache. This process never imports the plotting libraries: each
+worker imports matplotlib, seaborn or plotly through the one script it runs, and when
+everything is up to date nothing beyond the standard library is imported.
+
+Usage:
+    python render_all.py [figure ...] [--out DIR] [--jobs N] [--param FIGURE.NAME=VALUE]
+                         [--force] [--rebuild] [--dry-run] [--list]
+"""
+import argparse
+import ast
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+PLOTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(PLOTS_DIR)
+STAMPS_PATH = os.path.join(PLOTS_DIR, ".cache", "figures.json")
+sys.path.insert(0, PLOTS_DIR)
+
+# Read by every figure through the data layer
+COMMON_INPUTS = ["dataset.py"]
+
+# figure -> plot script, input files and frames it reads, output file, parameters of main()
+FIGURES = {
+    "transplantation_heatmap": {
+        "script": "rq1/transplantation_heatmap/transplantation.py",
+        "inputs": ["rq5/data/lineage_diagram.tsv"],
+        "frames": ["lineage"],
+        "output": "transplantation_heatmap.pdf",
+    },
+    "transplantation_timeline": {
+        "script": "rq1/transplantation_timeline/main4.py",
+        "inputs": ["rq1/transplantation_timeline/bug.csv"],
+        "frames": ["timeline"],
+        "output": "transplantation_timeline.pdf",
+    },
+    "coverage_progress": {
+        "script": "rq2/coverage_progress/progress.py",
+        "inputs": ["rq2/coverage_progress/data.csv"],
+        "frames": ["coverage"],
+        "output": "coverage_progress.pdf",
+    },
+    "venn": {
+        "script": "rq2/venn/seedbugs.py",
+        "inputs": [f"rq2/venn/{benchmark}.txt" for benchmark in ["llvmbench", "rtbench", "wasmbench", "specbench"]],
+        "frames": ["seed_bugs"],
+        "output": "venn4.pdf",
+    },
+    "upset": {
+        "script": "rq3/upset/upset.py",
+        "inputs": ["bug_sets.py", "rq3/WASM_Fuzzing_Study_Bugs.csv"],
+        "frames": ["bugs"],
+        "output": "upset.pdf",
+    },
+    "testcase_lineage": {
+        "script": "rq5/lineage_sankey/lineage.py",
+        "inputs": ["rq5/data/lineage_diagram.tsv"],
+        "frames": ["lineage_edges"],
+        "output": "testcase_lineage.pdf",
+        "params": {"scale": 3},
+    },
+}
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def path_digest(path):
+    """SHA-256 of a file, or of the names and contents of the files below a directory."""
+    if not os.path.isdir(path):
+        return file_digest(path)
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(f"{os.path.relpath(file_path, path)}:{file_digest(file_path)}".encode())
+    return digest.hexdigest()
+
+def repo_modules():
+    """Module name -> path of the Python modules in the top-level directories of the repository."""
+    modules = {}
+    for entry in sorted(os.listdir(REPO_DIR)):
+        directory = os.path.join(REPO_DIR, entry)
+        if entry.startswith(".") or not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".py"):
+                modules.setdefault(name[:-len(".py")], os.path.join(directory, name))
+    return modules
+
+def imported_modules(path):
+    """Top-level names of the modules a Python file imports anywhere (including in functions)."""
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module.split(".")[0])
+    return names
+
+def local_imports(script, modules):
+    """
+    Repository modules script imports, directly or through other repository modules, as paths
+    relative to plots/; a module next to the importing file takes precedence, as on sys.path.
+    """
+    found = set()
+    todo = [os.path.join(PLOTS_DIR, script)]
+    while todo:
+        path = todo.pop()
+        for name in imported_modules(path):
+            sibling = os.path.join(os.path.dirname(path), f"{name}.py")
+            module = sibling if os.path.exists(sibling) else modules.get(name)
+            if module and module not in found:
+                found.add(module)
+                todo.append(module)
+    return sorted(os.path.relpath(module, PLOTS_DIR) for module in found)
+
+def figure_stamp(figure, params, digests):
+    """
+    SHA-256 over a figure's script, the repository modules it imports, its inputs, frames and
+    parameters, with the contents of the paths parameters name; digests caches file hashes.
+    """
+    spec = FIGURES[figure]
+    if "modules" not in digests:
+        digests["modules"] = repo_modules()
+    digest = hashlib.sha256(f"{figure}:{spec['output']}:{','.join(spec['frames'])}".encode())
+    sources = [spec["script"]] + COMMON_INPUTS + spec["inputs"]
+    sources += [module for module in local_imports(spec["script"], digests["modules"]) if module not in sources]
+    for source in sources:
+        if source not in digests:
+            digests[source] = file_digest(os.path.join(PLOTS_DIR, source))
+        digest.update(f"{source}:{digests[source]}".encode())
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    # Parameters naming a file or directory (e.g. a transplant matrix state or coverage store)
+    for name, value in sorted(params.items()):
+        if isinstance(value, str) and os.path.exists(value):
+            key = os.path.abspath(value)
+            if key not in digests:
+                digests[key] = path_digest(value)
+            digest.update(f"{name}:{digests[key]}".encode())
+    return digest.hexdigest()
+
+def output_path(figure, out_dir=None):
+    spec = FIGURES[figure]
+    directory = out_dir or os.path.dirname(os.path.join(PLOTS_DIR, spec["script"]))
+    return os.path.abspath(os.path.join(directory, spec["output"]))
+
+def load_stamps():
+    try:
+        with open(STAMPS_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_stamps(stamps):
+    os.makedirs(os.path.dirname(STAMPS_PATH), exist_ok=True)
+    tmp = f"{STAMPS_PATH}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(stamps, f, indent=1, sort_keys=True)
+    os.replace(tmp, STAMPS_PATH)
+
+def load_script(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(f"figure_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def render(figure, out_dir=None, params=None):
+    """Runs one figure's plot script in this process; returns (figure, output path, seconds)."""
+    # Only takes effect if the script imports matplotlib
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    path = os.path.join(PLOTS_DIR, FIGURES[figure]["script"])
+    output = output_path(figure, out_dir)
+    start = time.perf_counter()
+    load_script(path).main(os.path.dirname(output), **(params or {}))
+    return figure, output, time.perf_counter() - start
+
+def parse_params(values):
+    """{figure: {name: value}} from FIGURE.NAME=VALUE options; values are JSON or plain strings."""
+    overrides = {}
+    for value in values:
+        key, sep, raw = value.partition("=")
+        figure, dot, name = key.partition(".")
+        if not sep or not dot or figure not in FIGURES:
+            raise ValueError(f"expected <figure>.<name>=<value>, got {value!r}")
+        try:
+            overrides.setdefault(figure, {})[name] = json.loads(raw)
+        except ValueError:
+            overrides.setdefault(figure, {})[name] = raw
+    return overrides
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the figures whose inputs changed, in parallel")
+    parser.add_argument("figures", nargs="*", help="Figures to consider (default: all)")
+    parser.add_argument("--out", help="Write all figures to this directory instead of next to their scripts")
+    parser.add_argument("--jobs", type=int, help="Worker processes (default: one per figure, at most one per CPU)")
+    parser.add_argument("--param", action="append", default=[], metavar="FIGURE.NAME=VALUE",
+                        help="Override a parameter of a figure, e.g. testcase_lineage.scale=1")
+    parser.add_argument("--force", action="store_true", help="Render the figures even when up to date")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the cached data frames and render")
+    parser.add_argument("--dry-run", action="store_true", help="Only print which figures are stale")
+    parser.add_argument("--list", action="store_true", help="List the figures and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for figure, spec in FIGURES.items():
+            print(f"{figure}\t{spec['script']}\t{spec['output']}\t{','.join(spec['frames'])}")
+        return
+    unknown = [figure for figure in args.figures if figure not in FIGURES]
+    if unknown:
+        parser.error(f"unknown figure(s) {', '.join(unknown)} (see --list)")
+    try:
+        overrides = parse_params(args.param)
+    except ValueError as e:
+        parser.error(str(e))
+    figures = args.figures or list(FIGURES)
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+
+    stamps = load_stamps()
+    digests = {}
+    params, stale = {}, {}
+    for figure in figures:
+        params[figure] = {**FIGURES[figure].get("params", {}), **overrides.get(figure, {})}
+        stamp = figure_stamp(figure, params[figure], digests)
+        output = output_path(figure, args.out)
+        if args.force or args.rebuild or stamps.get(output) != stamp or not os.path.exists(output):
+            stale[figure] = stamp
+        else:
+            print(f"{figure}: up to date")
+    if args.dry_run:
+        for figure in stale:
+            print(f"{figure}: stale")
+        return
+    if not stale:
+        return
+
+    from dataset import dataset
+    dataset.build_all(sorted({frame for figure in stale for frame in FIGURES[figure]["frames"]}), args.rebuild)
+
+    failed = []
+    jobs = args.jobs or min(len(stale), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(render, figure, args.out, params[figure]): figure for figure in stale}
+        for future in as_completed(futures):
+            figure = futures[future]
+            try:
+                _, output, seconds = future.result()
+            except Exception as e:
+                failed.append(figure)
+                print(f"{figure}: failed: {type(e).__name__}: {e}", file=sys.stderr)
+                continue
+            print(f"{figure}: {os.path.relpath(output)} ({seconds:.1f}s)")
+            stamps[output] = stale[figure]
+            save_stamps(stamps)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,92 @@
+"""
+Transplantation heatmap: bugs found on a target runtime by testcases from another runtime's seeds.
+
+By default the counts come from the lineage data of the paper. With --state, they come from a
+matrix kept by exec_oracle/transplant_matrix.py straight from replay outputs, which can have
+any runtimes and per-tier targets.
+
+Usage:
+    python transplantation.py [--state state.json] [--out DIR]
+"""
+import argparse
+import os
+import sys
+
 import seaborn as sns
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
-# Load TSV
-df = pd.read_csv("../data/lineage_diagram.tsv", sep="\t")
-
-# Normalize runtime names (capitalize consistently)
-runtime_map = {
-    "wasmtime": "Wasmtime",
-    "wasmer": "Wasmer",
-    "wamr": "WAMR",
-    "wasmedge": "WasmEdge"
-}
-df["seed_runtime"] = df["seed_runtime"].map(runtime_map)
-df["buggy_runtime"] = df["buggy_runtime"].map(runtime_map)
-
-# Filter transplantation rows only
-df_t = df[df["mode"] == "transplantation"]
-
-# Runtimes in fixed order
-runtimes = ["Wasmtime", "Wasmer", "WAMR", "WasmEdge"]
-
-# Initialize count matrix
-bug_counts = np.full((len(runtimes), len(runtimes)), np.nan)
-
-# Count occurrences
-for i, origin in enumerate(runtimes):
-    for j, target in enumerate(runtimes):
-        if origin != target:
-            count = ((df_t["seed_runtime"] == origin) &
-                     (df_t["buggy_runtime"] == target)).sum()
-            bug_counts[i, j] = count
-
-# Annotation labels: numbers or "-" on diagonal
-annot_labels = [[
-    "-" if i == j else str(int(bug_counts[i, j]))
-    for j in range(len(runtimes))
-] for i in range(len(runtimes))]
-
-# Plot heatmap
-plt.figure(figsize=(6, 5))
-ax = sns.heatmap(
-    bug_counts,
-    annot=annot_labels, fmt="",
-    cmap="viridis", cbar=True,
-    xticklabels=runtimes,
-    yticklabels=runtimes,
-    mask=np.isnan(bug_counts),
-    annot_kws={"fontsize": 15, "fontweight": "bold"}
-)
-
-ax.set_xlabel("Target Runtime", fontsize=15, fontweight="bold")
-ax.set_ylabel("Origin Runtime", fontsize=15, fontweight="bold")
-ax.set_title("", fontsize=15, fontweight="bold")
-
-ax.set_xticklabels(ax.get_xticklabels(), fontsize=12, rotation=0)
-ax.set_yticklabels(ax.get_yticklabels(), fontsize=12, rotation=0)
-
-plt.tight_layout()
-plt.savefig("transplantation_heatmap.pdf", dpi=300, bbox_inches="tight")
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", ".."))
+from dataset import RUNTIME_DISPLAY, RUNTIMES, dataset
+
+
+def lineage_matrix():
+    """(origins, targets, counts) of the transplantation rows of the lineage data."""
+    df_t = dataset.lineage
+    df_t = df_t[df_t["mode"] == "transplantation"]
+    # seed_runtimes holds a single runtime for transplanted bugs
+    counts = pd.crosstab(df_t["seed_runtimes"], df_t["buggy_runtime"])
+    counts = counts.reindex(index=RUNTIMES, columns=RUNTIMES, fill_value=0)
+    return RUNTIMES, RUNTIMES, counts.to_numpy()
+
+
+def state_matrix(path):
+    """(origins, targets, counts) of a transplant_matrix.py state file."""
+    sys.path.insert(0, os.path.join(HERE, "..", "..", "..", "exec_oracle"))
+    from transplant_matrix import TransplantMatrix
+    return TransplantMatrix.load(path).ordered()
+
+
+def label(name):
+    runtime, _, tier = name.partition("_")
+    display = RUNTIME_DISPLAY.get(runtime, runtime)
+    return f"{display}\n{tier}" if tier else display
+
+
+def main(out_dir=HERE, state=None):
+    origins, targets, counts = state_matrix(state) if state else lineage_matrix()
+
+    # Cells where the target is (a tier of) the origin runtime are not transplantation
+    same = np.array([[target.split("_", 1)[0] == origin for target in targets] for origin in origins],
+                    dtype=bool).reshape(len(origins), len(targets))
+    bug_counts = np.where(same, np.nan, counts.astype(float))
+
+    # Annotation labels: numbers or "-" on diagonal
+    annot_labels = [[
+        "-" if same[i, j] else str(int(bug_counts[i, j]))
+        for j in range(len(targets))
+    ] for i in range(len(origins))]
+
+    # Plot heatmap
+    plt.figure(figsize=(max(6, 1.2 * len(targets) + 1), max(5, len(origins) + 1)))
+    ax = sns.heatmap(
+        bug_counts,
+        annot=annot_labels, fmt="",
+        cmap="viridis", cbar=True,
+        xticklabels=[label(t) for t in targets],
+        yticklabels=[label(o) for o in origins],
+        mask=same,
+        annot_kws={"fontsize": 15, "fontweight": "bold"}
+    )
+
+    ax.set_xlabel("Target Tier" if any("_" in t for t in targets) else "Target Runtime",
+                  fontsize=15, fontweight="bold")
+    ax.set_ylabel("Origin Runtime", fontsize=15, fontweight="bold")
+    ax.set_title("", fontsize=15, fontweight="bold")
+
+    ax.set_xticklabels(ax.get_xticklabels(), fontsize=12, rotation=0)
+    ax.set_yticklabels(ax.get_yticklabels(), fontsize=12, rotation=0)
+
+    plt.tight_layout()
+    plt.savefig(os.path.join(out_dir, "transplantation_heatmap.pdf"), dpi=300, bbox_inches="tight")
+    plt.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transplantation heatmap")
+    parser.add_argument("--state", help="transplant_matrix.py state file to plot instead of the lineage data")
+    parser.add_argument("--out", default=HERE, help="Output directory")
+    args = parser.parse_args()
+    main(args.out, args.state)
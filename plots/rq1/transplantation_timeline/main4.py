@@ -1,28 +1,18 @@
 # plot_bugs_cross_runtime_8axes_report_to_reveal_v3.py
-import csv
+import os
+import sys
 from datetime import datetime
 from collections import defaultdict
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from dateutil.relativedelta import relativedelta
 
-# ---------- parsing ----------
-DATE_FORMATS = [
-    "%b-%d-%Y",
-    "%B-%d-%Y",
-    "%m-%d-%Y",
-    "%Y-%m-%d",
-    "%b %d %Y",
-    "%B %d %Y",
-]
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", ".."))
+from dataset import RUNTIME_DISPLAY, dataset
 
+# ---------- data ----------
 RUNTIME_ORDER = ["wamr", "wasmedge", "wasmtime", "wasmer"]
-RUNTIME_DISPLAY = {
-    "wamr": "WAMR",
-    "wasmedge": "WasmEdge",
-    "wasmtime": "Wasmtime",
-    "wasmer": "Wasmer",
-}
 
 # label box colors by runtime (for endpoint tags)
 RUNTIME_COLORS = {
@@ -38,55 +28,21 @@ REVEAL_AXIS_COLOR = (0.76, 0.93, 0.76, 0.55)  # light green
 GRAYED_AXIS_COLOR = (0.85, 0.85, 0.85, 0.65)  # wasmtime-reveal only
 
 
-def parse_month_anchor(s: str) -> datetime:
-    s = (s or "").strip().strip('"').replace("\t", " ")
-    if s.endswith(","):
-        s = s[:-1].strip()
-    for fmt in DATE_FORMATS:
-        try:
-            dt = datetime.strptime(s, fmt)
-            return datetime(dt.year, dt.month, 1)  # snap to month
-        except ValueError:
-            continue
-    raise ValueError(f"Unrecognized date format: {s!r}")
-
-
-def load_rows_csv(path="bug.csv"):
+def load_rows():
     """
-    CSV (no header), convention:
-      reveal_runtime, report_runtime, test_id, report_date, reveal_date
+    Transplanted test cases from the shared dataset (bug.csv, see plots/dataset.py):
+      reveal runtime, report runtime, test id, report month, reveal month
     """
-    rows = []
-    with open(path, newline="") as f:
-        rdr = csv.reader(f)
-        for i, row in enumerate(rdr, start=1):
-            if not row or all(not c.strip() for c in row):
-                continue
-            if len(row) < 5:
-                raise ValueError(f"Row {i} has fewer than 5 columns: {row}")
-            exist_rt = row[0].strip().lower()
-            report_rt = row[1].strip().lower()
-            test_id = row[2].strip().strip('"')
-            t_report = parse_month_anchor(row[3])
-            t_exist = parse_month_anchor(row[4])
-
-            if exist_rt not in RUNTIME_ORDER:
-                raise ValueError(
-                    f"Unknown reveal runtime '{row[0]}' on row {i}. "
-                    f"Allowed: {', '.join(RUNTIME_ORDER)}")
-            if report_rt not in RUNTIME_ORDER:
-                raise ValueError(
-                    f"Unknown report runtime '{row[1]}' on row {i}. "
-                    f"Allowed: {', '.join(RUNTIME_ORDER)}")
-            rows.append({
-                "exist_rt": exist_rt,
-                "report_rt": report_rt,
-                "id": test_id,
-                "t_report": t_report,
-                "t_exist": t_exist
-            })
+    df = dataset.timeline
+    rows = [{
+        "exist_rt": r.reveal_runtime,
+        "report_rt": r.report_runtime,
+        "id": r.test_id,
+        "t_report": r.report_date.to_pydatetime(),
+        "t_exist": r.reveal_date.to_pydatetime()
+    } for r in df.itertuples(index=False)]
     if not rows:
-        raise ValueError("No data loaded from CSV.")
+        raise ValueError("No transplantation timeline data.")
     return rows
 
 
@@ -118,7 +74,7 @@ def plot_bugs_report_to_reveal(
         y_gap=2.0,  # vertical isolation between axes
         y_step=0.88,  # stronger de-overlap for stacked labels
         connect_alpha=0.95,
-        save_path="transplantation_timeline.pdf"):
+        save_path=os.path.join(HERE, "transplantation_timeline.pdf")):
     fig, ax = plt.subplots(figsize=(30, 10))
 
     # Top 4 = Bug Report timelines; Bottom 4 = Reveal timelines
@@ -270,10 +226,14 @@ def plot_bugs_report_to_reveal(
 
     plt.tight_layout()
     plt.savefig(save_path, dpi=300, bbox_inches="tight")
+    plt.close(fig)
     print(f"Saved figure to: {save_path}")
 
 
 # ---------- main ----------
+def main(out_dir=HERE):
+    plot_bugs_report_to_reveal(load_rows(), save_path=os.path.join(out_dir, "transplantation_timeline.pdf"))
+
+
 if __name__ == "__main__":
-    data = load_rows_csv("bug.csv")
-    plot_bugs_report_to_reveal(data)
+    main()
@@ -1,67 +1,157 @@
 #!/usr/bin/env python3
-import pandas as pd
+"""
+Cumulative coverage over time per runtime and seed corpus.
+
+By default the 4-hourly samples of data.csv are plotted. With --store, the curves come from
+a coverage store written by plots/coverage_store.py (mean over the repetitions with a 95%
+confidence band, downsampled), so campaigns of any length plot equally fast.
+
+Usage:
+    python progress.py [--store coverage.parquet] [--metric coverage|edges] [--out DIR]
+"""
+import argparse
+import math
+import os
+import sys
+
 import matplotlib
 matplotlib.use("Agg")  # Non-interactive backend
 import matplotlib.pyplot as plt
 import numpy as np
 
-# Load CSV file (replace with your file path)
-df = pd.read_csv("data.csv")
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", ".."))
+from dataset import RUNTIME_DISPLAY, dataset
 
-# Runtimes and seeds
-runtimes = ["Wasmtime", "Wasmer", "WAMR", "WasmEdge"]
-seeds = ["llvmbench", "rtbench", "wasmbench", "specbench"]
-colors = ['tab:blue', 'tab:green', 'tab:orange', 'tab:red']
 
-# Set up 2×2 subplots (no shared axes)
-fig, axes = plt.subplots(2, 2, figsize=(10, 8), sharex=False, sharey=False)
-axes = axes.flatten()
+def hour_ticks(x_max):
+    """Tick positions every 4 hours, or a multiple of 4 hours that gives at most 7 ticks."""
+    step = 4 * max(1, math.ceil(x_max / 24))
+    return np.arange(0, x_max + step, step)
 
-# Fixed y-axis range and ticks
-y_min, y_max = 0, 45
-y_ticks = np.arange(y_min, y_max + 1, 5)
 
-for i, runtime in enumerate(runtimes):
-    ax = axes[i]
-    sub = df[df["runtime"] == runtime]
+def plot_store(store, metric, out_dir):
+    from coverage_store import load_curves
+    curves = load_curves(store, metric)
+    runtimes = list(curves["runtime"].cat.categories)
+    seeds = list(curves["seed"].cat.categories)
+    colors = plt.get_cmap("tab10").colors
 
-    if sub.empty:
-        ax.text(0.5, 0.5, "No Data", ha="center", va="center", fontsize=10)
-        ax.set_title(runtime, fontsize=12)
-    else:
+    rows = max(1, math.ceil(len(runtimes) / 2))
+    fig, axes = plt.subplots(rows, 2, figsize=(10, 4 * rows), sharex=False, sharey=False, squeeze=False)
+    axes = axes.flatten()
+    x_max = max(24, curves["hours"].max())
+    x_ticks = hour_ticks(x_max)
+    y_max = curves["high"].max()
+    if metric == "coverage":
+        y_max = max(45, 5 * math.ceil(y_max / 5))
+
+    for ax, runtime in zip(axes, runtimes):
+        sub = curves[curves["runtime"] == runtime]
         for seed, color in zip(seeds, colors):
-            sdata = sub[(sub["seed"] == seed) & (sub["hour"] <= 24)]
-            if not sdata.empty:
-                ax.plot(
-                    sdata["hour"], sdata["coverage"],
-                    marker='o', color=color, label=seed
-                )
-
-        ax.set_title(runtime, fontsize=14)
+            sdata = sub[sub["seed"] == seed]
+            if sdata.empty:
+                continue
+            ax.plot(sdata["hours"], sdata["mean"], color=color, label=seed)
+            ax.fill_between(sdata["hours"], sdata["low"], sdata["high"], color=color, alpha=0.2, linewidth=0)
+
+        ax.set_title(RUNTIME_DISPLAY.get(runtime, runtime), fontsize=14)
         ax.set_xlabel("Time (hours)")
-        ax.set_ylabel("Cumulative Coverage (%)")
+        ax.set_xticks(x_ticks)
+        ax.set_xticklabels([f"{v:g}h" for v in x_ticks])
+        ax.set_xlim(0, x_max)
+        ax.set_ylim(0, y_max)
+        if metric == "coverage":
+            ax.set_ylabel("Cumulative Coverage (%)")
+            y_ticks = np.arange(0, y_max + 1, 5)
+            ax.set_yticks(y_ticks)
+            ax.set_yticklabels([f"{v}%" for v in y_ticks])
+        else:
+            ax.set_ylabel("Cumulative Edges")
+        ax.grid(True, linestyle='--', alpha=0.5)
+        ax.tick_params(axis='both', labelsize=12, labelbottom=True, labelleft=True)
+    for ax in axes[len(runtimes):]:
+        ax.set_visible(False)
+
+    handles, labels = axes[0].get_legend_handles_labels()
+    fig.legend(handles, labels, loc='lower center', bbox_to_anchor=(0.5, -0.025), ncol=4, fontsize=15, frameon=False)
+    fig.tight_layout(rect=[0, 0.05, 1, 1])
+
+    plt.savefig(os.path.join(out_dir, "coverage_progress.pdf"), dpi=300, bbox_inches="tight")
+    plt.close(fig)
+
+
+def main(out_dir=HERE, store=None, metric="coverage"):
+    if store:
+        plot_store(store, metric, out_dir)
+        return
+
+    df = dataset.coverage
+
+    # Runtimes and seeds
+    runtimes = ["wasmtime", "wasmer", "wamr", "wasmedge"]
+    seeds = ["llvmbench", "rtbench", "wasmbench", "specbench"]
+    colors = ['tab:blue', 'tab:green', 'tab:orange', 'tab:red']
+
+    # Set up 2×2 subplots (no shared axes)
+    fig, axes = plt.subplots(2, 2, figsize=(10, 8), sharex=False, sharey=False)
+    axes = axes.flatten()
+
+    # Fixed y-axis range and ticks
+    y_min, y_max = 0, 45
+    y_ticks = np.arange(y_min, y_max + 1, 5)
+
+    for i, runtime in enumerate(runtimes):
+        ax = axes[i]
+        sub = df[df["runtime"] == runtime]
+
+        if sub.empty:
+            ax.text(0.5, 0.5, "No Data", ha="center", va="center", fontsize=10)
+            ax.set_title(RUNTIME_DISPLAY[runtime], fontsize=12)
+        else:
+            for seed, color in zip(seeds, colors):
+                sdata = sub[(sub["seed"] == seed) & (sub["hour"] <= 24)]
+                if not sdata.empty:
+                    ax.plot(
+                        sdata["hour"], sdata["coverage"],
+                        marker='o', color=color, label=seed
+                    )
+
+            ax.set_title(RUNTIME_DISPLAY[runtime], fontsize=14)
+            ax.set_xlabel("Time (hours)")
+            ax.set_ylabel("Cumulative Coverage (%)")
+
+        # Apply fixed axis limits and tick labels
+        ax.set_ylim(y_min, y_max)
+        ax.set_yticks(y_ticks)
+        ax.set_yticklabels([f"{v}%" for v in y_ticks])
+
+        # X-axis ticks every 4 hours
+        x_max = max(sub["hour"]) if not sub.empty else 24
+        ax.set_xticks(np.arange(0, x_max + 4, 4))
+        ax.set_xticklabels([f"{v}h" for v in np.arange(0, x_max + 4, 4)])
 
-    # Apply fixed axis limits and tick labels
-    ax.set_ylim(y_min, y_max)
-    ax.set_yticks(y_ticks)
-    ax.set_yticklabels([f"{v}%" for v in y_ticks])
+        ax.grid(True, linestyle='--', alpha=0.5)
+        ax.tick_params(axis='both', labelsize=12, labelbottom=True, labelleft=True)
 
-    # X-axis ticks every 4 hours
-    x_max = max(sub["hour"]) if not sub.empty else 24
-    ax.set_xticks(np.arange(0, x_max + 4, 4))
-    ax.set_xticklabels([f"{v}h" for v in np.arange(0, x_max + 4, 4)])
+    # Force all subplots to display their tick labels
+    for ax in axes:
+        ax.tick_params(labelbottom=True, labelleft=True)
 
-    ax.grid(True, linestyle='--', alpha=0.5)
-    ax.tick_params(axis='both', labelsize=12, labelbottom=True, labelleft=True)
+    # Shared legend and layout
+    handles, labels = axes[0].get_legend_handles_labels()
+    fig.legend(handles, labels, loc='lower center', bbox_to_anchor=(0.5, -0.025), ncol=4, fontsize=15, frameon=False)
+    fig.tight_layout(rect=[0, 0.05, 1, 1])
 
-# Force all subplots to display their tick labels
-for ax in axes:
-    ax.tick_params(labelbottom=True, labelleft=True)
+    plt.savefig(os.path.join(out_dir, "coverage_progress.pdf"), dpi=300, bbox_inches="tight")
+    plt.close(fig)
 
-# Shared legend and layout
-handles, labels = axes[0].get_legend_handles_labels()
-fig.legend(handles, labels, loc='lower center', bbox_to_anchor=(0.5, -0.025), ncol=4, fontsize=15, frameon=False)
-fig.tight_layout(rect=[0, 0.05, 1, 1])
 
-plt.savefig("coverage_progress.pdf", dpi=300, bbox_inches="tight")
-plt.close(fig)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Coverage progress plot")
+    parser.add_argument("--store", help="Coverage store (coverage_store.py ingest) to plot instead of data.csv")
+    parser.add_argument("--metric", choices=["coverage", "edges"], default="coverage",
+                        help="Metric plotted from the store")
+    parser.add_argument("--out", default=HERE, help="Output directory")
+    args = parser.parse_args()
+    main(args.out, args.store, args.metric)
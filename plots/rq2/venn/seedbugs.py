@@ -1,19 +1,27 @@
 #!/usr/bin/env python3
+import os
+import sys
+
 import matplotlib.pyplot as plt
 from venn import venn
 from matplotlib.patches import Patch
 
-def read_list_from_file(filename):
-    """Read non-empty, stripped lines from a text file into a set."""
-    with open(filename, "r") as f:
-        return {line.strip() for line in f if line.strip()}
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", ".."))
+from dataset import dataset
+
+def bug_sets():
+    """Set of bug ids found per seed benchmark (the <benchmark>.txt lists)."""
+    df = dataset.seed_bugs
+    return {benchmark: set(df.loc[df["benchmark"] == benchmark, "bug_id"]) for benchmark in df["benchmark"].cat.categories}
 
-def main():
-    # Read sets from files
-    llvmbench = read_list_from_file("llvmbench.txt")
-    rtbench = read_list_from_file("rtbench.txt")
-    wasmbench = read_list_from_file("wasmbench.txt")
-    specbench = read_list_from_file("specbench.txt")
+def main(out_dir=HERE):
+    # Bug sets per benchmark
+    sets = bug_sets()
+    llvmbench = sets["llvmbench"]
+    rtbench = sets["rtbench"]
+    wasmbench = sets["wasmbench"]
+    specbench = sets["specbench"]
 
     # Create labeled names with counts
     names = {
@@ -83,7 +91,7 @@ def main():
     ax.set_ylim(ymin, ymax - (ymax - ymin) * 0.21)  # crop top 25% of whitespace
     ax.set_position([0.05, 0.12, 0.9, 0.8])  # shrink axes to remove outer padding
 
-    plt.savefig("venn4.pdf", dpi=300, bbox_inches="tight", pad_inches=0)
+    plt.savefig(os.path.join(out_dir, "venn4.pdf"), dpi=300, bbox_inches="tight", pad_inches=0)
     plt.close()
 
 if __name__ == "__main__":
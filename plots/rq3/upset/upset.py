@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", ".."))
+from bug_sets import BugSets, fuzzer_columns, plot_upset
+from dataset import dataset
+
+
+def main(out_dir=HERE):
+    # Bugs per fuzzer x seed corpus, as in the rq3 bug table
+    df = dataset.bugs
+    sets = BugSets.from_table(df, fuzzer_columns(df))
+    plot_upset(sets, os.path.join(out_dir, "upset.pdf"))
+
+
+if __name__ == "__main__":
+    main()
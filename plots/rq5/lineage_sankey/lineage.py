@@ -1,89 +1,13 @@
-import pandas as pd
+import os
+import sys
+
 import plotly.graph_objects as go
 import numpy as np
-import re
-
-# ========= Load Data =========
-file_path = "../data/lineage_diagram.tsv"
-df = pd.read_csv(file_path, sep="\t")
-
-# Drop rows missing seed_runtime or buggy_runtime
-df = df.dropna(subset=["seed_runtime", "buggy_runtime", "mode"])
-
-# ========= Bucket Ages =========
-def bucket_age(months):
-    bands = {12: "12 months", 24: "24 months", 36: "36 months", 48: "48 months", 72: "72 months"}
-    try:
-        return bands.get(int(months), None)
-    except:
-        return None
-
-df["age_band"] = df["avg_seed_age_months"].apply(bucket_age)
-df = df.dropna(subset=["age_band"])
-
-# ========= Normalize & Split Runtimes =========
-def clean_runtime(raw):
-    if pd.isna(raw):
-        return []
-    parts = str(raw).split("/")
-    cleaned = []
-    for p in parts:
-        p = p.strip()
-        p = re.split(r"[ (]", p)[0]
-        if p and p not in ["#REF!", "NA", "N/A"]:
-            cleaned.append(p)
-    return cleaned
-
-# ========= Expand =========
-expanded = []
-for _, row in df.iterrows():
-    seeds = clean_runtime(row["seed_runtime"])
-    targets = clean_runtime(row["buggy_runtime"])
-    for s in seeds:
-        for t in targets:
-            expanded.append({
-                "seed_runtime": s,
-                "age_band": row["age_band"],
-                "mode": row["mode"],
-                "buggy_runtime": t
-            })
-df_expanded = pd.DataFrame(expanded)
-
-# ========= Build Layers =========
-seed_runtimes = sorted(df_expanded["seed_runtime"].unique())
-age_bands = ["12 months", "24 months", "36 months", "48 months", "72 months"]
-modes = ["wapplique", "wasmaker", "both_fuzzers", "transplantation"]
-target_runtimes = sorted(df_expanded["buggy_runtime"].unique())
-
-nodes_prefixed = (
-    [f"seed::{s}" for s in seed_runtimes] +
-    [f"age::{a}" for a in age_bands] +
-    [f"mode::{m}" for m in modes] +
-    [f"target::{t}" for t in target_runtimes]
-)
-labels = seed_runtimes + age_bands + modes + target_runtimes
-node_index = {name: i for i, name in enumerate(nodes_prefixed)}
-
-# ========= Build Links =========
-links = {}
-link_level = {}
-
-def add_link(src, tgt, stage):
-    pair = (node_index[src], node_index[tgt])
-    links[pair] = links.get(pair, 0) + 1
-    link_level[pair] = stage
-
-for _, row in df_expanded.iterrows():
-    add_link(f"seed::{row['seed_runtime']}", f"age::{row['age_band']}", "seed_age")
-    add_link(f"age::{row['age_band']}", f"mode::{row['mode']}", "age_mode")
-    add_link(f"mode::{row['mode']}", f"target::{row['buggy_runtime']}", "mode_target")
-
-sources = [s for (s, t) in links.keys()]
-targets = [t for (s, t) in links.keys()]
-values = [v for v in links.values()]
-
-# ========= Node Positions =========
-x, y = [], []
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", ".."))
+from dataset import AGE_BANDS, dataset, expand_lineage, oracle_lineage
+
 
 def spaced_positions(n):
     return np.linspace(0.1, 0.9, n) if n > 1 else [0.5]
@@ -99,131 +23,189 @@ def add_paper_arrow(fig, x0, x1, y, pad=0.04, **arrow_kwargs):
         text="", **arrow_kwargs
     )
 
-# Node positions
-for i, n in enumerate(seed_runtimes):
-    x.append(0.0)  # far left
-    y.append(spaced_positions(len(seed_runtimes))[i])
-
-age_x_map = {
-    "12 months": 0.25,
-    "24 months": 0.33,
-    "36 months": 0.41,
-    "48 months": 0.49,
-    "72 months": 0.57
-}
-age_y_map = {
-    "12 months": 0.05,
-    "24 months": 0.25,
-    "36 months": 0.50,
-    "48 months": 0.70,
-    "72 months": 0.90
-}
-for i, n in enumerate(age_bands):
-    x.append(age_x_map[n])
-    y.append(age_y_map[n])
-
-for i, n in enumerate(modes):
-    x.append(0.75)  # shifted further right
-    y.append(spaced_positions(len(modes))[i])
-
-for i, n in enumerate(target_runtimes):
-    x.append(1.0)  # far right
-    y.append(spaced_positions(len(target_runtimes))[i])
-
-# ========= Colors =========
-palette = ["#4477AA", "#CC6677", "#DDCC77", "#117733", "#88CCEE", "#882255"]
-node_colors = []
-for i, n in enumerate(seed_runtimes):
-    node_colors.append(palette[i % len(palette)])
-for _ in age_bands:
-    node_colors.append("#BBBBBB")
-for _ in modes:
-    node_colors.append("#BBBBBB")
-for i, n in enumerate(target_runtimes):
-    if n in seed_runtimes:
-        node_colors.append(palette[seed_runtimes.index(n) % len(palette)])
-    else:
-        node_colors.append("#999999")
-
-link_colors = []
-for (s, t) in links.keys():
-    stage = link_level[(s, t)]
-    if stage in ["seed_age", "age_mode"]:
-        base_color = node_colors[s]
-        alpha = 0.6
-    else:
-        base_color = node_colors[t]
-        alpha = 0.4
-    if base_color.startswith("#"):
-        r = int(base_color[1:3], 16)
-        g = int(base_color[3:5], 16)
-        b = int(base_color[5:7], 16)
-        link_colors.append(f"rgba({r},{g},{b},{alpha})")
-    else:
-        link_colors.append("rgba(160,160,160,0.4)")
-
-# ========= Build Figure =========
-fig = go.Figure(data=[go.Sankey(
-    arrangement="fixed",
-    node=dict(
-        pad=175,
-        thickness=20,
-        line=dict(color="black", width=5),
-        label=labels,
-        x=x,
-        y=y,
-        color=node_colors
-    ),
-    link=dict(
-        source=sources,
-        target=targets,
-        value=values,
-        color=link_colors
-    ),
-    textfont=dict(size=102, color="black")
-)])
-
-fig.update_layout(
-    title_text="",
-    title_font_size=72,
-    font_size=102,
-    width=3600,   
-    height=900,  
-    margin=dict(l=0, r=25, t=50, b=450),
-    plot_bgcolor="white",
-    annotations=[
-        dict(
-            text="<b>Seed<br>Runtime</b>",
-            x=0.01, y=-0.30, xref="paper", yref="paper",
-            showarrow=False, font=dict(size=108, color="black"),
-            xanchor="left"
-        ),
-        dict(
-            text="<b>Seed<br>Age</b>",
-            x=0.42, y=-0.30, xref="paper", yref="paper",
-            showarrow=False, font=dict(size=108, color="black"),
-            xanchor="center"
+
+def main(out_dir=HERE, lineage=None, scale=3):
+    # ========= Load Data =========
+    # One row per (seed runtime, buggy runtime) pair of each bug, with its age band
+    # (rows without runtimes, mode or a known age band are dropped; see plots/dataset.py).
+    # lineage replaces the paper's rows, e.g. with dataset.oracle_lineage() of a campaign.
+    edges = dataset.lineage_edges if lineage is None else expand_lineage(lineage)
+    df_expanded = edges.astype({"seed_runtime": str, "age_band": str, "mode": str, "buggy_runtime": str})
+
+    # ========= Build Layers =========
+    seed_runtimes = sorted(df_expanded["seed_runtime"].unique())
+    age_bands = list(AGE_BANDS.values())
+    modes = ["wapplique", "wasmaker", "both_fuzzers", "transplantation"]
+    target_runtimes = sorted(df_expanded["buggy_runtime"].unique())
+
+    nodes_prefixed = (
+        [f"seed::{s}" for s in seed_runtimes] +
+        [f"age::{a}" for a in age_bands] +
+        [f"mode::{m}" for m in modes] +
+        [f"target::{t}" for t in target_runtimes]
+    )
+    labels = seed_runtimes + age_bands + modes + target_runtimes
+    node_index = {name: i for i, name in enumerate(nodes_prefixed)}
+
+    # ========= Build Links =========
+    # Flow per stage: row counts of each (source, target) pair, aggregated over all rows
+    stages = [
+        ("seed_runtime", "age_band", "seed", "age", "seed_age"),
+        ("age_band", "mode", "age", "mode", "age_mode"),
+        ("mode", "buggy_runtime", "mode", "target", "mode_target"),
+    ]
+    sources, targets, values, link_level = [], [], [], []
+    for src_col, tgt_col, src_layer, tgt_layer, stage in stages:
+        counts = df_expanded.groupby([src_col, tgt_col], sort=False).size()
+        for (src, tgt), count in counts.items():
+            sources.append(node_index[f"{src_layer}::{src}"])
+            targets.append(node_index[f"{tgt_layer}::{tgt}"])
+            values.append(int(count))
+            link_level.append(stage)
+
+    # ========= Node Positions =========
+    x, y = [], []
+
+    # Node positions
+    for i, n in enumerate(seed_runtimes):
+        x.append(0.0)  # far left
+        y.append(spaced_positions(len(seed_runtimes))[i])
+
+    age_x_map = {
+        "12 months": 0.25,
+        "24 months": 0.33,
+        "36 months": 0.41,
+        "48 months": 0.49,
+        "72 months": 0.57
+    }
+    age_y_map = {
+        "12 months": 0.05,
+        "24 months": 0.25,
+        "36 months": 0.50,
+        "48 months": 0.70,
+        "72 months": 0.90
+    }
+    for i, n in enumerate(age_bands):
+        x.append(age_x_map[n])
+        y.append(age_y_map[n])
+
+    for i, n in enumerate(modes):
+        x.append(0.75)  # shifted further right
+        y.append(spaced_positions(len(modes))[i])
+
+    for i, n in enumerate(target_runtimes):
+        x.append(1.0)  # far right
+        y.append(spaced_positions(len(target_runtimes))[i])
+
+    # ========= Colors =========
+    palette = ["#4477AA", "#CC6677", "#DDCC77", "#117733", "#88CCEE", "#882255"]
+    node_colors = []
+    for i, n in enumerate(seed_runtimes):
+        node_colors.append(palette[i % len(palette)])
+    for _ in age_bands:
+        node_colors.append("#BBBBBB")
+    for _ in modes:
+        node_colors.append("#BBBBBB")
+    for i, n in enumerate(target_runtimes):
+        if n in seed_runtimes:
+            node_colors.append(palette[seed_runtimes.index(n) % len(palette)])
+        else:
+            node_colors.append("#999999")
+
+    link_colors = []
+    for s, t, stage in zip(sources, targets, link_level):
+        if stage in ["seed_age", "age_mode"]:
+            base_color = node_colors[s]
+            alpha = 0.6
+        else:
+            base_color = node_colors[t]
+            alpha = 0.4
+        if base_color.startswith("#"):
+            r = int(base_color[1:3], 16)
+            g = int(base_color[3:5], 16)
+            b = int(base_color[5:7], 16)
+            link_colors.append(f"rgba({r},{g},{b},{alpha})")
+        else:
+            link_colors.append("rgba(160,160,160,0.4)")
+
+    # ========= Build Figure =========
+    fig = go.Figure(data=[go.Sankey(
+        arrangement="fixed",
+        node=dict(
+            pad=175,
+            thickness=20,
+            line=dict(color="black", width=5),
+            label=labels,
+            x=x,
+            y=y,
+            color=node_colors
         ),
-        dict(
-            text="<b>Testing<br>Technique</b>",
-            x=0.75, y=-0.30, xref="paper", yref="paper",
-            showarrow=False, font=dict(size=108, color="black"),
-            xanchor="center"
+        link=dict(
+            source=sources,
+            target=targets,
+            value=values,
+            color=link_colors
         ),
-        dict(
-            text="<b>Buggy<br>Runtime</b>",
-            x=1.00, y=-0.30, xref="paper", yref="paper",
-            showarrow=False, font=dict(size=108, color="black"),
-            xanchor="right"
-        )
-    ]
-)
-
-# Add arrows (same y as labels, trimmed horizontally with pad)
-y_labels = -0.18  # in paper coords; adjust and increase bottom margin if clipped
-add_paper_arrow(fig, 0.00, 0.34, y=y_labels, pad=0)   # Seed Runtime → Seed Age
-add_paper_arrow(fig, 0.35, 0.68, y=y_labels, pad=0)   # Seed Age → Fuzzing/Transplantation
-add_paper_arrow(fig, 0.74, 0.90, y=y_labels, pad=0)   # Fuzzing/Transplantation → Buggy Runtime
+        textfont=dict(size=102, color="black")
+    )])
+
+    fig.update_layout(
+        title_text="",
+        title_font_size=72,
+        font_size=102,
+        width=3600,   
+        height=900,  
+        margin=dict(l=0, r=25, t=50, b=450),
+        plot_bgcolor="white",
+        annotations=[
+            dict(
+                text="<b>Seed<br>Runtime</b>",
+                x=0.01, y=-0.30, xref="paper", yref="paper",
+                showarrow=False, font=dict(size=108, color="black"),
+                xanchor="left"
+            ),
+            dict(
+                text="<b>Seed<br>Age</b>",
+                x=0.42, y=-0.30, xref="paper", yref="paper",
+                showarrow=False, font=dict(size=108, color="black"),
+                xanchor="center"
+            ),
+            dict(
+                text="<b>Testing<br>Technique</b>",
+                x=0.75, y=-0.30, xref="paper", yref="paper",
+                showarrow=False, font=dict(size=108, color="black"),
+                xanchor="center"
+            ),
+            dict(
+                text="<b>Buggy<br>Runtime</b>",
+                x=1.00, y=-0.30, xref="paper", yref="paper",
+                showarrow=False, font=dict(size=108, color="black"),
+                xanchor="right"
+            )
+        ]
+    )
 
-# ========= Save High-Resolution PDF =========
-fig.write_image("testcase_lineage.pdf", format="pdf", width=5600, height=1800, scale=3)  # 300 dpi
+    # Add arrows (same y as labels, trimmed horizontally with pad)
+    y_labels = -0.18  # in paper coords; adjust and increase bottom margin if clipped
+    add_paper_arrow(fig, 0.00, 0.34, y=y_labels, pad=0)   # Seed Runtime → Seed Age
+    add_paper_arrow(fig, 0.35, 0.68, y=y_labels, pad=0)   # Seed Age → Fuzzing/Transplantation
+    add_paper_arrow(fig, 0.74, 0.90, y=y_labels, pad=0)   # Fuzzing/Transplantation → Buggy Runtime
+
+    # ========= Save High-Resolution PDF =========
+    # scale 3 gives 300 dpi; lower it for quick drafts
+    fig.write_image(os.path.join(out_dir, "testcase_lineage.pdf"), format="pdf", width=5600, height=1800, scale=scale)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Test case lineage Sankey diagram")
+    parser.add_argument("campaigns", nargs="*",
+                        help="<mode>=<replay_wasm.sh output dir> to plot a campaign instead of the paper's bugs")
+    parser.add_argument("--pack", help="Corpus pack providing the seed ages of a campaign")
+    parser.add_argument("--out", default=HERE, help="Output directory")
+    parser.add_argument("--scale", type=float, default=3, help="Export scale (3 gives 300 dpi)")
+    args = parser.parse_args()
+    lineage = None
+    if args.campaigns:
+        lineage = oracle_lineage(dict(c.split("=", 1) for c in args.campaigns), args.pack)
+    main(args.out, lineage, args.scale)
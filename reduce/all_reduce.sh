@@ -1,5 +1,13 @@
+#!/bin/bash
+# Usage: bash all_reduce.sh <testcase_dir>   (reduces every <testcase>__<func>.wasm below it)
+reduction_dir="${1:?Usage: bash all_reduce.sh <testcase_dir>}"
+script_dir="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+
 # wasm-tools shrink (wasm structure-aware reducer)
-find /path/to/__reduction_round2 -type f -name "*.wasm" | xargs -I{} bash -c "bash test_reducer.sh {}"
+find "$reduction_dir" -type f -name "*.wasm" | xargs -I{} bash "$script_dir/test_reducer.sh" {}
 
 # lithium (character/line based reducer)
-# find /path/to/__reduction_round2 -type f -name "*.wasm" | xargs -I{} bash -c "bash lithium_reducer.sh {}"
\ No newline at end of file
+# find "$reduction_dir" -type f -name "*.wasm" | xargs -I{} bash "$script_dir/lithium_reducer.sh" {}
+
+# structure-aware native reducer (reduce/wasm_reducer.py)
+# find "$reduction_dir" -type f -name "*.wasm" | xargs -I{} bash "$script_dir/native_reducer.sh" {}
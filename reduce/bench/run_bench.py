@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Reduction benchmark: runs every reducer configuration on the checked-in
+known-divergent testcases (bench/testcases, described by manifest.json) against
+the deterministic runtime stand-in, and records for each run
+
+  - calls:             predicate calls (one line per call in $REDUCE_LOG)
+  - candidates_per_s:  calls / wall time
+  - final_size:        size of the reduced testcase (best seed for shrink-sN)
+  - wall_s:            wall time of the whole configuration
+  - time_to_ref_s:     seconds until an interesting candidate of at most
+                       reference_size * --slack bytes was first seen (null if never)
+
+Results are written as bench/results/<stamp>.json plus a markdown table.
+Configurations whose tool is not installed (lithium, wasm-tools) are skipped.
+
+Usage:
+  python3 run_bench.py [--config native --config shrink-s4 ...] [--testcase NAME ...]
+                       [--slack 1.5] [--timeout 600] [--latency-ms 0]
+  python3 run_bench.py --compare old.json new.json
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REDUCE_DIR = os.path.dirname(BENCH_DIR)
+REPO_DIR = os.path.dirname(REDUCE_DIR)
+TESTCASE_DIR = os.path.join(BENCH_DIR, "testcases")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+STANDIN_REPLAY = os.path.join(BENCH_DIR, "standin_replay.sh")
+DEDUP_OUTPUT = os.path.join(REPO_DIR, "exec_oracle", "dedup_output.py")
+
+sys.path.insert(0, os.path.join(REPO_DIR, "exec_oracle"))
+from oracle_results import divergent_tiers, parse_output
+
+CONFIGS = ["native", "lithium", "shrink-s1", "shrink-s4", "shrink-s24"]
+# Fixed seeds so shrink runs are repeatable across benchmark invocations
+SHRINK_SEEDS = [1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233,
+                377, 610, 987, 1597, 2584, 4181, 6765, 10946, 17711, 28657, 46368, 75025]
+
+
+def available(config):
+    if config == "native":
+        return True
+    if config == "lithium":
+        return subprocess.run([sys.executable, "-c", "import lithium"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+    return shutil.which("wasm-tools") is not None
+
+
+def make_reference(wasm_path, func, run_dir, name):
+    """Replay the original once and store its deduped output as <name>.txt in run_dir."""
+    tmp_dir = os.path.join(run_dir, "ref")
+    os.makedirs(tmp_dir)
+    shutil.copy(wasm_path, tmp_dir)
+    subprocess.run(["/bin/bash", STANDIN_REPLAY, func, tmp_dir], check=True)
+    subprocess.run([sys.executable, DEDUP_OUTPUT, os.path.join(tmp_dir, "output")], check=True)
+    deduped = os.listdir(os.path.join(tmp_dir, "output", "deduped"))
+    shutil.copy(os.path.join(tmp_dir, "output", "deduped", deduped[0]), os.path.join(run_dir, f"{name}.txt"))
+    shutil.rmtree(tmp_dir)
+    # Timing the reduction of a testcase whose tiers all agree would measure reducing a non-bug
+    with open(os.path.join(run_dir, f"{name}.txt")) as f:
+        if not divergent_tiers(parse_output(f)):
+            raise SystemExit(f"[!] {name}: the reference output does not diverge, fix the testcase or the stand-in")
+
+
+def commands(config, wasm_path, func, output):
+    """One command per independent reducer process of the configuration."""
+    if config == "native":
+        return [[sys.executable, os.path.join(REDUCE_DIR, "wasm_reducer.py"),
+                 "--predicate", os.path.join(REDUCE_DIR, "lithium_predicate.py"),
+                 "--keep-export", func, "-o", output, wasm_path]]
+    if config == "lithium":
+        # lithium reduces the testcase in place
+        shutil.copy(wasm_path, output)
+        return [[sys.executable, "-m", "lithium", "-c", "--tempdir", os.path.dirname(output) + "/tmp",
+                 os.path.join(REDUCE_DIR, "lithium_predicate.py"), "--testcase", output]]
+    n_seeds = int(config.split("-s")[1])
+    return [["wasm-tools", "shrink", "-a", "100000", "-s", str(seed),
+             os.path.join(REDUCE_DIR, "reducer_predicate.sh"), wasm_path,
+             "-o", f"{output}.seed-{seed}"]
+            for seed in SHRINK_SEEDS[:n_seeds]]
+
+
+def read_log(path):
+    entries = []
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3:
+                    entries.append((float(parts[0]), int(parts[1]), parts[2] == "1"))
+    return entries
+
+
+def run_one(config, name, spec, args):
+    func = spec["func"]
+    run_dir = tempfile.mkdtemp(prefix=f"bench_{config}_{name}_")
+    try:
+        wasm_path = os.path.join(run_dir, f"{name}.wasm")
+        shutil.copy(os.path.join(TESTCASE_DIR, f"{name}.wasm"), wasm_path)
+        os.makedirs(os.path.join(run_dir, "tmp"))
+        make_reference(wasm_path, func, run_dir, name)
+
+        log_path = os.path.join(run_dir, "calls.log")
+        output = os.path.join(run_dir, f"shrunken_{name}.wasm")
+        env = dict(os.environ, WASM_DIR=run_dir, FILENAME=name, FUNC_NAME=func,
+                   REPLAY_WASM=STANDIN_REPLAY, DEDUP_OUTPUT=DEDUP_OUTPUT, REDUCE_LOG=log_path,
+                   REDUCE_SCRATCH=os.path.join(run_dir, "scratch"),
+                   STANDIN_LATENCY_MS=str(args.latency_ms))
+
+        start = time.time()
+        procs = [subprocess.Popen(cmd, cwd=REDUCE_DIR, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                 for cmd in commands(config, wasm_path, func, output)]
+        timed_out = False
+        for proc in procs:
+            try:
+                proc.wait(timeout=max(0.0, args.timeout - (time.time() - start)))
+            except subprocess.TimeoutExpired:
+                timed_out = True
+                proc.kill()
+                proc.wait()
+        wall = time.time() - start
+
+        entries = read_log(log_path)
+        target = spec["reference_size"] * args.slack
+        hits = [t for t, size, ok in entries if ok and size <= target]
+        sizes = [os.path.getsize(p) for p in [output] + [f"{output}.seed-{s}" for s in SHRINK_SEEDS]
+                 if os.path.exists(p)]
+        return {
+            "config": config,
+            "testcase": name,
+            "original_size": spec["original_size"],
+            "reference_size": spec["reference_size"],
+            "final_size": min(sizes) if sizes else None,
+            "calls": len(entries),
+            "candidates_per_s": round(len(entries) / wall, 2) if wall else None,
+            "wall_s": round(wall, 2),
+            "time_to_ref_s": round(min(hits) - start, 2) if hits else None,
+            "timed_out": timed_out,
+        }
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def git_rev():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    return result.stdout.strip() or "unknown"
+
+
+def fmt(value):
+    return "-" if value is None else str(value)
+
+
+def markdown(report):
+    lines = [f"# Reduction benchmark ({report['git_rev']}, {report['date']})", "",
+             f"slack={report['slack']} timeout={report['timeout']}s latency={report['latency_ms']}ms", "",
+             "| config | testcase | original | reference | final | calls | cand/s | wall (s) | time to ref (s) |",
+             "|---|---|---|---|---|---|---|---|---|"]
+    for r in report["results"]:
+        lines.append(f"| {r['config']} | {r['testcase']} | {r['original_size']} | {r['reference_size']} "
+                     f"| {fmt(r['final_size'])} | {r['calls']} | {fmt(r['candidates_per_s'])} "
+                     f"| {r['wall_s']}{' (timeout)' if r['timed_out'] else ''} | {fmt(r['time_to_ref_s'])} |")
+    if report["skipped"]:
+        lines += ["", f"Skipped (tool not installed): {', '.join(report['skipped'])}"]
+    return "\n".join(lines) + "\n"
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = {(r["config"], r["testcase"]): r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new_report = json.load(f)
+    print("| config | testcase | final | calls | wall (s) | time to ref (s) |")
+    print("|---|---|---|---|---|---|")
+    for r in new_report["results"]:
+        base = old.get((r["config"], r["testcase"]))
+        if base is None:
+            continue
+        cells = []
+        for key in ("final_size", "calls", "wall_s", "time_to_ref_s"):
+            a, b = base[key], r[key]
+            if a is None or b is None:
+                cells.append(f"{fmt(a)} -> {fmt(b)}")
+            else:
+                cells.append(f"{a} -> {b} ({(b - a) / a * 100 if a else 0:+.0f}%)")
+        print(f"| {r['config']} | {r['testcase']} | " + " | ".join(cells) + " |")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reducer configurations")
+    parser.add_argument("--config", action="append", choices=CONFIGS, help="Configuration(s) to run (default: all)")
+    parser.add_argument("--testcase", action="append", help="Testcase(s) from manifest.json (default: all)")
+    parser.add_argument("--slack", type=float, default=1.5, help="Size factor over reference_size counted as reached")
+    parser.add_argument("--timeout", type=float, default=600, help="Per-run time budget in seconds")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Per-tier delay of the runtime stand-in")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two JSON reports")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    with open(os.path.join(TESTCASE_DIR, "manifest.json")) as f:
+        manifest = json.load(f)
+    names = args.testcase or list(manifest)
+    configs = args.config or CONFIGS
+
+    results, skipped = [], []
+    for config in configs:
+        if not available(config):
+            print(f"[-] Skipping {config}: tool not installed")
+            skipped.append(config)
+            continue
+        for name in names:
+            print(f"[*] {config} on {name}")
+            result = run_one(config, name, manifest[name], args)
+            print(f"    {result['final_size']} bytes, {result['calls']} calls, {result['wall_s']}s")
+            results.append(result)
+
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    report = {"git_rev": git_rev(), "date": stamp, "slack": args.slack, "timeout": args.timeout,
+              "latency_ms": args.latency_ms, "skipped": skipped, "results": results}
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    json_path = os.path.join(RESULTS_DIR, f"{stamp}.json")
+    with open(json_path, "w") as f:
+        json.dump(report, f, indent=2)
+    with open(os.path.join(RESULTS_DIR, f"{stamp}.md"), "w") as f:
+        f.write(markdown(report))
+    print(markdown(report))
+    print(f"[+] Report written to {json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Deterministic stand-in for replay_wasm.sh used by the reduction benchmark.
+
+Takes the same arguments (<func_name> <wasm_dir>) and writes the same
+ten-line output file per testcase into <wasm_dir>/output, but instead of
+running the runtimes it decides each tier's outcome from the module itself:
+every tier reports the same result unless the code reachable from the invoked
+export contains one of the seeded bug triggers below, which makes the affected
+tiers diverge. Outcomes therefore only depend on what a reducer must preserve.
+
+Modules are validated with `wasm-tools validate` when it is installed, and
+otherwise by fully decoding them with wasm_module, so byte-level reducers see
+the same rejections they would get from the runtimes.
+
+Set STANDIN_LATENCY_MS to add a fixed per-tier delay that mimics replay cost.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from wasm_module import DecodeError, Module, KIND_FUNC, iter_instrs
+
+TIERS = [
+    "wasmtime", "wasmtime_compiled", "wasmer_cranelift", "wasmer_llvm", "wamr_compiler",
+    "wamr_aot", "wamr_jit", "wasmedge_jit", "wasmedge_interp", "wasmedge_compiled",
+]
+
+
+def _has_ops(*ops):
+    return lambda module, code: all(op in code["ops"] for op in ops)
+
+
+def _wide_br_table(module, code):
+    return code["br_table_width"] >= 3
+
+
+def _grow_with_data(module, code):
+    return 0x40 in code["ops"] and any(d.flags in (0, 2) for d in module.datas)
+
+
+# (trigger, affected tiers, divergent output)
+BUGS = [
+    (_has_ops(0x6F), ("wamr_aot", "wamr_jit"), "1:<>:integer_overflow"),
+    (_has_ops(0x90, 0xA8), ("wasmer_llvm",), "1:<>:llvm_error_cannot_select"),
+    (_wide_br_table, ("wasmedge_jit", "wasmedge_compiled"), "1:<>:out_of_bounds"),
+    (_grow_with_data, ("wasmtime_compiled",), "134:<>:fatal"),
+]
+
+
+def validate(path, data):
+    if shutil.which("wasm-tools"):
+        result = subprocess.run(["wasm-tools", "validate", path],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if result.returncode != 0:
+            return None
+    try:
+        module = Module(data)
+    except (DecodeError, IndexError, UnicodeDecodeError):
+        return None
+    if any(func.body is None for func in module.funcs):
+        return None
+    return module
+
+
+def reachable_code(module, root):
+    """Collect opcodes and the widest br_table reachable from function `root`."""
+    n_imports = len(module.imported(KIND_FUNC))
+    table_funcs = [idx for elem in module.elems for idx in (elem.funcs or ())]
+    seen = set()
+    todo = [root]
+    code = {"ops": set(), "br_table_width": 0}
+    while todo:
+        idx = todo.pop()
+        if idx in seen or idx < n_imports or idx - n_imports >= len(module.funcs):
+            continue
+        seen.add(idx)
+        for ins in iter_instrs(module.funcs[idx - n_imports].body):
+            code["ops"].add(ins.op)
+            if ins.op in (0x10, 0x12, 0xD2):
+                todo.append(ins.index("func"))
+            elif ins.op in (0x11, 0x13):
+                todo.extend(table_funcs)
+            elif ins.op == 0x0E:
+                # Branch targets: the label vector and the default label
+                code["br_table_width"] = max(code["br_table_width"], len(ins.fields[0][1]) + 1)
+    return code
+
+
+def replay(path, func_name):
+    with open(path, "rb") as f:
+        data = f.read()
+    module = validate(path, data)
+    if module is None:
+        outputs = {tier: "1:<>:invalid" for tier in TIERS}
+        outputs["wamr_compiler"] = "1:<>:compilation_failed"
+        return outputs
+    outputs = {tier: "0:<>:0" for tier in TIERS}
+    outputs["wamr_compiler"] = "0:<>:compilation_successful"
+    exported = [e.index for e in module.exports if e.kind == KIND_FUNC and e.name == func_name.encode()]
+    if not exported:
+        for tier in TIERS:
+            if tier != "wamr_compiler":
+                outputs[tier] = "1:<>:no_func"
+        return outputs
+    code = reachable_code(module, exported[0])
+    for trigger, tiers, output in BUGS:
+        if trigger(module, code):
+            for tier in tiers:
+                outputs[tier] = output
+    return outputs
+
+
+def main():
+    func_name, wasm_dir = sys.argv[1], sys.argv[2]
+    latency = float(os.environ.get("STANDIN_LATENCY_MS", "0")) / 1000.0
+    output_dir = os.path.join(wasm_dir, "output")
+    os.makedirs(output_dir, exist_ok=True)
+    for entry in sorted(os.listdir(wasm_dir)):
+        if not entry.endswith(".wasm"):
+            continue
+        name = entry[:-len(".wasm")]
+        output_path = os.path.join(output_dir, f"{name}__{func_name}.txt")
+        if os.path.exists(output_path):
+            continue
+        outputs = replay(os.path.join(wasm_dir, entry), func_name)
+        if latency:
+            time.sleep(latency * len(TIERS))
+        with open(output_path, "w") as f:
+            for tier in TIERS:
+                f.write(f"{tier}: {outputs[tier]}\n")
+
+
+if __name__ == "__main__":
+    main()
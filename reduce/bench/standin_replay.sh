@@ -0,0 +1,4 @@
+#!/bin/bash
+
+# Drop-in replacement for exec_oracle/replay_wasm.sh (point REPLAY_WASM at this script)
+exec python3 "$(dirname "$0")/standin_replay.py" "$@"
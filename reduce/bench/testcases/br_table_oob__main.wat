@@ -0,0 +1,29 @@
+(module
+  (memory 1)
+  (global $acc (mut i64) (i64.const 1))
+  (global $k i32 (i32.const 7))
+  (data (i32.const 16) "regression test payload 533")
+  (func $helper0 (param $x i32) (result i32) (local $t i32) (local.set $t (local.get $x)) (local.set $t (i32.add (local.get $t) (i32.const 11))) (local.set $t (i32.add (local.get $t) (i32.const 46))) (global.set $acc (i64.mul (global.get $acc) (i64.const 7))) (drop (call $helper2 (local.get $t))) (local.get $t))
+  (func $helper1 (param $x i32) (result i32) (local $t i32) (local.set $t (local.get $x)) (if (i32.lt_s (local.get $t) (i32.const 38)) (then (global.set $acc (i64.mul (global.get $acc) (i64.const 6))) (local.set $t (i32.add (local.get $t) (i32.const 74))) (drop (call $helper1 (local.get $t))))) (block (drop (call $helper3 (local.get $t))) (drop (call $helper2 (local.get $t))) (i32.store (i32.const 224) (local.get $t))) (i32.store (i32.const 136) (local.get $t)) (local.set $t (i32.add (local.get $t) (i32.const 3))) (local.get $t))
+  (func $helper2 (param $x i32) (result i32) (local $t i32) (local.set $t (local.get $x)) (if (i32.lt_s (local.get $t) (i32.const 29)) (then (drop (call $helper3 (local.get $t))) (drop (call $helper1 (local.get $t))) (i32.store (i32.const 88) (local.get $t)))) (global.set $acc (i64.mul (global.get $acc) (i64.const 3))) (local.set $t (i32.add (local.get $t) (i32.const 22))) (if (i32.lt_s (local.get $t) (i32.const 11)) (then (global.set $acc (i64.mul (global.get $acc) (i64.const 6))) (i32.store (i32.const 184) (local.get $t)) (i32.store (i32.const 92) (local.get $t)))) (local.get $t))
+  (func $helper3 (param $x i32) (result i32) (local $t i32) (local.set $t (local.get $x)) (block (drop (call $helper2 (local.get $t))) (i32.store (i32.const 180) (local.get $t)) (drop (call $helper3 (local.get $t)))) (global.set $acc (i64.mul (global.get $acc) (i64.const 8))) (block (drop (call $helper3 (local.get $t))) (drop (call $helper1 (local.get $t))) (drop (call $helper2 (local.get $t)))) (block (i32.store (i32.const 180) (local.get $t)) (drop (call $helper3 (local.get $t))) (drop (call $helper2 (local.get $t)))) (local.get $t))
+  (func $unused0 (export "unused0") (result i64) (local $t i32) (i32.store (i32.const 232) (local.get $t)) (block (drop (call $helper1 (local.get $t))) (if (i32.lt_s (local.get $t) (i32.const 44)) (then (global.set $acc (i64.mul (global.get $acc) (i64.const 6))) (if (i32.lt_s (local.get $t) (i32.const 49)) (then (drop (call $helper2 (local.get $t))) (drop (call $helper3 (local.get $t))) (drop (call $helper1 (local.get $t))))) (block (i32.store (i32.const 184) (local.get $t)) (drop (call $helper0 (local.get $t))) (drop (call $helper0 (local.get $t)))))) (global.set $acc (i64.mul (global.get $acc) (i64.const 7)))) (local.set $t (i32.add (local.get $t) (i32.const 7))) (i32.store (i32.const 24) (local.get $t)) (if (i32.lt_s (local.get $t) (i32.const 37)) (then (global.set $acc (i64.mul (global.get $acc) (i64.const 7))) (local.set $t (i32.add (local.get $t) (i32.const 96))) (i32.store (i32.const 68) (local.get $t)))) (global.get $acc))
+  (func $unused1 (export "unused1") (result i64) (local $t i32) (if (i32.lt_s (local.get $t) (i32.const 15)) (then (global.set $acc (i64.mul (global.get $acc) (i64.const 2))) (block (drop (call $helper0 (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 46))) (if (i32.lt_s (local.get $t) (i32.const 11)) (then (global.set $acc (i64.mul (global.get $acc) (i64.const 7))) (local.set $t (i32.add (local.get $t) (i32.const 10))) (local.set $t (i32.add (local.get $t) (i32.const 8)))))) (local.set $t (i32.add (local.get $t) (i32.const 5))))) (drop (call $helper0 (local.get $t))) (if (i32.lt_s (local.get $t) (i32.const 16)) (then (global.set $acc (i64.mul (global.get $acc) (i64.const 8))) (global.set $acc (i64.mul (global.get $acc) (i64.const 7))) (global.set $acc (i64.mul (global.get $acc) (i64.const 6))))) (drop (call $helper0 (local.get $t))) (block (i32.store (i32.const 20) (local.get $t)) (global.set $acc (i64.mul (global.get $acc) (i64.const 3))) (local.set $t (i32.add (local.get $t) (i32.const 0)))) (global.get $acc))
+  (func $unused2 (export "unused2") (result i64) (local $t i32) (if (i32.lt_s (local.get $t) (i32.const 39)) (then (drop (call $helper0 (local.get $t))) (if (i32.lt_s (local.get $t) (i32.const 21)) (then (block (local.set $t (i32.add (local.get $t) (i32.const 39))) (drop (call $helper0 (local.get $t))) (drop (call $helper3 (local.get $t)))) (i32.store (i32.const 76) (local.get $t)) (block (global.set $acc (i64.mul (global.get $acc) (i64.const 2))) (drop (call $helper2 (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 3)))))) (block (global.set $acc (i64.mul (global.get $acc) (i64.const 6))) (i32.store (i32.const 200) (local.get $t)) (block (i32.store (i32.const 164) (local.get $t)) (global.set $acc (i64.mul (global.get $acc) (i64.const 8))) (drop (call $helper2 (local.get $t))))))) (if (i32.lt_s (local.get $t) (i32.const 38)) (then (block (drop (call $helper0 (local.get $t))) (drop (call $helper1 (local.get $t))) (drop (call $helper0 (local.get $t)))) (if (i32.lt_s (local.get $t) (i32.const 2)) (then (global.set $acc (i64.mul (global.get $acc) (i64.const 3))) (global.set $acc (i64.mul (global.get $acc) (i64.const 2))) (block (drop (call $helper1 (local.get $t))) (i32.store (i32.const 16) (local.get $t)) (global.set $acc (i64.mul (global.get $acc) (i64.const 3)))))) (drop (call $helper3 (local.get $t))))) (local.set $t (i32.add (local.get $t) (i32.const 32))) (local.set $t (i32.add (local.get $t) (i32.const 75))) (global.set $acc (i64.mul (global.get $acc) (i64.const 6))) (global.get $acc))
+  (func $unused3 (export "unused3") (result i64) (local $t i32) (i32.store (i32.const 184) (local.get $t)) (if (i32.lt_s (local.get $t) (i32.const 43)) (then (block (if (i32.lt_s (local.get $t) (i32.const 33)) (then (local.set $t (i32.add (local.get $t) (i32.const 19))) (local.set $t (i32.add (local.get $t) (i32.const 49))) (drop (call $helper1 (local.get $t))))) (local.set $t (i32.add (local.get $t) (i32.const 65))) (drop (call $helper0 (local.get $t)))) (global.set $acc (i64.mul (global.get $acc) (i64.const 2))) (local.set $t (i32.add (local.get $t) (i32.const 2))))) (global.set $acc (i64.mul (global.get $acc) (i64.const 8))) (global.set $acc (i64.mul (global.get $acc) (i64.const 2))) (global.set $acc (i64.mul (global.get $acc) (i64.const 2))) (global.get $acc))
+  (func $main (export "main") (result i32) (local $t i32)
+    (drop (call $helper3 (local.get $t)))
+    (block (if (i32.lt_s (local.get $t) (i32.const 34)) (then (drop (call $helper3 (local.get $t))) (global.set $acc (i64.mul (global.get $acc) (i64.const 7))) (global.set $acc (i64.mul (global.get $acc) (i64.const 7))))) (block (block (i32.store (i32.const 8) (local.get $t)) (i32.store (i32.const 24) (local.get $t)) (drop (call $helper1 (local.get $t)))) (local.set $t (i32.add (local.get $t) (i32.const 84))) (block (drop (call $helper0 (local.get $t))) (i32.store (i32.const 60) (local.get $t)) (i32.store (i32.const 184) (local.get $t)))) (if (i32.lt_s (local.get $t) (i32.const 44)) (then (if (i32.lt_s (local.get $t) (i32.const 19)) (then (local.set $t (i32.add (local.get $t) (i32.const 87))) (drop (call $helper0 (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 39))))) (global.set $acc (i64.mul (global.get $acc) (i64.const 8))) (drop (call $helper0 (local.get $t))))))
+    (block (local.set $t (i32.add (local.get $t) (i32.const 52))) (drop (call $helper3 (local.get $t))) (block (global.set $acc (i64.mul (global.get $acc) (i64.const 6))) (i32.store (i32.const 36) (local.get $t)) (local.set $t (i32.add (local.get $t) (i32.const 36)))))
+    (local.set $t (i32.add (local.get $t) (i32.const 47)))
+    (if (i32.lt_s (local.get $t) (i32.const 46)) (then (local.set $t (i32.add (local.get $t) (i32.const 28))) (block (global.set $acc (i64.mul (global.get $acc) (i64.const 2))) (i32.store (i32.const 188) (local.get $t)) (block (drop (call $helper3 (local.get $t))) (global.set $acc (i64.mul (global.get $acc) (i64.const 8))) (drop (call $helper3 (local.get $t))))) (local.set $t (i32.add (local.get $t) (i32.const 32)))))
+    (local.set $t (i32.add (local.get $t) (i32.const 15)))
+    (block $a (block $b (block $c (br_table $a $b $c (local.get $t)))))
+    (local.set $t (i32.add (local.get $t) (i32.const 78)))
+    (if (i32.lt_s (local.get $t) (i32.const 41)) (then (block (global.set $acc (i64.mul (global.get $acc) (i64.const 7))) (local.set $t (i32.add (local.get $t) (i32.const 3))) (i32.store (i32.const 240) (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 92))) (drop (call $helper3 (local.get $t)))))
+    (if (i32.lt_s (local.get $t) (i32.const 22)) (then (block (global.set $acc (i64.mul (global.get $acc) (i64.const 8))) (if (i32.lt_s (local.get $t) (i32.const 17)) (then (drop (call $helper3 (local.get $t))) (drop (call $helper3 (local.get $t))) (drop (call $helper2 (local.get $t))))) (block (global.set $acc (i64.mul (global.get $acc) (i64.const 3))) (drop (call $helper2 (local.get $t))) (i32.store (i32.const 216) (local.get $t)))) (drop (call $helper0 (local.get $t))) (i32.store (i32.const 48) (local.get $t))))
+    (local.set $t (i32.add (local.get $t) (i32.const 45)))
+    (global.set $acc (i64.mul (global.get $acc) (i64.const 6)))
+    (global.set $acc (i64.mul (global.get $acc) (i64.const 8)))
+    (local.get $t))
+)
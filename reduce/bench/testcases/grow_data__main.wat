@@ -0,0 +1,29 @@
+(module
+  (memory 1)
+  (global $acc (mut i64) (i64.const 1))
+  (global $k i32 (i32.const 7))
+  (data (i32.const 16) "regression test payload 477")
+  (func $helper0 (param $x i32) (result i32) (local $t i32) (local.set $t (local.get $x)) (global.set $acc (i64.mul (global.get $acc) (i64.const 6))) (i32.store (i32.const 64) (local.get $t)) (if (i32.lt_s (local.get $t) (i32.const 38)) (then (drop (call $helper0 (local.get $t))) (i32.store (i32.const 4) (local.get $t)) (drop (call $helper2 (local.get $t))))) (i32.store (i32.const 116) (local.get $t)) (local.get $t))
+  (func $helper1 (param $x i32) (result i32) (local $t i32) (local.set $t (local.get $x)) (global.set $acc (i64.mul (global.get $acc) (i64.const 7))) (block (i32.store (i32.const 240) (local.get $t)) (drop (call $helper1 (local.get $t))) (global.set $acc (i64.mul (global.get $acc) (i64.const 7)))) (global.set $acc (i64.mul (global.get $acc) (i64.const 8))) (i32.store (i32.const 196) (local.get $t)) (local.get $t))
+  (func $helper2 (param $x i32) (result i32) (local $t i32) (local.set $t (local.get $x)) (drop (call $helper0 (local.get $t))) (drop (call $helper0 (local.get $t))) (global.set $acc (i64.mul (global.get $acc) (i64.const 8))) (i32.store (i32.const 20) (local.get $t)) (local.get $t))
+  (func $helper3 (param $x i32) (result i32) (local $t i32) (local.set $t (local.get $x)) (if (i32.lt_s (local.get $t) (i32.const 49)) (then (local.set $t (i32.add (local.get $t) (i32.const 34))) (drop (call $helper3 (local.get $t))) (drop (call $helper3 (local.get $t))))) (block (drop (call $helper3 (local.get $t))) (global.set $acc (i64.mul (global.get $acc) (i64.const 4))) (local.set $t (i32.add (local.get $t) (i32.const 4)))) (global.set $acc (i64.mul (global.get $acc) (i64.const 5))) (global.set $acc (i64.mul (global.get $acc) (i64.const 4))) (local.get $t))
+  (func $unused0 (export "unused0") (result i64) (local $t i32) (drop (call $helper3 (local.get $t))) (drop (call $helper2 (local.get $t))) (block (i32.store (i32.const 196) (local.get $t)) (i32.store (i32.const 176) (local.get $t)) (i32.store (i32.const 208) (local.get $t))) (i32.store (i32.const 116) (local.get $t)) (if (i32.lt_s (local.get $t) (i32.const 43)) (then (local.set $t (i32.add (local.get $t) (i32.const 35))) (i32.store (i32.const 80) (local.get $t)) (drop (call $helper2 (local.get $t))))) (global.get $acc))
+  (func $unused1 (export "unused1") (result i64) (local $t i32) (i32.store (i32.const 52) (local.get $t)) (drop (call $helper1 (local.get $t))) (drop (call $helper2 (local.get $t))) (if (i32.lt_s (local.get $t) (i32.const 7)) (then (local.set $t (i32.add (local.get $t) (i32.const 61))) (drop (call $helper3 (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 44))))) (local.set $t (i32.add (local.get $t) (i32.const 52))) (global.get $acc))
+  (func $unused2 (export "unused2") (result i64) (local $t i32) (global.set $acc (i64.mul (global.get $acc) (i64.const 2))) (if (i32.lt_s (local.get $t) (i32.const 27)) (then (block (local.set $t (i32.add (local.get $t) (i32.const 5))) (i32.store (i32.const 20) (local.get $t)) (block (drop (call $helper2 (local.get $t))) (i32.store (i32.const 140) (local.get $t)) (i32.store (i32.const 120) (local.get $t)))) (local.set $t (i32.add (local.get $t) (i32.const 39))) (local.set $t (i32.add (local.get $t) (i32.const 9))))) (local.set $t (i32.add (local.get $t) (i32.const 76))) (i32.store (i32.const 16) (local.get $t)) (global.set $acc (i64.mul (global.get $acc) (i64.const 5))) (global.get $acc))
+  (func $unused3 (export "unused3") (result i64) (local $t i32) (if (i32.lt_s (local.get $t) (i32.const 39)) (then (if (i32.lt_s (local.get $t) (i32.const 9)) (then (drop (call $helper0 (local.get $t))) (if (i32.lt_s (local.get $t) (i32.const 20)) (then (drop (call $helper1 (local.get $t))) (drop (call $helper3 (local.get $t))) (drop (call $helper3 (local.get $t))))) (drop (call $helper0 (local.get $t))))) (i32.store (i32.const 136) (local.get $t)) (block (drop (call $helper1 (local.get $t))) (if (i32.lt_s (local.get $t) (i32.const 27)) (then (drop (call $helper2 (local.get $t))) (i32.store (i32.const 172) (local.get $t)) (local.set $t (i32.add (local.get $t) (i32.const 53))))) (i32.store (i32.const 160) (local.get $t))))) (local.set $t (i32.add (local.get $t) (i32.const 48))) (i32.store (i32.const 68) (local.get $t)) (local.set $t (i32.add (local.get $t) (i32.const 81))) (drop (call $helper2 (local.get $t))) (global.get $acc))
+  (func $main (export "main") (result i32) (local $t i32)
+    (if (i32.lt_s (local.get $t) (i32.const 43)) (then (if (i32.lt_s (local.get $t) (i32.const 38)) (then (drop (call $helper2 (local.get $t))) (drop (call $helper3 (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 75))))) (local.set $t (i32.add (local.get $t) (i32.const 86))) (local.set $t (i32.add (local.get $t) (i32.const 47)))))
+    (if (i32.lt_s (local.get $t) (i32.const 40)) (then (block (if (i32.lt_s (local.get $t) (i32.const 37)) (then (i32.store (i32.const 160) (local.get $t)) (global.set $acc (i64.mul (global.get $acc) (i64.const 4))) (global.set $acc (i64.mul (global.get $acc) (i64.const 4))))) (if (i32.lt_s (local.get $t) (i32.const 38)) (then (drop (call $helper2 (local.get $t))) (drop (call $helper0 (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 72))))) (drop (call $helper1 (local.get $t)))) (if (i32.lt_s (local.get $t) (i32.const 32)) (then (global.set $acc (i64.mul (global.get $acc) (i64.const 7))) (if (i32.lt_s (local.get $t) (i32.const 15)) (then (drop (call $helper1 (local.get $t))) (drop (call $helper3 (local.get $t))) (drop (call $helper0 (local.get $t))))) (local.set $t (i32.add (local.get $t) (i32.const 76))))) (if (i32.lt_s (local.get $t) (i32.const 21)) (then (drop (call $helper1 (local.get $t))) (block (global.set $acc (i64.mul (global.get $acc) (i64.const 2))) (drop (call $helper1 (local.get $t))) (i32.store (i32.const 228) (local.get $t))) (if (i32.lt_s (local.get $t) (i32.const 14)) (then (local.set $t (i32.add (local.get $t) (i32.const 4))) (i32.store (i32.const 96) (local.get $t)) (drop (call $helper1 (local.get $t)))))))))
+    (if (i32.lt_s (local.get $t) (i32.const 21)) (then (drop (call $helper0 (local.get $t))) (i32.store (i32.const 176) (local.get $t)) (i32.store (i32.const 64) (local.get $t))))
+    (block (if (i32.lt_s (local.get $t) (i32.const 33)) (then (if (i32.lt_s (local.get $t) (i32.const 29)) (then (drop (call $helper3 (local.get $t))) (drop (call $helper3 (local.get $t))) (i32.store (i32.const 208) (local.get $t)))) (local.set $t (i32.add (local.get $t) (i32.const 52))) (global.set $acc (i64.mul (global.get $acc) (i64.const 3))))) (local.set $t (i32.add (local.get $t) (i32.const 61))) (i32.store (i32.const 220) (local.get $t)))
+    (i32.store (i32.const 112) (local.get $t))
+    (local.set $t (i32.add (local.get $t) (i32.const 95)))
+    (drop (memory.grow (i32.const 1)))
+    (block (drop (call $helper2 (local.get $t))) (i32.store (i32.const 172) (local.get $t)) (global.set $acc (i64.mul (global.get $acc) (i64.const 8))))
+    (local.set $t (i32.add (local.get $t) (i32.const 75)))
+    (if (i32.lt_s (local.get $t) (i32.const 7)) (then (global.set $acc (i64.mul (global.get $acc) (i64.const 2))) (local.set $t (i32.add (local.get $t) (i32.const 88))) (i32.store (i32.const 100) (local.get $t))))
+    (block (i32.store (i32.const 24) (local.get $t)) (local.set $t (i32.add (local.get $t) (i32.const 61))) (drop (call $helper0 (local.get $t))))
+    (global.set $acc (i64.mul (global.get $acc) (i64.const 6)))
+    (if (i32.lt_s (local.get $t) (i32.const 15)) (then (drop (call $helper0 (local.get $t))) (i32.store (i32.const 208) (local.get $t)) (local.set $t (i32.add (local.get $t) (i32.const 78)))))
+    (local.get $t))
+)
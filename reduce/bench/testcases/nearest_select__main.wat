@@ -0,0 +1,29 @@
+(module
+  (memory 1)
+  (global $acc (mut i64) (i64.const 1))
+  (global $k i32 (i32.const 7))
+  (data (i32.const 16) "regression test payload 736")
+  (func $helper0 (param $x i32) (result i32) (local $t i32) (local.set $t (local.get $x)) (global.set $acc (i64.mul (global.get $acc) (i64.const 6))) (local.set $t (i32.add (local.get $t) (i32.const 32))) (local.set $t (i32.add (local.get $t) (i32.const 63))) (block (drop (call $helper3 (local.get $t))) (global.set $acc (i64.mul (global.get $acc) (i64.const 2))) (drop (call $helper0 (local.get $t)))) (local.get $t))
+  (func $helper1 (param $x i32) (result i32) (local $t i32) (local.set $t (local.get $x)) (block (drop (call $helper0 (local.get $t))) (drop (call $helper3 (local.get $t))) (drop (call $helper1 (local.get $t)))) (i32.store (i32.const 52) (local.get $t)) (if (i32.lt_s (local.get $t) (i32.const 1)) (then (local.set $t (i32.add (local.get $t) (i32.const 3))) (drop (call $helper0 (local.get $t))) (drop (call $helper1 (local.get $t))))) (block (drop (call $helper0 (local.get $t))) (i32.store (i32.const 112) (local.get $t)) (drop (call $helper3 (local.get $t)))) (local.get $t))
+  (func $helper2 (param $x i32) (result i32) (local $t i32) (local.set $t (local.get $x)) (i32.store (i32.const 116) (local.get $t)) (if (i32.lt_s (local.get $t) (i32.const 14)) (then (drop (call $helper1 (local.get $t))) (drop (call $helper2 (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 53))))) (i32.store (i32.const 48) (local.get $t)) (global.set $acc (i64.mul (global.get $acc) (i64.const 7))) (local.get $t))
+  (func $helper3 (param $x i32) (result i32) (local $t i32) (local.set $t (local.get $x)) (drop (call $helper2 (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 95))) (if (i32.lt_s (local.get $t) (i32.const 46)) (then (drop (call $helper3 (local.get $t))) (i32.store (i32.const 96) (local.get $t)) (drop (call $helper2 (local.get $t))))) (i32.store (i32.const 252) (local.get $t)) (local.get $t))
+  (func $unused0 (export "unused0") (result i64) (local $t i32) (i32.store (i32.const 200) (local.get $t)) (i32.store (i32.const 16) (local.get $t)) (block (global.set $acc (i64.mul (global.get $acc) (i64.const 7))) (block (block (drop (call $helper1 (local.get $t))) (drop (call $helper2 (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 56)))) (drop (call $helper0 (local.get $t))) (global.set $acc (i64.mul (global.get $acc) (i64.const 6)))) (block (if (i32.lt_s (local.get $t) (i32.const 31)) (then (drop (call $helper0 (local.get $t))) (drop (call $helper0 (local.get $t))) (drop (call $helper3 (local.get $t))))) (drop (call $helper1 (local.get $t))) (global.set $acc (i64.mul (global.get $acc) (i64.const 6))))) (global.set $acc (i64.mul (global.get $acc) (i64.const 2))) (global.set $acc (i64.mul (global.get $acc) (i64.const 6))) (global.get $acc))
+  (func $unused1 (export "unused1") (result i64) (local $t i32) (i32.store (i32.const 116) (local.get $t)) (block (i32.store (i32.const 176) (local.get $t)) (i32.store (i32.const 180) (local.get $t)) (block (if (i32.lt_s (local.get $t) (i32.const 42)) (then (i32.store (i32.const 0) (local.get $t)) (drop (call $helper1 (local.get $t))) (i32.store (i32.const 104) (local.get $t)))) (block (local.set $t (i32.add (local.get $t) (i32.const 61))) (drop (call $helper1 (local.get $t))) (i32.store (i32.const 208) (local.get $t))) (block (drop (call $helper3 (local.get $t))) (drop (call $helper0 (local.get $t))) (i32.store (i32.const 168) (local.get $t))))) (block (i32.store (i32.const 12) (local.get $t)) (global.set $acc (i64.mul (global.get $acc) (i64.const 7))) (global.set $acc (i64.mul (global.get $acc) (i64.const 6)))) (i32.store (i32.const 92) (local.get $t)) (local.set $t (i32.add (local.get $t) (i32.const 70))) (global.get $acc))
+  (func $unused2 (export "unused2") (result i64) (local $t i32) (if (i32.lt_s (local.get $t) (i32.const 2)) (then (drop (call $helper0 (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 2))) (block (local.set $t (i32.add (local.get $t) (i32.const 96))) (if (i32.lt_s (local.get $t) (i32.const 15)) (then (drop (call $helper0 (local.get $t))) (i32.store (i32.const 92) (local.get $t)) (drop (call $helper2 (local.get $t))))) (local.set $t (i32.add (local.get $t) (i32.const 21)))))) (global.set $acc (i64.mul (global.get $acc) (i64.const 4))) (i32.store (i32.const 84) (local.get $t)) (drop (call $helper2 (local.get $t))) (drop (call $helper2 (local.get $t))) (global.get $acc))
+  (func $unused3 (export "unused3") (result i64) (local $t i32) (block (drop (call $helper2 (local.get $t))) (block (block (local.set $t (i32.add (local.get $t) (i32.const 3))) (drop (call $helper3 (local.get $t))) (drop (call $helper3 (local.get $t)))) (global.set $acc (i64.mul (global.get $acc) (i64.const 4))) (local.set $t (i32.add (local.get $t) (i32.const 32)))) (drop (call $helper1 (local.get $t)))) (i32.store (i32.const 220) (local.get $t)) (local.set $t (i32.add (local.get $t) (i32.const 28))) (local.set $t (i32.add (local.get $t) (i32.const 50))) (global.set $acc (i64.mul (global.get $acc) (i64.const 2))) (global.get $acc))
+  (func $main (export "main") (result i32) (local $t i32)
+    (global.set $acc (i64.mul (global.get $acc) (i64.const 5)))
+    (drop (call $helper3 (local.get $t)))
+    (i32.store (i32.const 112) (local.get $t))
+    (drop (call $helper3 (local.get $t)))
+    (global.set $acc (i64.mul (global.get $acc) (i64.const 6)))
+    (drop (call $helper0 (local.get $t)))
+    (local.set $t (i32.trunc_f32_s (f32.nearest (f32.convert_i32_s (local.get $t)))))
+    (block (drop (call $helper2 (local.get $t))) (drop (call $helper3 (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 94))))
+    (if (i32.lt_s (local.get $t) (i32.const 8)) (then (global.set $acc (i64.mul (global.get $acc) (i64.const 2))) (if (i32.lt_s (local.get $t) (i32.const 4)) (then (local.set $t (i32.add (local.get $t) (i32.const 39))) (if (i32.lt_s (local.get $t) (i32.const 47)) (then (global.set $acc (i64.mul (global.get $acc) (i64.const 5))) (i32.store (i32.const 128) (local.get $t)) (global.set $acc (i64.mul (global.get $acc) (i64.const 2))))) (i32.store (i32.const 16) (local.get $t)))) (i32.store (i32.const 108) (local.get $t))))
+    (i32.store (i32.const 232) (local.get $t))
+    (global.set $acc (i64.mul (global.get $acc) (i64.const 8)))
+    (drop (call $helper0 (local.get $t)))
+    (block (global.set $acc (i64.mul (global.get $acc) (i64.const 4))) (local.set $t (i32.add (local.get $t) (i32.const 26))) (i32.store (i32.const 220) (local.get $t)))
+    (local.get $t))
+)
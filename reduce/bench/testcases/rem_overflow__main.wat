@@ -0,0 +1,29 @@
+(module
+  (memory 1)
+  (global $acc (mut i64) (i64.const 1))
+  (global $k i32 (i32.const 7))
+  (data (i32.const 16) "regression test payload 400")
+  (func $helper0 (param $x i32) (result i32) (local $t i32) (local.set $t (local.get $x)) (block (drop (call $helper0 (local.get $t))) (drop (call $helper3 (local.get $t))) (drop (call $helper2 (local.get $t)))) (block (drop (call $helper1 (local.get $t))) (i32.store (i32.const 68) (local.get $t)) (drop (call $helper1 (local.get $t)))) (local.set $t (i32.add (local.get $t) (i32.const 79))) (if (i32.lt_s (local.get $t) (i32.const 34)) (then (drop (call $helper1 (local.get $t))) (drop (call $helper0 (local.get $t))) (drop (call $helper0 (local.get $t))))) (local.get $t))
+  (func $helper1 (param $x i32) (result i32) (local $t i32) (local.set $t (local.get $x)) (drop (call $helper2 (local.get $t))) (block (i32.store (i32.const 48) (local.get $t)) (drop (call $helper3 (local.get $t))) (drop (call $helper1 (local.get $t)))) (i32.store (i32.const 244) (local.get $t)) (block (i32.store (i32.const 132) (local.get $t)) (local.set $t (i32.add (local.get $t) (i32.const 70))) (local.set $t (i32.add (local.get $t) (i32.const 11)))) (local.get $t))
+  (func $helper2 (param $x i32) (result i32) (local $t i32) (local.set $t (local.get $x)) (drop (call $helper3 (local.get $t))) (drop (call $helper0 (local.get $t))) (i32.store (i32.const 252) (local.get $t)) (if (i32.lt_s (local.get $t) (i32.const 15)) (then (drop (call $helper2 (local.get $t))) (drop (call $helper0 (local.get $t))) (global.set $acc (i64.mul (global.get $acc) (i64.const 6))))) (local.get $t))
+  (func $helper3 (param $x i32) (result i32) (local $t i32) (local.set $t (local.get $x)) (global.set $acc (i64.mul (global.get $acc) (i64.const 3))) (global.set $acc (i64.mul (global.get $acc) (i64.const 8))) (i32.store (i32.const 228) (local.get $t)) (local.set $t (i32.add (local.get $t) (i32.const 10))) (local.get $t))
+  (func $unused0 (export "unused0") (result i64) (local $t i32) (if (i32.lt_s (local.get $t) (i32.const 32)) (then (block (local.set $t (i32.add (local.get $t) (i32.const 38))) (i32.store (i32.const 148) (local.get $t)) (drop (call $helper0 (local.get $t)))) (i32.store (i32.const 168) (local.get $t)) (i32.store (i32.const 104) (local.get $t)))) (i32.store (i32.const 144) (local.get $t)) (block (local.set $t (i32.add (local.get $t) (i32.const 76))) (block (if (i32.lt_s (local.get $t) (i32.const 36)) (then (global.set $acc (i64.mul (global.get $acc) (i64.const 4))) (global.set $acc (i64.mul (global.get $acc) (i64.const 3))) (global.set $acc (i64.mul (global.get $acc) (i64.const 2))))) (i32.store (i32.const 132) (local.get $t)) (block (local.set $t (i32.add (local.get $t) (i32.const 11))) (drop (call $helper1 (local.get $t))) (global.set $acc (i64.mul (global.get $acc) (i64.const 2))))) (local.set $t (i32.add (local.get $t) (i32.const 89)))) (i32.store (i32.const 200) (local.get $t)) (drop (call $helper2 (local.get $t))) (global.get $acc))
+  (func $unused1 (export "unused1") (result i64) (local $t i32) (i32.store (i32.const 120) (local.get $t)) (global.set $acc (i64.mul (global.get $acc) (i64.const 7))) (i32.store (i32.const 212) (local.get $t)) (i32.store (i32.const 140) (local.get $t)) (block (block (drop (call $helper2 (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 41))) (i32.store (i32.const 56) (local.get $t))) (block (i32.store (i32.const 168) (local.get $t)) (global.set $acc (i64.mul (global.get $acc) (i64.const 3))) (local.set $t (i32.add (local.get $t) (i32.const 93)))) (if (i32.lt_s (local.get $t) (i32.const 7)) (then (drop (call $helper1 (local.get $t))) (if (i32.lt_s (local.get $t) (i32.const 10)) (then (drop (call $helper3 (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 12))) (global.set $acc (i64.mul (global.get $acc) (i64.const 8))))) (drop (call $helper1 (local.get $t)))))) (global.get $acc))
+  (func $unused2 (export "unused2") (result i64) (local $t i32) (local.set $t (i32.add (local.get $t) (i32.const 73))) (drop (call $helper0 (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 15))) (drop (call $helper1 (local.get $t))) (i32.store (i32.const 60) (local.get $t)) (global.get $acc))
+  (func $unused3 (export "unused3") (result i64) (local $t i32) (block (local.set $t (i32.add (local.get $t) (i32.const 47))) (local.set $t (i32.add (local.get $t) (i32.const 4))) (i32.store (i32.const 8) (local.get $t))) (global.set $acc (i64.mul (global.get $acc) (i64.const 3))) (drop (call $helper0 (local.get $t))) (block (global.set $acc (i64.mul (global.get $acc) (i64.const 7))) (local.set $t (i32.add (local.get $t) (i32.const 86))) (local.set $t (i32.add (local.get $t) (i32.const 69)))) (block (i32.store (i32.const 48) (local.get $t)) (if (i32.lt_s (local.get $t) (i32.const 4)) (then (global.set $acc (i64.mul (global.get $acc) (i64.const 2))) (drop (call $helper2 (local.get $t))) (if (i32.lt_s (local.get $t) (i32.const 27)) (then (global.set $acc (i64.mul (global.get $acc) (i64.const 2))) (i32.store (i32.const 236) (local.get $t)) (local.set $t (i32.add (local.get $t) (i32.const 76))))))) (local.set $t (i32.add (local.get $t) (i32.const 89)))) (global.get $acc))
+  (func $main (export "main") (result i32) (local $t i32)
+    (global.set $acc (i64.mul (global.get $acc) (i64.const 4)))
+    (if (i32.lt_s (local.get $t) (i32.const 46)) (then (block (i32.store (i32.const 84) (local.get $t)) (drop (call $helper1 (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 86)))) (global.set $acc (i64.mul (global.get $acc) (i64.const 8))) (global.set $acc (i64.mul (global.get $acc) (i64.const 4)))))
+    (i32.store (i32.const 128) (local.get $t))
+    (local.set $t (i32.add (local.get $t) (i32.const 76)))
+    (block (drop (call $helper1 (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 60))) (drop (call $helper3 (local.get $t))))
+    (i32.store (i32.const 156) (local.get $t))
+    (local.set $t (i32.rem_s (local.get $t) (i32.const -1)))
+    (drop (call $helper2 (local.get $t)))
+    (block (drop (call $helper2 (local.get $t))) (global.set $acc (i64.mul (global.get $acc) (i64.const 6))) (drop (call $helper0 (local.get $t))))
+    (block (drop (call $helper0 (local.get $t))) (if (i32.lt_s (local.get $t) (i32.const 47)) (then (local.set $t (i32.add (local.get $t) (i32.const 69))) (if (i32.lt_s (local.get $t) (i32.const 8)) (then (global.set $acc (i64.mul (global.get $acc) (i64.const 8))) (drop (call $helper2 (local.get $t))) (i32.store (i32.const 144) (local.get $t)))) (drop (call $helper2 (local.get $t))))) (i32.store (i32.const 64) (local.get $t)))
+    (drop (call $helper2 (local.get $t)))
+    (block (drop (call $helper3 (local.get $t))) (drop (call $helper0 (local.get $t))) (local.set $t (i32.add (local.get $t) (i32.const 76))))
+    (global.set $acc (i64.mul (global.get $acc) (i64.const 7)))
+    (local.get $t))
+)
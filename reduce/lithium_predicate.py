@@ -1,6 +1,18 @@
+import glob
 import os
 import shutil
 import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "pipeline"))
+import spans
+from workspace import candidate_workspace, log_verdict
+
+# Overridable so the reduction benchmark can swap in its runtime stand-in
+ORACLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "exec_oracle")
+REPLAY_WASM = os.environ.get("REPLAY_WASM", os.path.join(ORACLE_DIR, "replay_wasm.sh"))
+DEDUP_OUTPUT = os.environ.get("DEDUP_OUTPUT", os.path.join(ORACLE_DIR, "dedup_output.py"))
 
 def interesting(args, prefix):
     """
@@ -8,7 +20,14 @@ def interesting(args, prefix):
     Returns True if the reduced testcase is still interesting
     (i.e., new output matches reference output), else False.
     """
-
+    with spans.span("predicate") as span:
+        result = evaluate(args)
+        span.annotate(interesting=result)
+    spans.count("predicate.calls")
+    return result
+
+def evaluate(args):
+    """Replays the candidate and compares its deduplicated output with the reference."""
     if not args:
         print("[!] No input file provided to interesting()")
         return False
@@ -24,41 +43,46 @@ def interesting(args, prefix):
         print("[!] Missing environment variables: WASM_DIR, FUNC_NAME, FILENAME")
         return False
 
-    reduced_dir = os.path.join(WASM_DIR, "reduced")
-    os.makedirs(reduced_dir, exist_ok=True)
-
-    # Copy candidate to reduced directory
-    temp_copy = os.path.join(reduced_dir, f"temp__{FUNC_NAME}.wasm")
-    shutil.copy(temp_wasm_path, temp_copy)
-
     ref_output_path = os.path.join(WASM_DIR, f"{FILENAME}.txt")
-    new_output_dir = os.path.join(reduced_dir, "output")
-    new_dedup_dir = os.path.join(new_output_dir, "deduped")
-    new_output_path = os.path.join(new_dedup_dir, f"temp__{FUNC_NAME}.txt")
-
-    # Run replay and dedup
-    subprocess.run(
-        ["/bin/bash", "/path/to/replay_wasm.sh", FUNC_NAME, reduced_dir],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-    )
-    subprocess.run(
-        ["python3", "/path/to/dedup_output.py", new_output_dir],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-    )
-
-    # Read reference and new outputs as strings
-    ref_content = ""
-    new_content = ""
-
-    if os.path.exists(ref_output_path):
-        with open(ref_output_path, "r", errors="ignore") as f:
-            ref_content = f.read().strip()
-
-    if os.path.exists(new_output_path):
-        with open(new_output_path, "r", errors="ignore") as f:
-            new_content = f.read().strip()
+
+    # Each evaluation replays in its own scratch directory, so concurrent
+    # reductions never share candidate copies, artifacts or outputs.
+    with candidate_workspace(f"predicate_{FUNC_NAME}") as reduced_dir:
+        temp_copy = os.path.join(reduced_dir, f"temp__{FUNC_NAME}.wasm")
+        shutil.copy(temp_wasm_path, temp_copy)
+
+        new_output_dir = os.path.join(reduced_dir, "output")
+        new_dedup_dir = os.path.join(new_output_dir, "deduped")
+
+        # Run replay and dedup
+        with spans.span("replay"):
+            subprocess.run(
+                ["/bin/bash", REPLAY_WASM, FUNC_NAME, reduced_dir],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        with spans.span("dedup"):
+            subprocess.run(
+                ["python3", DEDUP_OUTPUT, new_output_dir],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+
+        # The workspace holds a single candidate, so its deduped output is the only file there
+        deduped = glob.glob(os.path.join(new_dedup_dir, "*.txt"))
+        new_output_path = deduped[0] if deduped else os.path.join(new_dedup_dir, f"temp__{FUNC_NAME}.txt")
+
+        # Read reference and new outputs as strings
+        ref_content = ""
+        new_content = ""
+
+        if os.path.exists(ref_output_path):
+            with open(ref_output_path, "r", errors="ignore") as f:
+                ref_content = f.read().strip()
+
+        if os.path.exists(new_output_path):
+            with open(new_output_path, "r", errors="ignore") as f:
+                new_content = f.read().strip()
 
     # Print logs similar to the bash version
     print("++++++++++++++++++++++++++++++++++++++++++")
@@ -79,16 +103,6 @@ def interesting(args, prefix):
 
     print("++++++++++++++++++++++++++++++++++++++++++")
 
-    # Clean up
-    cleanup_paths = [
-        os.path.join(new_output_dir, f"temp__{FUNC_NAME}__{FUNC_NAME}.txt"),
-        new_output_path,
-        temp_copy,
-    ]
-    for path in cleanup_paths:
-        try:
-            os.remove(path)
-        except FileNotFoundError:
-            pass
+    log_verdict(os.environ.get("REDUCE_LOG"), os.path.getsize(temp_wasm_path), interesting_result)
 
     return interesting_result
@@ -0,0 +1,80 @@
+#!/bin/bash
+
+# The oracle scripts of this repository, unless overridden (e.g. by the reduction benchmark)
+export SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+export REPLAY_WASM="${REPLAY_WASM:-$SCRIPT_DIR/../exec_oracle/replay_wasm.sh}"
+export DEDUP_OUTPUT="${DEDUP_OUTPUT:-$SCRIPT_DIR/../exec_oracle/dedup_output.py}"
+
+get_ref_output() {
+  local wasm_path=$1
+  local func=$2
+
+  wasm_dir=$(dirname "$wasm_path")
+  # A private workspace per call, so concurrent runs on testcases of the same directory
+  # never replay (or delete) each other's files
+  local tmp_dir
+  tmp_dir=$(python3 "$SCRIPT_DIR/workspace.py" "ref_output") || return 1
+
+  cp "$wasm_path" "$tmp_dir"
+
+  bash "$REPLAY_WASM" $func "$tmp_dir"
+  python3 "$DEDUP_OUTPUT" "$tmp_dir/output"
+
+  # Copy the reference deduped output file from the workspace to the test case directory
+  cp "$tmp_dir"/output/deduped/*.txt "$wasm_dir"
+  rm -rf "$tmp_dir"
+}
+
+shrink() {
+  local wasm_path=$1
+  local func=$2
+
+  export WASM_DIR=$(dirname "$wasm_path")
+  filename=$(basename $wasm_path .wasm)
+  export FILENAME=$filename
+
+  shrunken_wasm_path="$WASM_DIR/shrunken_$FILENAME.wasm"
+  shrunken_wat_path="$WASM_DIR/shrunken_$FILENAME.wat"
+
+  export FUNC_NAME=$func
+  export TMPDIR="/tmp"
+
+  # The structure-aware reducer is deterministic, so a single run replaces the per-seed runs
+  python3 "$SCRIPT_DIR/wasm_reducer.py" --predicate "$SCRIPT_DIR/lithium_predicate.py" --keep-export "$func" \
+    -o "$shrunken_wasm_path" "$wasm_path"
+
+  if [ -f "$shrunken_wasm_path" ]; then
+    wasm-tools print "$shrunken_wasm_path" -o "$shrunken_wat_path"
+  fi
+
+  sleep infinity
+}
+export -f shrink
+
+# Entry
+wasm_path=$1
+
+tc_dir=$(dirname "$wasm_path")
+tc_name=$(basename "$wasm_path")
+tc_name_with_func=$(basename "$wasm_path" .wasm)
+tc="${tc_name_with_func%%__*}"
+func="${tc_name_with_func##*__}"
+
+if [ $func == "start" ]; then
+  func="_start"
+fi
+
+# Create reference output file
+get_ref_output $wasm_path $func
+if [ ! -f "${tc_dir}/${tc_name_with_func}.txt" ]; then
+  echo ""
+  echo "ERROR: Reference output file ( ${tc_dir}/${tc_name_with_func}.txt ) was not created. Please check. Stopping reduction."
+  exit 1
+fi
+
+mkdir -p "$tc_dir/reductions/native"
+new_wasm_path="$tc_dir/reductions/native/$tc_name"
+cp $wasm_path $new_wasm_path                                    # duplicate of input wasm file
+cp "$tc_dir/$tc_name_with_func.txt" "$tc_dir/reductions/native" # duplicate of reference output file
+
+screen -dmS shrink__native__${tc_name_with_func} bash -c "shrink $new_wasm_path $func"
@@ -3,15 +3,28 @@
 # The input wasm_path should be the path to a temporary wasm_path which is ideally copied from the original directory into a reduced directory
 temp_wasm_path=$1
 
-reduced_dir="$WASM_DIR/reduced"
-mkdir -p $reduced_dir
+# Replay every candidate in its own scratch directory (on tmpfs when available) so that
+# concurrent reductions in the same directory never share candidates, artifacts or outputs
+scratch_root="${REDUCE_SCRATCH:-/dev/shm}"
+if [ ! -d "$scratch_root" ] || [ ! -w "$scratch_root" ]; then
+  scratch_root="${TMPDIR:-/tmp}"
+fi
+mkdir -p "$scratch_root"
+reduced_dir=$(mktemp -d "$scratch_root/predicate_${FUNC_NAME}.XXXXXX") || exit 1
+trap 'rm -rf "$reduced_dir"' EXIT
+
 cp $temp_wasm_path $reduced_dir/temp__${FUNC_NAME}.wasm
 
 ref_output_path="$WASM_DIR/${FILENAME}.txt"
-new_output_path="$reduced_dir/output/deduped/temp__${FUNC_NAME}.txt"
 
-bash /path/to/replay_wasm.sh $FUNC_NAME "$reduced_dir"
-python3 /path/to/dedup_output.py "$reduced_dir/output"
+# Overridable so the reduction benchmark can swap in its runtime stand-in
+script_dir="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+bash "${REPLAY_WASM:-$script_dir/../exec_oracle/replay_wasm.sh}" $FUNC_NAME "$reduced_dir"
+python3 "${DEDUP_OUTPUT:-$script_dir/../exec_oracle/dedup_output.py}" "$reduced_dir/output"
+
+# The workspace holds a single candidate, so its deduped output is the only file there
+new_output_path=$(ls "$reduced_dir"/output/deduped/*.txt 2>/dev/null | head -n 1)
+new_output_path="${new_output_path:-$reduced_dir/output/deduped/temp__${FUNC_NAME}.txt}"
 
 diff_output=$(diff "$ref_output_path" "$new_output_path")
 diff_status=$?
@@ -27,12 +40,13 @@ echo "DIFF:"
 echo "$diff_output"
 echo "++++++++++++++++++++++++++++++++++++++++++"
 
-rm "$reduced_dir/output/temp__${FUNC_NAME}__${FUNC_NAME}.txt"
-rm "$reduced_dir/output/deduped/temp__${FUNC_NAME}.txt"
-rm "$reduced_dir/temp__${FUNC_NAME}.wasm"
+# One "<time> <size> <verdict>" line per call when running under the benchmark
+if [ -n "$REDUCE_LOG" ]; then
+  echo "$(date +%s.%N) $(stat -c %s "$temp_wasm_path") $([ "$diff_status" -eq 0 ] && echo 1 || echo 0)" >> "$REDUCE_LOG"
+fi
 
 if [ "$diff_status" -eq 0 ]; then
   exit 0
 else
   exit 1
-fi
\ No newline at end of file
+fi
@@ -1,22 +1,28 @@
 #!/bin/bash
 
+# The oracle scripts of this repository, unless overridden (e.g. by the reduction benchmark)
+export SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+export REPLAY_WASM="${REPLAY_WASM:-$SCRIPT_DIR/../exec_oracle/replay_wasm.sh}"
+export DEDUP_OUTPUT="${DEDUP_OUTPUT:-$SCRIPT_DIR/../exec_oracle/dedup_output.py}"
+
 get_ref_output() {
   local wasm_path=$1
   local func=$2
 
-  wasm_fname=$(basename $wasm_path)
   wasm_dir=$(dirname "$wasm_path")
-  tmp_dir="$wasm_dir/tmp"
-  mkdir -p $tmp_dir
+  # A private workspace per call, so concurrent runs on testcases of the same directory
+  # never replay (or delete) each other's files
+  local tmp_dir
+  tmp_dir=$(python3 "$SCRIPT_DIR/workspace.py" "ref_output") || return 1
 
-  cp $wasm_path $tmp_dir
+  cp "$wasm_path" "$tmp_dir"
 
-  bash /path/to/replay_wasm.sh $func $tmp_dir
-  python3 /path/to/dedup_output.py $tmp_dir/output
+  bash "$REPLAY_WASM" $func "$tmp_dir"
+  python3 "$DEDUP_OUTPUT" "$tmp_dir/output"
 
-  # Copy the reference deduped output file from tmp/output/deduped to the test case directory
-  cp $tmp_dir/output/deduped/*.txt $wasm_dir
-  rm -rf $tmp_dir
+  # Copy the reference deduped output file from the workspace to the test case directory
+  cp "$tmp_dir"/output/deduped/*.txt "$wasm_dir"
+  rm -rf "$tmp_dir"
 }
 
 rand() {
@@ -41,7 +47,7 @@ shrink() {
   export FUNC_NAME=$func
   export TMPDIR="/tmp"
 
-  RUST_LOG=info wasm-tools shrink -a 100000 -s $seed ./reducer_predicate.sh "$wasm_path" -o "$shrunken_wasm_path"
+  RUST_LOG=info wasm-tools shrink -a 100000 -s $seed "$SCRIPT_DIR/reducer_predicate.sh" "$wasm_path" -o "$shrunken_wasm_path"
   
   if [ -f "$shrunken_wasm_path" ]; then
     wasm-tools print "$shrunken_wasm_path" -o "$shrunken_wat_path"
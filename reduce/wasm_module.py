@@ -0,0 +1,993 @@
+"""
+Minimal WebAssembly binary model.
+
+Parses a core module into sections, functions and structured instruction
+trees (block/loop/if bodies nested under their opening instruction) and
+encodes it back. Only the pieces the reducer edits are modelled; everything
+else (types, tables, memories, tags, custom sections) is carried as raw bytes.
+"""
+MAGIC = b"\0asm"
+VERSION = b"\x01\0\0\0"
+
+SEC_CUSTOM = 0
+SEC_TYPE = 1
+SEC_IMPORT = 2
+SEC_FUNCTION = 3
+SEC_TABLE = 4
+SEC_MEMORY = 5
+SEC_GLOBAL = 6
+SEC_EXPORT = 7
+SEC_START = 8
+SEC_ELEMENT = 9
+SEC_CODE = 10
+SEC_DATA = 11
+SEC_DATACOUNT = 12
+SEC_TAG = 13
+
+KIND_FUNC = 0
+KIND_TABLE = 1
+KIND_MEMORY = 2
+KIND_GLOBAL = 3
+KIND_TAG = 4
+
+I32 = b"\x7f"
+I64 = b"\x7e"
+F32 = b"\x7d"
+F64 = b"\x7c"
+V128 = b"\x7b"
+
+# Opcodes that open a structured instruction and the separators inside them.
+BLOCK_OPS = {0x02, 0x03, 0x04, 0x06, 0x1F}
+ARM_OPS = {0x05, 0x07, 0x19}
+END = 0x0B
+DELEGATE = 0x18
+
+
+class DecodeError(Exception):
+    pass
+
+
+# ----------- LEB128 -----------
+
+def enc_u(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def enc_s(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if (value == 0 and not byte & 0x40) or (value == -1 and byte & 0x40):
+            out.append(byte)
+            return bytes(out)
+        out.append(byte | 0x80)
+
+
+def enc_vec(items):
+    return enc_u(len(items)) + b"".join(items)
+
+
+def enc_name(raw):
+    return enc_u(len(raw)) + raw
+
+
+class Reader:
+    def __init__(self, data, pos=0, end=None):
+        self.data = data
+        self.pos = pos
+        self.end = len(data) if end is None else end
+
+    def eof(self):
+        return self.pos >= self.end
+
+    def byte(self):
+        if self.pos >= self.end:
+            raise DecodeError("unexpected end of input")
+        b = self.data[self.pos]
+        self.pos += 1
+        return b
+
+    def peek(self):
+        if self.pos >= self.end:
+            raise DecodeError("unexpected end of input")
+        return self.data[self.pos]
+
+    def bytes(self, n):
+        if self.pos + n > self.end:
+            raise DecodeError("unexpected end of input")
+        b = bytes(self.data[self.pos:self.pos + n])
+        self.pos += n
+        return b
+
+    def u(self):
+        result = shift = 0
+        while True:
+            b = self.byte()
+            result |= (b & 0x7F) << shift
+            shift += 7
+            if not b & 0x80:
+                return result
+            if shift > 70:
+                raise DecodeError("LEB128 too long")
+
+    def s(self):
+        result = shift = 0
+        while True:
+            b = self.byte()
+            result |= (b & 0x7F) << shift
+            shift += 7
+            if not b & 0x80:
+                if b & 0x40:
+                    result -= 1 << shift
+                return result
+            if shift > 70:
+                raise DecodeError("LEB128 too long")
+
+    def name(self):
+        return self.bytes(self.u())
+
+    def valtype(self):
+        start = self.pos
+        b = self.byte()
+        if b in (0x63, 0x64):
+            self.s()
+        return bytes(self.data[start:self.pos])
+
+    def limits(self):
+        flags = self.byte()
+        self.u()
+        if flags & 0x01:
+            self.u()
+        return flags
+
+
+# ----------- Instructions -----------
+
+class Instr:
+    """
+    One instruction. `op` is the opcode byte, or (prefix, subop) for prefixed
+    opcodes. `fields` are the immediates as (encoding, value, role) tuples,
+    where encoding is 'u'/'s' (LEB128), 'raw' (bytes), 'vec' or 'seq' (lists of
+    fields) and role names the index space an index immediate refers to.
+    """
+    __slots__ = ("op", "fields")
+
+    def __init__(self, op, fields=()):
+        self.op = op
+        self.fields = tuple(fields)
+
+    def __repr__(self):
+        return f"Instr({self.op!r}, {self.fields!r})"
+
+    def index(self, role):
+        for enc, value, r in self.fields:
+            if r == role:
+                return value
+        return None
+
+
+class Block(Instr):
+    """
+    A structured instruction. `arms` is a list of (separator, body) pairs: a
+    single arm for block/loop, then/else for if and try/catch clauses for try.
+    `end` is the closing instruction (end, or delegate for legacy try).
+    """
+    __slots__ = ("arms", "end")
+
+    def __init__(self, op, fields=(), arms=None, end=None):
+        super().__init__(op, fields)
+        self.arms = arms if arms is not None else [(None, [])]
+        self.end = end if end is not None else Instr(END)
+
+    def __repr__(self):
+        return f"Block({self.op!r}, {self.fields!r}, {self.arms!r})"
+
+    @property
+    def blocktype(self):
+        enc, value, _ = self.fields[0]
+        return value
+
+
+def _memarg(r):
+    align = r.u()
+    fields = [("u", align, None)]
+    if align & 0x40:
+        fields.append(("u", r.u(), "mem"))
+    fields.append(("u", r.u(), None))
+    return fields
+
+
+def _blocktype(r):
+    b = r.peek()
+    if 0x40 <= b < 0x80:
+        if b == 0x40:
+            r.byte()
+            return [("raw", b"\x40", None)]
+        return [("raw", r.valtype(), None)]
+    return [("s", r.s(), "type")]
+
+
+def _heaptype(r):
+    start = r.pos
+    r.s()
+    return [("raw", bytes(r.data[start:r.pos]), None)]
+
+
+def _catch(r):
+    kind = r.byte()
+    fields = [("raw", bytes([kind]), None)]
+    if kind in (0, 1):
+        fields.append(("u", r.u(), "tag"))
+    fields.append(("u", r.u(), "label"))
+    return ("seq", fields, None)
+
+
+IMM = {
+    "u:func": lambda r: [("u", r.u(), "func")],
+    "u:global": lambda r: [("u", r.u(), "global")],
+    "u:local": lambda r: [("u", r.u(), "local")],
+    "u:label": lambda r: [("u", r.u(), "label")],
+    "u:type": lambda r: [("u", r.u(), "type")],
+    "u:table": lambda r: [("u", r.u(), "table")],
+    "u:mem": lambda r: [("u", r.u(), "mem")],
+    "u:data": lambda r: [("u", r.u(), "data")],
+    "u:elem": lambda r: [("u", r.u(), "elem")],
+    "u:tag": lambda r: [("u", r.u(), "tag")],
+    "u:field": lambda r: [("u", r.u(), None)],
+    "u": lambda r: [("u", r.u(), None)],
+    "s": lambda r: [("s", r.s(), None)],
+    "f32": lambda r: [("raw", r.bytes(4), None)],
+    "f64": lambda r: [("raw", r.bytes(8), None)],
+    "v128": lambda r: [("raw", r.bytes(16), None)],
+    "lane": lambda r: [("raw", r.bytes(1), None)],
+    "byte": lambda r: [("raw", r.bytes(1), None)],
+    "memarg": _memarg,
+    "bt": _blocktype,
+    "ht": _heaptype,
+    "labels": lambda r: [("vec", [("u", r.u(), "label") for _ in range(r.u())], None)],
+    "valtypes": lambda r: [("vec", [("raw", r.valtype(), None) for _ in range(r.u())], None)],
+    "catches": lambda r: [("vec", [_catch(r) for _ in range(r.u())], None)],
+}
+
+# Immediate layout per opcode. Opcodes absent from the table have none.
+SINGLE = {
+    0x02: ("bt",), 0x03: ("bt",), 0x04: ("bt",), 0x06: ("bt",),
+    0x07: ("u:tag",), 0x08: ("u:tag",), 0x09: ("u:label",),
+    0x0C: ("u:label",), 0x0D: ("u:label",), 0x0E: ("labels", "u:label"),
+    0x10: ("u:func",), 0x11: ("u:type", "u:table"),
+    0x12: ("u:func",), 0x13: ("u:type", "u:table"),
+    0x14: ("u:type",), 0x15: ("u:type",),
+    0x18: ("u:label",), 0x1C: ("valtypes",), 0x1F: ("bt", "catches"),
+    0x20: ("u:local",), 0x21: ("u:local",), 0x22: ("u:local",),
+    0x23: ("u:global",), 0x24: ("u:global",),
+    0x25: ("u:table",), 0x26: ("u:table",),
+    0x3F: ("u:mem",), 0x40: ("u:mem",),
+    0x41: ("s",), 0x42: ("s",), 0x43: ("f32",), 0x44: ("f64",),
+    0xD0: ("ht",), 0xD2: ("u:func",), 0xD5: ("u:label",), 0xD6: ("u:label",),
+}
+for _op in range(0x28, 0x3F):
+    SINGLE[_op] = ("memarg",)
+
+KNOWN_SINGLE = (
+    set(range(0x00, 0x1D)) | {0x1F} | set(range(0x20, 0x27)) | set(range(0x28, 0xC5))
+    | set(range(0xD0, 0xD7))
+) - {0x16, 0x17}
+
+PREFIXED = {
+    0xFC: {
+        **{i: () for i in range(8)},
+        8: ("u:data", "u:mem"), 9: ("u:data",), 10: ("u:mem", "u:mem"), 11: ("u:mem",),
+        12: ("u:elem", "u:table"), 13: ("u:elem",), 14: ("u:table", "u:table"),
+        15: ("u:table",), 16: ("u:table",), 17: ("u:table",),
+    },
+    0xFB: {
+        0: ("u:type",), 1: ("u:type",), 2: ("u:type", "u:field"), 3: ("u:type", "u:field"),
+        4: ("u:type", "u:field"), 5: ("u:type", "u:field"), 6: ("u:type",), 7: ("u:type",),
+        8: ("u:type", "u"), 9: ("u:type", "u:data"), 10: ("u:type", "u:elem"),
+        11: ("u:type",), 12: ("u:type",), 13: ("u:type",), 14: ("u:type",), 15: (),
+        16: ("u:type",), 17: ("u:type", "u:type"), 18: ("u:type", "u:data"),
+        19: ("u:type", "u:elem"), 20: ("ht",), 21: ("ht",), 22: ("ht",), 23: ("ht",),
+        24: ("byte", "u:label", "ht", "ht"), 25: ("byte", "u:label", "ht", "ht"),
+        26: (), 27: (), 28: (), 29: (), 30: (),
+    },
+    0xFD: {},
+    0xFE: {0: ("memarg",), 1: ("memarg",), 2: ("memarg",), 3: ("byte",)},
+}
+for _sub in range(0, 12):
+    PREFIXED[0xFD][_sub] = ("memarg",)
+PREFIXED[0xFD][12] = ("v128",)
+PREFIXED[0xFD][13] = ("v128",)
+for _sub in range(14, 21):
+    PREFIXED[0xFD][_sub] = ()
+for _sub in range(21, 35):
+    PREFIXED[0xFD][_sub] = ("lane",)
+for _sub in range(35, 84):
+    PREFIXED[0xFD][_sub] = ()
+for _sub in range(84, 92):
+    PREFIXED[0xFD][_sub] = ("memarg", "lane")
+PREFIXED[0xFD][92] = ("memarg",)
+PREFIXED[0xFD][93] = ("memarg",)
+for _sub in range(94, 276):
+    PREFIXED[0xFD][_sub] = ()
+for _sub in range(0x10, 0x4F):
+    PREFIXED[0xFE][_sub] = ("memarg",)
+
+
+def read_instr(r):
+    b = r.byte()
+    if b in PREFIXED:
+        sub = r.u()
+        spec = PREFIXED[b].get(sub)
+        if spec is None:
+            raise DecodeError(f"unknown opcode 0x{b:02x} {sub}")
+        op = (b, sub)
+    else:
+        if b not in KNOWN_SINGLE:
+            raise DecodeError(f"unknown opcode 0x{b:02x}")
+        spec = SINGLE.get(b, ())
+        op = b
+    fields = []
+    for kind in spec:
+        fields.extend(IMM[kind](r))
+    return Instr(op, fields)
+
+
+def decode_expr(r):
+    """
+    Decode instructions up to and including the `end` that closes the
+    expression, returning the top-level node list.
+    """
+    root = []
+    stack = [(None, root)]
+    while True:
+        ins = read_instr(r)
+        op = ins.op
+        blk, body = stack[-1]
+        if op in BLOCK_OPS:
+            node = Block(op, ins.fields)
+            body.append(node)
+            stack.append((node, node.arms[0][1]))
+        elif op in ARM_OPS:
+            if blk is None:
+                raise DecodeError("separator outside of a block")
+            arm = (ins, [])
+            blk.arms.append(arm)
+            stack[-1] = (blk, arm[1])
+        elif op == END or op == DELEGATE:
+            if blk is None:
+                if op != END:
+                    raise DecodeError("delegate outside of a block")
+                return root
+            blk.end = ins
+            stack.pop()
+        else:
+            body.append(ins)
+
+
+def iter_depths(r):
+    """
+    Yield (instruction, depth) up to and excluding the `end` that closes the
+    expression, without building the tree. Depth counts the blocks enclosing
+    the instruction; a block's opener, separators and end are at the depth of
+    the block itself.
+    """
+    depth = 0
+    while True:
+        ins = read_instr(r)
+        op = ins.op
+        if op in BLOCK_OPS:
+            yield ins, depth
+            depth += 1
+        elif op in ARM_OPS:
+            if depth == 0:
+                raise DecodeError("separator outside of a block")
+            yield ins, depth - 1
+        elif op == END or op == DELEGATE:
+            if depth == 0:
+                if op != END:
+                    raise DecodeError("delegate outside of a block")
+                return
+            depth -= 1
+            yield ins, depth
+        else:
+            yield ins, depth
+
+
+def encode_fields(fields, out):
+    for enc, value, _ in fields:
+        if enc == "u":
+            out += enc_u(value)
+        elif enc == "s":
+            out += enc_s(value)
+        elif enc == "raw":
+            out += value
+        elif enc == "vec":
+            out += enc_u(len(value))
+            encode_fields(value, out)
+        elif enc == "seq":
+            encode_fields(value, out)
+
+
+def encode_instr(ins, out, remap=None):
+    op = ins.op
+    if isinstance(op, tuple):
+        out.append(op[0])
+        out += enc_u(op[1])
+    else:
+        out.append(op)
+    fields = ins.fields
+    if remap:
+        fields = remap_fields(fields, remap)
+    encode_fields(fields, out)
+
+
+def remap_fields(fields, remap):
+    result = []
+    for enc, value, role in fields:
+        if enc in ("vec", "seq"):
+            value = remap_fields(value, remap)
+        elif role in remap:
+            value = remap[role][value]
+        result.append((enc, value, role))
+    return result
+
+
+def encode_expr(nodes, out, remap=None):
+    """Encode a node list followed by the closing `end`."""
+    stack = [iter(nodes)]
+    closers = [None]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+            closer = closers.pop()
+            if closer is None:
+                out.append(END)
+            elif isinstance(closer, tuple):
+                blk, arm_idx = closer
+                if arm_idx < len(blk.arms):
+                    sep, body = blk.arms[arm_idx]
+                    encode_instr(sep, out, remap)
+                    stack.append(iter(body))
+                    closers.append((blk, arm_idx + 1))
+                else:
+                    encode_instr(blk.end, out, remap)
+            continue
+        encode_instr(node, out, remap)
+        if isinstance(node, Block):
+            stack.append(iter(node.arms[0][1]))
+            closers.append((node, 1))
+    return out
+
+
+def iter_instrs(nodes):
+    """Yield every instruction in a node list, including nested ones and block ends."""
+    stack = [iter(nodes)]
+    while stack:
+        node = next(stack[-1], None)
+        if node is None:
+            stack.pop()
+            continue
+        yield node
+        if isinstance(node, Block):
+            arms = [body for _, body in node.arms]
+            for sep, _ in node.arms[1:]:
+                yield sep
+            yield node.end
+            for body in reversed(arms):
+                stack.append(iter(body))
+
+
+# ----------- Module -----------
+
+class FuncType:
+    __slots__ = ("params", "results")
+
+    def __init__(self, params, results):
+        self.params = params
+        self.results = results
+
+
+class Import:
+    __slots__ = ("module", "name", "kind", "desc", "typeidx", "valtype", "mem_flags")
+
+    def __init__(self, module, name, kind, desc):
+        self.module = module
+        self.name = name
+        self.kind = kind
+        self.desc = desc
+        self.typeidx = None
+        self.valtype = None
+        self.mem_flags = None
+
+
+class Global:
+    __slots__ = ("valtype", "mut", "init")
+
+    def __init__(self, valtype, mut, init):
+        self.valtype = valtype
+        self.mut = mut
+        self.init = init
+
+
+class Export:
+    __slots__ = ("name", "kind", "index")
+
+    def __init__(self, name, kind, index):
+        self.name = name
+        self.kind = kind
+        self.index = index
+
+
+class Elem:
+    __slots__ = ("flags", "table", "offset", "elemtype", "funcs", "exprs")
+
+    def __init__(self, flags, table, offset, elemtype, funcs, exprs):
+        self.flags = flags
+        self.table = table
+        self.offset = offset
+        self.elemtype = elemtype
+        self.funcs = funcs
+        self.exprs = exprs
+
+
+class Data:
+    __slots__ = ("flags", "memory", "offset", "init")
+
+    def __init__(self, flags, memory, offset, init):
+        self.flags = flags
+        self.memory = memory
+        self.offset = offset
+        self.init = init
+
+
+class Func:
+    """
+    A defined function. `body` is the decoded node list, or None when the body
+    uses instructions this model does not know; `raw` then holds the encoded body.
+    """
+    __slots__ = ("typeidx", "locals", "body", "raw")
+
+    def __init__(self, typeidx, locals_, body, raw):
+        self.typeidx = typeidx
+        self.locals = locals_
+        self.body = body
+        self.raw = raw
+
+    def local_types(self):
+        types = []
+        for count, valtype in self.locals:
+            types.extend([valtype] * count)
+        return types
+
+
+class Edit:
+    """
+    A candidate change to a module: items to drop (by index in the respective
+    index space) and replacement function bodies (by defined-function index).
+    """
+
+    def __init__(self, funcs=(), globals_=(), datas=(), exports=(), customs=(), bodies=None):
+        self.funcs = set(funcs)
+        self.globals = set(globals_)
+        self.datas = set(datas)
+        self.exports = set(exports)
+        self.customs = set(customs)
+        self.bodies = dict(bodies or {})
+
+
+class Module:
+    def __init__(self, data):
+        data = bytes(data)
+        if data[:4] != MAGIC or data[4:8] != VERSION:
+            raise DecodeError("not a core WebAssembly module")
+        self.sections = []    # (id, raw payload) in file order
+        self.types = []
+        self.imports = []
+        self.funcs = []
+        self.memories = []
+        self.globals = []
+        self.exports = []
+        self.start = None
+        self.elems = []
+        self.datas = []
+        self.has_datacount = False
+        self.customs = []     # (section position, name, payload)
+        self.type_section_ok = True
+
+        r = Reader(data, 8)
+        func_types = []
+        while not r.eof():
+            sid = r.byte()
+            size = r.u()
+            payload = r.bytes(size)
+            self.sections.append((sid, payload))
+            sr = Reader(payload)
+            if sid == SEC_CUSTOM:
+                self.customs.append((len(self.sections) - 1, sr.name(), payload))
+            elif sid == SEC_TYPE:
+                self._parse_types(sr)
+            elif sid == SEC_IMPORT:
+                for _ in range(sr.u()):
+                    self.imports.append(self._parse_import(sr))
+            elif sid == SEC_FUNCTION:
+                func_types = [sr.u() for _ in range(sr.u())]
+            elif sid == SEC_MEMORY:
+                self.memories = [sr.limits() for _ in range(sr.u())]
+            elif sid == SEC_GLOBAL:
+                for _ in range(sr.u()):
+                    valtype = sr.valtype()
+                    mut = sr.byte()
+                    self.globals.append(Global(valtype, mut, decode_expr(sr)))
+            elif sid == SEC_EXPORT:
+                for _ in range(sr.u()):
+                    name = sr.name()
+                    kind = sr.byte()
+                    self.exports.append(Export(name, kind, sr.u()))
+            elif sid == SEC_START:
+                self.start = sr.u()
+            elif sid == SEC_ELEMENT:
+                self.elems = [self._parse_elem(sr) for _ in range(sr.u())]
+            elif sid == SEC_DATACOUNT:
+                self.has_datacount = True
+            elif sid == SEC_CODE:
+                count = sr.u()
+                if count != len(func_types):
+                    raise DecodeError("function and code section sizes differ")
+                for typeidx in func_types:
+                    self.funcs.append(self._parse_func(sr, typeidx))
+            elif sid == SEC_DATA:
+                self.datas = [self._parse_data(sr) for _ in range(sr.u())]
+        if func_types and not self.funcs:
+            raise DecodeError("function section without code section")
+
+    # ----- parsing helpers -----
+
+    def _parse_types(self, r):
+        for _ in range(r.u()):
+            form = r.byte()
+            if form == 0x60:
+                params = [r.valtype() for _ in range(r.u())]
+                results = [r.valtype() for _ in range(r.u())]
+                self.types.append(FuncType(params, results))
+            elif form == 0x4E:
+                for _ in range(r.u()):
+                    self._parse_subtype(r, r.byte())
+            else:
+                self._parse_subtype(r, form)
+
+    def _parse_subtype(self, r, form):
+        self.type_section_ok = False
+        if form in (0x50, 0x4F):
+            for _ in range(r.u()):
+                r.u()
+            form = r.byte()
+        if form == 0x60:
+            params = [r.valtype() for _ in range(r.u())]
+            results = [r.valtype() for _ in range(r.u())]
+            self.types.append(FuncType(params, results))
+        elif form == 0x5F:
+            for _ in range(r.u()):
+                r.valtype()
+                r.byte()
+            self.types.append(None)
+        elif form == 0x5E:
+            r.valtype()
+            r.byte()
+            self.types.append(None)
+        else:
+            raise DecodeError(f"unknown type form 0x{form:02x}")
+
+    def _parse_import(self, r):
+        module = r.name()
+        name = r.name()
+        kind = r.byte()
+        start = r.pos
+        typeidx = valtype = mem_flags = None
+        if kind == KIND_FUNC:
+            typeidx = r.u()
+        elif kind == KIND_TABLE:
+            r.valtype()
+            r.limits()
+        elif kind == KIND_MEMORY:
+            mem_flags = r.limits()
+        elif kind == KIND_GLOBAL:
+            valtype = r.valtype()
+            r.byte()
+        elif kind == KIND_TAG:
+            r.byte()
+            typeidx = r.u()
+        else:
+            raise DecodeError(f"unknown import kind {kind}")
+        imp = Import(module, name, kind, bytes(r.data[start:r.pos]))
+        imp.typeidx = typeidx
+        imp.valtype = valtype
+        imp.mem_flags = mem_flags
+        return imp
+
+    def _parse_elem(self, r):
+        flags = r.u()
+        table = offset = elemtype = funcs = exprs = None
+        if flags & 0x02 and not flags & 0x01:
+            table = r.u()
+        if not flags & 0x01:
+            offset = decode_expr(r)
+        if flags & 0x03:
+            elemtype = r.valtype() if flags & 0x04 else r.bytes(1)
+        if flags & 0x04:
+            exprs = [decode_expr(r) for _ in range(r.u())]
+        else:
+            funcs = [r.u() for _ in range(r.u())]
+        return Elem(flags, table, offset, elemtype, funcs, exprs)
+
+    def _parse_data(self, r):
+        flags = r.u()
+        memory = offset = None
+        if flags == 2:
+            memory = r.u()
+        if flags in (0, 2):
+            offset = decode_expr(r)
+        return Data(flags, memory, offset, r.name())
+
+    def _parse_func(self, r, typeidx):
+        size = r.u()
+        end = r.pos + size
+        raw = r.bytes(size)
+        fr = Reader(raw)
+        locals_ = []
+        body = None
+        try:
+            for _ in range(fr.u()):
+                count = fr.u()
+                locals_.append((count, fr.valtype()))
+            body = decode_expr(fr)
+            if not fr.eof():
+                body = None
+        except DecodeError:
+            body = None
+        r.pos = end
+        return Func(typeidx, locals_, body, raw)
+
+    # ----- index spaces -----
+
+    def imported(self, kind):
+        return [imp for imp in self.imports if imp.kind == kind]
+
+    def func_count(self):
+        return len(self.imported(KIND_FUNC)) + len(self.funcs)
+
+    def global_count(self):
+        return len(self.imported(KIND_GLOBAL)) + len(self.globals)
+
+    def func_type(self, funcidx):
+        imported = self.imported(KIND_FUNC)
+        if funcidx < len(imported):
+            typeidx = imported[funcidx].typeidx
+        else:
+            typeidx = self.funcs[funcidx - len(imported)].typeidx
+        return self.types[typeidx] if typeidx < len(self.types) else None
+
+    def global_type(self, globalidx):
+        imported = self.imported(KIND_GLOBAL)
+        if globalidx < len(imported):
+            return imported[globalidx].valtype
+        return self.globals[globalidx - len(imported)].valtype
+
+    def memory_is_64(self, memidx):
+        flags = [imp.mem_flags for imp in self.imported(KIND_MEMORY)] + self.memories
+        return memidx < len(flags) and bool(flags[memidx] & 0x04)
+
+    def references(self, role):
+        """
+        Count references to each index of an index space ('func', 'global' or
+        'data'). A function calling itself does not count as a reference, so
+        self-recursive functions can still be dropped. Returns None when an
+        undecoded body could hide references.
+        """
+        counts = {}
+        own = None
+
+        def scan(nodes):
+            for ins in iter_instrs(nodes):
+                scan_fields(ins.fields)
+
+        def scan_fields(fields):
+            for enc, value, r in fields:
+                if enc in ("vec", "seq"):
+                    scan_fields(value)
+                elif r == role and value != own:
+                    counts[value] = counts.get(value, 0) + 1
+
+        kind = {"func": KIND_FUNC, "global": KIND_GLOBAL}.get(role)
+        for exp in self.exports:
+            if exp.kind == kind:
+                counts[exp.index] = counts.get(exp.index, 0) + 1
+        if role == "func" and self.start is not None:
+            counts[self.start] = counts.get(self.start, 0) + 1
+        for glob in self.globals:
+            scan(glob.init)
+        for elem in self.elems:
+            if elem.offset:
+                scan(elem.offset)
+            if role == "func" and elem.funcs:
+                for idx in elem.funcs:
+                    counts[idx] = counts.get(idx, 0) + 1
+            for expr in elem.exprs or ():
+                scan(expr)
+        for data in self.datas:
+            if data.offset:
+                scan(data.offset)
+        n_func_imports = len(self.imported(KIND_FUNC))
+        for i, func in enumerate(self.funcs):
+            if func.body is None:
+                return None
+            own = n_func_imports + i if role == "func" else None
+            scan(func.body)
+        return counts
+
+    # ----- encoding -----
+
+    def encode(self, edit=None):
+        edit = edit or Edit()
+        n_func_imports = len(self.imported(KIND_FUNC))
+        n_global_imports = len(self.imported(KIND_GLOBAL))
+        func_map = _index_map(self.func_count(), edit.funcs)
+        global_map = _index_map(self.global_count(), edit.globals)
+        data_map = _index_map(len(self.datas), edit.datas)
+        remap = None
+        if edit.funcs or edit.globals or edit.datas:
+            remap = {"func": func_map, "global": global_map, "data": data_map}
+
+        imports = []
+        fi = gi = 0
+        for imp in self.imports:
+            if imp.kind == KIND_FUNC:
+                fi += 1
+                if fi - 1 in edit.funcs:
+                    continue
+            elif imp.kind == KIND_GLOBAL:
+                gi += 1
+                if gi - 1 in edit.globals:
+                    continue
+            imports.append(enc_name(imp.module) + enc_name(imp.name) + bytes([imp.kind]) + imp.desc)
+
+        funcs = [(i, f) for i, f in enumerate(self.funcs) if i + n_func_imports not in edit.funcs]
+        globals_ = [g for i, g in enumerate(self.globals) if i + n_global_imports not in edit.globals]
+        exports = []
+        for i, exp in enumerate(self.exports):
+            if i in edit.exports:
+                continue
+            index = exp.index
+            if exp.kind == KIND_FUNC:
+                index = func_map[index]
+            elif exp.kind == KIND_GLOBAL:
+                index = global_map[index]
+            exports.append(enc_name(exp.name) + bytes([exp.kind]) + enc_u(index))
+        datas = [d for i, d in enumerate(self.datas) if i not in edit.datas]
+
+        payloads = {}
+        if self.imports:
+            payloads[SEC_IMPORT] = enc_vec(imports) if imports else None
+        payloads[SEC_FUNCTION] = enc_vec([enc_u(f.typeidx) for _, f in funcs]) if funcs else None
+        payloads[SEC_GLOBAL] = enc_vec([
+            g.valtype + bytes([g.mut]) + bytes(encode_expr(g.init, bytearray(), remap))
+            for g in globals_
+        ]) if globals_ else None
+        payloads[SEC_EXPORT] = enc_vec(exports) if exports else None
+        if self.start is not None:
+            payloads[SEC_START] = enc_u(func_map[self.start])
+        payloads[SEC_ELEMENT] = enc_vec([self._encode_elem(e, func_map, remap) for e in self.elems]) \
+            if self.elems else None
+        payloads[SEC_DATACOUNT] = enc_u(len(datas))
+        payloads[SEC_CODE] = enc_vec([
+            self._encode_func(i, f, edit, remap) for i, f in funcs
+        ]) if funcs else None
+        payloads[SEC_DATA] = enc_vec([self._encode_data(d, remap) for d in datas]) if datas else None
+
+        out = bytearray(MAGIC + VERSION)
+        custom_positions = {pos for pos, _, _ in self.customs}
+        dropped_customs = {self.customs[i][0] for i in edit.customs}
+        names_stale = bool(edit.funcs or edit.globals)
+        for pos, (sid, payload) in enumerate(self.sections):
+            if sid == SEC_CUSTOM:
+                if pos in dropped_customs:
+                    continue
+                if names_stale and pos in custom_positions and Reader(payload).name() == b"name":
+                    continue
+            elif sid in payloads:
+                payload = payloads[sid]
+                if payload is None:
+                    continue
+            out.append(sid)
+            out += enc_u(len(payload))
+            out += payload
+        return bytes(out)
+
+    def _encode_elem(self, elem, func_map, remap):
+        out = bytearray(enc_u(elem.flags))
+        if elem.table is not None:
+            out += enc_u(elem.table)
+        if elem.offset is not None:
+            encode_expr(elem.offset, out, remap)
+        if elem.elemtype is not None:
+            out += elem.elemtype
+        if elem.exprs is not None:
+            out += enc_u(len(elem.exprs))
+            for expr in elem.exprs:
+                encode_expr(expr, out, remap)
+        else:
+            out += enc_vec([enc_u(func_map[i]) for i in elem.funcs])
+        return bytes(out)
+
+    def _encode_data(self, data, remap):
+        out = bytearray(enc_u(data.flags))
+        if data.memory is not None:
+            out += enc_u(data.memory)
+        if data.offset is not None:
+            encode_expr(data.offset, out, remap)
+        out += enc_name(data.init)
+        return bytes(out)
+
+    def _encode_func(self, i, func, edit, remap):
+        if i in edit.bodies:
+            locals_, body = edit.bodies[i]
+        else:
+            locals_, body = func.locals, func.body
+        if body is None:
+            if remap:
+                raise DecodeError("cannot renumber indices inside an undecoded body")
+            raw = func.raw
+        else:
+            out = bytearray(enc_u(len(locals_)))
+            for count, valtype in locals_:
+                out += enc_u(count) + valtype
+            encode_expr(body, out, remap)
+            raw = bytes(out)
+        return enc_u(len(raw)) + raw
+
+
+def _index_map(count, dropped):
+    mapping = {}
+    j = 0
+    for i in range(count):
+        if i not in dropped:
+            mapping[i] = j
+            j += 1
+    return mapping
+
+
+# ----------- Constants -----------
+
+def default_value(valtype):
+    """
+    Instruction producing the default value of `valtype`, or None when the type
+    has no default (non-nullable references).
+    """
+    if valtype == I32:
+        return Instr(0x41, [("s", 0, None)])
+    if valtype == I64:
+        return Instr(0x42, [("s", 0, None)])
+    if valtype == F32:
+        return Instr(0x43, [("raw", b"\0" * 4, None)])
+    if valtype == F64:
+        return Instr(0x44, [("raw", b"\0" * 8, None)])
+    if valtype == V128:
+        return Instr((0xFD, 12), [("raw", b"\0" * 16, None)])
+    if len(valtype) == 1:
+        return Instr(0xD0, [("raw", valtype, None)])
+    if valtype[0] == 0x63:
+        return Instr(0xD0, [("raw", valtype[1:], None)])
+    return None
+
+
+def is_const(ins):
+    return not isinstance(ins, Block) and ins.op in (0x41, 0x42, 0x43, 0x44, (0xFD, 12), 0xD0)
@@ -0,0 +1,530 @@
+#!/usr/bin/env python3
+"""
+Structure-aware WebAssembly reducer.
+
+Parses the testcase with wasm_module and applies hierarchical delta debugging
+over module structure: custom sections, exports, function bodies, unreferenced
+functions, globals and data segments, then instruction subtrees inside each
+function. Every candidate is built so that it stays a valid module (removed
+items are unreferenced, indices are renumbered, and instruction subtrees are
+only removed or replaced by a constant when their stack effect is preserved),
+so no predicate call is spent on a module the runtimes would reject.
+
+Candidates are judged with the same contract lithium uses:
+`interesting(args, prefix)` from a predicate module such as lithium_predicate.py.
+
+Usage:
+  python3 wasm_reducer.py [--predicate lithium_predicate.py] [--keep-export NAME] \
+      [-o shrunken.wasm] testcase.wasm
+"""
+import argparse
+import hashlib
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from wasm_module import (
+    Block, DecodeError, Edit, Module, I32, I64, F32, F64, V128, default_value, is_const,
+)
+from workspace import publish, scratch_root
+
+# ----------- Stack effects -----------
+
+POLYMORPHIC = object()
+
+# op -> (operand count, result types) for instructions with a fixed signature.
+FIXED = {0x01: (0, []), 0x41: (0, [I32]), 0x42: (0, [I64]), 0x43: (0, [F32]), 0x44: (0, [F64]),
+         0x45: (1, [I32]), 0x50: (1, [I32]), 0xD1: (1, [I32]), (0xFD, 12): (0, [V128]),
+         (0xFC, 9): (0, []), (0xFC, 8): (3, []), (0xFC, 10): (3, []), (0xFC, 11): (3, [])}
+for _op in range(0x46, 0x50):
+    FIXED[_op] = (2, [I32])
+for _op in range(0x51, 0x67):
+    FIXED[_op] = (2, [I32])
+for _lo, _hi, _n, _t in ((0x67, 0x69, 1, I32), (0x6A, 0x78, 2, I32), (0x79, 0x7B, 1, I64),
+                         (0x7C, 0x8A, 2, I64), (0x8B, 0x91, 1, F32), (0x92, 0x98, 2, F32),
+                         (0x99, 0x9F, 1, F64), (0xA0, 0xA6, 2, F64), (0xC0, 0xC1, 1, I32),
+                         (0xC2, 0xC4, 1, I64)):
+    for _op in range(_lo, _hi + 1):
+        FIXED[_op] = (_n, [_t])
+for _op, _t in zip(range(0xA7, 0xC0), (I32, I32, I32, I32, I32, I64, I64, I64, I64, I64, I64,
+                                        F32, F32, F32, F32, F32, F64, F64, F64, F64, F64,
+                                        I32, I64, F32, F64)):
+    FIXED[_op] = (1, [_t])
+for _sub, _t in enumerate((I32, I32, I32, I32, I64, I64, I64, I64)):
+    FIXED[(0xFC, _sub)] = (1, [_t])
+for _op, _t in zip(range(0x28, 0x36), (I32, I64, F32, F64, I32, I32, I32, I32,
+                                        I64, I64, I64, I64, I64, I64)):
+    FIXED[_op] = (1, [_t])
+for _op in range(0x36, 0x3F):
+    FIXED[_op] = (2, [])
+FIXED[(0xFD, 0)] = (1, [V128])
+FIXED[(0xFD, 11)] = (2, [])
+
+ENDS_REACHABILITY = {0x00, 0x08, 0x09, 0x0A, 0x0C, 0x0E, 0x0F, 0x12, 0x13, 0x15}
+
+REPLACEABLE = {I32, I64, F32, F64, V128}
+
+
+class Candidate:
+    """
+    A contiguous span [start, end) of one instruction sequence, identified by
+    `path` (a tuple of (node index, arm index) steps from the function body).
+    `valtype` is None for a span with no net stack effect (removed outright),
+    otherwise the type of the single value it produces (replaced by a constant).
+    """
+    __slots__ = ("path", "start", "end", "valtype", "parent", "level")
+
+    def __init__(self, path, start, end, valtype):
+        self.path = path
+        self.start = start
+        self.end = end
+        self.valtype = valtype
+        self.parent = None
+        self.level = 0
+
+
+class Context:
+    def __init__(self, module, func):
+        self.module = module
+        ftype = module.types[func.typeidx] if func.typeidx < len(module.types) else None
+        self.locals = (list(ftype.params) if ftype else []) + func.local_types()
+        self.results = list(ftype.results) if ftype else None
+
+    def blocktype(self, bt):
+        if bt == b"\x40":
+            return [], []
+        if isinstance(bt, bytes):
+            return [], [bt]
+        if bt < len(self.module.types) and self.module.types[bt] is not None:
+            ftype = self.module.types[bt]
+            return list(ftype.params), list(ftype.results)
+        return None
+
+    def effect(self, ins, stack, labels):
+        op = ins.op
+        if op in ENDS_REACHABILITY:
+            return POLYMORPHIC
+        if op in FIXED:
+            return FIXED[op]
+        if op == 0x20:
+            return 0, [self.locals[ins.index("local")]]
+        if op == 0x21:
+            return 1, []
+        if op == 0x22:
+            return 1, [self.locals[ins.index("local")]]
+        if op == 0x23:
+            return 0, [self.module.global_type(ins.index("global"))]
+        if op == 0x24:
+            return 1, []
+        if op == 0x1A:
+            return 1, []
+        if op == 0x1B:
+            return (3, [stack[-2][1]]) if len(stack) >= 3 else None
+        if op == 0x1C:
+            return 3, [ins.fields[0][1][0][1]]
+        if op == 0x0D:
+            label = labels[-1 - ins.index("label")]
+            return len(label) + 1, list(label)
+        if op == 0x10:
+            ftype = self.module.func_type(ins.index("func"))
+            return (len(ftype.params), list(ftype.results)) if ftype else None
+        if op == 0x11:
+            typeidx = ins.index("type")
+            ftype = self.module.types[typeidx] if typeidx < len(self.module.types) else None
+            return (len(ftype.params) + 1, list(ftype.results)) if ftype else None
+        if op in (0x3F, 0x40):
+            addr = I64 if self.module.memory_is_64(ins.index("mem")) else I32
+            return (0 if op == 0x3F else 1), [addr]
+        if op == 0xD0:
+            ht = ins.fields[0][1]
+            return 0, [ht if len(ht) == 1 else b"\x63" + ht]
+        return None
+
+
+def analyze(seq, path, params, labels, ctx, out):
+    """
+    Simulate the operand stack over one instruction sequence and record every
+    span that either leaves the stack unchanged or pushes exactly one value
+    built only from operands produced inside the span. Stops at the first
+    instruction whose stack effect is unknown or that makes the rest of the
+    sequence unreachable, since spans past that point cannot be checked.
+    """
+    stack = [(None, t) for t in params]
+    for k, node in enumerate(seq):
+        if isinstance(node, Block):
+            if node.op not in (0x02, 0x03, 0x04):
+                return
+            bt = ctx.blocktype(node.blocktype)
+            if bt is None:
+                return
+            bparams, bresults = bt
+            label = bparams if node.op == 0x03 else bresults
+            for arm_idx, (_, body) in enumerate(node.arms):
+                analyze(body, path + ((k, arm_idx),), bparams, labels + [label], ctx, out)
+            npop = len(bparams) + (1 if node.op == 0x04 else 0)
+            push = bresults
+        else:
+            eff = ctx.effect(node, stack, labels)
+            if eff is None or eff is POLYMORPHIC:
+                return
+            npop, push = eff
+        if npop > len(stack):
+            return
+        popped = stack[len(stack) - npop:]
+        del stack[len(stack) - npop:]
+        if npop == 0:
+            start = k
+        elif any(s is None for s, _ in popped):
+            start = None
+        else:
+            start = popped[0][0]
+        if start is not None:
+            if not push:
+                out.append(Candidate(path, start, k + 1, None))
+            elif len(push) == 1 and push[0] in REPLACEABLE:
+                if k + 1 - start > 1 or not is_const(node):
+                    out.append(Candidate(path, start, k + 1, push[0]))
+        if len(push) == 1:
+            stack.append((start, push[0]))
+        else:
+            stack.extend((None, t) for t in push)
+
+
+def body_candidates(module, func):
+    if func.body is None or func.typeidx >= len(module.types) or module.types[func.typeidx] is None:
+        return []
+    if any(default_value(t) is None for _, t in func.locals):
+        return []
+    ctx = Context(module, func)
+    out = []
+    analyze(func.body, (), [], [ctx.results], ctx, out)
+    link_candidates(out)
+    return out
+
+
+def link_candidates(cands):
+    """Set each candidate's innermost enclosing candidate and its nesting level."""
+    by_path = {}
+    for c in cands:
+        by_path.setdefault(c.path, []).append(c)
+    for group in by_path.values():
+        group.sort(key=lambda c: (c.start, -c.end))
+        stack = []
+        for c in group:
+            while stack and stack[-1].end <= c.start:
+                stack.pop()
+            if stack and stack[-1].end >= c.end:
+                c.parent = stack[-1]
+            stack.append(c)
+    for c in cands:
+        if c.parent is not None:
+            continue
+        path = c.path
+        while path and c.parent is None:
+            k = path[-1][0]
+            path = path[:-1]
+            enclosing = [p for p in by_path.get(path, ()) if p.start <= k < p.end]
+            if enclosing:
+                c.parent = max(enclosing, key=lambda p: p.start)
+    for c in cands:
+        level = 0
+        p = c.parent
+        while p is not None:
+            level += 1
+            p = p.parent
+        c.level = level
+
+
+def apply_candidates(body, chosen):
+    """Return a copy of `body` with the chosen (non-overlapping) spans edited."""
+    by_path = {}
+    for c in chosen:
+        by_path.setdefault(c.path, []).append(c)
+    touched = {}
+    for path in by_path:
+        for depth in range(len(path)):
+            touched.setdefault(path[:depth], set()).add(path[depth])
+
+    def rebuild(seq, path):
+        new = list(seq)
+        arms_by_node = {}
+        for k, arm_idx in touched.get(path, ()):
+            arms_by_node.setdefault(k, set()).add(arm_idx)
+        for k, arm_set in arms_by_node.items():
+            blk = new[k]
+            arms = [
+                (sep, rebuild(arm_body, path + ((k, a),)) if a in arm_set else arm_body)
+                for a, (sep, arm_body) in enumerate(blk.arms)
+            ]
+            new[k] = Block(blk.op, blk.fields, arms, blk.end)
+        for c in sorted(by_path.get(path, ()), key=lambda c: c.start, reverse=True):
+            new[c.start:c.end] = [] if c.valtype is None else [default_value(c.valtype)]
+        return new
+
+    return rebuild(body, ())
+
+
+def outermost(chosen):
+    chosen = set(chosen)
+    result = []
+    for c in chosen:
+        p = c.parent
+        while p is not None and p not in chosen:
+            p = p.parent
+        if p is None:
+            result.append(c)
+    return result
+
+
+# ----------- Delta debugging -----------
+
+def ddmin(items, test):
+    """
+    Find a large subset of `items` that can be removed together.
+    `test(subset)` returns True when removing `subset` keeps the testcase
+    interesting. Returns the removed items.
+    """
+    if not items:
+        return []
+    if test(items):
+        return list(items)
+    kept = list(items)
+    removed = []
+    n = 2
+    while len(kept) >= 2:
+        chunk = -(-len(kept) // n)
+        progress = False
+        for i in range(0, len(kept), chunk):
+            trial = kept[i:i + chunk]
+            if test(removed + trial):
+                removed += trial
+                kept = kept[:i] + kept[i + chunk:]
+                n = max(n - 1, 2)
+                progress = True
+                break
+        if not progress:
+            if n >= len(kept):
+                break
+            n = min(n * 2, len(kept))
+    if len(kept) == 1 and test(removed + kept):
+        removed += kept
+    return removed
+
+
+class Reducer:
+    def __init__(self, data, predicate, output, keep_exports=(), workdir=None):
+        self.best = bytes(data)
+        self.predicate = predicate
+        self.output = output
+        self.keep_exports = {name.encode() for name in keep_exports}
+        self.workdir = workdir or tempfile.mkdtemp(prefix="wasm_reducer_", dir=scratch_root())
+        self.cache = {}
+        self.calls = 0
+        self.started = time.time()
+
+    # ----- predicate -----
+
+    def interesting(self, data):
+        if data == self.best:
+            return True
+        key = hashlib.sha256(data).digest()
+        if key in self.cache:
+            return self.cache[key]
+        self.calls += 1
+        prefix = os.path.join(self.workdir, f"candidate{self.calls}")
+        path = prefix + ".wasm"
+        with open(path, "wb") as f:
+            f.write(data)
+        try:
+            result = bool(self.predicate.interesting([path], prefix))
+        finally:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.cache[key] = result
+        if result and len(data) < len(self.best):
+            self.best = data
+            self.save()
+            print(f"[+] {len(data)} bytes after {self.calls} predicate calls")
+        return result
+
+    def save(self):
+        publish(self.best, self.output)
+
+    def try_edits(self, module, make_edit, items):
+        """ddmin over `items`, where `make_edit(subset)` builds the Edit removing them."""
+        def test(subset):
+            try:
+                data = module.encode(make_edit(subset))
+            except DecodeError:
+                return False
+            if len(data) >= len(self.best):
+                return data == self.best
+            return self.interesting(data)
+        return ddmin(items, test)
+
+    # ----- passes -----
+
+    def module(self):
+        return Module(self.best)
+
+    def reduce_customs(self):
+        module = self.module()
+        self.try_edits(module, lambda s: Edit(customs=s), list(range(len(module.customs))))
+
+    def reduce_exports(self):
+        module = self.module()
+        items = [i for i, exp in enumerate(module.exports) if exp.name not in self.keep_exports]
+        self.try_edits(module, lambda s: Edit(exports=s), items)
+
+    def reduce_function_bodies(self):
+        module = self.module()
+        stubs = {}
+        for i, func in enumerate(module.funcs):
+            ftype = module.types[func.typeidx] if func.typeidx < len(module.types) else None
+            if ftype is None:
+                continue
+            stub = [default_value(t) for t in ftype.results]
+            if any(ins is None for ins in stub):
+                continue
+            if func.body is not None and not func.locals and len(func.body) == len(stub) \
+                    and all(is_const(ins) for ins in func.body):
+                continue
+            stubs[i] = ([], stub)
+        self.try_edits(module, lambda s: Edit(bodies={i: stubs[i] for i in s}), sorted(stubs))
+
+    def reduce_unreferenced(self, role):
+        while True:
+            module = self.module()
+            refs = module.references(role)
+            if refs is None:
+                return
+            count = {"func": module.func_count(), "global": module.global_count(),
+                     "data": len(module.datas)}[role]
+            items = [i for i in range(count) if not refs.get(i)]
+            make = {"func": lambda s: Edit(funcs=s), "global": lambda s: Edit(globals_=s),
+                    "data": lambda s: Edit(datas=s)}[role]
+            if not self.try_edits(module, make, items):
+                return
+
+    def reduce_instructions(self):
+        module = self.module()
+        order = sorted(range(len(module.funcs)), key=lambda i: -len(module.funcs[i].raw))
+        for i in order:
+            module = self.module()
+            if i >= len(module.funcs):
+                continue
+            func = module.funcs[i]
+            cands = body_candidates(module, func)
+            if not cands:
+                continue
+            removed = set()
+            for level in range(max(c.level for c in cands) + 1):
+                items = [c for c in cands if c.level == level and not self._ancestor_in(c, removed)]
+                if not items:
+                    continue
+                # Largest spans first so ddmin's early chunks carry the most weight.
+                items.sort(key=lambda c: c.start - c.end)
+
+                def make(subset, func=func, i=i):
+                    body = apply_candidates(func.body, outermost(removed | set(subset)))
+                    return Edit(bodies={i: (func.locals, body)})
+                removed |= set(self.try_edits(module, make, items))
+
+    @staticmethod
+    def _ancestor_in(c, removed):
+        p = c.parent
+        while p is not None:
+            if p in removed:
+                return True
+            p = p.parent
+        return False
+
+    def run(self, max_rounds=8):
+        reencoded = self.module().encode()
+        if reencoded != self.best and not self.interesting_or_equal(reencoded):
+            print("[!] Re-encoded testcase is not interesting; leaving it untouched.")
+            return self.best
+        for round_idx in range(1, max_rounds + 1):
+            size = len(self.best)
+            print(f"[*] Round {round_idx}: {size} bytes")
+            self.reduce_customs()
+            self.reduce_exports()
+            self.reduce_function_bodies()
+            self.reduce_unreferenced("func")
+            self.reduce_unreferenced("global")
+            self.reduce_unreferenced("data")
+            self.reduce_instructions()
+            self.reduce_unreferenced("func")
+            if len(self.best) >= size:
+                break
+        elapsed = time.time() - self.started
+        print(f"[*] Done: {len(self.best)} bytes, {self.calls} predicate calls, {elapsed:.1f}s")
+        return self.best
+
+    def interesting_or_equal(self, data):
+        if self.interesting(data):
+            self.best = data
+            self.save()
+            return True
+        return False
+
+
+def load_predicate(path):
+    spec = importlib.util.spec_from_file_location("wasm_reducer_predicate", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if not hasattr(module, "interesting"):
+        raise SystemExit(f"[!] {path} does not define interesting(args, prefix)")
+    return module
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Structure-aware WebAssembly reducer")
+    parser.add_argument("testcase", help="Path to the .wasm testcase to reduce")
+    parser.add_argument("--predicate", default=os.path.join(here, "lithium_predicate.py"),
+                        help="Python file defining interesting(args, prefix)")
+    parser.add_argument("--keep-export", action="append", default=None,
+                        help="Export that must survive reduction (default: $FUNC_NAME)")
+    parser.add_argument("-o", "--output", help="Reduced output (default: shrunken_<name>.wasm)")
+    parser.add_argument("--max-rounds", type=int, default=8, help="Maximum reduction rounds")
+    parser.add_argument("--tempdir", help="Directory for candidate files (default: tmpfs when available)")
+    args = parser.parse_args()
+    sys.setrecursionlimit(100000)
+
+    keep = args.keep_export
+    if keep is None:
+        keep = [os.environ["FUNC_NAME"]] if os.environ.get("FUNC_NAME") else []
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(args.testcase)),
+        f"shrunken_{os.path.splitext(os.path.basename(args.testcase))[0]}.wasm")
+
+    with open(args.testcase, "rb") as f:
+        data = f.read()
+    try:
+        Module(data)
+    except DecodeError as e:
+        print(f"[!] Cannot parse {args.testcase}: {e}")
+        sys.exit(1)
+
+    predicate = load_predicate(args.predicate)
+    workdir = tempfile.mkdtemp(prefix="wasm_reducer_", dir=args.tempdir or scratch_root())
+    try:
+        print(f"[*] Checking that {args.testcase} is interesting")
+        if not predicate.interesting([args.testcase], os.path.join(workdir, "original")):
+            print("[!] The original testcase is not interesting. Stopping reduction.")
+            sys.exit(1)
+        reducer = Reducer(data, predicate, output, keep, workdir)
+        reducer.save()
+        reducer.run(args.max_rounds)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+# tmpfs keeps the many small replay artifacts of a predicate call off the disk.
+TMPFS_ROOT = "/dev/shm"
+
+# The process umask, read once at import (os.umask can only read it by setting it)
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def scratch_root():
+    """
+    Directory under which per-candidate workspaces are created:
+    $REDUCE_SCRATCH if set, else /dev/shm when writable, else the system temp dir.
+    """
+    root = os.environ.get("REDUCE_SCRATCH")
+    if root:
+        os.makedirs(root, exist_ok=True)
+        return root
+    if os.path.isdir(TMPFS_ROOT) and os.access(TMPFS_ROOT, os.W_OK):
+        return TMPFS_ROOT
+    return tempfile.gettempdir()
+
+
+def new_workspace(tag="predicate"):
+    """Create a fresh, uniquely named scratch directory under scratch_root() and return its path."""
+    return tempfile.mkdtemp(prefix=f"{tag}.", dir=scratch_root())
+
+
+@contextmanager
+def candidate_workspace(tag="predicate"):
+    """
+    Create a private scratch directory for one predicate evaluation and remove
+    it afterwards, whatever the outcome. Concurrent reductions of testcases in
+    the same directory (or of the same testcase with different seeds) each get
+    their own replay inputs, compiled artifacts and outputs.
+    """
+    path = new_workspace(tag)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def publish(data, dest):
+    """
+    Atomically write `data` to `dest`: readers see either the previous file or
+    the complete new one, never a partially written result. The file keeps the
+    mode of the one it replaces, or gets the usual 0o666 minus the umask (not
+    mkstemp's 0o600).
+    """
+    dest_dir = os.path.dirname(os.path.abspath(dest))
+    try:
+        mode = os.stat(dest).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~UMASK
+    fd, tmp = tempfile.mkstemp(prefix=".publish.", dir=dest_dir)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, mode)
+        os.replace(tmp, dest)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def log_verdict(path, size, verdict):
+    """
+    Append one "<unix time> <candidate size> <verdict>" line to `path` (the
+    $REDUCE_LOG of a benchmark run). Lines are short single writes to a file
+    opened in append mode, so concurrent predicate processes do not interleave.
+    """
+    if not path:
+        return
+    with open(path, "a") as f:
+        f.write(f"{time.time():.6f} {size} {int(bool(verdict))}\n")
+
+
+if __name__ == "__main__":
+    # For the shell drivers: `python3 workspace.py [tag]` creates a workspace and prints its path;
+    # the caller removes it.
+    import sys
+    print(new_workspace(sys.argv[1] if len(sys.argv) > 1 else "predicate"))